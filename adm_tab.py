@@ -11,6 +11,11 @@ Funcionalidades principais:
 - Proteções contra operações indevidas
 - Hash seguro de senhas com bcrypt
 - Validações em tempo real
+- Importação de contas em lote a partir de CSV (staff_import.py)
+- Cópia de segurança sob demanda (backup.py)
+- Arquivamento de registros antigos (archive.py)
+- Publicação do site estático de adoção (static_site.py)
+- Verificação dos planos de consulta e do arquivo do banco (doctor.py)
 
 Controle de acesso:
 - Níveis implementados:
@@ -44,10 +49,20 @@ Validações do sistema:
 - Integridade referencial
 """
 
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database import session
+from tkinter import ttk, messagebox, filedialog
+from database import read_session, session_scope
 from models import AuthUser
+import queries
+import archive
+import backup
+import diagnostics
+import doctor
+import staff_import
+import static_site
+from diagnostics import instrumentado
+from utils import ACCESS_LEVELS
 
 class AdmTab(ttk.Frame):
     """
@@ -117,7 +132,8 @@ class AdmTab(ttk.Frame):
         2. Divisão em painéis principais
         3. Construção da tabela no painel esquerdo
         4. Construção do formulário no painel direito
-        5. Carregamento inicial dos dados
+        5. Seção de diagnóstico de consultas
+        6. Carregamento inicial dos dados
         """
         # Título principal da aba
         ttk.Label(self, text="Gerenciamento de Usuários do Sistema", 
@@ -196,7 +212,7 @@ class AdmTab(ttk.Frame):
         
         # Campo: Nível de acesso (combobox)
         ttk.Label(form_frame, text="Nível de Acesso *").grid(row=6, column=0, sticky="w", pady=(5, 2))
-        self.combo_nivel = ttk.Combobox(form_frame, values=["admin", "gestor", "usuario"], 
+        self.combo_nivel = ttk.Combobox(form_frame, values=ACCESS_LEVELS, 
                                       state="readonly", width=22)
         self.combo_nivel.grid(row=7, column=0, sticky="we", pady=(0, 15))
         self.combo_nivel.set("usuario")  # Valor padrão
@@ -209,6 +225,38 @@ class AdmTab(ttk.Frame):
         ttk.Button(btn_frame, text="Novo", command=self.novo_usuario).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Salvar", command=self.salvar_usuario).pack(side=tk.LEFT, padx=5)
         ttk.Button(btn_frame, text="Excluir", command=self.excluir_usuario).pack(side=tk.LEFT, padx=5)
+
+        # Importação em lote (CSV com usuario, senha e nivel)
+        self.btn_importar = ttk.Button(form_frame, text="Importar CSV...", command=self.importar_usuarios)
+        self.btn_importar.grid(row=9, column=0, sticky="w", pady=(0, 5))
+        
+        # ========== CÓPIAS DE SEGURANÇA ==========
+        backup_frame = ttk.LabelFrame(form_frame, text="Cópias de Segurança")
+        backup_frame.grid(row=10, column=0, sticky="we", pady=(10, 0))
+        self.lbl_backup = ttk.Label(backup_frame, text="")
+        self.lbl_backup.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        self.btn_backup = ttk.Button(backup_frame, text="Fazer backup agora", command=self.fazer_backup)
+        self.btn_backup.pack(anchor=tk.W, padx=5, pady=5)
+        self.atualizar_backup()
+        
+        # ========== ARQUIVO HISTÓRICO ==========
+        archive_frame = ttk.LabelFrame(form_frame, text="Arquivo Histórico")
+        archive_frame.grid(row=11, column=0, sticky="we", pady=(10, 0))
+        self.lbl_arquivo = ttk.Label(archive_frame, text=f"Adotados e encerrados há mais de {archive.CUTOFF_DAYS} dias")
+        self.lbl_arquivo.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        self.btn_arquivo = ttk.Button(archive_frame, text="Arquivar antigos", command=self.arquivar_antigos)
+        self.btn_arquivo.pack(anchor=tk.W, padx=5, pady=5)
+        
+        # ========== SITE PÚBLICO ==========
+        site_frame = ttk.LabelFrame(form_frame, text="Site Público")
+        site_frame.grid(row=12, column=0, sticky="we", pady=(10, 0))
+        self.lbl_site = ttk.Label(site_frame, text=f"Animais disponíveis em {static_site.OUTPUT_DIR}")
+        self.lbl_site.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        self.btn_site = ttk.Button(site_frame, text="Publicar site", command=self.publicar_site)
+        self.btn_site.pack(anchor=tk.W, padx=5, pady=5)
+        
+        # ========== SEÇÃO DE DIAGNÓSTICO ==========
+        self.criar_diagnostico()
         
         # Inicialização de variáveis de estado
         self.selected_id = None  # Nenhum usuário selecionado inicialmente
@@ -216,6 +264,7 @@ class AdmTab(ttk.Frame):
         # Carrega os usuários existentes na tabela
         self.carregar_usuarios()
     
+    @instrumentado("ADM: carregar usuários")
     def carregar_usuarios(self):
         """
         Carrega todos os usuários do banco de dados na tabela.
@@ -232,14 +281,13 @@ class AdmTab(ttk.Frame):
         for item in self.tree.get_children():
             self.tree.delete(item)
             
-        # Consulta todos os usuários ordenados por nome
-        usuarios = session.query(AuthUser).order_by(AuthUser.username).all()
-        
-        # Insere cada usuário na tabela
-        for usuario in usuarios:
-            self.tree.insert("", "end", iid=str(usuario.id),
-                           values=(usuario.id, usuario.username, usuario.nivel_acesso))
+        # Consulta todos os usuários ordenados por nome e insere na tabela
+        with read_session() as s:
+            rows = queries.auth_user_rows(s)
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
     
+    @instrumentado("ADM: selecionar")
     def on_select(self, event):
         """
         Manipula a seleção de um usuário na tabela.
@@ -260,7 +308,8 @@ class AdmTab(ttk.Frame):
             
         # Converte o ID (string) para inteiro e busca o usuário
         usuario_id = int(selecionados[0])
-        usuario = session.query(AuthUser).get(usuario_id)
+        with read_session() as s:
+            usuario = s.get(AuthUser, usuario_id)
         self.selected_id = usuario.id  # Armazena o ID para operações futuras
         
         # Preenche o formulário com os dados do usuário
@@ -291,6 +340,7 @@ class AdmTab(ttk.Frame):
         self.entry_confirmar_senha.delete(0, tk.END)
         self.combo_nivel.set("usuario")  # Valor padrão
     
+    @instrumentado("ADM: salvar usuário")
     def salvar_usuario(self):
         """
         Salva ou atualiza um usuário no banco de dados.
@@ -332,43 +382,117 @@ class AdmTab(ttk.Frame):
             messagebox.showerror("Erro", "Senhas não coincidem.")
             return
         
-        # ========== OPERAÇÃO DE EDIÇÃO ==========
-        if self.selected_id:
-            # Busca o usuário existente
-            usuario = session.query(AuthUser).get(self.selected_id)
-            usuario.username = username
-            usuario.nivel_acesso = nivel_acesso
-            
-            # Atualiza senha apenas se foi informada (permite manter a atual)
-            if password:
-                usuario.set_password(password)
-                
-            message = "Usuário atualizado com sucesso!"
-            
-        # ========== OPERAÇÃO DE CRIAÇÃO ==========
-        else:
-            # Verifica se o username já existe
-            if session.query(AuthUser).filter_by(username=username).first():
-                messagebox.showerror("Erro", "Usuário já existe.")
-                return
-                
-            # Cria novo usuário
-            usuario = AuthUser(username=username, nivel_acesso=nivel_acesso)
-            usuario.set_password(password)  # Gera o hash da senha
-            session.add(usuario)
-            message = "Usuário criado com sucesso!"
-        
         # ========== PERSISTÊNCIA NO BANCO ==========
+        # A unidade de trabalho confirma as alterações ao final do bloco
+        # e desfaz tudo automaticamente em caso de erro
         try:
-            session.commit()  # Salva as alterações
+            with session_scope() as s:
+                # ========== OPERAÇÃO DE EDIÇÃO ==========
+                if self.selected_id:
+                    # Busca o usuário existente
+                    usuario = s.get(AuthUser, self.selected_id)
+                    usuario.username = username
+                    usuario.nivel_acesso = nivel_acesso
+                    
+                    # Atualiza senha apenas se foi informada (permite manter a atual)
+                    if password:
+                        usuario.set_password(password)
+                        
+                    message = "Usuário atualizado com sucesso!"
+                    
+                # ========== OPERAÇÃO DE CRIAÇÃO ==========
+                else:
+                    # Verifica se o username já existe
+                    if s.query(AuthUser).filter_by(username=username).first():
+                        messagebox.showerror("Erro", "Usuário já existe.")
+                        return
+                        
+                    # Cria novo usuário
+                    usuario = AuthUser(username=username, nivel_acesso=nivel_acesso)
+                    usuario.set_password(password)  # Gera o hash da senha
+                    s.add(usuario)
+                    message = "Usuário criado com sucesso!"
             self.carregar_usuarios()  # Atualiza a tabela
             self.novo_usuario()  # Limpa o formulário
             messagebox.showinfo("Sucesso", message)
         except Exception as e:
-            # Em caso de erro, faz rollback e informa o usuário
-            session.rollback()
+            # Em caso de erro, o rollback já foi feito; informa o usuário
             messagebox.showerror("Erro", f"Erro ao salvar usuário: {e}")
     
+    def importar_usuarios(self):
+        """
+        Importa contas de um arquivo CSV em segundo plano (staff_import.py).
+
+        As senhas são processadas em paralelo e as contas gravadas numa
+        única transação; o resultado de cada linha é exibido ao final.
+        """
+        caminho = filedialog.askopenfilename(
+            title="Importar usuários",
+            filetypes=[("CSV", "*.csv"), ("Todos os arquivos", "*.*")]
+        )
+        if not caminho:
+            return
+        nivel = self.combo_nivel.get() or "usuario"
+
+        self.btn_importar.config(state=tk.DISABLED, text="Importando...")
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["linhas"] = staff_import.import_accounts(caminho, nivel)
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="importacao", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_importar.config(state=tk.NORMAL, text="Importar CSV...")
+            if "erro" in resultado:
+                messagebox.showerror("Erro", f"Erro na importação: {resultado['erro']}")
+                return
+            self.carregar_usuarios()
+            self.mostrar_importacao(resultado["linhas"])
+
+        aguardar()
+
+    def mostrar_importacao(self, linhas):
+        """
+        Exibe o resultado da importação, uma linha do arquivo por linha.
+
+        Args:
+            linhas (list): Tuplas (linha, usuário, situação, detalhe)
+        """
+        window = tk.Toplevel(self)
+        window.title("Importação de usuários")
+        window.transient(self.winfo_toplevel())
+
+        totais = {situacao: sum(1 for linha in linhas if linha[2] == situacao)
+                  for situacao in (staff_import.CREATED, staff_import.EXISTING, staff_import.ERROR)}
+        ttk.Label(window, text=f"{totais[staff_import.CREATED]} criados, "
+                               f"{totais[staff_import.EXISTING]} já existentes, "
+                               f"{totais[staff_import.ERROR]} com erro").pack(anchor=tk.W, padx=10, pady=(10, 0))
+
+        frame = ttk.Frame(window)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        scrollbar = ttk.Scrollbar(frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        columns = ("Linha", "Usuário", "Situação", "Detalhe")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=15, yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+        for c, w in zip(columns, (60, 150, 90, 220)):
+            tree.heading(c, text=c.upper())
+            tree.column(c, width=w, anchor=tk.W)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        for linha in linhas:
+            tree.insert("", "end", values=linha)
+
+        ttk.Button(window, text="Fechar", command=window.destroy).pack(pady=(0, 10))
+    
+    @instrumentado("ADM: excluir usuário")
     def excluir_usuario(self):
         """
         Exclui o usuário selecionado após confirmação.
@@ -391,7 +515,8 @@ class AdmTab(ttk.Frame):
             return
             
         # Busca o usuário no banco
-        usuario = session.query(AuthUser).get(self.selected_id)
+        with read_session() as s:
+            usuario = s.get(AuthUser, self.selected_id)
         
         # Medida de segurança: impede a exclusão do próprio usuário logado
         if usuario.id == self.usuario_logado.id:
@@ -404,12 +529,319 @@ class AdmTab(ttk.Frame):
             
         # Tenta executar a exclusão
         try:
-            session.delete(usuario)
-            session.commit()
+            with session_scope() as s:
+                s.delete(s.get(AuthUser, usuario.id))
             self.carregar_usuarios()  # Atualiza a tabela
             self.novo_usuario()  # Limpa o formulário
             messagebox.showinfo("Sucesso", "Usuário excluído com sucesso!")
         except Exception as e:
-            # Em caso de erro, faz rollback
-            session.rollback()
+            # Em caso de erro, o rollback já foi feito pela unidade de trabalho
             messagebox.showerror("Erro", f"Erro ao excluir usuário: {e}")
+
+    # ========== CÓPIAS DE SEGURANÇA ==========
+
+    def atualizar_backup(self):
+        """Mostra a cópia mais recente (ou a última falha do agendamento)."""
+        resultado = backup.get_scheduler().last_result
+        if resultado and resultado[2]:
+            self.lbl_backup.config(text=f"Falha em {resultado[0]:%d/%m/%Y %H:%M}: {resultado[2]}")
+            return
+        copias = backup.list_backups()
+        if copias:
+            self.lbl_backup.config(text=f"Última cópia: {copias[0][1]:%d/%m/%Y %H:%M} ({len(copias)} mantidas)")
+        else:
+            self.lbl_backup.config(text="Nenhuma cópia encontrada.")
+
+    def fazer_backup(self):
+        """
+        Cria uma cópia do banco em segundo plano.
+
+        A cópia usa a API de backup do SQLite em passos (backup.py): a
+        interface e as gravações continuam enquanto ela é feita.
+        """
+        self.btn_backup.config(state=tk.DISABLED)
+        self.lbl_backup.config(text="Copiando...")
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["caminho"] = backup.get_scheduler().run_now()
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="backup-manual", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_backup.config(state=tk.NORMAL)
+            self.atualizar_backup()
+            if "erro" in resultado:
+                messagebox.showerror("Erro", f"Erro ao criar a cópia: {resultado['erro']}")
+            else:
+                messagebox.showinfo("Sucesso", f"Cópia criada em {resultado['caminho']}")
+
+        aguardar()
+
+    # ========== ARQUIVO HISTÓRICO ==========
+
+    def arquivar_antigos(self):
+        """
+        Move animais adotados e processos encerrados antigos para o
+        arquivo histórico (archive.py), em segundo plano.
+
+        Cada lote é uma transação curta; o progresso aparece no rótulo
+        da seção e as abas são recarregadas ao final.
+        """
+        if not messagebox.askyesno(
+            "Confirmar",
+            f"Arquivar animais adotados e processos encerrados há mais de {archive.CUTOFF_DAYS} dias?\n\n"
+            "Eles continuam visíveis na aba Adoções com \"Incluir arquivados\"."
+        ):
+            return
+        self.btn_arquivo.config(state=tk.DISABLED)
+        progresso = {}
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["resumo"] = archive.archive_old(progress=progresso.update)
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="arquivo", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                if progresso:
+                    self.lbl_arquivo.config(text=f"Arquivando... {progresso['animals']} animais, "
+                                                 f"{progresso['adoptions']} processos")
+                self.after(300, aguardar)
+                return
+            self.btn_arquivo.config(state=tk.NORMAL)
+            if "erro" in resultado:
+                self.lbl_arquivo.config(text="Falha no arquivamento.")
+                messagebox.showerror("Erro", f"Erro ao arquivar: {resultado['erro']}")
+                return
+            resumo = resultado["resumo"]
+            self.lbl_arquivo.config(text=f"Arquivados {resumo['animals']} animais e {resumo['adoptions']} processos.")
+            root = self.winfo_toplevel()
+            if hasattr(root, "reload_all_tabs"):
+                root.reload_all_tabs()
+
+        aguardar()
+
+    # ========== SITE PÚBLICO ==========
+
+    def publicar_site(self):
+        """
+        Gera o site estático dos animais disponíveis (static_site.py) em
+        segundo plano; apenas as páginas alteradas são regravadas.
+        """
+        self.btn_site.config(state=tk.DISABLED)
+        self.lbl_site.config(text="Publicando...")
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["resumo"] = static_site.publish()
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="site", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_site.config(state=tk.NORMAL)
+            if "erro" in resultado:
+                self.lbl_site.config(text="Falha na publicação.")
+                messagebox.showerror("Erro", f"Erro ao publicar o site: {resultado['erro']}")
+                return
+            resumo = resultado["resumo"]
+            self.lbl_site.config(text=f"{len(resumo['written'])} páginas gravadas, "
+                                      f"{len(resumo['removed'])} apagadas, "
+                                      f"{resumo['unchanged']} sem alteração.")
+
+        aguardar()
+
+    # ========== DIAGNÓSTICO DE CONSULTAS ==========
+
+    def criar_diagnostico(self):
+        """
+        Constrói a seção de diagnóstico de consultas SQL.
+        
+        Exibe, por ação de interface (carregar aba, salvar, pesquisar),
+        quantas consultas foram executadas e quanto tempo o banco levou,
+        destacando ações com padrão N+1 (mesmo comando repetido várias
+        vezes numa única execução).
+        """
+        diag_frame = ttk.LabelFrame(self, text="Diagnóstico de Consultas")
+        diag_frame.pack(fill=tk.BOTH, padx=10, pady=(0, 10))
+        
+        # Tabela de ações agregadas
+        self.diag_tree = ttk.Treeview(
+            diag_frame,
+            columns=("Ação", "Execuções", "Consultas", "Total", "SQL (ms)", "N+1"),
+            show="headings",
+            height=6
+        )
+        for col, width in [("Ação", 200), ("Execuções", 80), ("Consultas", 80),
+                           ("Total", 80), ("SQL (ms)", 90), ("N+1", 60)]:
+            self.diag_tree.heading(col, text=col.upper())
+            self.diag_tree.column(col, width=width, anchor=tk.W)
+        self.diag_tree.tag_configure("n_plus_one", foreground="#e74c3c")
+        self.diag_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 5), pady=5)
+        self.diag_tree.bind("<<TreeviewSelect>>", self.on_select_diagnostico)
+        
+        # Detalhes da última execução da ação selecionada
+        self.diag_details = tk.Text(diag_frame, height=8, width=60, wrap="none")
+        self.diag_details.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, pady=5)
+        
+        # Botões da seção
+        diag_btns = ttk.Frame(diag_frame)
+        diag_btns.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
+        ttk.Button(diag_btns, text="Atualizar", command=self.atualizar_diagnostico).pack(fill=tk.X, pady=2)
+        ttk.Button(diag_btns, text="Limpar", command=self.limpar_diagnostico).pack(fill=tk.X, pady=2)
+        ttk.Button(diag_btns, text="Exportar...", command=self.exportar_diagnostico).pack(fill=tk.X, pady=2)
+        self.btn_verificar = ttk.Button(diag_btns, text="Verificar banco", command=self.verificar_banco)
+        self.btn_verificar.pack(fill=tk.X, pady=(10, 2))
+        self.btn_exportar_verificacao = ttk.Button(diag_btns, text="Exportar verificação...",
+                                                   command=self.exportar_verificacao, state=tk.DISABLED)
+        self.btn_exportar_verificacao.pack(fill=tk.X, pady=2)
+        
+        self._diag_summary = {}
+        self._verificacao = None
+        self.atualizar_diagnostico()
+        
+        # Atualiza automaticamente sempre que a aba ADM é exibida
+        self.bind("<Map>", lambda e: self.atualizar_diagnostico())
+    
+    def atualizar_diagnostico(self):
+        """
+        Recarrega a tabela de diagnóstico a partir do monitor de consultas.
+        
+        Ações cuja última execução teve comandos repetidos (N+1) são
+        destacadas em vermelho.
+        """
+        for item in self.diag_tree.get_children():
+            self.diag_tree.delete(item)
+        
+        self._diag_summary = {}
+        for i, item in enumerate(diagnostics.monitor.summary()):
+            iid = str(i)
+            self._diag_summary[iid] = item
+            self.diag_tree.insert("", "end", iid=iid,
+                                  values=(item["action"], item["calls"], item["last_queries"],
+                                          item["total_queries"], f"{item['avg_sql_ms']:.1f}",
+                                          item["n_plus_one"] or ""),
+                                  tags=("n_plus_one",) if item["n_plus_one"] else ())
+    
+    def on_select_diagnostico(self, event):
+        """
+        Mostra os comandos SQL da última execução da ação selecionada.
+        
+        Os comandos são listados do mais repetido para o menos repetido,
+        com a marca [N+1] nos que atingem o limite de repetições.
+        """
+        selecionados = self.diag_tree.selection()
+        if not selecionados:
+            return
+        record = self._diag_summary[selecionados[0]]["last"]
+        
+        linhas = [f"{record.name} - {record.query_count} consultas, {record.sql_ms:.1f} ms no banco", ""]
+        for sql, (count, ms) in sorted(record.statements.items(), key=lambda kv: kv[1][0], reverse=True):
+            marca = "[N+1] " if count >= diagnostics.N_PLUS_ONE_THRESHOLD else ""
+            linhas.append(f"{marca}{count}x  {ms:.1f} ms  {' '.join(sql.split())}")
+        
+        self.diag_details.delete("1.0", tk.END)
+        self.diag_details.insert("1.0", "\n".join(linhas))
+    
+    def limpar_diagnostico(self):
+        """Descarta o histórico de consultas coletado até o momento."""
+        diagnostics.monitor.clear()
+        self.diag_details.delete("1.0", tk.END)
+        self.atualizar_diagnostico()
+    
+    def exportar_diagnostico(self):
+        """
+        Exporta o diagnóstico completo (resumo e histórico) em JSON.
+        """
+        caminho = filedialog.asksaveasfilename(
+            title="Exportar diagnóstico",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+            initialfile="diagnostico_consultas.json"
+        )
+        if not caminho:
+            return
+        try:
+            diagnostics.monitor.export_json(caminho)
+            messagebox.showinfo("Sucesso", f"Diagnóstico exportado para {caminho}")
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao exportar diagnóstico: {e}")
+
+    def verificar_banco(self):
+        """
+        Executa a verificação do banco (doctor.py) em segundo plano.
+
+        Os planos de todas as consultas das abas, o arquivo e o uso dos
+        índices aparecem no quadro de detalhes; varreduras completas de
+        tabelas grandes são avisadas ao final.
+        """
+        self.btn_verificar.config(state=tk.DISABLED)
+        self.diag_details.delete("1.0", tk.END)
+        self.diag_details.insert("1.0", "Verificando consultas...")
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["relatorio"] = doctor.run_doctor()
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="verificacao", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_verificar.config(state=tk.NORMAL)
+            self.diag_details.delete("1.0", tk.END)
+            if "erro" in resultado:
+                messagebox.showerror("Erro", f"Erro na verificação: {resultado['erro']}")
+                return
+            self._verificacao = resultado["relatorio"]
+            self.btn_exportar_verificacao.config(state=tk.NORMAL)
+            self.diag_details.insert("1.0", doctor.format_report(self._verificacao))
+            self.atualizar_diagnostico()
+            alertas = self._verificacao["alerts"]
+            if alertas:
+                messagebox.showwarning("Verificação do banco", "\n".join(alertas))
+
+        aguardar()
+
+    def exportar_verificacao(self):
+        """Exporta a última verificação do banco em JSON."""
+        if self._verificacao is None:
+            return
+        caminho = filedialog.asksaveasfilename(
+            title="Exportar verificação",
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json")],
+            initialfile="verificacao_banco.json"
+        )
+        if not caminho:
+            return
+        try:
+            with open(caminho, "w", encoding="utf-8") as f:
+                f.write(doctor.report_json(self._verificacao))
+            messagebox.showinfo("Sucesso", f"Verificação exportada para {caminho}")
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao exportar verificação: {e}")
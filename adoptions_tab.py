@@ -13,6 +13,16 @@ Funcionalidades principais:
 - Sistema detalhado de notas e observações
 - Sincronização automática com outras abas
 - Atualizações em tempo real de status
+- Relatório de tempo médio em cada etapa (histórico de mudanças)
+- Contratos dos processos finalizados gerados em lote (documents.py)
+- Histórico completo sob demanda: processos arquivados (archive.py)
+  incluídos na lista e no relatório, somente para consulta
+- Sugestões de tutores para o animal escolhido e de animais para o
+  tutor escolhido, pelas preferências de adoção (matching.py)
+- Ordenação pelo cabeçalho feita no banco, com páginas lidas conforme a
+  rolagem (paged_tree.py)
+- Filtro rápido pelo início do nome do animal ou do tutor, sem
+  diferenciar acentos (quick_filter.py)
 
 Fluxo de aprovação:
 1. Questionário: Avaliação inicial
@@ -37,12 +47,23 @@ Sincronização:
 - Manutenção de consistência de dados
 """
 
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database import session
-from models import AdoptionProcess, Animal, User
+from tkinter import ttk, messagebox, filedialog
+from database import read_session, session_scope
+from models import AdoptionProcess
+import archive
+import documents
+import matching
+import queries
+from paged_tree import PagedTree
+from quick_filter import QuickFilter
+from diagnostics import instrumentado
 from utils import ADOPTION_STEPS
 
+# Nova tentativa de exibir as sugestões enquanto os índices são construídos (ms)
+MATCH_RETRY_MS = 1000
+
 class AdoptionsTab(ttk.Frame):
     """
     Classe para gerenciamento completo de processos de adoção.
@@ -114,6 +135,30 @@ class AdoptionsTab(ttk.Frame):
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
+        # Ordenação pelo cabeçalho e páginas lidas conforme a rolagem
+        self.pager = PagedTree(self.tree, scrollbar, self.fetch_page, "Adoções")
+
+        # Filtro rápido acima da lista
+        self.quick = QuickFilter(left_panel, self.pager, queries.ADOPTION_FILTERS,
+                                 {"Animal": "animal", "Tutor": "user"})
+        self.quick.pack(fill=tk.X, pady=(0, 5), before=table_frame)
+
+        list_btns = ttk.Frame(left_panel)
+        list_btns.pack(fill=tk.X, pady=(5, 0))
+
+        # Processos arquivados (archive.py) só entram quando pedidos
+        self.include_archive = tk.BooleanVar(value=False)
+        self.with_archive = False  # valor lido pela consulta (também em segundo plano)
+        ttk.Checkbutton(list_btns, text="Incluir arquivados", variable=self.include_archive,
+                        command=self.load).pack(side=tk.LEFT)
+
+        # Relatório de tempo por etapa (histórico de mudanças de status)
+        ttk.Button(list_btns, text="Tempo por etapa", command=self.show_stage_report).pack(side=tk.RIGHT)
+
+        # Contratos dos processos selecionados (ou de todos os finalizados)
+        self.btn_contracts = ttk.Button(list_btns, text="Gerar contratos", command=self.generate_contracts)
+        self.btn_contracts.pack(side=tk.RIGHT, padx=(0, 5))
+
         # ========== PAINEL DIREITO - FORMULÁRIO ==========
         right_panel = ttk.Frame(main_container, width=400)
         right_panel.pack(side=tk.RIGHT, fill=tk.Y)
@@ -173,9 +218,32 @@ class AdoptionsTab(ttk.Frame):
         ttk.Button(btn_frame, text="Salvar", command=self.save).pack(side=tk.LEFT, padx=4)
         ttk.Button(btn_frame, text="Excluir", command=self.delete).pack(side=tk.LEFT, padx=4)
         # Nota: botão 'Atualizar Página' removido. A função de recarregar é realizada após Salvar/Excluir.
+        r += 1
+
+        # ========== SUGESTÕES DE COMPATIBILIDADE ==========
+        match_frame = ttk.LabelFrame(self.scrollable_frame, text="Sugestões")
+        match_frame.grid(row=r, column=0, sticky="we", pady=(0, 5))
+
+        self.lbl_matches = ttk.Label(match_frame, text="Escolha um animal ou um tutor.")
+        self.lbl_matches.pack(anchor=tk.W, padx=5, pady=(5, 0))
+
+        self.match_tree = ttk.Treeview(match_frame, columns=("ID", "Nome", "Compatível"),
+                                       show="headings", height=6)
+        for c, w in (("ID", 45), ("Nome", 140), ("Compatível", 170)):
+            self.match_tree.heading(c, text=c.upper())
+            self.match_tree.column(c, width=w, anchor=tk.W)
+        self.match_tree.pack(fill=tk.X, padx=5, pady=5)
+        # Duplo clique preenche o outro campo do formulário com a sugestão
+        self.match_tree.bind("<Double-1>", self.pick_match)
+
+        self.inputs["Animal *"].bind("<<ComboboxSelected>>", lambda e: self.show_matches("animal"))
+        self.inputs["Usuário *"].bind("<<ComboboxSelected>>", lambda e: self.show_matches("user"))
 
         # ========== INICIALIZAÇÃO ==========
         self.selected_id = None
+        self._match_job = None
+        self._match_source = None  # "animal" (sugere tutores) ou "user" (sugere animais)
+        self._match_values = {}    # iid da sugestão → texto "ID - Nome" para a combobox
         self.load()
 
     # ========== FUNÇÕES AUXILIARES ==========
@@ -190,14 +258,9 @@ class AdoptionsTab(ttk.Frame):
         Returns:
             list: Lista de strings no formato "ID - Nome" para animais disponíveis
         """
-        # Filtra apenas animais com status próximo de "Disponível".
-        # Usa busca case-insensitive/ilike para cobrir variações sem acento
-        # ou espaços acidentais (ex: 'Disponivel', ' Disponível ').
-        animais_disponiveis = session.query(Animal).filter(
-            Animal.status.ilike("%dispon%")
-        ).all()
-        
-        return [f"{a.id} - {a.name}" for a in animais_disponiveis]
+        # Filtra apenas animais com status próximo de "Disponível"
+        with read_session() as s:
+            return queries.available_animal_choices(s)
     
     def get_users(self):
         """
@@ -210,34 +273,41 @@ class AdoptionsTab(ttk.Frame):
             list: Lista de strings no formato "ID - Nome" para usuários aprovados
         """
         # Retorna todos os usuários
-        usuarios = session.query(User).all()
-        return [f"{u.id} - {u.name}" for u in usuarios]
+        with read_session() as s:
+            return queries.user_choices(s)
 
     # ========== OPERAÇÕES CRUD ==========
 
+    @instrumentado("Adoções: carregar")
     def load(self):
         """
-        Carrega todos os processos de adoção na tabela.
+        Carrega os processos de adoção na tabela.
         
-        Ordena os processos por ID decrescente (mais recentes primeiro)
-        e atualiza as listas de animais e usuários nos comboboxes.
+        Relê a primeira página na ordenação atual (ID decrescente, mais
+        recentes primeiro, até um clique no cabeçalho) e atualiza as
+        listas de animais e usuários nos comboboxes.
         """
-        # Limpa a tabela atual
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        # Busca todos os processos ordenados por ID decrescente
-        for adocao in session.query(AdoptionProcess).order_by(AdoptionProcess.id.desc()).all():
-            self.tree.insert("", "end", iid=str(adocao.id),
-                           values=(adocao.id,
-                                   adocao.animal.name if adocao.animal else "-",
-                                   adocao.user.name if adocao.user else "-",
-                                   adocao.status or "-"))
+        self.with_archive = self.include_archive.get()
+        self.pager.reload()
 
         # Atualiza as listas nos comboboxes
         self.inputs["Animal *"]["values"] = self.get_animals()
         self.inputs["Usuário *"]["values"] = self.get_users()
 
+    def fetch_page(self, session, column, descending, after, limit):
+        """
+        Consulta paginada da lista (ver paged_tree.PagedTree).
+
+        Com "Incluir arquivados" a página vem da união com o arquivo
+        histórico, ordenada pelos valores exibidos (sem índice).
+        """
+        prefix = self.quick.prefix
+        if self.with_archive:
+            return queries.projection_page(session, archive.adoption_history_stmt(session, prefix),
+                                           column, descending, after, limit)
+        return queries.adoption_page(session, column, descending, after, limit, prefix)
+
+    @instrumentado("Adoções: selecionar")
     def on_select(self, event):
         """
         Manipula a seleção de um processo na lista.
@@ -249,13 +319,19 @@ class AdoptionsTab(ttk.Frame):
         if not sel:
             return
             
-        # Busca o processo selecionado
-        adocao = session.get(AdoptionProcess, int(sel[0]))
+        # Busca o processo selecionado (animal e usuário lidos na mesma sessão)
+        with read_session() as s:
+            adocao = s.get(AdoptionProcess, int(sel[0]))
+            if adocao is None:
+                # Processo arquivado: disponível apenas para consulta na lista
+                self.new()
+                return
+            animal, user = adocao.animal, adocao.user
         self.selected_id = adocao.id
 
         # Preenche campos básicos
-        self.inputs["Animal *"].set(f"{adocao.animal.id} - {adocao.animal.name}" if adocao.animal else "")
-        self.inputs["Usuário *"].set(f"{adocao.user.id} - {adocao.user.name}" if adocao.user else "")
+        self.inputs["Animal *"].set(f"{animal.id} - {animal.name}" if animal else "")
+        self.inputs["Usuário *"].set(f"{user.id} - {user.name}" if user else "")
         self.inputs["Status"].set(adocao.status or "")
         
         # Preenche datas de visita (formatadas)
@@ -268,6 +344,8 @@ class AdoptionsTab(ttk.Frame):
         self.inputs["Notas"].delete("1.0", tk.END)
         self.inputs["Notas"].insert("1.0", adocao.notes or "")
 
+        self.show_matches("animal")
+
     def new(self):
         """Limpa o formulário para criar um novo processo."""
         self.selected_id = None
@@ -278,7 +356,9 @@ class AdoptionsTab(ttk.Frame):
                 widget.delete("1.0", tk.END)
             elif isinstance(widget, tk.Entry):
                 widget.delete(0, tk.END)
+        self.show_matches(None)
 
+    @instrumentado("Adoções: salvar")
     def save(self):
         """
         Salva ou atualiza um processo de adoção.
@@ -314,23 +394,20 @@ class AdoptionsTab(ttk.Frame):
             return
 
         # Determina se é criação ou edição
-        is_new = False
-        if self.selected_id:
-            adocao = session.get(AdoptionProcess, self.selected_id)
-            if adocao is None:
-                messagebox.showerror("Erro", "Adoção selecionada não encontrada.")
-                return
-        else:
-            # Antes de criar, verifica se o animal já está em um processo ativo
-            animal_id_check = int(animal_val.split(" - ")[0])
-            active = session.query(AdoptionProcess).filter(
-                AdoptionProcess.animal_id == animal_id_check,
-                AdoptionProcess.status.notin_(("Finalizado", "Recusado"))
-            ).count()
-            if active > 0:
-                messagebox.showerror("Erro", "Este animal já está em um processo de adoção ativo.")
-                return
-            is_new = True
+        with read_session() as s:
+            if self.selected_id:
+                encontrada = s.get(AdoptionProcess, self.selected_id) is not None
+                ativos = 0
+            else:
+                # Antes de criar, verifica se o animal já está em um processo ativo
+                encontrada = True
+                ativos = queries.active_adoption_count(s, animal_id)
+        if not encontrada:
+            messagebox.showerror("Erro", "Adoção selecionada não encontrada.")
+            return
+        if ativos > 0:
+            messagebox.showerror("Erro", "Este animal já está em um processo de adoção ativo.")
+            return
 
         # Processa data única de visita (in_person_visit_at)
         from datetime import datetime
@@ -340,34 +417,21 @@ class AdoptionsTab(ttk.Frame):
             if visita:
                 visita_dt = datetime.strptime(visita, "%d/%m/%Y")
         except ValueError:
-            # garante que sessão não fique com transações parciais
-            session.rollback()
             messagebox.showerror("Erro", "Formato de data inválido. Use DD/MM/AAAA.")
             return
 
-        # Agora que validações passaram, cria/atualiza o objeto
-        if is_new:
-            adocao = AdoptionProcess()
-            session.add(adocao)
-
-        # Atualiza dados básicos
-        adocao.animal_id = animal_id
-        adocao.user_id = user_id
-        adocao.status = self.inputs["Status"].get().strip() or None
-        adocao.notes = self.inputs["Notas"].get("1.0", tk.END).strip() or None
-        adocao.in_person_visit_at = visita_dt
-
         try:
-            # Salva o processo
-            session.commit()
-
-            # Atualiza automaticamente o status do animal
-            adocao.update_animal_status()
-            # Se o processo está em andamento, garante que o animal fique em processo
-            if adocao.animal:
-                if adocao.status in ["Questionário", "Visita", "Documentos", "Aprovado"]:
-                    adocao.animal.status = "Em processo"
-            session.commit()
+            # Agora que validações passaram, cria/atualiza o processo e
+            # sincroniza automaticamente o status do animal
+            with session_scope() as s:
+                queries.save_adoption(
+                    s, self.selected_id,
+                    animal_id=animal_id,
+                    user_id=user_id,
+                    status=status_val,
+                    notes=notes_raw or None,
+                    in_person_visit_at=visita_dt,
+                )
 
             # Recarrega abas locais e globais
             try:
@@ -380,9 +444,9 @@ class AdoptionsTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Adoção salva com sucesso. Status do animal atualizado automaticamente.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao salvar adoção: {e}")
 
+    @instrumentado("Adoções: excluir")
     def delete(self):
         """
         Exclui o processo de adoção selecionado.
@@ -398,14 +462,14 @@ class AdoptionsTab(ttk.Frame):
             return
             
         try:
-            adocao = session.get(AdoptionProcess, self.selected_id)
-            
-            # Restaura o status do animal para disponível
-            if adocao.animal:
-                adocao.animal.status = "Disponível"
-            
-            session.delete(adocao)
-            session.commit()
+            with session_scope() as s:
+                adocao = s.get(AdoptionProcess, self.selected_id)
+                
+                # Restaura o status do animal para disponível
+                if adocao.animal:
+                    adocao.animal.status = "Disponível"
+                
+                s.delete(adocao)
             
             # Recarrega todas as abas para manter UI consistente
             try:
@@ -419,5 +483,148 @@ class AdoptionsTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Adoção excluída com sucesso. Status do animal restaurado para Disponível.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao excluir adoção: {e}")
+
+    # ========== RELATÓRIOS ==========
+
+    @instrumentado("Adoções: tempo por etapa")
+    def show_stage_report(self):
+        """
+        Exibe quanto tempo os processos passam em cada etapa.
+
+        Mostra, por etapa, as passagens concluídas (média e máximo em
+        dias) e os processos que ainda estão nela (tempo médio até agora).
+        Com "Incluir arquivados" marcado, as passagens dos processos
+        arquivados também entram nas médias.
+        """
+        with read_session() as s:
+            report = queries.stage_time_report(s, include_archive=self.include_archive.get())
+
+        window = tk.Toplevel(self)
+        window.title("Tempo por etapa")
+        window.transient(self.winfo_toplevel())
+
+        columns = ("Etapa", "Concluídas", "Média (dias)", "Máximo (dias)", "Em andamento", "Média atual (dias)")
+        tree = ttk.Treeview(window, columns=columns, show="headings", height=max(len(report), 1))
+        for c in columns:
+            tree.heading(c, text=c.upper())
+            tree.column(c, width=140 if c == "Etapa" else 110, anchor=tk.W if c == "Etapa" else tk.E)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        def days(value):
+            return "-" if value is None else f"{value:.1f}"
+
+        for status, done, avg, longest, current, current_avg in report:
+            tree.insert("", "end", values=(status, done, days(avg), days(longest), current, days(current_avg)))
+
+        if not report:
+            ttk.Label(window, text="Nenhuma mudança de etapa registrada.").pack(pady=(0, 10))
+        ttk.Button(window, text="Fechar", command=window.destroy).pack(pady=(0, 10))
+
+    def generate_contracts(self):
+        """
+        Gera os contratos dos processos selecionados na lista (ou de todos
+        os finalizados, sem seleção) em segundo plano (documents.py).
+
+        Processos não finalizados da seleção são ignorados.
+        """
+        ids = [int(iid) for iid in self.tree.selection()] or None
+        if ids is None and not messagebox.askyesno(
+                "Contratos", "Nenhum processo selecionado. Gerar os contratos de todos os processos finalizados?"):
+            return
+        out_dir = filedialog.askdirectory(title="Pasta dos contratos", mustexist=False)
+        if not out_dir:
+            return
+
+        self.btn_contracts.config(state=tk.DISABLED)
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["paths"] = documents.generate_contracts(ids, out_dir)
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="contratos", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_contracts.config(state=tk.NORMAL)
+            if "erro" in resultado:
+                messagebox.showerror("Erro", f"Erro ao gerar contratos: {resultado['erro']}")
+            elif not resultado["paths"]:
+                messagebox.showinfo("Contratos", "Nenhum processo finalizado na seleção.")
+            else:
+                messagebox.showinfo("Contratos", f"{len(resultado['paths'])} contratos gravados em {out_dir}.")
+
+        aguardar()
+
+    # ========== SUGESTÕES ==========
+
+    @instrumentado("Adoções: sugestões")
+    def show_matches(self, source):
+        """
+        Exibe as sugestões para o campo escolhido no formulário.
+
+        Args:
+            source (str): "animal" → tutores compatíveis com o animal;
+                          "user" → animais disponíveis compatíveis com o
+                          tutor; None → limpa as sugestões
+
+        Enquanto os índices são construídos (primeiro uso ou alterações
+        de outro processo) tenta novamente a cada MATCH_RETRY_MS.
+        """
+        if self._match_job is not None:
+            self.after_cancel(self._match_job)
+            self._match_job = None
+        self._match_source = source
+        self._match_values = {}
+        self.match_tree.delete(*self.match_tree.get_children())
+
+        field = {"animal": "Animal *", "user": "Usuário *"}.get(source)
+        value = self.inputs[field].get().strip() if field else ""
+        if not value:
+            self.lbl_matches.config(text="Escolha um animal ou um tutor.")
+            return
+        chosen_id = int(value.split(" - ")[0])
+
+        with read_session() as s:
+            if source == "animal":
+                results = matching.tutors_for_animal(s, chosen_id)
+            else:
+                results = matching.animals_for_tutor(s, chosen_id)
+        if results is None:
+            self.lbl_matches.config(text="Calculando sugestões...")
+            self._match_job = self.after(MATCH_RETRY_MS, lambda: self.show_matches(source))
+            return
+
+        def compat(matched, mismatched):
+            text = ", ".join(matching.LABELS[c] for c in matched)
+            if mismatched:
+                text += f" (difere: {', '.join(matching.LABELS[c] for c in mismatched)})"
+            return text
+
+        if source == "animal":
+            self.lbl_matches.config(text=f"Tutores compatíveis com o animal: {len(results)}")
+            for user_id, name, matched, mismatched, _ in results:
+                self.match_tree.insert("", "end", iid=str(user_id),
+                                       values=(user_id, name, compat(matched, mismatched)))
+                self._match_values[str(user_id)] = f"{user_id} - {name}"
+        else:
+            self.lbl_matches.config(text=f"Animais disponíveis compatíveis com o tutor: {len(results)}")
+            for animal_id, name, species, size, age, matched, mismatched in results:
+                details = ", ".join(str(v) for v in (species, size, f"{age} anos" if age is not None else None) if v)
+                self.match_tree.insert("", "end", iid=str(animal_id),
+                                       values=(animal_id, f"{name} ({details})", compat(matched, mismatched)))
+                self._match_values[str(animal_id)] = f"{animal_id} - {name}"
+
+    def pick_match(self, event):
+        """Preenche o tutor (ou o animal) do formulário com a sugestão clicada."""
+        sel = self.match_tree.selection()
+        if not sel or self._match_source is None:
+            return
+        field = "Usuário *" if self._match_source == "animal" else "Animal *"
+        self.inputs[field].set(self._match_values[sel[0]])
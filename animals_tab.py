@@ -12,6 +12,11 @@ Funcionalidades principais:
 - Controle automático de lotação e capacidade
 - Sincronização em tempo real entre todas as abas
 - Atualização automática de status baseado em adoções
+- Ordenação pelo cabeçalho feita no banco, com páginas lidas conforme a
+  rolagem (paged_tree.py)
+- Filtro rápido pelo início do nome ou da raça, sem diferenciar acentos
+  (quick_filter.py)
+- Foto do animal no formulário (miniatura em cache, photos.py)
 
 Informações gerenciadas:
 - Dados básicos: nome*, espécie*, raça*, idade*
@@ -36,9 +41,14 @@ Sincronização:
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database import session
+from tkinter import ttk, messagebox, filedialog
+from database import read_session, session_scope
 from models import Animal, AdoptionProcess
+import queries
+from paged_tree import PagedTree
+from quick_filter import QuickFilter
+import photos
+from diagnostics import instrumentado
 from utils import SIZES, GENDERS, STATUSES, SPECIES, TEMPERAMENTS
 
 class AnimalsTab(ttk.Frame):
@@ -114,6 +124,14 @@ class AnimalsTab(ttk.Frame):
 
         # Posicionamento da tabela
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Ordenação pelo cabeçalho e páginas lidas conforme a rolagem
+        self.pager = PagedTree(self.tree, scrollbar, self.fetch_page, "Animais")
+
+        # Filtro rápido acima da lista
+        self.quick = QuickFilter(left_panel, self.pager, queries.ANIMAL_FILTERS,
+                                 {"Nome": "name", "Raça": "breed"})
+        self.quick.pack(fill=tk.X, pady=(0, 5), before=table_frame)
         
         # Vinculação do evento de seleção
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
@@ -183,6 +201,17 @@ class AnimalsTab(ttk.Frame):
         self.inputs["Observações"].grid(row=r, column=0, columnspan=2, sticky="we", pady=(0, 5))
         r += 1
 
+        # Foto (gravada direto no animal selecionado, fora do Salvar)
+        ttk.Label(self.scrollable_frame, text="Foto").grid(row=r, column=0, columnspan=2, sticky="w", pady=(5, 0))
+        r += 1
+        self.photo_label = ttk.Label(self.scrollable_frame, text="(sem foto)", anchor=tk.CENTER)
+        self.photo_label.grid(row=r, column=0, rowspan=2, sticky="w", pady=(0, 5))
+        ttk.Button(self.scrollable_frame, text="Escolher foto...", command=self.choose_photo).grid(
+            row=r, column=1, sticky="we", pady=(0, 2))
+        ttk.Button(self.scrollable_frame, text="Remover foto", command=self.remove_photo).grid(
+            row=r + 1, column=1, sticky="we", pady=(0, 5))
+        r += 2
+
         # ========== BOTÕES DE AÇÃO ==========
         btn_frame = ttk.Frame(self.scrollable_frame)
         btn_frame.grid(row=r, column=0, columnspan=2, pady=10)
@@ -211,60 +240,42 @@ class AnimalsTab(ttk.Frame):
         Exemplo de retorno:
             ["1 - Abrigo Central", "2 - Abrigo Zona Norte", "3 - Abrigo Temporário"]
         """
-        from models import Shelter
         # Consulta todos os abrigos e formata a lista
-        return [f"{s.id} - {s.name}" for s in session.query(Shelter).all()]
+        with read_session() as s:
+            return queries.shelter_choices(s)
 
+    @instrumentado("Animais: carregar")
     def load(self):
         """
-        Carrega todos os animais do banco de dados na tabela.
+        Carrega os animais do banco de dados na tabela.
         
         Este método realiza as seguintes operações:
-        1. Limpa a tabela atual removendo todos os itens
-        2. Consulta todos os animais ordenados por ID decrescente
-        3. Para cada animal, verifica e atualiza automaticamente o status
-           baseado em processos de adoção finalizados
-        4. Insere cada animal na tabela com suas informações formatadas
-        5. Atualiza a lista de abrigos no combobox
-        6. Confirma as transações no banco
+        1. Atualiza o status dos animais com processos de adoção
+           finalizados e confirma a transação
+        2. Relê a primeira página da lista na ordenação atual (ID
+           decrescente até um clique no cabeçalho); as demais páginas são
+           lidas conforme a rolagem (paged_tree.py)
+        3. Atualiza a lista de abrigos no combobox
         
         A atualização automática de status garante que animais com adoções
         finalizadas tenham seu status atualizado para "Adotado" mesmo que
         não tenham sido editados manualmente.
         """
-        # Limpeza completa da tabela atual
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        # Consulta todos os animais ordenados por ID decrescente (mais recentes primeiro)
-        animals = session.query(Animal).order_by(Animal.id.desc()).all()
-        
-        for animal in animals:
-            # Atualização automática de status: verifica se há adoção finalizada
-            finalized_adoption = any(
-                adoption_process.status == "Finalizado" 
-                for adoption_process in animal.adoptions
-            )
-            
-            # Se encontrou adoção finalizada, atualiza o status do animal
-            if finalized_adoption:
-                animal.status = "Adotado"
-                
-            # Obtém o nome do abrigo se existir vinculação
-            shelter_name = animal.shelter.name if animal.shelter else ""
-                
-            # Insere o animal na tabela
-            self.tree.insert("", "end", iid=str(animal.id),
-                           values=(animal.id, animal.name, animal.species, animal.breed or "", 
-                                   animal.age, animal.size or "", animal.gender or "", 
-                                   animal.status, shelter_name))
+        # Corrige e confirma o status dos animais com adoção finalizada
+        with session_scope() as s:
+            queries.sync_animal_status(s)
+
+        # Primeira página na ordenação atual (ORDER BY no banco)
+        self.pager.reload()
         
         # Atualiza a lista de abrigos no combobox
         self.inputs["Abrigo"]["values"] = self.get_shelters()
-        
-        # Confirma as possíveis alterações de status
-        session.commit()
 
+    def fetch_page(self, session, column, descending, after, limit):
+        """Consulta paginada da lista com o filtro rápido (ver paged_tree.PagedTree)."""
+        return queries.animal_page(session, column, descending, after, limit, self.quick.prefix)
+
+    @instrumentado("Animais: selecionar")
     def on_select(self, event):
         """
         Manipula a seleção de um animal na lista.
@@ -283,9 +294,13 @@ class AnimalsTab(ttk.Frame):
         if not sel:  # Se não há seleção, retorna silenciosamente
             return
             
-        # Busca o animal selecionado no banco
-        animal = session.get(Animal, int(sel[0]))
+        # Busca o animal selecionado no banco (sessão curta de leitura;
+        # o abrigo é lido dentro dela para preencher o formulário)
+        with read_session() as s:
+            animal = s.get(Animal, int(sel[0]))
+            shelter = animal.shelter
         self.selected_id = animal.id  # Armazena o ID para operações futuras
+        self.show_photo()
 
         # Preenche campos básicos do formulário
         self.inputs["Nome *"].delete(0, tk.END)
@@ -305,14 +320,15 @@ class AnimalsTab(ttk.Frame):
         self.inputs["Temperamento"].set(animal.temperament or "")
         
         # Campo Abrigo - formata para o padrão "ID - Nome"
-        if animal.shelter:
-            self.inputs["Abrigo"].set(f"{animal.shelter.id} - {animal.shelter.name}")
+        if shelter:
+            self.inputs["Abrigo"].set(f"{shelter.id} - {shelter.name}")
         else:
             self.inputs["Abrigo"].set("")
             
-        # Campo Observações (área de texto)
+        # Campo Observações (área de texto); health_history não é coluna
+        # mapeada em Animal, por isso a leitura tolera a ausência
         self.inputs["Observações"].delete("1.0", tk.END)
-        self.inputs["Observações"].insert(tk.END, animal.health_history or "")
+        self.inputs["Observações"].insert(tk.END, getattr(animal, "health_history", None) or "")
 
     def new(self):
         """
@@ -331,7 +347,9 @@ class AnimalsTab(ttk.Frame):
                 widget.delete("1.0", tk.END)  # Limpa área de texto
             else:
                 widget.delete(0, tk.END)  # Limpa campos de entrada
+        self.show_photo()
 
+    @instrumentado("Animais: salvar")
     def save(self):
         """
         Salva ou atualiza um animal no banco de dados.
@@ -365,14 +383,15 @@ class AnimalsTab(ttk.Frame):
 
         # Extrai o ID do abrigo do formato "ID - Nome"
         shelter_id = int(shelter_val.split(" - ")[0])
-        shelter = session.get(Shelter, shelter_id)
+        with read_session() as s:
+            shelter = s.get(Shelter, shelter_id)
+            # Verificação crítica de capacidade
+            # Conta apenas animais que ainda não foram adotados
+            animais_atuais = queries.shelter_occupancy(s, shelter_id) if shelter else 0
         if shelter is None:
             messagebox.showerror("Erro", "Abrigo selecionado não encontrado.")
             return
 
-        # Verificação crítica de capacidade
-        # Conta apenas animais que ainda não foram adotados
-        animais_atuais = session.query(Animal).filter(Animal.shelter_id == shelter_id, Animal.status != "Adotado").count()
         if animais_atuais >= shelter.capacity:
             messagebox.showerror("Erro", f"Abrigo '{shelter.name}' está lotado (capacidade: {shelter.capacity}).")
             return
@@ -420,41 +439,25 @@ class AnimalsTab(ttk.Frame):
             messagebox.showerror("Erro", "Temperamento é obrigatório.")
             return
 
-        # Determina se é criação ou edição (criação somente após validações)
-        if self.selected_id:
-            animal = session.get(Animal, self.selected_id)
+        try:
+            # Cria ou atualiza o animal (criação somente após validações)
+            with session_scope() as s:
+                animal = queries.save_animal(
+                    s, self.selected_id,
+                    name=name,
+                    species=self.inputs["Espécie"].get() or None,
+                    breed=self.inputs["Raça"].get().strip() or None,
+                    age=idade_val,
+                    size=porte_val,
+                    gender=genero_val,
+                    status=status_val,
+                    temperament=temperament_val,
+                    health_history=observacoes_val,
+                    shelter_id=shelter_id,
+                )
             if animal is None:
                 messagebox.showerror("Erro", "Animal selecionado não encontrado.")
                 return
-        else:
-            animal = Animal()
-
-        # Atualização dos dados básicos
-        animal.name = name
-        animal.species = self.inputs["Espécie"].get() or None
-        animal.breed = self.inputs["Raça"].get().strip() or None
-
-        # Processamento da idade (já validada)
-        animal.age = idade_val
-
-        animal.size = porte_val
-        animal.gender = genero_val
-        animal.status = status_val
-        animal.temperament = temperament_val
-        animal.health_history = observacoes_val
-
-        # Vinculação com abrigo
-        if shelter_val:
-            animal.shelter_id = shelter_id
-        else:
-            animal.shelter_id = None
-
-        # Se é novo, só adiciona à sessão agora (após validações)
-        if not self.selected_id:
-            session.add(animal)
-
-        try:
-            session.commit()
             # Recarrega todas as abas para manter UI consistente
             try:
                 root = self.winfo_toplevel()
@@ -465,9 +468,9 @@ class AnimalsTab(ttk.Frame):
             self.load()  # Recarrega a lista
             messagebox.showinfo("Sucesso", "Animal salvo com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao salvar animal: {e}")
 
+    @instrumentado("Animais: excluir")
     def delete(self):
         """
         Exclui o animal selecionado após confirmação do usuário.
@@ -491,16 +494,18 @@ class AnimalsTab(ttk.Frame):
             return
             
         # Verifica se existem processos de adoção vinculados ao animal
-        processos_vinculados = session.query(AdoptionProcess).filter(AdoptionProcess.animal_id == self.selected_id).count()
+        with read_session() as s:
+            processos_vinculados = s.query(AdoptionProcess).filter(AdoptionProcess.animal_id == self.selected_id).count()
         if processos_vinculados > 0:
             messagebox.showerror("Erro", f"Não é possível excluir o animal. Existem {processos_vinculados} processos de adoção vinculados a ele.")
             return
 
         # Execução da exclusão com tratamento de erros
         try:
-            animal = session.get(Animal, self.selected_id)
-            session.delete(animal)
-            session.commit()
+            with session_scope() as s:
+                photos.delete_photo(s, self.selected_id)
+                s.delete(s.get(Animal, self.selected_id))
+            photos.thumbnails.discard(self.selected_id)
 
             # Recarrega todas as abas para manter UI consistente
             try:
@@ -515,5 +520,43 @@ class AnimalsTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Animal excluído com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao excluir animal: {e}")
+
+    # ========== FOTO ==========
+
+    def show_photo(self):
+        """Exibe a miniatura do animal selecionado (cache compartilhado)."""
+        image = photos.thumbnails.get(self.selected_id) if self.selected_id else None
+        self.photo_label.configure(image=image or "", text="" if image else "(sem foto)")
+        self.photo_label.image = image  # referência mantida enquanto exibida
+
+    @instrumentado("Animais: foto")
+    def choose_photo(self):
+        """Grava a foto escolhida no animal selecionado (miniatura gerada uma vez)."""
+        if not self.selected_id:
+            messagebox.showerror("Erro", "Selecione ou salve o animal antes de escolher a foto.")
+            return
+        path = filedialog.askopenfilename(title="Foto do animal", filetypes=photos.FILE_TYPES)
+        if not path:
+            return
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            with session_scope() as s:
+                photos.save_photo(s, self.selected_id, data)
+        except (OSError, photos.PhotoError) as e:
+            messagebox.showerror("Erro", f"Erro ao gravar a foto: {e}")
+            return
+        photos.thumbnails.discard(self.selected_id)
+        self.show_photo()
+
+    def remove_photo(self):
+        """Remove a foto do animal selecionado."""
+        if not self.selected_id:
+            return
+        if not messagebox.askyesno("Confirmar", "Remover a foto do animal?"):
+            return
+        with session_scope() as s:
+            photos.delete_photo(s, self.selected_id)
+        photos.thumbnails.discard(self.selected_id)
+        self.show_photo()
@@ -0,0 +1,430 @@
+"""
+Arquivo Histórico - Animais Adotados e Processos Encerrados
+-----------------------------------------------------------
+Este módulo move para um segundo arquivo SQLite os registros que só
+interessam ao histórico, mantendo pequenas as tabelas lidas a todo
+momento (AnimalsTab.load, AdoptionsTab.load, contagens de lotação).
+
+1. Arquivo:
+   - "<banco>_archive.db" ao lado do banco (SHELTER_ARCHIVE_DB altera),
+     anexado às conexões com ATTACH DATABASE ... AS archive
+   - Tabelas animals, animal_photos, adoptions e adoption_status_events
+     com o mesmo DDL do banco principal; colunas acrescentadas depois por
+     database.migrar_esquema são replicadas antes de cada arquivamento
+
+2. O que é arquivado (archive_old):
+   - Animais "Adotado" sem alteração desde o corte e cujos processos
+     estão todos "Finalizado"/"Recusado" antes do corte (data do último
+     evento de status; sem eventos, data da visita): animal, foto,
+     processos e eventos juntos (as chaves estrangeiras não são
+     verificadas pelo SQLite; nada fica órfão no banco principal)
+   - Processos "Recusado" avulsos encerrados antes do corte; um processo
+     "Finalizado" só sai junto com o seu animal (senão o animal ficaria
+     "Adotado" sem a adoção que o explica nas estatísticas dos abrigos)
+   - IDs nunca reutilizados: as tabelas arquivadas têm AUTOINCREMENT
+     (database.ativar_autoincremento) e o maior ID do arquivo é piso de
+     main.sqlite_sequence; excluir ou arquivar o maior registro não faz
+     o número voltar a ser usado (o histórico e backup._reconcile
+     dependem de IDs únicos entre os dois arquivos)
+   - Lotes de BATCH_SIZE em transações próprias (INSERT ... SELECT no
+     arquivo + DELETE no banco), sem bloquear as estações por muito tempo;
+     interromper no meio deixa cada lote inteiro num dos dois arquivos
+
+3. Consultas de histórico:
+   - adoption_history_stmt e stage_time_report(include_archive=True)
+     juntam (UNION ALL) banco e arquivo quando a tela pede o histórico
+   - Estatísticas dos abrigos (queries.shelter_page) também somam o
+     arquivo: resgatados e adotados continuam os mesmos após arquivar
+   - As demais consultas continuam lendo só o banco principal
+
+4. Efeitos colaterais:
+   - IDs removidos notificados por database.registrar_alteracoes (índice
+     bitmap, caches)
+   - Os rollups do painel já contabilizaram os registros arquivados; uma
+     reconstrução completa (rollups.rebuild) passa a contar apenas o
+     banco principal
+
+Exemplo de uso:
+    resumo = archive.archive_old(days=730)
+    with read_session() as s:
+        rows = s.execute(archive.adoption_history_stmt(s)).all()
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from sqlalchemy import and_, delete, exists, func, insert, not_, or_, select, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.schema import MetaData
+
+import database
+from models import Animal, AnimalPhoto, AdoptionProcess, AdoptionStatusEvent, User
+
+# Nome do banco anexado
+SCHEMA = "archive"
+
+# Idade mínima (dias) dos registros arquivados
+CUTOFF_DAYS = 730
+
+# Animais (ou processos) movidos por transação
+BATCH_SIZE = 250
+
+# Situações finais de um processo
+FINAL_STEPS = ("Finalizado", "Recusado")
+
+# Tabelas arquivadas, na ordem de cópia (pais antes dos filhos)
+TABLES = (Animal.__table__, AnimalPhoto.__table__, AdoptionProcess.__table__, AdoptionStatusEvent.__table__)
+
+# Índices das consultas de histórico no arquivo
+INDEXES = (
+    ("ix_archive_adoptions_animal", "adoptions", "animal_id"),
+    ("ix_archive_events_adoption", "adoption_status_events", "adoption_id, id"),
+    ("ix_archive_events_stage", "adoption_status_events", "from_status, changed_at, stage_seconds"),
+)
+
+# Cópias das tabelas apontando para o banco anexado (consultas Core)
+_metadata = MetaData()
+ARCHIVED = {table.name: table.to_metadata(_metadata, schema=SCHEMA) for table in TABLES}
+
+_CREATE_TABLE = re.compile(r'^\s*CREATE TABLE\s+("?)(\w+)\1', re.IGNORECASE)
+
+# ========== ANEXAÇÃO E ESQUEMA ==========
+
+def archive_path(bind=None, database_path=None):
+    """
+    Caminho do arquivo histórico correspondente a um banco.
+
+    Args:
+        bind: Engine do banco (padrão: a da fábrica de sessões)
+        database_path (str): Caminho do banco (tem precedência sobre bind)
+    """
+    configured = os.environ.get("SHELTER_ARCHIVE_DB")
+    if configured:
+        return configured
+    database_path = database_path or (bind or database.SessionFactory.kw["bind"]).url.database
+    if database_path.startswith("file:"):
+        # Conexões por URI (ex: somente leitura de web_api.py)
+        database_path = url2pathname(urlsplit(database_path).path)
+    return f"{os.path.splitext(database_path)[0]}_archive.db"
+
+
+def attach(session, create=False):
+    """
+    Anexa o arquivo histórico à conexão da sessão (uma vez por conexão).
+
+    Deve ser chamada antes de qualquer gravação na sessão: o SQLite não
+    aceita ATTACH com uma transação de escrita aberta.
+
+    Args:
+        create (bool): Cria o arquivo se ainda não existir (apenas
+            archive_old); consultas nunca criam um arquivo vazio
+
+    Returns:
+        bool: True se o arquivo existe e está anexado
+    """
+    conn = session.connection()
+    attached = {row[1] for row in conn.exec_driver_sql("PRAGMA database_list")}
+    if SCHEMA in attached:
+        return True
+    path = archive_path(session.get_bind())
+    if not create and not os.path.exists(path):
+        return False
+    conn.exec_driver_sql(f"ATTACH DATABASE ? AS {SCHEMA}", (path,))
+    return True
+
+
+def has_archive(session):
+    """Indica se há registros arquivados consultáveis (arquivo anexado com tabelas)."""
+    if not attach(session):
+        return False
+    found = session.connection().exec_driver_sql(
+        f"SELECT count(*) FROM {SCHEMA}.sqlite_master WHERE type = 'table' AND name = 'adoptions'"
+    ).scalar()
+    return bool(found)
+
+
+def _columns(conn, schema, table):
+    """Colunas (nome, tipo declarado) de uma tabela, na ordem física."""
+    return [(row[1], row[2]) for row in conn.exec_driver_sql(f'PRAGMA {schema}.table_info("{table}")')]
+
+
+def ensure_schema(session):
+    """
+    Cria as tabelas do arquivo (mesmo DDL do banco principal) e replica
+    colunas acrescentadas depois da criação (cria o arquivo se preciso).
+    """
+    attach(session, create=True)
+    conn = session.connection()
+    database.ativar_autoincremento(conn)
+    for table in TABLES:
+        archived = _columns(conn, SCHEMA, table.name)
+        if not archived:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+            ).scalar()
+            conn.exec_driver_sql(_CREATE_TABLE.sub(f'CREATE TABLE {SCHEMA}."{table.name}"', ddl, count=1))
+            continue
+        present = {name for name, _ in archived}
+        for name, declared in _columns(conn, "main", table.name):
+            if name not in present:
+                conn.exec_driver_sql(f'ALTER TABLE {SCHEMA}."{table.name}" ADD COLUMN "{name}" {declared}')
+    database.converter_categorias(conn, SCHEMA)
+    for name, table, columns in INDEXES:
+        conn.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {SCHEMA}."{name}" ON "{table}" ({columns})')
+
+    # Nome e raça normalizados de animais arquivados antes das colunas existirem
+    import queries
+    animals = ARCHIVED["animals"]
+    queries.backfill_normalized(session, ((animals.c.name, animals.c.name_norm),
+                                          (animals.c.breed, animals.c.breed_norm)))
+    _reserve_archived_ids(conn)
+
+
+def _reserve_archived_ids(conn):
+    """
+    Garante que main.sqlite_sequence esteja acima de todo ID do arquivo.
+
+    Cobre bancos em que o arquivo foi preenchido antes do AUTOINCREMENT
+    (sqlite_sequence parte do maior ID que restou no banco principal).
+    """
+    for table in TABLES:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        archived_max = conn.exec_driver_sql(f'SELECT max(id) FROM {SCHEMA}."{table.name}"').scalar()
+        if archived_max is None:
+            continue
+        conn.exec_driver_sql(
+            "INSERT INTO main.sqlite_sequence (name, seq) SELECT ?, 0 "
+            "WHERE NOT EXISTS (SELECT 1 FROM main.sqlite_sequence WHERE name = ?)", (table.name, table.name))
+        conn.exec_driver_sql("UPDATE main.sqlite_sequence SET seq = max(seq, ?) WHERE name = ?",
+                             (archived_max, table.name))
+
+# ========== SELEÇÃO DOS REGISTROS ANTIGOS ==========
+
+def _closed_at(adoption):
+    """Data de encerramento de um processo: último evento de status, senão a visita."""
+    E = AdoptionStatusEvent
+    last_event = (select(func.max(E.changed_at)).where(E.adoption_id == adoption.id)
+                  .correlate(adoption).scalar_subquery())
+    return func.coalesce(last_event, adoption.in_person_visit_at)
+
+
+def _old_closed(adoption, cutoff):
+    """Condição: processo encerrado antes do corte (sem data → nunca)."""
+    return and_(func.coalesce(adoption.status, "").in_(FINAL_STEPS),
+                func.coalesce(_closed_at(adoption) < cutoff, False))
+
+
+def _old_animals(session, cutoff, after_id, limit):
+    """IDs de animais adotados arquiváveis, em ordem, a partir de after_id."""
+    A = aliased(AdoptionProcess)
+    blocking = exists().where(A.animal_id == Animal.id, not_(_old_closed(A, cutoff)))
+    stmt = (
+        select(Animal.id)
+        .where(Animal.id > after_id, Animal.status == "Adotado",
+               func.coalesce(Animal.updated_at, Animal.created_at) < cutoff, ~blocking)
+        .order_by(Animal.id)
+        .limit(limit)
+    )
+    return session.execute(stmt).scalars().all()
+
+
+def _old_adoptions(session, cutoff, after_id, limit):
+    """
+    IDs de processos recusados arquiváveis, em ordem, a partir de after_id.
+
+    Processos finalizados nunca saem sem o animal (fase dos animais).
+    """
+    stmt = (
+        select(AdoptionProcess.id)
+        .where(AdoptionProcess.id > after_id, AdoptionProcess.status == "Recusado",
+               _old_closed(AdoptionProcess, cutoff))
+        .order_by(AdoptionProcess.id)
+        .limit(limit)
+    )
+    return session.execute(stmt).scalars().all()
+
+# ========== MOVIMENTAÇÃO EM LOTES ==========
+
+def _move(session, table, condition):
+    """
+    Copia para o arquivo as linhas da tabela que satisfazem a condição e
+    as remove do banco principal.
+
+    Returns:
+        list: Chaves primárias movidas (ID; animal_id nas fotos)
+    """
+    conn = session.connection()
+    key = table.primary_key.columns[0]
+    ids = session.execute(select(key).where(condition)).scalars().all()
+    if not ids:
+        return []
+    archived = ARCHIVED[table.name]
+    names = [name for name, _ in _columns(conn, SCHEMA, table.name)]
+    session.execute(
+        insert(archived).from_select(names, select(*(table.c[name] for name in names)).where(key.in_(ids)))
+    )
+    session.execute(delete(table).where(key.in_(ids)))
+    return ids
+
+
+def _move_batch(session, animal_ids, adoption_ids):
+    """Move um lote: animais com foto e todos os seus processos, e processos avulsos."""
+    adoptions = AdoptionProcess.__table__
+    events = AdoptionStatusEvent.__table__
+    adoption_condition = or_(adoptions.c.animal_id.in_(animal_ids), adoptions.c.id.in_(adoption_ids))
+    moving = select(adoptions.c.id).where(adoption_condition)
+    _move(session, events, events.c.adoption_id.in_(moving))
+    moved_adoptions = _move(session, adoptions, adoption_condition)
+    moved_animals = []
+    if animal_ids:
+        photos = AnimalPhoto.__table__
+        _move(session, photos, photos.c.animal_id.in_(animal_ids))
+        moved_animals = _move(session, Animal.__table__, Animal.__table__.c.id.in_(animal_ids))
+    database.registrar_alteracoes(session, "adoptions", moved_adoptions)
+    database.registrar_alteracoes(session, "animals", moved_animals)
+    return len(moved_animals), len(moved_adoptions)
+
+
+def archive_old(days=CUTOFF_DAYS, batch_size=BATCH_SIZE, now=None, progress=None):
+    """
+    Arquiva os animais adotados e processos encerrados há mais de `days` dias.
+
+    Cada lote é uma transação própria (database.session_scope).
+
+    Args:
+        days (int): Idade mínima dos registros arquivados
+        batch_size (int): Animais ou processos por transação
+        now (datetime): Referência do corte (padrão: agora)
+        progress (callable): Recebe o resumo parcial após cada lote;
+                             retornar False interrompe o arquivamento
+
+    Returns:
+        dict: {"animals": movidos, "adoptions": movidos, "batches": lotes}
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=days)
+    summary = {"animals": 0, "adoptions": 0, "batches": 0}
+
+    with database.session_scope() as s:
+        ensure_schema(s)
+
+    for phase in ("animals", "adoptions"):
+        last_id = 0
+        while True:
+            with database.session_scope() as s:
+                attach(s)
+                if phase == "animals":
+                    ids = _old_animals(s, cutoff, last_id, batch_size)
+                    moved = _move_batch(s, ids, []) if ids else (0, 0)
+                else:
+                    ids = _old_adoptions(s, cutoff, last_id, batch_size)
+                    moved = _move_batch(s, [], ids) if ids else (0, 0)
+            if not ids:
+                break
+            last_id = ids[-1]
+            summary["animals"] += moved[0]
+            summary["adoptions"] += moved[1]
+            summary["batches"] += 1
+            if progress is not None and progress(dict(summary)) is False:
+                return summary
+    return summary
+
+# ========== CONSULTAS DE HISTÓRICO ==========
+
+def adoption_history_stmt(session, prefix=None):
+    """
+    Projeção da AdoptionsTab incluindo os processos arquivados.
+
+    Processos arquivados podem apontar para animais ainda no banco
+    principal (processo recusado de um animal disponível): o nome vem do
+    arquivo ou, na falta dele, do banco principal.
+
+    Args:
+        prefix (tuple): Filtro rápido (campo, texto), como em
+                        queries.adoption_page
+
+    Returns:
+        Select: Mesmas colunas de queries.adoption_rows_stmt, ID decrescente
+    """
+    import queries
+    hot = queries.adoption_rows_stmt().where(*queries.prefix_filter(queries.ADOPTION_FILTERS, prefix))
+    if not has_archive(session):
+        return hot
+    hot = hot.order_by(None)
+    a, animals = ARCHIVED["adoptions"], ARCHIVED["animals"]
+    filters = {"animal": (func.coalesce(animals.c.name_norm, Animal.name_norm), 1),
+               "user": queries.ADOPTION_FILTERS["user"]}
+    cold = (
+        select(a.c.id,
+               func.coalesce(animals.c.name, Animal.name, "-"),
+               func.coalesce(User.name, "-"),
+               func.coalesce(func.nullif(a.c.status, "", type_=a.c.status.type), "-"))
+        .outerjoin(animals, a.c.animal_id == animals.c.id)
+        .outerjoin(Animal, a.c.animal_id == Animal.id)
+        .outerjoin(User, a.c.user_id == User.id)
+        .where(*queries.prefix_filter(filters, prefix))
+    )
+    history = union_all(hot, cold).subquery()
+    return select(*history.c).order_by(history.c[0].desc())
+
+
+def events_union(session):
+    """
+    Eventos de status do banco principal e do arquivo (UNION ALL).
+
+    Returns:
+        Subquery: Colunas de adoption_status_events (id, adoption_id,
+                  from_status, to_status, changed_at, stage_seconds)
+    """
+    hot = AdoptionStatusEvent.__table__
+    names = ("id", "adoption_id", "from_status", "to_status", "changed_at", "stage_seconds")
+    parts = [select(*(hot.c[name] for name in names))]
+    if has_archive(session):
+        cold = ARCHIVED["adoption_status_events"]
+        parts.append(select(*(cold.c[name] for name in names)))
+    return union_all(*parts).subquery("events") if len(parts) > 1 else parts[0].subquery("events")
+
+
+def archived_counts(session):
+    """
+    Quantidade de registros no arquivo.
+
+    Returns:
+        dict: Tabela → linhas (vazio sem arquivo)
+    """
+    if not has_archive(session):
+        return {}
+    return {name: session.execute(select(func.count()).select_from(table)).scalar_one()
+            for name, table in ARCHIVED.items()}
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso
+    """
+    parser = argparse.ArgumentParser(description="Arquiva animais adotados e processos encerrados antigos.")
+    parser.add_argument("--days", type=int, default=CUTOFF_DAYS, help="idade mínima dos registros (dias)")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="registros por transação")
+    args = parser.parse_args(argv)
+
+    def report(summary):
+        print(f"{summary['batches']} lotes: {summary['animals']} animais, "
+              f"{summary['adoptions']} processos", file=sys.stderr)
+
+    summary = archive_old(args.days, args.batch, progress=report)
+    print(f"Arquivados {summary['animals']} animais e {summary['adoptions']} processos "
+          f"em {archive_path()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+"""
+Cópias de Segurança - Backup Online pela API do SQLite
+------------------------------------------------------
+Este módulo copia o banco em uso sem interromper a aplicação. Copiar o
+arquivo shelter.db com o sistema aberto pode gerar uma cópia corrompida
+(páginas de transações diferentes); a API de backup do SQLite copia um
+retrato consistente.
+
+1. Cópia (create_backup):
+   - sqlite3.Connection.backup em passos de PAGES_PER_STEP páginas
+   - O bloqueio de leitura do arquivo só existe durante cada passo; entre
+     os passos há uma pausa (STEP_PAUSE_S) para as gravações da aplicação
+     e de outras estações seguirem sem esperar
+   - Se outra conexão gravar no meio da cópia, o SQLite recomeça a cópia
+     do início no passo seguinte (o resultado continua consistente);
+     depois de MAX_RESTARTS recomeços a cópia é feita num passo único,
+     que bloqueia as gravações até terminar
+   - A cópia é gravada em "<nome>.part" e só recebe o nome final depois
+     de passar no PRAGMA integrity_check
+   - Se existir o arquivo histórico (<banco>_archive.db, ver archive.py),
+     ele é copiado na mesma execução, da mesma forma, para
+     "shelter_AAAAMMDD_HHMMSS_archive.db", logo depois do banco principal.
+     Um lote arquivado entre as duas cópias apareceria nas duas; esses
+     registros são removidos da cópia do arquivo, que fica coerente com o
+     retrato do banco principal
+
+2. Rotação:
+   - Arquivos shelter_AAAAMMDD_HHMMSS.db em BACKUP_DIR
+   - Mantidas apenas as KEEP cópias mais recentes; a cópia do arquivo
+     histórico acompanha a do banco principal (removida junto)
+
+3. Agendamento (start_scheduler):
+   - Thread em segundo plano; uma cópia a cada INTERVAL_HOURS, contadas a
+     partir da cópia mais recente existente (reabrir o sistema não gera
+     cópias extras)
+   - Falhas não interrompem a aplicação: ficam em last_result e no console
+
+4. Restauração (linha de comando, com o sistema fechado):
+   - python backup.py list
+   - python backup.py verify ARQUIVO
+   - python backup.py restore ARQUIVO
+   - A cópia é verificada antes; o banco atual é salvo como
+     "<banco>.antes-da-restauracao" e então sobrescrito pela API de backup
+   - O arquivo histórico é restaurado junto, a partir da cópia
+     "..._archive.db" correspondente (o atual é salvo da mesma forma). Se
+     a cópia é anterior ao primeiro arquivamento, o arquivo histórico
+     atual é apenas salvo e removido: os registros dele ainda estão no
+     banco restaurado
+
+Variáveis de ambiente:
+    SHELTER_BACKUP_DIR: diretório das cópias (padrão: backups)
+    SHELTER_BACKUP_HOURS: intervalo entre cópias; 0 desativa o agendamento
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import archive
+import database
+
+# Diretório das cópias
+BACKUP_DIR = os.environ.get("SHELTER_BACKUP_DIR", "backups")
+
+# Cópias mantidas na rotação
+KEEP = 14
+
+# Intervalo entre cópias agendadas (horas)
+INTERVAL_HOURS = float(os.environ.get("SHELTER_BACKUP_HOURS", "24"))
+
+# Páginas copiadas por passo e pausa entre passos: com páginas de 4 KiB,
+# cada passo lê 1 MiB (poucos ms com o arquivo em cache)
+PAGES_PER_STEP = 256
+STEP_PAUSE_S = 0.005
+
+# Recomeços tolerados antes de copiar o restante num passo único
+MAX_RESTARTS = 3
+
+# Espera pelo bloqueio do arquivo de origem (ms)
+BUSY_TIMEOUT_MS = 5000
+
+_NAME = re.compile(r"^shelter_(\d{8}_\d{6})\.db$")
+
+
+class BackupError(Exception):
+    """Falha ao criar, verificar ou restaurar uma cópia."""
+
+
+class _Restarted(Exception):
+    """Cópia recomeçada vezes demais por gravações de outras conexões."""
+
+# ========== CÓPIA E VERIFICAÇÃO ==========
+
+def _connect(path, readonly=False):
+    """Conexão sqlite3 direta (fora do SQLAlchemy) com espera por bloqueio."""
+    if readonly:
+        conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _copy(source, target, pages=PAGES_PER_STEP, pause=STEP_PAUSE_S):
+    """
+    Copia o banco source → target pela API de backup, em passos.
+
+    Args:
+        source, target (sqlite3.Connection): Conexões de origem e destino
+        pages (int): Páginas por passo (-1 = tudo de uma vez)
+        pause (float): Pausa entre passos, sem bloqueio no arquivo (s)
+    """
+    state = {"remaining": None, "restarts": 0}
+
+    def progress(status, remaining, total):
+        # "remaining" voltando a crescer = a cópia recomeçou
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+            if state["restarts"] > MAX_RESTARTS:
+                raise _Restarted()
+        state["remaining"] = remaining
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=pause or 0.25)
+    except _Restarted:
+        # Gravações contínuas: copia o restante num passo único (o arquivo
+        # fica bloqueado para gravação durante toda a cópia)
+        source.backup(target, pages=-1)
+
+
+def _archive_copy(path):
+    """Caminho da cópia do arquivo histórico que acompanha uma cópia."""
+    return f"{os.path.splitext(path)[0]}_archive.db"
+
+
+def _reconcile(archive_copy, main_copy):
+    """
+    Remove da cópia do arquivo histórico os registros presentes na cópia
+    do banco principal (lote arquivado entre as duas cópias).
+
+    Returns:
+        int: Registros removidos
+    """
+    conn = sqlite3.connect(archive_copy)
+    try:
+        conn.execute("ATTACH DATABASE ? AS principal", (main_copy,))
+        existing = {row[0] for row in conn.execute("SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+        removed = 0
+        with conn:
+            # Filhos antes dos pais
+            for table in reversed(archive.TABLES):
+                if table.name in existing:
+                    key = table.primary_key.columns[0].name
+                    removed += conn.execute(
+                        f'DELETE FROM main."{table.name}" WHERE "{key}" IN (SELECT "{key}" FROM principal."{table.name}")'
+                    ).rowcount
+        conn.execute("DETACH DATABASE principal")
+    finally:
+        conn.close()
+    return removed
+
+
+def _copy_file(source_path, partial, pages, pause):
+    """Copia um arquivo de banco para `partial` (conexão de origem somente leitura)."""
+    if os.path.exists(partial):
+        os.remove(partial)
+    source = _connect(source_path, readonly=True)
+    try:
+        target = sqlite3.connect(partial)
+        try:
+            _copy(source, target, pages, pause)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def _check(partial):
+    """
+    Verifica uma cópia parcial, removendo-a se inválida.
+
+    Raises:
+        BackupError: Cópia com falha na verificação de integridade
+    """
+    problems = verify(partial)
+    if problems:
+        os.remove(partial)
+        raise BackupError(f"cópia inválida de {os.path.basename(partial)} ({'; '.join(problems[:3])})")
+
+
+def verify(path):
+    """
+    Executa PRAGMA integrity_check num arquivo de banco.
+
+    Returns:
+        list: Problemas encontrados (vazia se o arquivo está íntegro)
+    """
+    if not os.path.exists(path):
+        return [f"arquivo não encontrado: {path}"]
+    try:
+        conn = _connect(path, readonly=True)
+        try:
+            rows = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    return [] if rows == ["ok"] else rows
+
+
+def create_backup(source_path=None, directory=None, keep=KEEP, pages=PAGES_PER_STEP, pause=STEP_PAUSE_S):
+    """
+    Cria uma cópia verificada do banco (e do arquivo histórico, se
+    existir) e aplica a rotação.
+
+    Args:
+        source_path (str): Banco de origem (padrão: database.DATABASE_PATH)
+        directory (str): Diretório das cópias (padrão: BACKUP_DIR)
+        keep (int): Cópias mantidas na rotação
+        pages (int): Páginas por passo da API de backup
+        pause (float): Pausa entre passos (s)
+
+    Returns:
+        str: Caminho da cópia criada
+
+    Raises:
+        BackupError: Cópia com falha na verificação de integridade
+    """
+    source_path = source_path or database.DATABASE_PATH
+    directory = directory or BACKUP_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final = os.path.join(directory, f"shelter_{stamp}.db")
+    partial = final + ".part"
+    _copy_file(source_path, partial, pages, pause)
+    _check(partial)
+
+    # Arquivo histórico: copiado depois do banco principal (ver seção 1)
+    archive_source = archive.archive_path(database_path=source_path)
+    archive_final = _archive_copy(final)
+    if os.path.exists(archive_source):
+        archive_partial = archive_final + ".part"
+        try:
+            _copy_file(archive_source, archive_partial, pages, pause)
+            _reconcile(archive_partial, partial)
+            _check(archive_partial)
+        except Exception:
+            os.remove(partial)
+            if os.path.exists(archive_partial):
+                os.remove(archive_partial)
+            raise
+        os.replace(archive_partial, archive_final)
+
+    os.replace(partial, final)
+    rotate(directory, keep)
+    return final
+
+# ========== ROTAÇÃO E LISTAGEM ==========
+
+def list_backups(directory=None):
+    """
+    Lista as cópias existentes.
+
+    Returns:
+        list: Tuplas (caminho, data da cópia, tamanho em bytes), mais
+              recente primeiro
+    """
+    directory = directory or BACKUP_DIR
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in os.listdir(directory):
+        match = _NAME.match(name)
+        if match:
+            path = os.path.join(directory, name)
+            found.append((path, datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"), os.path.getsize(path)))
+    found.sort(key=lambda item: item[1], reverse=True)
+    return found
+
+
+def rotate(directory=None, keep=KEEP):
+    """
+    Remove as cópias mais antigas, mantendo as `keep` mais recentes.
+
+    Returns:
+        list: Caminhos removidos
+    """
+    removed = []
+    for path, _, _ in list_backups(directory)[keep:]:
+        for name in (path, _archive_copy(path)):
+            if os.path.exists(name):
+                os.remove(name)
+                removed.append(name)
+    return removed
+
+# ========== RESTAURAÇÃO ==========
+
+def restore(backup_path, target_path=None):
+    """
+    Substitui o banco (e o arquivo histórico) pelo conteúdo de uma cópia.
+
+    Deve ser executada com o sistema fechado em todas as estações. Os
+    arquivos atuais são preservados em "<arquivo>.antes-da-restauracao".
+
+    Args:
+        backup_path (str): Cópia a restaurar
+        target_path (str): Banco de destino (padrão: database.DATABASE_PATH)
+
+    Returns:
+        list: Caminhos dos arquivos anteriores preservados
+
+    Raises:
+        BackupError: Cópia inexistente ou com falha de integridade
+    """
+    target_path = target_path or database.DATABASE_PATH
+    archive_backup = _archive_copy(backup_path)
+    archive_target = archive.archive_path(database_path=target_path)
+    problems = verify(backup_path)
+    if not problems and os.path.exists(archive_backup):
+        problems = verify(archive_backup)
+    if problems:
+        raise BackupError(f"cópia inválida, nada foi alterado ({'; '.join(problems[:3])})")
+
+    preserved = []
+    for path in (target_path, archive_target):
+        if os.path.exists(path):
+            previous = path + ".antes-da-restauracao"
+            _restore_file(path, previous)
+            preserved.append(previous)
+
+    _restore_file(backup_path, target_path)
+    if os.path.exists(archive_backup):
+        _restore_file(archive_backup, archive_target)
+    elif os.path.exists(archive_target):
+        # Cópia anterior ao primeiro arquivamento: os registros do arquivo
+        # atual estão no banco restaurado
+        os.remove(archive_target)
+    return preserved
+
+
+def _restore_file(source_path, target_path):
+    """Sobrescreve target_path com o conteúdo de source_path (passo único)."""
+    source = _connect(source_path, readonly=True)
+    try:
+        target = _connect(target_path)
+        try:
+            _copy(source, target, pages=-1, pause=0)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+# ========== AGENDAMENTO ==========
+
+class BackupScheduler:
+    """
+    Executa create_backup periodicamente numa thread em segundo plano.
+
+    Atributos:
+        interval_s (float): Intervalo entre cópias (s)
+        last_result (tuple): (data, caminho da cópia ou None, erro ou None)
+    """
+
+    def __init__(self, interval_hours=INTERVAL_HOURS, directory=None):
+        self.interval_s = interval_hours * 3600
+        self.directory = directory
+        self.last_result = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread de agendamento (se ainda não iniciada)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="backup", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Interrompe o agendamento (uma cópia em andamento termina antes)."""
+        self._stop.set()
+
+    def run_now(self):
+        """
+        Cria uma cópia imediatamente (uma por vez).
+
+        Returns:
+            str: Caminho da cópia
+
+        Raises:
+            BackupError, sqlite3.Error: Falha na cópia
+        """
+        with self._lock:
+            try:
+                path = create_backup(directory=self.directory)
+            except Exception as e:
+                self.last_result = (datetime.now(), None, str(e))
+                raise
+            self.last_result = (datetime.now(), path, None)
+            return path
+
+    def _seconds_until_due(self):
+        """Tempo até a próxima cópia, a partir da mais recente existente."""
+        existing = list_backups(self.directory)
+        if not existing:
+            return 0
+        elapsed = (datetime.now() - existing[0][1]).total_seconds()
+        return max(0, self.interval_s - elapsed)
+
+    def _run(self):
+        while not self._stop.wait(self._seconds_until_due()):
+            try:
+                path = self.run_now()
+                print(f"Backup criado: {path}")
+            except Exception as e:
+                print(f"Falha no backup automático: {e}")
+                # Nova tentativa após um décimo do intervalo
+                if self._stop.wait(self.interval_s / 10):
+                    return
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Agendador compartilhado pela aplicação."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BackupScheduler()
+    return _scheduler
+
+
+def start_scheduler():
+    """Inicia as cópias agendadas (SHELTER_BACKUP_HOURS=0 desativa)."""
+    if INTERVAL_HOURS > 0:
+        get_scheduler().start()
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso, 1 em caso de falha
+    """
+    parser = argparse.ArgumentParser(description="Cópias de segurança do banco do abrigo.")
+    parser.add_argument("--db", default=database.DATABASE_PATH, help="banco da aplicação")
+    parser.add_argument("--dir", default=BACKUP_DIR, help="diretório das cópias")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("create", help="cria uma cópia agora")
+    commands.add_parser("list", help="lista as cópias existentes")
+    check = commands.add_parser("verify", help="verifica a integridade de uma cópia")
+    check.add_argument("file")
+    back = commands.add_parser("restore", help="restaura uma cópia (sistema fechado)")
+    back.add_argument("file")
+    back.add_argument("--yes", action="store_true", help="não pede confirmação")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "create":
+            print(create_backup(args.db, args.dir))
+        elif args.command == "list":
+            for path, when, size in list_backups(args.dir):
+                extra = "  (+ arquivo histórico)" if os.path.exists(_archive_copy(path)) else ""
+                print(f"{when:%d/%m/%Y %H:%M:%S}  {size / 1024 / 1024:8.1f} MiB  {path}{extra}")
+        elif args.command == "verify":
+            problems = verify(args.file)
+            if not problems and os.path.exists(_archive_copy(args.file)):
+                problems = verify(_archive_copy(args.file))
+            print("ok" if not problems else "\n".join(problems))
+            return 1 if problems else 0
+        elif args.command == "restore":
+            if not args.yes:
+                answer = input(f"Substituir {args.db} por {args.file}? O sistema deve estar fechado. [s/N] ")
+                if answer.strip().lower() not in ("s", "sim"):
+                    print("Cancelado.")
+                    return 1
+            for previous in restore(args.file, args.db):
+                print(f"Arquivo anterior preservado em {previous}")
+            print(f"Banco restaurado a partir de {args.file}")
+    except (BackupError, sqlite3.Error, OSError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,910 @@
+"""
+Suíte de Benchmark Headless - Caminhos de Dados das Abas
+--------------------------------------------------------
+Este módulo mede, sem interface gráfica, as mesmas consultas e a mesma
+montagem de linhas executadas pelas abas (via queries.py) contra bases
+sintéticas de vários tamanhos geradas por dataset_generator.py.
+
+1. Cenários Medidos:
+   - AnimalsTab.load, AdoptionsTab.load, UsersTab.load, ShelterTab.load
+     (primeira página da lista, como as abas exibem)
+   - Ordenação pelo cabeçalho (primeira página por coluna indexada e por
+     nome vindo de JOIN) e página seguinte da rolagem
+   - Filtro rápido por prefixo (textos digitados em sequência, de uma
+     letra ao nome completo)
+   - SearchTab.search (consulta SQL e índice bitmap)
+   - UsersTab.duplicates (varredura) e verificação de duplicados ao salvar
+   - AdoptionsTab.match_tutors / match_animals (sugestões do formulário)
+   - AdmTab.carregar_usuarios
+   - Caminhos de gravação: AnimalsTab.save, UsersTab.save,
+     AdoptionsTab.save, ShelterTab.save
+
+2. Métricas por Cenário:
+   - Latência: p50, p90, p95, p99, máximo e média (ms)
+   - Quantidade de comandos SQL por execução (diagnostics.py)
+   - Comandos com padrão N+1 na execução
+   - Pico de memória alocada (tracemalloc, KiB)
+
+3. Comparação com Baseline:
+   - Resultados salvos em JSON (--save-baseline)
+   - Execuções seguintes comparam latência p50, consultas e memória
+   - Regressões são listadas e o processo sai com código 1
+
+4. Teste de Resistência de Memória (--soak):
+   - Simula um turno de 8 horas recarregando todas as abas e repetindo a
+     pesquisa (consulta SQL, facetas e índice bitmap) a cada ciclo
+   - Usa session_scope()/read_session() de database.py, como as abas
+   - Mede a memória residente (RSS) do processo em pontos de controle
+   - Falha (código 1) se o RSS crescer além de --soak-limit MiB após o
+     aquecimento
+   - Verificação de regressão sem supervisão: a execução completa (sem
+     --only) roda SOAK_CHECK_CYCLES ciclos no menor tamanho e soma a
+     falha às regressões; para o turno inteiro, agendar
+     "python benchmark.py --sizes 100000 --soak -o soak.json" e tratar
+     o código de saída 1 como falha
+
+5. Memória por Linha das Listagens (--row-cache):
+   - Objetos ORM Animal com a coleção adoptions (amostra de até 100 mil)
+   - Tuplas da projeção de queries.animal_rows
+   - Cache colunar de row_cache.py (meta: < 100 bytes por animal)
+
+6. Sincronização dos Índices (--index-sync, também na execução completa):
+   - Grava um tutor, atualiza os rollups e edita um animal pela fábrica
+     de sessões de database.py; o índice bitmap não pode ser reconstruído
+   - Uma gravação de outra conexão deve provocar a reconstrução
+
+7. Características Técnicas:
+   - Bases geradas uma vez e reaproveitadas (bench_data/)
+   - Cada tamanho roda numa cópia temporária (gravações não sujam a base)
+   - Sessão nova a cada execução, com a mesma configuração de database.py
+
+Exemplo de uso:
+    python benchmark.py --sizes 1000,10000,100000 --output resultados.json
+    python benchmark.py --save-baseline
+    python benchmark.py --sizes 100000 --soak 480 --soak-limit 16
+    python benchmark.py --sizes 1000000 --row-cache
+    python benchmark.py --sizes 1000 --index-sync
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import sqlalchemy
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import selectinload, sessionmaker
+
+import bitmap_index
+import database
+import dataset_generator
+import diagnostics
+import duplicates
+import matching
+import queries
+import rollups
+import row_cache
+from models import AdoptionProcess, Animal, AuthUser, Shelter, User
+
+# Diretório onde as bases sintéticas ficam armazenadas entre execuções
+DATA_DIR = "bench_data"
+
+# Arquivo de baseline padrão
+BASELINE_FILE = "bench_baseline.json"
+
+# Tolerância relativa antes de considerar uma métrica regressão
+DEFAULT_TOLERANCE = 0.25
+
+# Diferenças de latência abaixo deste valor (ms) são ruído
+NOISE_FLOOR_MS = 2.0
+
+# Teste de resistência: 480 ciclos = recarga de todas as abas a cada
+# minuto durante um turno de 8 horas
+SOAK_CYCLES = 480
+
+# Crescimento máximo aceito do RSS após o aquecimento (MiB)
+SOAK_LIMIT_MIB = 16
+
+# Ciclos de aquecimento antes da medição de referência (caches, arenas)
+SOAK_WARMUP = 10
+
+# Ciclos da verificação curta incluída na execução completa
+SOAK_CHECK_CYCLES = 60
+
+# Critérios da pesquisa repetida no teste de resistência
+SOAK_SEARCH = dict(species="Cachorro", size="Médio", age_min=1, age_max=5)
+
+# Amostra máxima de objetos ORM na medição de memória por linha
+ORM_SAMPLE = 100_000
+
+# ========== CENÁRIOS ==========
+
+def _animals_load(session, ctx):
+    """Mesma sequência de AnimalsTab.load (sincroniza status + lista + combobox de abrigos)."""
+    queries.sync_animal_status(session)
+    session.commit()
+    queries.animal_page(session)
+    queries.shelter_choices(session)
+
+
+def _adoptions_load(session, ctx):
+    """Mesma sequência de AdoptionsTab.load (lista + comboboxes)."""
+    queries.adoption_page(session)
+    queries.available_animal_choices(session)
+    queries.user_choices(session)
+
+
+def _users_load(session, ctx):
+    """Mesma sequência de UsersTab.load."""
+    queries.user_page(session)
+
+
+def _shelter_load(session, ctx):
+    """Mesma sequência de ShelterTab.load."""
+    queries.shelter_page(session)
+
+
+def _animals_sort_name(session, ctx):
+    """Clique no cabeçalho "Nome" da AnimalsTab (coluna indexada)."""
+    queries.animal_page(session, column=1, descending=False)
+
+
+def _animals_sort_shelter(session, ctx):
+    """Clique no cabeçalho "Abrigo" da AnimalsTab (nome do abrigo via JOIN, sem índice)."""
+    queries.animal_page(session, column=8, descending=False)
+
+
+def _animals_scroll(session, ctx):
+    """Página seguinte da AnimalsTab ordenada por nome (a partir do cursor, sem OFFSET)."""
+    cursor = ctx.get("name_cursor")
+    if cursor is None:
+        cursor = ctx["name_cursor"] = queries.animal_page(session, column=1, descending=False,
+                                                          limit=50 * queries.PAGE_SIZE)[1]
+    queries.animal_page(session, column=1, descending=False, after=cursor)
+
+
+def _adoptions_sort_status(session, ctx):
+    """Clique no cabeçalho "Status" da AdoptionsTab (coluna indexada)."""
+    queries.adoption_page(session, column=3, descending=False)
+
+
+# Textos digitados no filtro rápido, repetidos em ciclo (uma letra,
+# prefixos curtos e longos, com e sem acento)
+QUICK_FILTER_TEXTS = ("a", "j", "jo", "joã", "João", "ma", "Mar", "pedro r", "ZZZ")
+
+
+def _quick_filter(session, ctx, page, filters, field):
+    """Primeira página do filtro rápido com o próximo texto do ciclo."""
+    i = ctx["quick_filter"] = ctx.get("quick_filter", -1) + 1
+    text = QUICK_FILTER_TEXTS[i % len(QUICK_FILTER_TEXTS)]
+    page(session, column=filters[field][1], descending=False, prefix=(field, text))
+
+
+def _animals_filter(session, ctx):
+    """Filtro rápido da AnimalsTab pelo nome."""
+    _quick_filter(session, ctx, queries.animal_page, queries.ANIMAL_FILTERS, "name")
+
+
+def _users_filter_name(session, ctx):
+    """Filtro rápido da UsersTab pelo nome."""
+    _quick_filter(session, ctx, queries.user_page, queries.USER_FILTERS, "name")
+
+
+def _users_filter_city(session, ctx):
+    """Filtro rápido da UsersTab pela cidade ("São Paulo" e similares)."""
+    queries.user_page(session, column=3, descending=False, prefix=("city", "sao"))
+
+
+def _adoptions_filter_user(session, ctx):
+    """Filtro rápido da AdoptionsTab pelo nome do tutor (JOIN)."""
+    _quick_filter(session, ctx, queries.adoption_page, queries.ADOPTION_FILTERS, "user")
+
+
+def _search(session, ctx):
+    """SearchTab.search com filtros típicos (espécie, porte, abrigo e idade)."""
+    queries.sync_animal_status(session, in_progress=True)
+    session.commit()
+    criteria = dict(species="Cachorro", size="Médio", shelter_id=ctx["shelter_id"], age_min=1, age_max=5)
+    queries.search_count(session, **criteria)
+    queries.search_page(session, criteria)
+
+
+def _search_text(session, ctx):
+    """SearchTab.search pela busca livre (categorias e raça digitadas sem acento)."""
+    criteria = dict(text="cachorro medio pastor alemao")
+    queries.search_count(session, **criteria)
+    queries.search_page(session, criteria)
+
+
+def _search_bitmap(session, ctx):
+    """SearchTab.search pelo índice bitmap (construído no aquecimento, fora da medição)."""
+    queries.sync_animal_status(session, in_progress=True)
+    session.commit()
+    index = ctx.get("bitmap")
+    if index is None:
+        index = ctx["bitmap"] = bitmap_index.BitmapIndex()
+        index.build(session)
+    index.refresh(session)
+    criteria = dict(species="Cachorro", size="Médio", shelter_id=ctx["shelter_id"], age_min=1, age_max=5)
+    index.count(**criteria)
+    queries.search_page(session, criteria)
+
+
+def _facets(session, ctx):
+    """SearchTab.refresh_facets pela consulta agrupada (filtros de _search)."""
+    queries.facet_counts(session, species="Cachorro", size="Médio",
+                         shelter_id=ctx["shelter_id"], age_min=1, age_max=5)
+
+
+def _facets_bitmap(session, ctx):
+    """SearchTab.refresh_facets pelo índice bitmap (popcount das interseções)."""
+    index = ctx.get("bitmap")
+    if index is None:
+        index = ctx["bitmap"] = bitmap_index.BitmapIndex()
+        index.build(session)
+    index.refresh(session)
+    index.facet_counts(species="Cachorro", size="Médio", shelter_id=ctx["shelter_id"], age_min=1, age_max=5)
+
+
+def _stage_report(session, ctx):
+    """Relatório de tempo por etapa da AdoptionsTab (histórico completo)."""
+    queries.stage_time_report(session)
+
+
+def _dashboard_load(session, ctx):
+    """
+    DashboardTab.load: atualização incremental dos rollups + leituras.
+
+    O aquecimento faz a reconstrução completa (primeira abertura); as
+    execuções medidas processam só o que os cenários de gravação mudaram.
+    """
+    rollups.refresh(session)
+    session.commit()
+    since = date.today() - timedelta(days=29)
+    queries.dashboard_occupancy(session)
+    queries.dashboard_species(session, since)
+    queries.dashboard_daily(session, since)
+
+
+def _matches_for_animal(session, ctx):
+    """Sugestões de tutores do formulário de adoção (índice de preferências)."""
+    tutors = ctx.get("tutors")
+    if tutors is None:
+        tutors = ctx["tutors"] = matching.TutorIndex()
+        tutors.build(session)
+    matching.tutors_for_animal(session, ctx["animal_id"], tutors=tutors)
+
+
+def _matches_for_tutor(session, ctx):
+    """Sugestões de animais do formulário de adoção (sobre o índice bitmap)."""
+    index = ctx.get("bitmap")
+    if index is None:
+        index = ctx["bitmap"] = bitmap_index.BitmapIndex()
+        index.build(session)
+    matching.animals_for_tutor(session, ctx["tutor_id"], animals=index)
+
+
+def _duplicates_check(session, ctx):
+    """Verificação de duplicados do UsersTab.save (dados de um tutor existente)."""
+    user = session.get(User, ctx["user_id"])
+    duplicates.find_similar(session, user.name, user.email, user.phone)
+
+
+def _duplicates_scan(session, ctx):
+    """Varredura completa de UsersTab.show_duplicates."""
+    duplicates.scan(session)
+
+
+def _adm_load(session, ctx):
+    """Mesma sequência de AdmTab.carregar_usuarios."""
+    queries.auth_user_rows(session)
+
+
+def _animals_save(session, ctx):
+    """AnimalsTab.save de um novo animal (validação de lotação + gravação)."""
+    shelter = session.get(Shelter, ctx["shelter_id"])
+    queries.shelter_occupancy(session, shelter.id)
+    queries.save_animal(session, None, name="Bench", species="Gato", breed="SRD", age=2,
+                        size="Pequeno", gender="Fêmea", status="Disponível",
+                        temperament="Dócil", shelter_id=shelter.id)
+    session.commit()
+
+
+def _users_save(session, ctx):
+    """UsersTab.save de um novo tutor (email único a cada execução)."""
+    ctx["seq"] += 1
+    queries.save_user(session, None, name="Tutor Bench", email=f"bench{ctx['seq']}@bench.local",
+                      phone="11999999999", city="São Paulo", adoption_preferences=None)
+    session.commit()
+
+
+def _adoptions_save(session, ctx):
+    """AdoptionsTab.save editando um processo existente (com sincronização do animal)."""
+    adocao = session.get(AdoptionProcess, ctx["adoption_id"])
+    queries.save_adoption(session, adocao.id, animal_id=adocao.animal_id, user_id=adocao.user_id,
+                          status="Documentos", notes="bench", in_person_visit_at=None)
+    session.commit()
+
+
+def _shelter_save(session, ctx):
+    """ShelterTab.save editando um abrigo existente."""
+    queries.save_shelter(session, ctx["shelter_id"], name="Abrigo Bench", email="bench@abrigos.org",
+                         phone="11999999999", address="Rua Bench, 1", capacity=10**9)
+    session.commit()
+
+
+SCENARIOS = [
+    ("AnimalsTab.load", _animals_load),
+    ("AdoptionsTab.load", _adoptions_load),
+    ("UsersTab.load", _users_load),
+    ("ShelterTab.load", _shelter_load),
+    ("AnimalsTab.sort (nome)", _animals_sort_name),
+    ("AnimalsTab.sort (abrigo)", _animals_sort_shelter),
+    ("AnimalsTab.scroll (nome)", _animals_scroll),
+    ("AdoptionsTab.sort (status)", _adoptions_sort_status),
+    ("AnimalsTab.filter (nome)", _animals_filter),
+    ("UsersTab.filter (nome)", _users_filter_name),
+    ("UsersTab.filter (cidade)", _users_filter_city),
+    ("AdoptionsTab.filter (tutor)", _adoptions_filter_user),
+    ("SearchTab.search", _search),
+    ("SearchTab.search (texto)", _search_text),
+    ("SearchTab.search (bitmap)", _search_bitmap),
+    ("SearchTab.facets", _facets),
+    ("SearchTab.facets (bitmap)", _facets_bitmap),
+    ("AdoptionsTab.stage_report", _stage_report),
+    ("UsersTab.duplicates", _duplicates_scan),
+    ("AdoptionsTab.match_tutors", _matches_for_animal),
+    ("AdoptionsTab.match_animals", _matches_for_tutor),
+    ("AdmTab.carregar_usuarios", _adm_load),
+    ("AnimalsTab.save", _animals_save),
+    ("UsersTab.save (duplicados)", _duplicates_check),
+    ("UsersTab.save", _users_save),
+    ("AdoptionsTab.save", _adoptions_save),
+    ("ShelterTab.save", _shelter_save),
+    ("DashboardTab.load", _dashboard_load),
+]
+
+# ========== PREPARAÇÃO ==========
+
+def ensure_dataset(size, seed):
+    """
+    Gera (se necessário) a base sintética de um tamanho.
+
+    Args:
+        size (int): Quantidade de animais
+        seed (int): Semente do gerador
+
+    Returns:
+        str: Caminho do arquivo .db
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"shelter_{size}_s{seed}_v{dataset_generator.DATASET_VERSION}.db")
+    if not os.path.exists(path):
+        result = dataset_generator.generate(path, animals=size, seed=seed)
+        print(f"  base de {size} animais gerada em {result['seconds']}s", file=sys.stderr)
+    return path
+
+
+def _prepare_copy(source, workdir):
+    """
+    Copia a base para um diretório temporário e cria contas de sistema.
+
+    As bases sintéticas não têm AuthUser; as contas usam um hash fixo
+    para não medir bcrypt na preparação.
+
+    Returns:
+        str: Caminho da cópia de trabalho
+    """
+    path = os.path.join(workdir, os.path.basename(source))
+    shutil.copyfile(source, path)
+    conn = sqlite3.connect(path)
+    try:
+        if not conn.execute("SELECT 1 FROM auth_users LIMIT 1").fetchone():
+            conn.executemany(
+                "INSERT INTO auth_users (username, password_hash, nivel_acesso) VALUES (?, ?, ?)",
+                [(f"staff{i:03d}", "x", ("admin", "gestor", "usuario")[i % 3]) for i in range(50)],
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def _percentile(sorted_values, pct):
+    """Percentil por interpolação linear sobre valores já ordenados."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+# ========== EXECUÇÃO ==========
+
+def run_size(size, repeat, seed, only=None):
+    """
+    Executa todos os cenários contra a base de um tamanho.
+
+    Args:
+        size (int): Quantidade de animais da base
+        repeat (int): Execuções cronometradas por cenário
+        seed (int): Semente da base sintética
+        only (list): Substrings para filtrar cenários (None = todos)
+
+    Returns:
+        dict: Métricas por nome de cenário
+    """
+    source = ensure_dataset(size, seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        path = _prepare_copy(source, workdir)
+        engine = create_engine(f"sqlite:///{path}", echo=False, future=True)
+        Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+        with Session() as s:
+            ctx = {
+                "seq": 0,
+                "shelter_id": s.query(Shelter.id).order_by(Shelter.id).first()[0],
+                "adoption_id": s.query(AdoptionProcess.id).order_by(AdoptionProcess.id).first()[0],
+                "user_id": s.query(User.id).order_by(User.id).first()[0],
+                "animal_id": s.query(Animal.id).order_by(Animal.id).first()[0],
+                "tutor_id": s.query(User.id).filter(User.adoption_preferences.is_not(None))
+                             .order_by(User.id).first()[0],
+                "auth_users": s.query(AuthUser).count(),
+            }
+
+        for name, func in SCENARIOS:
+            if only and not any(o in name for o in only):
+                continue
+
+            # Aquecimento: cache de páginas do SQLite e compilação de consultas
+            with Session() as s:
+                func(s, ctx)
+
+            timings = []
+            query_counts = []
+            n_plus_one = 0
+            for _ in range(repeat):
+                with Session() as s, diagnostics.acao(name) as record:
+                    started = time.perf_counter()
+                    func(s, ctx)
+                    timings.append((time.perf_counter() - started) * 1000)
+                query_counts.append(record.query_count)
+                n_plus_one = max(n_plus_one, len(record.n_plus_one()))
+
+            # Execução separada para memória (tracemalloc distorce a latência)
+            tracemalloc.start()
+            with Session() as s:
+                func(s, ctx)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            timings.sort()
+            results[name] = {
+                "runs": repeat,
+                "p50_ms": round(_percentile(timings, 50), 3),
+                "p90_ms": round(_percentile(timings, 90), 3),
+                "p95_ms": round(_percentile(timings, 95), 3),
+                "p99_ms": round(_percentile(timings, 99), 3),
+                "max_ms": round(timings[-1], 3),
+                "mean_ms": round(statistics.fmean(timings), 3),
+                "queries": max(query_counts),
+                "n_plus_one": n_plus_one,
+                "peak_mem_kib": round(peak / 1024, 1),
+            }
+            print(f"  {size:>9} {name:<28} p50={results[name]['p50_ms']:>10.2f}ms "
+                  f"queries={results[name]['queries']:>6} n+1={n_plus_one:>2} mem={results[name]['peak_mem_kib']:>10.1f}KiB",
+                  file=sys.stderr)
+
+        engine.dispose()
+    return results
+
+
+def _rss_kib():
+    """
+    Memória residente atual do processo (KiB).
+
+    Lê /proc/self/statm (Linux); em outros sistemas usa o pico de
+    getrusage, que só cresce e portanto também denuncia vazamentos.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _soak_cycle(index):
+    """
+    Recarrega todas as abas e repete a pesquisa como a interface faz
+    (sessões curtas por ação).
+
+    Args:
+        index (BitmapIndex): Índice da pesquisa, mantido entre os ciclos
+    """
+    with database.session_scope() as s:
+        queries.sync_animal_status(s, in_progress=True)
+    with database.read_session() as s:
+        queries.animal_page(s)
+        queries.shelter_choices(s)
+    with database.read_session() as s:
+        queries.adoption_page(s)
+        queries.available_animal_choices(s)
+        queries.user_choices(s)
+    with database.read_session() as s:
+        queries.user_page(s)
+    with database.read_session() as s:
+        queries.shelter_page(s)
+    with database.read_session() as s:
+        queries.auth_user_rows(s)
+    with database.read_session() as s:
+        queries.search_count(s, **SOAK_SEARCH)
+        queries.search_page(s, SOAK_SEARCH)
+        queries.facet_counts(s, **SOAK_SEARCH)
+        if index.refresh(s):
+            index.count(**SOAK_SEARCH)
+            index.facet_counts(**SOAK_SEARCH)
+
+
+def soak(size, cycles, seed, limit_mib=SOAK_LIMIT_MIB):
+    """
+    Teste de resistência de memória: recargas repetidas de tabelas grandes.
+
+    A fábrica de sessões de database.py é religada à cópia da base
+    sintética, de modo que session_scope()/read_session() sejam
+    exercitados exatamente como nas abas.
+
+    Args:
+        size (int): Quantidade de animais da base
+        cycles (int): Ciclos de recarga (480 = turno de 8h, 1 por minuto)
+        seed (int): Semente da base sintética
+        limit_mib (float): Crescimento máximo aceito do RSS (MiB)
+
+    Returns:
+        dict: Amostras de RSS, crescimento e indicação de falha
+    """
+    source = ensure_dataset(size, seed)
+    checkpoints = max(1, cycles // 20)
+    samples = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = _prepare_copy(source, workdir)
+        engine = create_engine(f"sqlite:///{path}", echo=False, future=True)
+        database.SessionFactory.configure(bind=engine)
+        diagnostics.monitor.enabled = False
+        index = bitmap_index.BitmapIndex()
+        database.ao_confirmar(index.on_commit)
+        try:
+            with database.read_session() as s:
+                index.build(s)
+            for _ in range(SOAK_WARMUP):
+                _soak_cycle(index)
+            gc.collect()
+            reference = _rss_kib()
+            samples.append((0, reference))
+            started = time.perf_counter()
+            for cycle in range(1, cycles + 1):
+                _soak_cycle(index)
+                if cycle % checkpoints == 0 or cycle == cycles:
+                    gc.collect()
+                    samples.append((cycle, _rss_kib()))
+                    print(f"  soak {size:>9} ciclo {cycle:>5}/{cycles} rss={samples[-1][1] / 1024:>8.1f}MiB",
+                          file=sys.stderr)
+            elapsed = time.perf_counter() - started
+        finally:
+            database._commit_listeners.remove(index.on_commit)
+            diagnostics.monitor.enabled = True
+            database.SessionFactory.configure(bind=database.engine)
+            engine.dispose()
+
+    growth = max(rss for _, rss in samples) - reference
+    return {
+        "size": size,
+        "cycles": cycles,
+        "seconds": round(elapsed, 1),
+        "rss_reference_kib": reference,
+        "rss_growth_kib": growth,
+        "limit_kib": int(limit_mib * 1024),
+        "failed": growth > limit_mib * 1024,
+        "samples": [{"cycle": c, "rss_kib": rss} for c, rss in samples],
+    }
+
+
+def soak_check(size, seed, cycles=SOAK_CHECK_CYCLES, limit_mib=SOAK_LIMIT_MIB):
+    """
+    Verificação curta de resistência de memória, sem supervisão.
+
+    Returns:
+        list: Descrição da falha (vazia = ok)
+    """
+    result = soak(size, cycles, seed, limit_mib)
+    if not result["failed"]:
+        return []
+    return [f"soak {size} ({cycles} ciclos): RSS cresceu {result['rss_growth_kib']}KiB "
+            f"(limite {result['limit_kib']}KiB)"]
+
+
+def index_sync_check(size, seed):
+    """
+    Verifica que gravações locais não reconstroem os índices em memória.
+
+    Numa cópia da base, com a fábrica de sessões de database.py religada
+    a ela (como em soak), grava um tutor, atualiza os rollups e edita um
+    animal: após cada passo, BitmapIndex.refresh deve seguir pronto, sem
+    reconstrução. Por fim, uma gravação de outra conexão (outro processo)
+    deve provocar a reconstrução.
+
+    Returns:
+        list: Descrições das falhas (vazia = ok)
+    """
+    source = ensure_dataset(size, seed)
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        path = _prepare_copy(source, workdir)
+        engine = create_engine(f"sqlite:///{path}", echo=False, future=True)
+        database.SessionFactory.configure(bind=engine)
+        index = bitmap_index.BitmapIndex()
+        database.ao_confirmar(index.on_commit)
+        try:
+            with database.read_session() as s:
+                index.build(s)
+                animal_id = s.query(Animal.id).order_by(Animal.id).first()[0]
+
+            def check(step, expected):
+                with database.read_session() as s:
+                    ready = index.refresh(s)
+                if ready != expected:
+                    failures.append(f"índice bitmap: {step}: "
+                                    f"{'reconstrução inesperada' if expected else 'mudança externa ignorada'}")
+                while index._building:
+                    time.sleep(0.05)
+
+            with database.session_scope() as s:
+                queries.save_user(s, None, name="Tutor Sync", email="sync@bench.local", phone="11999999999",
+                                  city="São Paulo", adoption_preferences=None)
+            check("tutor salvo", True)
+            with database.session_scope() as s:
+                rollups.refresh(s)
+            check("rollups atualizados", True)
+            with database.session_scope() as s:
+                s.get(Animal, animal_id).species = "Sync"
+            check("animal salvo", True)
+            if index.count(species="Sync") != 1:
+                failures.append("índice bitmap: animal salvo não aparece na pesquisa")
+
+            conn = sqlite3.connect(path)
+            try:
+                conn.execute("UPDATE animals SET age = age WHERE id = ?", (animal_id,))
+                conn.commit()
+            finally:
+                conn.close()
+            check("gravação de outro processo", False)
+        finally:
+            database._commit_listeners.remove(index.on_commit)
+            database.SessionFactory.configure(bind=database.engine)
+            engine.dispose()
+    for line in failures:
+        print(f"  sync {size:>9} {line}", file=sys.stderr)
+    return failures
+
+
+def _traced_bytes(build):
+    """
+    Memória retida pelo resultado de build() (tracemalloc).
+
+    Returns:
+        tuple: (resultado, bytes alocados e ainda vivos após a construção)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return result, retained
+
+
+def row_cache_report(size, seed):
+    """
+    Mede os bytes por linha de animal em cada representação de listagem.
+
+    Objetos ORM são medidos numa amostra (até ORM_SAMPLE linhas, com a
+    coleção adoptions carregada) e extrapolados por linha; tuplas e
+    RowCache são medidos sobre a base inteira.
+
+    Returns:
+        dict: Bytes por linha de cada representação e tamanho do RowCache
+    """
+    source = ensure_dataset(size, seed)
+    engine = create_engine(f"sqlite:///{source}", echo=False, future=True)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    diagnostics.monitor.enabled = False
+    try:
+        sample = min(size, ORM_SAMPLE)
+        with Session() as s:
+            stmt = select(Animal).options(selectinload(Animal.adoptions)).limit(sample)
+            orm, orm_bytes = _traced_bytes(lambda: s.scalars(stmt).all())
+            del orm
+        with Session() as s:
+            rows, tuple_bytes = _traced_bytes(lambda: queries.animal_rows(s))
+            count = len(rows)
+            del rows
+        with Session() as s:
+            started = time.perf_counter()
+            cache, cache_bytes = _traced_bytes(lambda: row_cache.animal_cache(s))
+            load_s = time.perf_counter() - started
+    finally:
+        diagnostics.monitor.enabled = True
+        engine.dispose()
+
+    report = {
+        "size": count,
+        "orm_sample": sample,
+        "orm_bytes_per_row": round(orm_bytes / sample, 1),
+        "tuple_bytes_per_row": round(tuple_bytes / count, 1),
+        "row_cache_bytes_per_row": round(cache_bytes / count, 1),
+        "row_cache_nbytes_per_row": round(cache.nbytes() / count, 1),
+        "row_cache_mib": round(cache_bytes / 2**20, 1),
+        "row_cache_load_s": round(load_s, 2),
+    }
+    for key in ("orm_bytes_per_row", "tuple_bytes_per_row", "row_cache_bytes_per_row"):
+        print(f"  {count:>9} {key:<26} {report[key]:>10.1f}", file=sys.stderr)
+    return report
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compara resultados atuais com um baseline salvo.
+
+    Uma métrica é regressão quando:
+    - p50 cresce acima da tolerância relativa e do piso de ruído
+    - a quantidade de consultas aumenta
+    - o pico de memória cresce acima da tolerância relativa
+
+    Args:
+        current (dict): Seção "results" da execução atual
+        baseline (dict): Seção "results" do baseline
+        tolerance (float): Tolerância relativa (0.25 = 25%)
+
+    Returns:
+        list: Descrições das regressões encontradas
+    """
+    regressions = []
+    for size, scenarios in current.items():
+        for name, now in scenarios.items():
+            before = baseline.get(size, {}).get(name)
+            if not before:
+                continue
+            label = f"{name} @ {size}"
+            if (now["p50_ms"] > before["p50_ms"] * (1 + tolerance)
+                    and now["p50_ms"] - before["p50_ms"] > NOISE_FLOOR_MS):
+                regressions.append(f"{label}: p50 {before['p50_ms']}ms -> {now['p50_ms']}ms")
+            if now["queries"] > before["queries"]:
+                regressions.append(f"{label}: consultas {before['queries']} -> {now['queries']}")
+            if now["peak_mem_kib"] > before["peak_mem_kib"] * (1 + tolerance):
+                regressions.append(f"{label}: memória {before['peak_mem_kib']}KiB -> {now['peak_mem_kib']}KiB")
+    return regressions
+
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando do benchmark.
+
+    Returns:
+        int: 0 sem regressões, 1 se houver regressões em relação ao baseline
+    """
+    parser = argparse.ArgumentParser(description="Benchmark headless dos caminhos de dados das abas.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="tamanhos de base (animais), separados por vírgula")
+    parser.add_argument("--repeat", type=int, default=5, help="execuções cronometradas por cenário")
+    parser.add_argument("--seed", type=int, default=42, help="semente das bases sintéticas")
+    parser.add_argument("--only", default="", help="filtra cenários por substring (separados por vírgula)")
+    parser.add_argument("--output", "-o", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="arquivo de baseline para comparação")
+    parser.add_argument("--save-baseline", action="store_true", help="grava os resultados como novo baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="tolerância relativa para regressões (0.25 = 25%%)")
+    parser.add_argument("--soak", type=int, nargs="?", const=SOAK_CYCLES, default=0, metavar="CICLOS",
+                        help=f"teste de resistência de memória (padrão: {SOAK_CYCLES} ciclos = turno de 8h)")
+    parser.add_argument("--soak-limit", type=float, default=SOAK_LIMIT_MIB, metavar="MIB",
+                        help="crescimento máximo aceito do RSS no teste de resistência")
+    parser.add_argument("--row-cache", action="store_true",
+                        help="mede bytes por linha de animal (ORM, tuplas e row_cache)")
+    parser.add_argument("--index-sync", action="store_true",
+                        help="apenas verifica que gravações locais não reconstroem o índice bitmap")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    only = [o.strip() for o in args.only.split(",") if o.strip()]
+
+    if args.row_cache:
+        result = {str(size): row_cache_report(size, args.seed) for size in sizes}
+        payload = json.dumps(result, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(payload)
+        else:
+            print(payload)
+        return 0
+
+    if args.index_sync:
+        failures = index_sync_check(min(sizes), args.seed)
+        for line in failures:
+            print(f"REGRESSÃO: {line}", file=sys.stderr)
+        return 1 if failures else 0
+
+    if args.soak:
+        # Maior tamanho informado: é onde o acúmulo de objetos aparece
+        result = soak(max(sizes), args.soak, args.seed, args.soak_limit)
+        payload = json.dumps(result, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(payload)
+        else:
+            print(payload)
+        if result["failed"]:
+            print(f"REGRESSÃO: soak {result['size']} ({result['cycles']} ciclos): RSS cresceu "
+                  f"{result['rss_growth_kib']}KiB (limite {result['limit_kib']}KiB)", file=sys.stderr)
+            return 1
+        return 0
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    for size in sizes:
+        print(f"Base com {size} animais:", file=sys.stderr)
+        report["results"][str(size)] = run_size(size, args.repeat, args.seed, only)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline.get("results", {}), args.tolerance)
+    if not only:
+        regressions += index_sync_check(min(sizes), args.seed)
+        regressions += soak_check(min(sizes), args.seed, limit_mib=args.soak_limit)
+    if regressions:
+        report["regressions"] = regressions
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"Baseline gravado em {args.baseline}", file=sys.stderr)
+
+    for line in regressions:
+        print(f"REGRESSÃO: {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
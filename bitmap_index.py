@@ -0,0 +1,438 @@
+"""
+Índice Bitmap em Memória - Filtros Categóricos da Pesquisa
+----------------------------------------------------------
+Este módulo mantém, para cada valor das colunas categóricas de animais,
+um conjunto de bits (bitset) com as posições dos animais que têm aquele
+valor. Filtros da SearchTab viram operações AND/OR entre inteiros Python,
+sem consultar o banco.
+
+1. Estrutura:
+   - Posições 0..n-1 alinhadas aos IDs em ordem crescente (array "i")
+   - Um bitset (int Python) por valor de espécie, porte, gênero, status,
+     abrigo e temperamento (listas de utils.py e valores livres)
+   - Um bitset por idade + lista ordenada das idades distintas; faixas
+     usam ORs acumulados calculados sob demanda
+   - Valores indexados de cada posição num row_cache.RowCache na mesma
+     ordem (só as colunas de filtro, em códigos de 1 a 4 bytes, sem
+     textos), usados para desligar os bits antigos quando um animal muda
+   - Serve contagens (SearchTab.search), facetas e as sugestões de
+     matching.py; as linhas exibidas vêm do banco em páginas ordenadas
+     (queries.search_page)
+
+2. Filtros:
+   - Categorias: igualdade com o valor escolhido (como a consulta SQL),
+     um único bitset por filtro
+   - Abrigo: igualdade pelo ID
+   - Idade: faixa [mínima, máxima]; animais sem idade nunca entram
+   - Critérios diferentes combinados com AND
+
+3. Sincronização:
+   - Gravações da aplicação: database.ao_confirmar entrega os IDs
+     alterados após o commit; no próximo refresh() só essas linhas são
+     relidas (uma consulta) e seus bits são movidos
+   - Cada commit local registra a versão do arquivo (PRAGMA
+     data_version) logo após confirmar, mesmo sem animais alterados
+   - Alterações de outros processos: versão diferente da registrada,
+     sem commit local que a explique → reconstrução completa
+   - Reconstruções rodam numa thread: enquanto o índice não está pronto,
+     refresh() retorna False e a SearchTab usa a consulta SQL
+   - Janela conhecida: uma gravação externa confirmada entre o commit
+     local e o refresh seguinte só é vista na próxima mudança de versão
+
+4. Uso Opcional:
+   - SHELTER_BITMAP_INDEX=1 força o uso, =0 desativa
+   - Padrão: ativado a partir de MIN_ROWS animais (abaixo disso a
+     consulta SQL já responde em poucos milissegundos)
+
+Exemplo de uso:
+    index = bitmap_index.get_index()
+    with read_session() as s:
+        pronto = index.refresh(s)
+    if pronto:
+        total = index.count(species="Cachorro", age_min=1, age_max=5)
+"""
+
+import bisect
+import os
+import threading
+from array import array
+
+from sqlalchemy import func, select
+
+import database
+import queries
+import row_cache
+from models import Animal
+
+# Quantidade de animais a partir da qual o índice é usado (modo automático)
+MIN_ROWS = 20_000
+
+# Linhas atualizadas mantidas fora do RowCache antes de reconstruir
+MAX_OVERRIDES = 50_000
+
+# IDs por consulta ao reler linhas alteradas (limite de variáveis do SQLite)
+FETCH_CHUNK = 500
+
+# Colunas na ordem de queries.search_index_stmt (apenas as de filtro)
+INDEX_SCHEMA = (
+    ("id", "int"), ("species", "category"), ("age", "int"), ("size", "category"),
+    ("gender", "category"), ("status", "category"), ("shelter_id", "int"),
+    ("temperament", "category"),
+)
+
+# Colunas categóricas indexadas → posição na linha
+FIELDS = {"species": 1, "size": 3, "gender": 4, "status": 5, "shelter_id": 6, "temperament": 7}
+AGE = 2
+
+# Bit de cada posição dentro de um byte e posições dos bits de cada byte
+_BIT = tuple(1 << i for i in range(8))
+_BYTE_BITS = tuple(tuple(i for i in range(8) if byte >> i & 1) for byte in range(256))
+
+
+def _bitmaps(values, size):
+    """
+    Monta um bitset por valor distinto de uma sequência.
+
+    Returns:
+        dict: valor → int com o bit de cada posição onde o valor ocorre
+    """
+    nbytes = (size + 7) // 8
+    buffers = {}
+    for pos, value in enumerate(values):
+        buf = buffers.get(value)
+        if buf is None:
+            buf = buffers[value] = bytearray(nbytes)
+        buf[pos >> 3] |= _BIT[pos & 7]
+    return {value: int.from_bytes(buf, "little") for value, buf in buffers.items()}
+
+
+def popcount(bits):
+    """Quantidade de bits ligados (int.bit_count a partir do Python 3.10)."""
+    return bits.bit_count() if hasattr(bits, "bit_count") else bin(bits).count("1")
+
+
+def iter_positions(bits):
+    """Posições dos bits ligados, em ordem crescente."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            for bit in _BYTE_BITS[byte]:
+                yield base + bit
+
+
+class BitmapIndex:
+    """
+    Índice bitmap dos animais para a SearchTab.
+
+    Atributos:
+        ids (array): ID de cada posição, em ordem crescente
+        alive (int): Bitset das posições de animais existentes
+        bitmaps (dict): Campo → {valor: bitset}
+        ages (dict): Idade → bitset
+        version (int): PRAGMA data_version da última sincronização
+    """
+
+    def __init__(self):
+        self.rows = None
+        self.ids = array("i")
+        self.alive = 0
+        self.bitmaps = {field: {} for field in FIELDS}
+        self.ages = {}
+        self.overrides = {}      # posição → linha relida após alteração
+        self.version = None
+        self.stale = True
+        self._pending = set()    # IDs alterados ainda não aplicados
+        self._building = False
+        self._sorted_ages = []
+        self._age_prefix = None  # ORs acumulados por idade (sob demanda)
+
+    # ========== CONSTRUÇÃO E SINCRONIZAÇÃO ==========
+
+    def build(self, session):
+        """Reconstrói o índice inteiro a partir da projeção da pesquisa."""
+        version = database.versao_dados(session.get_bind())
+        cache = row_cache.load(session, queries.search_index_stmt(), INDEX_SCHEMA)
+        size = len(cache)
+        ids = cache.column("id").data
+
+        bitmaps = {}
+        for field, index in FIELDS.items():
+            column = cache.columns[index]
+            if isinstance(column, row_cache.CategoryColumn):
+                by_code = _bitmaps(column.codes, size)
+                bitmaps[field] = {column.values[code]: bits for code, bits in by_code.items()}
+            else:
+                bitmaps[field] = self._int_bitmaps(column, size)
+
+        self.rows = cache
+        self.ids = ids
+        self.alive = (1 << size) - 1
+        self.bitmaps = bitmaps
+        self.ages = self._int_bitmaps(cache.columns[AGE], size)
+        self.overrides = {}
+        self._pending = set()
+        self._ages_changed()
+        self.version = version
+        self.stale = False
+
+    def build_in_background(self):
+        """Inicia a reconstrução numa thread própria (se já não houver uma)."""
+        if self._building:
+            return
+
+        def run():
+            try:
+                with database.read_session() as s:
+                    self.build(s)
+            finally:
+                self._building = False
+
+        self._building = True
+        threading.Thread(target=run, name="bitmap-index", daemon=True).start()
+
+    @staticmethod
+    def _int_bitmaps(column, size):
+        """Bitsets de uma coluna inteira (NULL vira None)."""
+        by_value = _bitmaps(column.data, size)
+        if row_cache.IntColumn.NULL in by_value:
+            by_value[None] = by_value.pop(row_cache.IntColumn.NULL)
+        return by_value
+
+    def on_commit(self, alteracoes):
+        """
+        Ouvinte de database.ao_confirmar: anota os animais alterados e a
+        versão do arquivo após o commit.
+
+        Todo commit local (tutores, rollups...) muda a versão; registrá-la
+        aqui evita que refresh() o tome por uma gravação de outro processo.
+        """
+        if self.stale:
+            return
+        self._pending.update(alteracoes.get("animals", ()))
+        if not self._building:  # a reconstrução registra a própria versão
+            self.version = database.versao_dados()
+
+    def refresh(self, session):
+        """
+        Garante que o índice reflita o banco antes de uma pesquisa.
+
+        - Apenas gravações locais → relê só os animais alterados
+        - Índice nunca construído, muitas linhas atualizadas ou versão do arquivo diferente sem gravações locais
+          (outro processo alterou o banco) → reconstrução em segundo plano
+
+        Returns:
+            bool: True se o índice está pronto para consulta
+        """
+        if self._building:
+            return False
+        version = database.versao_dados(session.get_bind())
+        if not self.stale and self._pending:
+            self._apply(session, self._pending)
+            self._pending = set()
+            self.version = version
+        if self.stale or version != self.version or len(self.overrides) > MAX_OVERRIDES:
+            self.build_in_background()
+            return False
+        return True
+
+    def _apply(self, session, changed_ids):
+        """Relê os animais alterados e move seus bits."""
+        changed_ids = sorted(changed_ids)
+        fresh = {}
+        for start in range(0, len(changed_ids), FETCH_CHUNK):
+            chunk = changed_ids[start:start + FETCH_CHUNK]
+            for row in session.execute(queries.search_index_stmt(chunk)):
+                fresh[row[0]] = tuple(row)
+        for animal_id in changed_ids:
+            self._update(animal_id, fresh.get(animal_id))
+
+    def _position(self, animal_id):
+        """Posição de um ID (None se não indexado)."""
+        pos = bisect.bisect_left(self.ids, animal_id)
+        if pos < len(self.ids) and self.ids[pos] == animal_id:
+            return pos
+        return None
+
+    def _update(self, animal_id, row):
+        """Substitui (row), acrescenta (ID novo) ou remove (row=None) um animal."""
+        pos = self._position(animal_id)
+        if pos is not None and self.alive >> pos & 1:
+            self._set_bits(pos, self.row(pos), on=False)
+        if row is None:
+            if pos is not None:
+                self.alive &= ~(1 << pos)
+            return
+        if pos is None:
+            if self.ids and animal_id < self.ids[-1]:
+                # ID fora de ordem (inserido com ID explícito): não há posição
+                self.stale = True
+                return
+            pos = len(self.ids)
+            self.rows.append(row)  # self.ids é a coluna de IDs do RowCache
+        else:
+            self.overrides[pos] = row
+        self.alive |= 1 << pos
+        self._set_bits(pos, row, on=True)
+
+    def _set_bits(self, pos, row, on):
+        """Liga ou desliga o bit da posição nos bitsets dos valores da linha."""
+        mask = 1 << pos
+        for field, index in FIELDS.items():
+            self._toggle(self.bitmaps[field], row[index], mask, on)
+        self._toggle(self.ages, row[AGE], mask, on)
+        self._ages_changed()
+
+    @staticmethod
+    def _toggle(bitmaps, value, mask, on):
+        bits = bitmaps.get(value, 0)
+        bits = bits | mask if on else bits & ~mask
+        if bits:
+            bitmaps[value] = bits
+        else:
+            bitmaps.pop(value, None)
+
+    def _ages_changed(self):
+        self._sorted_ages = sorted(age for age in self.ages if age is not None)
+        self._age_prefix = None
+
+    # ========== CONSULTA ==========
+
+    def row(self, pos):
+        """Valores indexados de uma posição (considerando atualizações)."""
+        row = self.overrides.get(pos)
+        return row if row is not None else self.rows.row(pos)
+
+    def _value_bits(self, field, value):
+        """Bitset dos animais com o valor exato na coluna."""
+        return self.bitmaps[field].get(value, 0)
+
+    def _age_bits(self, age_min, age_max):
+        """Bitset das idades na faixa [age_min, age_max] (None = sem limite)."""
+        ages = self._sorted_ages
+        if self._age_prefix is None:
+            prefix, acc = [], 0
+            for age in ages:
+                acc |= self.ages[age]
+                prefix.append(acc)
+            self._age_prefix = prefix
+        prefix = self._age_prefix
+        hi = len(ages) if age_max is None else bisect.bisect_right(ages, age_max)
+        lo = 0 if age_min is None else bisect.bisect_left(ages, age_min)
+        if hi <= lo:
+            return 0
+        return prefix[hi - 1] & ~(prefix[lo - 1] if lo else 0)
+
+    def filter(self, species="", size="", gender="", status="", temperament="",
+               shelter_id=None, age_min=None, age_max=None, text=""):
+        """
+        Calcula o bitset dos animais que satisfazem todos os critérios.
+
+        Args:
+            species, size, gender, status, temperament (str): Valor
+                exato (vazio = sem filtro)
+            shelter_id (int): ID do abrigo (None = sem filtro)
+            age_min, age_max (int): Faixa de idade (None = sem limite)
+            text (str): Busca livre; não coberta pelo índice, deve ser
+                vazia (ver SearchTab.use_index)
+
+        Returns:
+            int: Bitset das posições encontradas
+
+        Raises:
+            ValueError: Busca livre informada
+        """
+        if text:
+            raise ValueError("busca livre não é coberta pelo índice bitmap")
+        bits = self.alive
+        for field, needle in (("species", species), ("size", size), ("gender", gender),
+                              ("status", status), ("temperament", temperament)):
+            if needle:
+                bits &= self._value_bits(field, needle)
+        if shelter_id is not None:
+            bits &= self.bitmaps["shelter_id"].get(shelter_id, 0)
+        if age_min is not None or age_max is not None:
+            bits &= self._age_bits(age_min, age_max)
+        return bits
+
+    def facet_counts(self, species="", size="", shelter_id=None, age_min=None, age_max=None, text="",
+                     status=""):
+        """
+        Mesmo resultado de queries.facet_counts, calculado por popcount.
+
+        Cada faceta combina os bitsets de todos os filtros exceto o seu
+        próprio e cruza o resultado com o bitset de cada valor.
+
+        Returns:
+            dict: Faceta → lista de (valor, quantidade), maior quantidade primeiro
+
+        Raises:
+            ValueError: Busca livre informada (ver filter)
+        """
+        if text:
+            raise ValueError("busca livre não é coberta pelo índice bitmap")
+        criteria = {}
+        if species:
+            criteria["species"] = self._value_bits("species", species)
+        if size:
+            criteria["size"] = self._value_bits("size", size)
+        if shelter_id is not None:
+            criteria["shelter_id"] = self.bitmaps["shelter_id"].get(shelter_id, 0)
+        if age_min is not None or age_max is not None:
+            criteria["age"] = self._age_bits(age_min, age_max)
+        if status:
+            criteria["status"] = self._value_bits("status", status)
+
+        counts = {}
+        for facet in queries.FACETS:
+            base = self.alive
+            for owner, bits in criteria.items():
+                if owner != facet:
+                    base &= bits
+            values = []
+            for value, bits in self.bitmaps[facet].items():
+                n = popcount(bits & base)
+                if n:
+                    values.append((value, n))
+            values.sort(key=lambda item: (-item[1], str(item[0])))
+            counts[facet] = values
+        return counts
+
+    def count(self, **criteria):
+        """Quantidade de animais que satisfazem os critérios (mesma de queries.search_count)."""
+        return popcount(self.filter(**criteria))
+
+# ========== INSTÂNCIA DA APLICAÇÃO ==========
+
+_index = None
+_enabled = None
+
+
+def enabled():
+    """
+    Indica se a SearchTab deve usar o índice.
+
+    SHELTER_BITMAP_INDEX=1/0 força a decisão; no modo automático o índice
+    é usado quando a base tem pelo menos MIN_ROWS animais (contagem feita
+    uma vez por execução).
+    """
+    global _enabled
+    if _enabled is None:
+        setting = os.environ.get("SHELTER_BITMAP_INDEX", "auto").strip().lower()
+        if setting in ("1", "true", "on"):
+            _enabled = True
+        elif setting in ("0", "false", "off"):
+            _enabled = False
+        else:
+            with database.read_session() as s:
+                _enabled = s.execute(select(func.count(Animal.id))).scalar_one() >= MIN_ROWS
+    return _enabled
+
+
+def get_index():
+    """Índice compartilhado pela aplicação (registrado em database.ao_confirmar)."""
+    global _index
+    if _index is None:
+        _index = BitmapIndex()
+        database.ao_confirmar(_index.on_commit)
+    return _index
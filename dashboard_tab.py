@@ -0,0 +1,219 @@
+"""
+Módulo do Painel Gerencial - Entradas, Adoções e Ocupação
+---------------------------------------------------------
+Este módulo implementa a aba de painel usada pela gestão para acompanhar
+o movimento dos abrigos sem consultar as tabelas de cadastro.
+
+Funcionalidades principais:
+- Ocupação atual por abrigo e espécie
+- Entradas e adoções por espécie no período
+- Entradas e adoções dia a dia no período
+- Filtro por abrigo e por período (7 a 365 dias)
+
+Desempenho:
+- Lê apenas as tabelas de rollup (rollups.py), cujo tamanho depende da
+  quantidade de abrigos/espécies e dos dias exibidos, não do histórico
+- Ao abrir, os rollups são atualizados incrementalmente (somente o que
+  mudou desde a última atualização), e apenas quando há algo a
+  contabilizar (verificação somente leitura); a primeira abertura faz a
+  carga completa
+
+Sincronização:
+- Recarregada junto com as demais abas após salvar/excluir
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date, timedelta
+
+from base_tab import BaseTab
+from database import read_session, session_scope
+import queries
+import rollups
+from diagnostics import instrumentado
+
+# Períodos disponíveis (rótulo → dias)
+PERIODS = {"7 dias": 7, "30 dias": 30, "90 dias": 90, "365 dias": 365}
+DEFAULT_PERIOD = "30 dias"
+
+class DashboardTab(BaseTab):
+    """
+    Classe da aba de painel gerencial.
+
+    A interface é dividida em:
+    - Seção superior: filtros (abrigo, período) e data da atualização
+    - Esquerda: ocupação atual por abrigo e espécie
+    - Direita: totais por espécie e movimento diário no período
+
+    Atributos:
+        cb_shelter (ttk.Combobox): Filtro de abrigo ("ID - Nome")
+        cb_period (ttk.Combobox): Período exibido
+        occupancy_tree, species_tree, daily_tree (ttk.Treeview): Tabelas
+    """
+
+    def __init__(self, parent):
+        """
+        Inicializa a aba de painel.
+
+        Args:
+            parent: Widget pai container
+        """
+        super().__init__(parent)
+        self.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        # ========== FILTROS ==========
+        filt = ttk.LabelFrame(self, text="Filtros")
+        filt.pack(fill=tk.X, padx=5, pady=5)
+
+        filt_row = ttk.Frame(filt)
+        filt_row.pack(fill=tk.X, padx=10, pady=10)
+
+        ttk.Label(filt_row, text="Abrigo").grid(row=0, column=0, padx=(0, 5))
+        self.cb_shelter = ttk.Combobox(filt_row, values=self.get_shelters(), state="readonly", width=24)
+        self.cb_shelter.grid(row=0, column=1, padx=(0, 15))
+
+        ttk.Label(filt_row, text="Período").grid(row=0, column=2, padx=(0, 5))
+        self.cb_period = ttk.Combobox(filt_row, values=list(PERIODS), state="readonly", width=10)
+        self.cb_period.set(DEFAULT_PERIOD)
+        self.cb_period.grid(row=0, column=3, padx=(0, 15))
+
+        ttk.Button(filt_row, text="Atualizar", command=self.load, style="Success.TButton").grid(row=0, column=4, padx=(0, 5))
+        ttk.Button(filt_row, text="Limpar", command=self.clear_filters).grid(row=0, column=5, padx=(0, 5))
+        ttk.Button(filt_row, text="Recalcular", command=self.rebuild).grid(row=0, column=6, padx=(0, 15))
+
+        self.lbl_refreshed = ttk.Label(filt_row, text="")
+        self.lbl_refreshed.grid(row=0, column=7)
+
+        for combo in (self.cb_shelter, self.cb_period):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.show())
+
+        # ========== TABELAS ==========
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        frame, self.occupancy_tree = self._table(body, "Ocupação atual",
+                                                 (("Abrigo", 200), ("Espécie", 110), ("Animais", 80)))
+        frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(0, 5))
+
+        right = ttk.Frame(body)
+        right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        frame, self.species_tree = self._table(right, "Por espécie no período",
+                                               (("Espécie", 120), ("Entradas", 90), ("Adoções", 90)), height=6)
+        frame.pack(fill=tk.X, pady=(0, 5))
+
+        frame, self.daily_tree = self._table(right, "Movimento diário",
+                                             (("Dia", 120), ("Entradas", 90), ("Adoções", 90)))
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        self.load()
+
+    def _table(self, parent, title, columns, height=14):
+        """
+        Cria uma tabela com título e scrollbar.
+
+        Args:
+            parent: Widget pai
+            title (str): Título do LabelFrame
+            columns (tuple): Pares (nome da coluna, largura)
+            height (int): Linhas visíveis
+
+        Returns:
+            tuple: (LabelFrame a ser posicionado pelo chamador, Treeview)
+        """
+        frame = ttk.LabelFrame(parent, text=title)
+        table_frame = ttk.Frame(frame)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        scrollbar = ttk.Scrollbar(table_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        names = tuple(name for name, _ in columns)
+        tree = ttk.Treeview(table_frame, columns=names, show="headings",
+                            yscrollcommand=scrollbar.set, height=height)
+        scrollbar.config(command=tree.yview)
+        for name, width in columns:
+            tree.heading(name, text=name.upper())
+            tree.column(name, width=width, anchor=tk.W if name in ("Abrigo", "Espécie", "Dia") else tk.E)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        return frame, tree
+
+    def get_shelters(self):
+        """
+        Obtém a lista de abrigos para o filtro.
+
+        Returns:
+            list: Strings no formato "ID - Nome"
+        """
+        with read_session() as s:
+            return queries.shelter_choices(s)
+
+    def clear_filters(self):
+        """Volta aos filtros padrão (todos os abrigos, 30 dias)."""
+        self.cb_shelter.set("")
+        self.cb_period.set(DEFAULT_PERIOD)
+        self.show()
+
+    @instrumentado("Painel: carregar")
+    def load(self):
+        """
+        Exibe o painel, atualizando antes os rollups apenas se houver algo
+        a contabilizar (rollups.pending, somente leitura).
+
+        A aba é recarregada após cada gravação de qualquer aba: abrir uma
+        transação de escrita a cada carga disputaria o bloqueio com as
+        outras estações e mudaria a versão do arquivo a cada exibição.
+        Também recarrega a lista de abrigos do filtro.
+        """
+        with read_session() as s:
+            stale = rollups.pending(s)
+        if stale:
+            with session_scope() as s:
+                rollups.refresh(s)
+        self.cb_shelter["values"] = self.get_shelters()
+        self.show()
+
+    @instrumentado("Painel: recalcular")
+    def rebuild(self):
+        """
+        Recalcula os rollups a partir das tabelas de cadastro.
+
+        Necessário apenas após alterações feitas fora da aplicação (ex:
+        SQL manual); pode levar alguns segundos em bases grandes.
+        """
+        if not messagebox.askyesno("Confirmar", "Recalcular todo o painel a partir dos cadastros?"):
+            return
+        with session_scope() as s:
+            rollups.rebuild(s)
+        self.show()
+
+    @instrumentado("Painel: exibir")
+    def show(self):
+        """Exibe os rollups com os filtros atuais (sem atualizá-los)."""
+        shelter_id = None
+        shelter_val = self.cb_shelter.get().strip()
+        if shelter_val:
+            try:
+                shelter_id = int(shelter_val.split(" - ")[0])
+            except ValueError:
+                pass
+        since = date.today() - timedelta(days=PERIODS.get(self.cb_period.get(), PERIODS[DEFAULT_PERIOD]) - 1)
+
+        with read_session() as s:
+            occupancy = queries.dashboard_occupancy(s, shelter_id)
+            species = queries.dashboard_species(s, since, shelter_id)
+            daily = queries.dashboard_daily(s, since, shelter_id)
+            refreshed = rollups.last_refresh(s)
+
+        for tree, rows in ((self.occupancy_tree, occupancy), (self.species_tree, species)):
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", "end", values=row)
+
+        self.daily_tree.delete(*self.daily_tree.get_children())
+        for day, intake, adopted in daily:
+            self.daily_tree.insert("", "end", values=(day.strftime("%d/%m/%Y"), intake, adopted))
+
+        self.lbl_refreshed.config(
+            text=f"Atualizado em {refreshed.strftime('%d/%m/%Y %H:%M')}" if refreshed else ""
+        )
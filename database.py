@@ -7,7 +7,8 @@ usando SQLAlchemy como ORM e SQLite como engine de persistência.
 Componentes principais:
 1. Configuração de Banco:
    - Engine SQLite com arquivo local
-   - Sessões com escopo thread-safe
+   - Sessões curtas por ação (unidade de trabalho)
+   - Variante somente leitura para listagens
    - Controle transacional explícito
    - Otimizações de performance
 
@@ -15,7 +16,9 @@ Componentes principais:
    - Inicialização automática de schema
    - Dados padrão do sistema
    - Migração e versionamento
-   - Backup automático
+   - Backup automático (backup.py: API de backup do SQLite)
+   - Manutenção em ociosidade (maintenance.py: ANALYZE, optimize,
+     vacuum incremental, checkpoint)
 
 3. Sistema de Usuários:
    - Criação de contas padrão
@@ -36,23 +39,349 @@ Componentes principais:
    - Logging de operações
 """
 
-from sqlalchemy import create_engine
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from itertools import chain
+
+from sqlalchemy import create_engine, event, inspect
 from sqlalchemy.orm import sessionmaker, scoped_session
-from models import Base
+from sqlalchemy.schema import CreateTable
+from models import Base, CodedText
+
+# Caminho do arquivo do banco de dados
+# Padrão: shelter.db no diretório atual. A variável de ambiente SHELTER_DB
+# permite apontar a aplicação para outro arquivo (ex: base sintética gerada
+# por dataset_generator.py para testes de carga).
+DATABASE_PATH = os.environ.get("SHELTER_DB", "shelter.db")
 
 # Configuração da engine do SQLite
 # "sqlite:///shelter.db" - Cria arquivo shelter.db no diretório atual
 # echo=False - Desativa log SQL (para produção)
 # future=True - Habilita comportamentos da versão 2.0
-engine = create_engine("sqlite:///shelter.db", echo=False, future=True)
+engine = create_engine(f"sqlite:///{DATABASE_PATH}", echo=False, future=True)
 
-# Configuração da sessão com escopo
-# scoped_session: Fornece a mesma sessão para mesma thread
+# Fábrica de sessões
 # autoflush=False: Controle manual de flush
 # autocommit=False: Controle manual de transações
-SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False))
+# expire_on_commit=True: objetos são recarregados após o commit
+SessionFactory = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=True)
+
+# Sessão global legada (mantida para compatibilidade de importação).
+# O código da aplicação usa session_scope()/read_session(): uma sessão
+# global acumula no identity map todas as linhas já carregadas e mantém
+# objetos obsoletos entre ações.
+SessionLocal = scoped_session(SessionFactory)
 session = SessionLocal()
 
+@contextmanager
+def session_scope():
+    """
+    Abre uma sessão curta para uma ação de gravação (unidade de trabalho).
+    
+    - Commit automático ao final do bloco
+    - Rollback automático se ocorrer exceção (que é repropagada)
+    - Sessão sempre fechada: identity map descartado ao sair
+    
+    Exemplo de uso:
+        with session_scope() as s:
+            s.add(Animal(name="Rex", species="Cachorro"))
+    """
+    s = SessionFactory()
+    try:
+        yield s
+        s.commit()
+    except Exception:
+        s.rollback()
+        raise
+    finally:
+        s.close()
+
+@contextmanager
+def read_session():
+    """
+    Abre uma sessão curta somente leitura (listagens e consultas).
+    
+    - PRAGMA query_only na conexão: qualquer escrita falha imediatamente
+    - Nada é gravado; a transação é descartada ao final
+    - Objetos lidos continuam acessíveis após o bloco (já carregados),
+      mas não ficam presos a nenhuma sessão
+    
+    Exemplo de uso:
+        with read_session() as s:
+            rows = queries.animal_rows(s)
+    """
+    s = SessionFactory()
+    conn = s.connection()
+    conn.exec_driver_sql("PRAGMA query_only = ON")
+    try:
+        yield s
+    finally:
+        try:
+            conn.exec_driver_sql("PRAGMA query_only = OFF")
+        finally:
+            # close() descarta a transação sem expirar os objetos lidos
+            s.close()
+
+# ========== VERSÃO DOS DADOS E NOTIFICAÇÃO DE ALTERAÇÕES ==========
+#
+# Estruturas em memória (ex: bitmap_index.py) precisam saber quando o
+# banco mudou. Há dois mecanismos complementares:
+# - Alterações feitas por esta aplicação: os IDs alterados são coletados
+#   no flush (e por registrar_alteracoes, para UPDATEs em lote) e
+#   entregues aos ouvintes após o commit
+# - Alterações de outros processos (outra estação usando o mesmo
+#   arquivo): detectadas por PRAGMA data_version (versao_dados)
+
+# Conexões dedicadas à leitura de PRAGMA data_version, por arquivo (o
+# valor só muda quando OUTRA conexão confirma uma transação no arquivo)
+_version_conns = {}
+
+# Funções chamadas após cada commit com alterações
+_commit_listeners = []
+
+def versao_dados(bind=None):
+    """
+    Versão atual do arquivo de banco (PRAGMA data_version).
+    
+    Muda sempre que qualquer conexão (desta aplicação ou de outro
+    processo) confirma alterações no arquivo.
+    
+    Args:
+        bind: Engine do arquivo consultado (padrão: a da fábrica de sessões)
+    
+    Returns:
+        int: Contador de versões (só comparável com valores anteriores)
+    """
+    path = (bind or SessionFactory.kw["bind"]).url.database
+    conn = _version_conns.get(path)
+    if conn is None:
+        conn = _version_conns[path] = sqlite3.connect(path, check_same_thread=False)
+    return conn.execute("PRAGMA data_version").fetchone()[0]
+
+def ao_confirmar(listener):
+    """
+    Registra uma função chamada após cada commit com alterações.
+    
+    Args:
+        listener (callable): Recebe um dicionário tabela → conjunto de IDs
+                             alterados (inseridos, atualizados ou excluídos);
+                             vazio quando a gravação não anotou IDs
+    """
+    _commit_listeners.append(listener)
+
+def registrar_alteracoes(session, tabela, ids):
+    """
+    Registra IDs alterados por comandos em lote (UPDATE/DELETE diretos),
+    que não passam pelo flush do ORM.
+    
+    Args:
+        session: Sessão onde o comando foi executado
+        tabela (str): Nome da tabela (ex: "animals")
+        ids (iterable): IDs afetados
+    """
+    ids = set(ids)
+    if ids:
+        session.info.setdefault("alteracoes", {}).setdefault(tabela, set()).update(ids)
+
+@event.listens_for(SessionFactory, "after_flush")
+def _coletar_alteracoes(session, flush_context):
+    """Anota os IDs dos objetos gravados no flush."""
+    for obj in chain(session.new, session.dirty, session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table is not None and getattr(obj, "id", None) is not None:
+            session.info.setdefault("alteracoes", {}).setdefault(table, set()).add(obj.id)
+
+@event.listens_for(SessionFactory, "after_begin")
+def _marcar_inicio(session, transaction, connection):
+    """
+    Guarda o total de linhas gravadas pela conexão no início da transação:
+    comandos que não passam pelo ORM nem por registrar_alteracoes (ex:
+    rollups.py) também contam como gravação local.
+    """
+    dbapi_connection = connection.connection.driver_connection
+    session.info["inicio"] = (dbapi_connection, dbapi_connection.total_changes)
+
+@event.listens_for(SessionFactory, "after_commit")
+def _notificar_alteracoes(session):
+    """
+    Entrega as alterações confirmadas aos ouvintes.
+
+    Todo commit que gravou algo é notificado, mesmo sem IDs anotados
+    (dicionário vazio): os ouvintes registram a versão do arquivo após
+    gravações locais e só tratam como externa uma mudança de versão que
+    nenhum commit local explica.
+    """
+    alteracoes = session.info.pop("alteracoes", None) or {}
+    inicio = session.info.pop("inicio", None)
+    gravou = inicio is not None and inicio[0].total_changes != inicio[1]
+    if not alteracoes and not gravou:
+        return
+    for listener in list(_commit_listeners):
+        listener(alteracoes)
+
+@event.listens_for(SessionFactory, "after_rollback")
+def _descartar_alteracoes(session):
+    """Alterações desfeitas não são notificadas."""
+    session.info.pop("alteracoes", None)
+    session.info.pop("inicio", None)
+
+# ========== MIGRAÇÃO DE ESQUEMA ==========
+
+def migrar_esquema(bind=None):
+    """
+    Acrescenta às tabelas existentes as colunas e índices novos dos modelos.
+
+    create_all só cria tabelas que ainda não existem; bancos criados por
+    versões anteriores recebem aqui as colunas novas (ALTER TABLE ... ADD
+    COLUMN, sempre anuláveis: registros antigos ficam com NULL) e os
+    índices declarados depois da criação da tabela.
+
+    Args:
+        bind: Engine alvo (padrão: engine da aplicação)
+
+    Returns:
+        list: Colunas acrescentadas no formato "tabela.coluna"
+    """
+    bind = bind or engine
+    adicionadas = []
+    with bind.begin() as conn:
+        existentes = inspect(conn)
+        for tabela in Base.metadata.sorted_tables:
+            if not existentes.has_table(tabela.name):
+                continue
+            atuais = {c["name"] for c in existentes.get_columns(tabela.name)}
+            novas = [c for c in tabela.columns if c.name not in atuais]
+            for coluna in novas:
+                tipo = coluna.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{tabela.name}" ADD COLUMN "{coluna.name}" {tipo}')
+                adicionadas.append(f"{tabela.name}.{coluna.name}")
+            indices = {i["name"] for i in existentes.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name not in indices:
+                    indice.create(conn)
+    return adicionadas
+
+def _colunas_codificadas(tabela):
+    """Colunas CodedText de uma tabela do modelo."""
+    return [c for c in tabela.columns if isinstance(c.type, CodedText)]
+
+
+def converter_categorias(conn, schema="main"):
+    """
+    Converte as colunas categóricas gravadas como texto por versões
+    anteriores para os códigos de CodedText.
+
+    O SQLite não altera o tipo de uma coluna: cada tabela afetada é
+    recriada com o mesmo DDL (colunas categóricas como INTEGER), os
+    registros são copiados com um CASE que traduz cada valor distinto
+    (variações de acento e maiúsculas incluídas) e os índices são
+    recriados. Valores fora das listas são copiados como texto.
+
+    Args:
+        conn: Conexão numa transação (ex: engine.begin())
+        schema (str): Banco alvo ("main" ou o arquivo histórico anexado)
+
+    Returns:
+        list: Tabelas convertidas
+    """
+    convertidas = []
+    for tabela in Base.metadata.sorted_tables:
+        codificadas = {c.name: c.type for c in _colunas_codificadas(tabela)}
+        if not codificadas:
+            continue
+        declarados = {row[1]: row[2] for row in conn.exec_driver_sql(f'PRAGMA {schema}.table_info("{tabela.name}")')}
+        texto = [nome for nome in codificadas if nome in declarados and declarados[nome].upper() != "INTEGER"]
+        if not texto:
+            continue
+
+        mestre = f"{schema}.sqlite_master"
+        ddl = conn.exec_driver_sql(f"SELECT sql FROM {mestre} WHERE type = 'table' AND name = ?",
+                                   (tabela.name,)).scalar()
+        indices = [row[0] for row in conn.exec_driver_sql(
+            f"SELECT sql FROM {mestre} WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabela.name,))]
+        temporaria = f"_{tabela.name}_codificada"
+        ddl = re.sub(r'^\s*CREATE TABLE\s+"?\w+"?', f'CREATE TABLE {schema}."{temporaria}"', ddl, count=1)
+        for nome in texto:
+            ddl = re.sub(rf'(\(|,)(\s*"?{nome}"?\s+)\w+(\(\d+\))?', r"\1\2INTEGER", ddl, count=1)
+        conn.exec_driver_sql(ddl)
+
+        # Um WHEN por valor distinto gravado (as colunas são categóricas)
+        expressoes, parametros = [], []
+        for nome in declarados:
+            if nome not in texto:
+                expressoes.append(f'"{nome}"')
+                continue
+            valores = [row[0] for row in conn.exec_driver_sql(
+                f'SELECT DISTINCT "{nome}" FROM {schema}."{tabela.name}" WHERE "{nome}" IS NOT NULL')]
+            casos = []
+            for valor in valores:
+                codigo = codificadas[nome].code(valor)
+                if codigo != valor:
+                    casos.append("WHEN ? THEN ?")
+                    parametros += [valor, codigo]
+            expressoes.append(f'CASE "{nome}" {" ".join(casos)} ELSE "{nome}" END' if casos else f'"{nome}"')
+        colunas = ", ".join(f'"{nome}"' for nome in declarados)
+        conn.exec_driver_sql(
+            f'INSERT INTO {schema}."{temporaria}" ({colunas}) '
+            f'SELECT {", ".join(expressoes)} FROM {schema}."{tabela.name}"',
+            tuple(parametros),
+        )
+        conn.exec_driver_sql(f'DROP TABLE {schema}."{tabela.name}"')
+        conn.exec_driver_sql(f'ALTER TABLE {schema}."{temporaria}" RENAME TO "{tabela.name}"')
+        for indice in indices:
+            conn.exec_driver_sql(re.sub(r"^(\s*CREATE\s+(UNIQUE\s+)?INDEX\s+)", rf"\1{schema}.", indice, count=1))
+        convertidas.append(tabela.name)
+    return convertidas
+
+def ativar_autoincremento(conn):
+    """
+    Recria com AUTOINCREMENT as tabelas declaradas com
+    sqlite_autoincrement que foram criadas sem ele.
+
+    Sem AUTOINCREMENT o SQLite dá ao próximo registro o maior ID + 1:
+    excluído (ou arquivado) o maior, o ID volta a ser usado. Com ele, o
+    maior ID já usado fica em sqlite_sequence. A tabela é recriada com o
+    DDL do modelo, os registros são copiados (sqlite_sequence parte do
+    maior ID copiado) e os índices existentes são recriados.
+
+    Args:
+        conn: Conexão numa transação, banco principal
+
+    Returns:
+        list: Tabelas recriadas
+    """
+    recriadas = []
+    for tabela in Base.metadata.sorted_tables:
+        if not tabela.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        ddl = conn.exec_driver_sql("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                                   (tabela.name,)).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            continue
+        indices = [row[0] for row in conn.exec_driver_sql(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabela.name,))]
+        temporaria = f"_{tabela.name}_autoincremento"
+        novo = str(CreateTable(tabela).compile(dialect=conn.dialect))
+        conn.exec_driver_sql(re.sub(r'^\s*CREATE TABLE\s+"?\w+"?', f'CREATE TABLE "{temporaria}"', novo, count=1))
+
+        # Colunas fora do modelo (gravadas por outra versão) são mantidas
+        atuais = [(row[1], row[2]) for row in conn.exec_driver_sql(f'PRAGMA main.table_info("{tabela.name}")')]
+        for nome, tipo in atuais:
+            if nome not in tabela.columns:
+                conn.exec_driver_sql(f'ALTER TABLE "{temporaria}" ADD COLUMN "{nome}" {tipo}')
+        colunas = ", ".join(f'"{nome}"' for nome, _ in atuais)
+        conn.exec_driver_sql(f'INSERT INTO "{temporaria}" ({colunas}) SELECT {colunas} FROM "{tabela.name}"')
+        conn.exec_driver_sql(f'DROP TABLE "{tabela.name}"')
+        conn.exec_driver_sql(f'ALTER TABLE "{temporaria}" RENAME TO "{tabela.name}"')
+        for indice in indices:
+            conn.exec_driver_sql(indice)
+        recriadas.append(tabela.name)
+    return recriadas
+
 # LISTA DE USUÁRIOS PADRÃO DO SISTEMA
 # Estes usuários são criados automaticamente na inicialização
 USUARIOS_PADRAO = [
@@ -73,39 +402,77 @@ def init_db():
     
     Fluxo de execução:
     1. Cria todas as tabelas baseadas nos modelos
-    2. Cria abrigo padrão se não existir
-    3. Cria usuários padrão com diferentes níveis de acesso
-    4. Confirma todas as alterações
+    2. Acrescenta colunas novas a tabelas existentes (migrar_esquema),
+       converte categorias gravadas como texto (converter_categorias) e
+       recria sem reutilização de IDs as tabelas arquivadas
+       (ativar_autoincremento)
+    3. Preenche as chaves de duplicidade de tutores antigos
+    4. Preenche as colunas normalizadas (filtro rápido) de registros antigos
+    5. Cria abrigo padrão se não existir
+    6. Cria usuários padrão com diferentes níveis de acesso
+    7. Confirma todas as alterações
     
     Exceções são tratadas com rollback para manter consistência.
     """
     # Cria todas as tabelas definidas nos modelos
-    Base.metadata.create_all(bind=engine)
+    # Bancos novos já nascem com vacuum incremental (maintenance.py); em
+    # bancos existentes o PRAGMA não tem efeito sem um VACUUM completo
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        Base.metadata.create_all(bind=conn)
 
-    from models import Shelter, AuthUser
+    # Bancos de versões anteriores: acrescenta colunas novas
+    for coluna in migrar_esquema():
+        print(f"Coluna adicionada: {coluna}")
+
+    # ... e converte as colunas categóricas gravadas como texto
+    with engine.begin() as conn:
+        for tabela in converter_categorias(conn):
+            print(f"Categorias convertidas para códigos: {tabela}")
+        for tabela in ativar_autoincremento(conn):
+            print(f"IDs sem reutilização (AUTOINCREMENT): {tabela}")
 
-    # Cria abrigo padrão se não existir nenhum
-    if not session.query(Shelter).first():
-        session.add(Shelter(name="Meu Abrigo", capacity=50))
-
-    # Cria múltiplos usuários padrão
-    for usuario_info in USUARIOS_PADRAO:
-        # Verifica se o usuário já existe
-        if not session.query(AuthUser).filter_by(username=usuario_info["username"]).first():
-            usuario = AuthUser(
-                username=usuario_info["username"],
-                nivel_acesso=usuario_info["nivel_acesso"]
-            )
-            usuario.set_password(usuario_info["password"])
-            session.add(usuario)
-            print(f"Usuário padrão criado: {usuario_info['username']}")
+    from models import Shelter, AuthUser
+    import archive
+    import duplicates
+    import queries
 
     try:
-        session.commit()
+        with session_scope() as s:
+            # Arquivo histórico de versões anteriores: colunas novas
+            # (anexado antes de qualquer gravação na sessão; sem arquivo,
+            # nada é anexado nem criado)
+            if os.path.exists(archive.archive_path()) and archive.has_archive(s):
+                archive.ensure_schema(s)
+
+            # Chaves de duplicidade de tutores gravados por versões anteriores
+            preenchidos = duplicates.backfill_keys(s)
+            if preenchidos:
+                print(f"Chaves de duplicidade preenchidas: {preenchidos} tutores")
+
+            # Colunas normalizadas (filtro rápido) de registros antigos
+            preenchidos = queries.backfill_normalized(s)
+            if preenchidos:
+                print(f"Colunas normalizadas preenchidas: {preenchidos} valores")
+
+            # Cria abrigo padrão se não existir nenhum
+            if not s.query(Shelter).first():
+                s.add(Shelter(name="Meu Abrigo", capacity=50))
+
+            # Cria múltiplos usuários padrão
+            for usuario_info in USUARIOS_PADRAO:
+                # Verifica se o usuário já existe
+                if not s.query(AuthUser).filter_by(username=usuario_info["username"]).first():
+                    usuario = AuthUser(
+                        username=usuario_info["username"],
+                        nivel_acesso=usuario_info["nivel_acesso"]
+                    )
+                    usuario.set_password(usuario_info["password"])
+                    s.add(usuario)
+                    print(f"Usuário padrão criado: {usuario_info['username']}")
         print("Banco de dados inicializado com sucesso!")
         print(f"Usuários disponíveis: {[u['username'] for u in USUARIOS_PADRAO]}")
     except Exception as e:
-        session.rollback()
         print(f"Erro ao inicializar banco de dados: {e}")
         raise
 
@@ -117,7 +484,8 @@ def listar_usuarios():
         list: Lista de objetos AuthUser com todos os usuários cadastrados
     """
     from models import AuthUser
-    return session.query(AuthUser).all()
+    with read_session() as s:
+        return s.query(AuthUser).all()
 
 def criar_usuario(username, password, nivel_acesso="usuario"):
     """
@@ -136,22 +504,20 @@ def criar_usuario(username, password, nivel_acesso="usuario"):
     """
     from models import AuthUser
     
-    # Verifica se usuário já existe
-    if session.query(AuthUser).filter_by(username=username).first():
-        print(f"Usuário '{username}' já existe!")
-        return False
-    
-    # Cria novo usuário
-    usuario = AuthUser(username=username, nivel_acesso=nivel_acesso)
-    usuario.set_password(password)  # Gera hash da senha
-    session.add(usuario)
-    
     try:
-        session.commit()
+        with session_scope() as s:
+            # Verifica se usuário já existe
+            if s.query(AuthUser).filter_by(username=username).first():
+                print(f"Usuário '{username}' já existe!")
+                return False
+            
+            # Cria novo usuário
+            usuario = AuthUser(username=username, nivel_acesso=nivel_acesso)
+            usuario.set_password(password)  # Gera hash da senha
+            s.add(usuario)
         print(f"Usuário '{username}' criado com sucesso!")
         return True
     except Exception as e:
-        session.rollback()
         print(f"Erro ao criar usuário: {e}")
         return False
 
@@ -173,7 +539,8 @@ def verificar_usuario(username, password):
     from models import AuthUser
     
     # Busca usuário pelo username
-    usuario = session.query(AuthUser).filter_by(username=username).first()
+    with read_session() as s:
+        usuario = s.query(AuthUser).filter_by(username=username).first()
     
     # Verifica se usuário existe e senha está correta
     if usuario and usuario.check_password(password):
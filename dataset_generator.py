@@ -0,0 +1,471 @@
+"""
+Gerador de Base Sintética - Dados Realistas para Testes de Carga
+----------------------------------------------------------------
+Este módulo cria um banco SQLite completo com dados fictícios em volume
+configurável, permitindo reproduzir localmente os problemas de desempenho
+observados em produção (o shelter.db do repositório é pequeno demais).
+
+1. Conteúdo Gerado:
+   - Abrigos com capacidade coerente com a ocupação
+   - Animais com distribuições realistas de espécie, porte, gênero,
+     temperamento, idade e status (listas de utils.py), com data de
+     entrada espalhada pelos anos do histórico
+   - Tutores com emails únicos, telefones de 11 dígitos e cidades,
+     incluindo recadastros da mesma pessoa com pequenas variações
+     (DUPLICATE_RATE) para exercitar duplicates.py
+   - Processos de adoção distribuídos pelas etapas de ADOPTION_STEPS
+   - Histórico de etapas (adoption_status_events) de cada processo,
+     com durações sorteadas por etapa ao longo de vários anos
+
+2. Consistência dos Dados:
+   - No máximo um processo por animal
+   - Processo finalizado → animal "Adotado"
+   - Processo em andamento → animal "Em processo"
+   - Data de visita preenchida nas etapas que a exigem
+
+3. Características Técnicas:
+   - Esquema criado a partir dos modelos (Base.metadata)
+   - Inserções em lote com executemany na conexão DBAPI
+   - PRAGMAs de carga (journal/sync desligados) apenas durante a geração
+   - Semente determinística: mesma semente → mesmo banco
+
+Exemplo de uso:
+    python dataset_generator.py --animals 1000000 --output shelter_1m.db
+    SHELTER_DB=shelter_1m.db python main.py
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from models import AdoptionProcess, Animal, Base
+from utils import SPECIES, SIZES, GENDERS, TEMPERAMENTS, email_key, normalize_text, phone_key
+
+# ========== DISTRIBUIÇÕES ==========
+
+# Pesos por espécie (cães e gatos dominam a população dos abrigos)
+SPECIES_WEIGHTS = {"Cachorro": 55, "Gato": 35, "Coelho": 4, "Pássaro": 3, "Roedor": 3}
+
+# Porte depende da espécie: apenas cães têm distribuição ampla
+SIZE_WEIGHTS = {
+    "Cachorro": {"Pequeno": 35, "Médio": 40, "Grande": 25},
+    "Gato": {"Pequeno": 60, "Médio": 38, "Grande": 2},
+    "Coelho": {"Pequeno": 85, "Médio": 15, "Grande": 0},
+    "Pássaro": {"Pequeno": 95, "Médio": 5, "Grande": 0},
+    "Roedor": {"Pequeno": 100, "Médio": 0, "Grande": 0},
+}
+
+GENDER_WEIGHTS = {"Macho": 51, "Fêmea": 49}
+
+TEMPERAMENT_WEIGHTS = {"Dócil": 35, "Sociável": 25, "Brincalhão": 22, "Medroso": 13, "Agressivo": 5}
+
+# Idade em anos: maioria de filhotes e jovens, cauda longa até 18
+AGE_WEIGHTS = [18, 16, 13, 11, 9, 7, 6, 5, 4, 3, 2, 2, 1, 1, 1, 0.5, 0.5, 0.3, 0.2]
+
+# Animais sem processo de adoção
+FREE_STATUS_WEIGHTS = {"Disponível": 88, "Indisponível": 12}
+
+# Etapas dos processos gerados (histórico longo → muitos finalizados)
+STEP_WEIGHTS = {
+    "Questionário": 12, "Documentos": 10, "Visita": 9, "Aprovado": 6,
+    "Finalizado": 48, "Recusado": 15,
+}
+
+# Etapas que exigem data de visita (mesma regra de AdoptionsTab.save)
+VISIT_STEPS = ("Visita", "Aprovado", "Finalizado")
+
+# Sequência normal das etapas e duração média de cada uma (dias)
+STEP_PATH = ("Questionário", "Documentos", "Visita", "Aprovado", "Finalizado")
+STAGE_MEAN_DAYS = {"Questionário": 5, "Documentos": 12, "Visita": 9, "Aprovado": 4}
+
+BREEDS = {
+    "Cachorro": ["SRD", "Labrador", "Poodle", "Vira-lata", "Pinscher", "Shih Tzu", "Beagle", "Pastor Alemão"],
+    "Gato": ["SRD", "Siamês", "Persa", "Maine Coon", "Angorá"],
+    "Coelho": ["Mini Lop", "Lionhead", "Holandês"],
+    "Pássaro": ["Calopsita", "Periquito", "Canário"],
+    "Roedor": ["Hamster", "Porquinho-da-índia", "Chinchila"],
+}
+
+ANIMAL_NAMES = [
+    "Rex", "Luna", "Thor", "Mel", "Bob", "Nina", "Max", "Lola", "Toby", "Bela",
+    "Fred", "Maya", "Zeus", "Pipoca", "Pingo", "Amora", "Bidu", "Chico", "Cacau",
+    "Frida", "Jade", "Lupi", "Marley", "Nescau", "Pandora", "Pretinha", "Simba",
+    "Tom", "Uva", "Vida", "Xodó", "Bolinha", "Estopa", "Faísca", "Mingau", "Paçoca",
+]
+
+FIRST_NAMES = [
+    "Ana", "João", "Maria", "José", "Pedro", "Paula", "Lucas", "Júlia", "Marcos",
+    "Carla", "Rafael", "Fernanda", "Bruno", "Camila", "Diego", "Beatriz", "Gustavo",
+    "Larissa", "Thiago", "Patrícia", "Felipe", "Aline", "Rodrigo", "Mariana",
+]
+
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves",
+    "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho",
+    "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+
+CITIES = [
+    "São Paulo", "Rio de Janeiro", "Belo Horizonte", "Curitiba", "Porto Alegre",
+    "Salvador", "Recife", "Fortaleza", "Campinas", "Goiânia", "Florianópolis",
+    "Brasília", "Niterói", "Santos", "Londrina",
+]
+
+EMAIL_DOMAINS = ["gmail.com", "hotmail.com", "outlook.com", "yahoo.com.br", "uol.com.br"]
+
+PREFERENCES = [
+    None, None, None, "Prefere cachorro de porte pequeno", "Gato dócil",
+    "Tem quintal grande", "Apartamento, animal calmo", "Filhote até 2 anos",
+]
+
+# Fração dos tutores que são recadastros de um tutor anterior
+DUPLICATE_RATE = 0.02
+
+# Tamanho de cada lote de executemany
+BATCH_SIZE = 50_000
+
+# Versão do conteúdo gerado: incrementar quando o esquema ou os dados
+# mudarem, para que bases em cache (benchmark.py) sejam regeradas
+DATASET_VERSION = 9
+
+
+def _weighted(rng, weights, k):
+    """
+    Sorteia k valores de um dicionário {valor: peso}.
+
+    Args:
+        rng (random.Random): Gerador com semente fixa
+        weights (dict): Pesos por valor
+        k (int): Quantidade de sorteios
+
+    Returns:
+        list: Valores sorteados
+    """
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def _vary_tutor(rng, name, local, phone):
+    """
+    Simula um recadastro: a mesma pessoa com nome, email e telefone
+    digitados de outro jeito. Telefone ou parte local do email continua
+    igual (após normalização), como nos casos reais.
+
+    Returns:
+        tuple: (nome, parte local do email, telefone)
+    """
+    # Nome: letra omitida ou sem o último sobrenome acentuado/maiúsculo
+    if rng.random() < 0.5 and len(name) > 6:
+        cut = rng.randrange(1, len(name) - 1)
+        name = name[:cut] + name[cut + 1:]
+    else:
+        name = name.upper()
+    if rng.random() < 0.5:
+        # Mesmo telefone (com formatação), outro email
+        phone = f"({phone[:2]}) {phone[2:7]}-{phone[7:]}"
+        local = local.replace(".", "_") + str(rng.randrange(10, 99))
+    else:
+        # Mesmo email (sem o ponto), outro telefone
+        local = local.replace(".", "")
+        phone = f"{rng.randrange(11, 99)}9{rng.randrange(10**8):08d}"
+    return name, local, phone
+
+
+def _check_constants():
+    """
+    Garante que as distribuições cobrem exatamente as listas de utils.py.
+
+    Evita que uma nova espécie/porte/temperamento seja adicionado às
+    constantes do sistema e esquecido pelo gerador.
+    """
+    for label, values, weights in (
+        ("SPECIES", SPECIES, SPECIES_WEIGHTS),
+        ("SIZES", SIZES, SIZE_WEIGHTS["Cachorro"]),
+        ("GENDERS", GENDERS, GENDER_WEIGHTS),
+        ("TEMPERAMENTS", TEMPERAMENTS, TEMPERAMENT_WEIGHTS),
+    ):
+        if set(v for v in values if v) != set(weights):
+            raise ValueError(f"Distribuição desatualizada para {label}")
+
+
+def _insert_batches(cursor, sql, rows):
+    """
+    Executa inserções em lotes de BATCH_SIZE linhas.
+
+    Args:
+        cursor: Cursor DBAPI do sqlite3
+        sql (str): Comando INSERT parametrizado
+        rows (iterable): Tuplas de parâmetros
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def generate(output, animals=100_000, tutors=None, adoptions=None, shelters=None, seed=42, force=False):
+    """
+    Gera um banco sintético completo no arquivo indicado.
+
+    Args:
+        output (str): Caminho do arquivo .db a ser criado
+        animals (int): Quantidade de animais
+        tutors (int): Quantidade de tutores (padrão: 20% dos animais)
+        adoptions (int): Quantidade de processos (padrão: 30% dos animais)
+        shelters (int): Quantidade de abrigos (padrão: 1 a cada 5000 animais)
+        seed (int): Semente do gerador pseudoaleatório
+        force (bool): Sobrescreve o arquivo se já existir
+
+    Returns:
+        dict: Contagens geradas e tempo total em segundos
+
+    Raises:
+        FileExistsError: Se o arquivo existir e force=False
+    """
+    _check_constants()
+
+    tutors = max(1, animals // 5) if tutors is None else tutors
+    adoptions = animals * 3 // 10 if adoptions is None else adoptions
+    shelters = max(1, animals // 5000) if shelters is None else shelters
+    adoptions = min(adoptions, animals)  # no máximo um processo por animal
+    if adoptions and not tutors:
+        raise ValueError("Processos de adoção exigem ao menos um tutor.")
+
+    if os.path.exists(output):
+        if not force:
+            raise FileExistsError(f"{output} já existe (use --force para sobrescrever).")
+        os.remove(output)
+
+    started = time.perf_counter()
+    rng = random.Random(seed)
+
+    # Esquema criado a partir dos modelos, exatamente como init_db
+    engine = create_engine(f"sqlite:///{output}", future=True)
+    Base.metadata.create_all(bind=engine)
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        # PRAGMAs de carga em massa: seguros aqui porque o arquivo é novo
+        cur.execute("PRAGMA journal_mode=OFF")
+        cur.execute("PRAGMA synchronous=OFF")
+        cur.execute("PRAGMA cache_size=-200000")
+
+        # ========== PROCESSOS (decididos antes para definir status) ==========
+        adopted_animal_ids = rng.sample(range(1, animals + 1), adoptions)
+        steps = _weighted(rng, STEP_WEIGHTS, adoptions)
+        step_by_animal = dict(zip(adopted_animal_ids, steps))
+
+        # ========== ANIMAIS ==========
+        species = _weighted(rng, SPECIES_WEIGHTS, animals)
+        genders = _weighted(rng, GENDER_WEIGHTS, animals)
+        temperaments = _weighted(rng, TEMPERAMENT_WEIGHTS, animals)
+        ages = rng.choices(range(len(AGE_WEIGHTS)), weights=AGE_WEIGHTS, k=animals)
+        free_statuses = _weighted(rng, FREE_STATUS_WEIGHTS, animals)
+        names = rng.choices(ANIMAL_NAMES, k=animals)
+        name_norms = {name: normalize_text(name) for name in ANIMAL_NAMES}
+        shelter_ids = rng.choices(range(1, shelters + 1), k=animals)
+        size_choices = {sp: _weighted(rng, w, animals) for sp, w in SIZE_WEIGHTS.items()}
+        breed_choices = {sp: rng.choices(b, k=animals) for sp, b in BREEDS.items()}
+        breed_norms = {breed: normalize_text(breed) for b in BREEDS.values() for breed in b}
+
+        occupancy = [0] * (shelters + 1)
+
+        # Colunas categóricas gravadas como códigos (models.CodedText)
+        species_code = Animal.species.type.code
+        size_code = Animal.size.type.code
+        gender_code = Animal.gender.type.code
+        temperament_code = Animal.temperament.type.code
+        status_code = Animal.status.type.code
+        step_code = AdoptionProcess.status.type.code
+
+        # Datas de entrada no mesmo intervalo do histórico de processos
+        base_date = datetime(2018, 1, 1)
+        span_days = (datetime(2025, 12, 31) - base_date).days
+        timestamp_format = "%Y-%m-%d %H:%M:%S.%f"
+        intake_offsets = rng.choices(range(span_days * 86400), k=animals)
+
+        def animal_rows():
+            for i in range(animals):
+                animal_id = i + 1
+                sp = species[i]
+                step = step_by_animal.get(animal_id)
+                if step == "Finalizado":
+                    status = "Adotado"
+                elif step is None or step == "Recusado":
+                    status = free_statuses[i]
+                else:
+                    status = "Em processo"
+                shelter_id = shelter_ids[i]
+                if status != "Adotado":
+                    occupancy[shelter_id] += 1
+                created = (base_date + timedelta(seconds=intake_offsets[i])).strftime(timestamp_format)
+                breed = breed_choices[sp][i]
+                yield (animal_id, names[i], species_code(sp), breed, ages[i],
+                       size_code(size_choices[sp][i]), gender_code(genders[i]),
+                       temperament_code(temperaments[i]), status_code(status),
+                       "Abrigo", shelter_id, created, created, name_norms[names[i]], breed_norms[breed])
+
+        _insert_batches(
+            cur,
+            "INSERT INTO animals (id, name, species, breed, age, size, gender, temperament, "
+            "status, location, shelter_id, created_at, updated_at, name_norm, breed_norm) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            animal_rows(),
+        )
+
+        # ========== ABRIGOS (capacidade com folga sobre a ocupação) ==========
+        shelter_rows = [
+            (sid, f"Abrigo {rng.choice(CITIES)} {sid}", f"abrigo{sid}@abrigos.org",
+             f"11{rng.randrange(10**9):09d}", f"Rua {rng.choice(LAST_NAMES)}, {rng.randrange(1, 3000)}",
+             occupancy[sid] + max(10, occupancy[sid] // 5), 0, 0)
+            for sid in range(1, shelters + 1)
+        ]
+        cur.executemany(
+            "INSERT INTO shelter (id, name, email, phone, address, capacity, rescued_count, adopted_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            shelter_rows,
+        )
+
+        # ========== TUTORES ==========
+        firsts = rng.choices(FIRST_NAMES, k=tutors)
+        lasts = rng.choices(LAST_NAMES, k=tutors)
+        domains = rng.choices(EMAIL_DOMAINS, k=tutors)
+        cities = rng.choices(CITIES, k=tutors)
+        city_norms = {city: normalize_text(city) for city in CITIES}
+        prefs = rng.choices(PREFERENCES, k=tutors)
+
+        def tutor_rows():
+            originals = []  # (nome, parte local, domínio, telefone) dos tutores originais
+            repeated = set()  # emails de recadastros (únicos entre si)
+            for i in range(tutors):
+                if originals and rng.random() < DUPLICATE_RATE:
+                    name, local, domain, phone = rng.choice(originals)
+                    name, local, phone = _vary_tutor(rng, name, local, phone)
+                    domain = rng.choice([d for d in EMAIL_DOMAINS if d != domain])
+                    if f"{local}@{domain}" in repeated:
+                        # Etiqueta "+n" mantém a unicidade sem mudar email_key
+                        local = f"{local}+{i + 1}"
+                    repeated.add(f"{local}@{domain}")
+                else:
+                    first, last = firsts[i], lasts[i]
+                    name = f"{first} {last}"
+                    # Sufixo com o ID garante unicidade do email
+                    local = f"{first}.{last}{i + 1}".lower()
+                    domain = domains[i]
+                    phone = f"{rng.randrange(11, 99)}9{rng.randrange(10**8):08d}"
+                    originals.append((name, local, domain, phone))
+                email = f"{local}@{domain}"
+                yield (i + 1, name, email, phone, cities[i], prefs[i], True,
+                       phone_key(phone), email_key(email),
+                       normalize_text(name), normalize_text(email), city_norms[cities[i]])
+
+        _insert_batches(
+            cur,
+            "INSERT INTO users (id, name, email, phone, city, adoption_preferences, approved, "
+            "phone_key, email_key, name_norm, email_norm, city_norm) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            tutor_rows(),
+        )
+
+        # ========== PROCESSOS DE ADOÇÃO ==========
+        adopters = rng.choices(range(1, tutors + 1), k=adoptions) if tutors else []
+
+        def adoption_rows():
+            for i, animal_id in enumerate(adopted_animal_ids):
+                step = steps[i]
+                visit = None
+                if step in VISIT_STEPS:
+                    visit = base_date + timedelta(days=rng.randrange(span_days))
+                yield (i + 1, animal_id, adopters[i], step_code(step), None, visit, None)
+
+        _insert_batches(
+            cur,
+            "INSERT INTO adoptions (id, animal_id, user_id, status, virtual_visit_at, "
+            "in_person_visit_at, notes) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            adoption_rows(),
+        )
+
+        # ========== HISTÓRICO DE ETAPAS ==========
+        # Cada processo percorre STEP_PATH até a etapa sorteada; recusas
+        # acontecem a partir de uma etapa intermediária qualquer
+
+        def event_rows():
+            event_id = 0
+            for i in range(adoptions):
+                step = steps[i]
+                if step == "Recusado":
+                    path = STEP_PATH[:rng.randrange(1, len(STEP_PATH))] + ("Recusado",)
+                else:
+                    path = STEP_PATH[:STEP_PATH.index(step) + 1]
+                changed = base_date + timedelta(seconds=rng.randrange(span_days * 86400))
+                previous = None
+                for status in path:
+                    stage_seconds = None
+                    if previous is not None:
+                        stage_seconds = int(rng.expovariate(1 / STAGE_MEAN_DAYS[previous]) * 86400)
+                        changed += timedelta(seconds=stage_seconds)
+                    event_id += 1
+                    yield (event_id, i + 1, step_code(previous), step_code(status),
+                           changed.strftime(timestamp_format), stage_seconds)
+                    previous = status
+
+        _insert_batches(
+            cur,
+            "INSERT INTO adoption_status_events (id, adoption_id, from_status, to_status, "
+            "changed_at, stage_seconds) VALUES (?, ?, ?, ?, ?, ?)",
+            event_rows(),
+        )
+
+        raw.commit()
+    finally:
+        raw.close()
+        engine.dispose()
+
+    return {
+        "output": output,
+        "shelters": shelters,
+        "animals": animals,
+        "tutors": tutors,
+        "adoptions": adoptions,
+        "seed": seed,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando do gerador.
+
+    Args:
+        argv (list): Argumentos (padrão: sys.argv)
+    """
+    parser = argparse.ArgumentParser(description="Gera um banco sintético do abrigo para testes de carga.")
+    parser.add_argument("--output", "-o", default="shelter_sintetico.db", help="arquivo .db de saída")
+    parser.add_argument("--animals", type=int, default=100_000, help="quantidade de animais")
+    parser.add_argument("--tutors", type=int, default=None, help="quantidade de tutores (padrão: 20%% dos animais)")
+    parser.add_argument("--adoptions", type=int, default=None, help="quantidade de processos (padrão: 30%% dos animais)")
+    parser.add_argument("--shelters", type=int, default=None, help="quantidade de abrigos (padrão: 1 a cada 5000 animais)")
+    parser.add_argument("--seed", type=int, default=42, help="semente determinística")
+    parser.add_argument("--force", action="store_true", help="sobrescreve o arquivo de saída")
+    args = parser.parse_args(argv)
+
+    try:
+        result = generate(args.output, args.animals, args.tutors, args.adoptions,
+                          args.shelters, args.seed, args.force)
+    except (FileExistsError, ValueError) as e:
+        parser.error(str(e))
+
+    print(f"Base gerada em {result['output']} ({result['seconds']}s): "
+          f"{result['shelters']} abrigos, {result['animals']} animais, "
+          f"{result['tutors']} tutores, {result['adoptions']} processos.")
+
+
+if __name__ == "__main__":
+    main()
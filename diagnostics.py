@@ -0,0 +1,325 @@
+"""
+Módulo de Diagnóstico - Instrumentação de Consultas SQL
+-------------------------------------------------------
+Este módulo registra todas as consultas executadas pelo SQLAlchemy e as
+agrupa pela ação de interface que as originou (carregar aba, salvar,
+pesquisar), dando visibilidade de quantas consultas cada clique causa.
+
+1. Instrumentação:
+   - Eventos before_cursor_execute/after_cursor_execute da Engine
+   - Tempo de cada comando SQL medido no driver
+   - Atribuição à ação mais interna em andamento (ações aninhadas)
+   - Comandos fora de ações ficam em "(fora de ação)"
+
+2. Detecção de N+1:
+   - Comando idêntico repetido N_PLUS_ONE_THRESHOLD vezes ou mais
+     dentro de uma mesma execução de ação
+   - Típico de lazy loads de relacionamentos por linha
+
+3. Consumo dos Dados:
+   - Seção de diagnóstico da AdmTab (tabela, detalhes e exportação)
+   - Benchmark headless (contagem de consultas por cenário)
+   - Exportação em JSON
+
+Exemplo de uso:
+    @instrumentado("Animais: carregar")
+    def load(self): ...
+
+    with acao("Pesquisa: buscar"):
+        session.query(Animal).all()
+"""
+
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Repetições do mesmo comando numa ação a partir das quais há suspeita de N+1
+N_PLUS_ONE_THRESHOLD = 5
+
+# Quantidade de execuções de ações mantidas no histórico
+HISTORY_SIZE = 200
+
+# Nome usado para comandos executados fora de qualquer ação
+OUTSIDE_ACTION = "(fora de ação)"
+
+
+class ActionRecord:
+    """
+    Registro de uma execução de ação da interface.
+
+    Atributos:
+        name (str): Nome da ação (ex: "Animais: carregar")
+        started_at (datetime): Início da execução
+        duration_ms (float): Duração total da ação
+        statements (OrderedDict): Comando SQL → [execuções, tempo total ms]
+    """
+
+    __slots__ = ("name", "started_at", "duration_ms", "statements", "_t0")
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.duration_ms = 0.0
+        self.statements = OrderedDict()
+        self._t0 = time.perf_counter()
+
+    def add(self, statement, elapsed_ms):
+        """Contabiliza uma execução de um comando SQL."""
+        entry = self.statements.get(statement)
+        if entry is None:
+            self.statements[statement] = [1, elapsed_ms]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed_ms
+
+    def snapshot(self):
+        """Cópia independente do registro (contadores inclusive)."""
+        copy = ActionRecord(self.name)
+        copy.started_at = self.started_at
+        copy.duration_ms = self.duration_ms
+        copy.statements = OrderedDict((sql, list(entry)) for sql, entry in self.statements.items())
+        copy._t0 = self._t0
+        return copy
+
+    @property
+    def query_count(self):
+        """Total de comandos SQL executados na ação."""
+        return sum(count for count, _ in self.statements.values())
+
+    @property
+    def sql_ms(self):
+        """Tempo total gasto no banco (ms)."""
+        return sum(ms for _, ms in self.statements.values())
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """
+        Lista os comandos repetidos que indicam padrão N+1.
+
+        Returns:
+            list: Tuplas (comando, execuções, tempo total ms)
+        """
+        return [(sql, count, ms) for sql, (count, ms) in self.statements.items() if count >= threshold]
+
+    def to_dict(self):
+        """Representação serializável em JSON."""
+        return {
+            "action": self.name,
+            "started_at": self.started_at.isoformat(timespec="milliseconds"),
+            "duration_ms": round(self.duration_ms, 3),
+            "queries": self.query_count,
+            "sql_ms": round(self.sql_ms, 3),
+            "n_plus_one": [
+                {"statement": sql, "count": count, "ms": round(ms, 3)}
+                for sql, count, ms in self.n_plus_one()
+            ],
+            "statements": [
+                {"statement": sql, "count": count, "ms": round(ms, 3)}
+                for sql, (count, ms) in self.statements.items()
+            ],
+        }
+
+
+class QueryMonitor:
+    """
+    Coletor central das consultas agrupadas por ação.
+
+    Mantém uma pilha de ações por thread (ações aninhadas, ex: salvar →
+    recarregar abas) e um histórico limitado de execuções concluídas.
+    O acumulado fora de ações é compartilhado pelas threads (backup,
+    manutenção, importação) e só é alterado ou lido sob self._lock.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.enabled = True
+        self.history = deque(maxlen=history_size)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._outside_record = None
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """Ação mais interna em andamento na thread atual (ou None)."""
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def begin(self, name):
+        """Inicia uma ação e a torna a ação corrente."""
+        record = ActionRecord(name)
+        self._stack().append(record)
+        return record
+
+    def end(self, record):
+        """Finaliza a ação e a move para o histórico."""
+        record.duration_ms = (time.perf_counter() - record._t0) * 1000
+        stack = self._stack()
+        if stack and stack[-1] is record:
+            stack.pop()
+        with self._lock:
+            self.history.append(record)
+
+    def record_statement(self, statement, elapsed_ms):
+        """Contabiliza um comando na ação corrente (ou fora de ação)."""
+        record = self.current()
+        if record is not None:
+            # Pilha da própria thread: sem concorrência
+            record.add(statement, elapsed_ms)
+            return
+        with self._lock:
+            if self._outside_record is None:
+                self._outside_record = ActionRecord(OUTSIDE_ACTION)
+            self._outside_record.add(statement, elapsed_ms)
+
+    def clear(self):
+        """Descarta o histórico e o acumulado fora de ações."""
+        with self._lock:
+            self.history.clear()
+            self._outside_record = None
+
+    def summary(self):
+        """
+        Agrega o histórico por nome de ação.
+
+        Returns:
+            list: Dicionários com execuções, consultas da última execução,
+                  médias de tempo e quantidade de comandos N+1, ordenados
+                  pelo total de consultas (maior primeiro)
+        """
+        with self._lock:
+            records = list(self.history)
+            # Cópia: outras threads continuam acumulando no original
+            if self._outside_record is not None and self._outside_record.statements:
+                records.append(self._outside_record.snapshot())
+
+        groups = OrderedDict()
+        for record in records:
+            groups.setdefault(record.name, []).append(record)
+
+        summary = []
+        for name, group in groups.items():
+            last = group[-1]
+            summary.append({
+                "action": name,
+                "calls": len(group),
+                "last_queries": last.query_count,
+                "total_queries": sum(r.query_count for r in group),
+                "avg_sql_ms": round(sum(r.sql_ms for r in group) / len(group), 3),
+                "avg_duration_ms": round(sum(r.duration_ms for r in group) / len(group), 3),
+                "n_plus_one": len(last.n_plus_one()),
+                "last": last,
+            })
+        summary.sort(key=lambda item: item["total_queries"], reverse=True)
+        return summary
+
+    def export_json(self, path):
+        """
+        Exporta o resumo e o histórico completo em JSON.
+
+        Args:
+            path (str): Arquivo de destino
+        """
+        with self._lock:
+            records = list(self.history)
+        data = {
+            "exported_at": datetime.now().isoformat(timespec="seconds"),
+            "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+            "summary": [
+                {k: v for k, v in item.items() if k != "last"} for item in self.summary()
+            ],
+            "history": [r.to_dict() for r in records],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+# Instância única usada pela aplicação inteira
+monitor = QueryMonitor()
+
+# ========== EVENTOS DO SQLALCHEMY ==========
+
+# Chave do início dos comandos sem contexto de execução em Connection.info
+_STARTS = "diagnostics_t0"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """
+    Marca o início do comando.
+
+    O início fica no contexto de execução, descartado com ele mesmo que
+    o comando falhe (after_cursor_execute não é chamado). Comandos sem
+    contexto (inicialização do dialeto) usam uma única entrada em
+    Connection.info, sobrescrita a cada comando e limpa em handle_error.
+    """
+    if context is not None:
+        context._diagnostics_t0 = time.perf_counter()
+    else:
+        conn.info[_STARTS] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Calcula a duração do comando e o atribui à ação corrente."""
+    if context is not None:
+        start = getattr(context, "_diagnostics_t0", None)
+    else:
+        start = conn.info.pop(_STARTS, None)
+    if start is None:
+        return
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if monitor.enabled:
+        monitor.record_statement(statement, elapsed_ms)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    """Descarta o início de um comando sem contexto que falhou."""
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is None:
+        conn.info.pop(_STARTS, None)
+
+# ========== API PÚBLICA ==========
+
+@contextmanager
+def acao(nome):
+    """
+    Agrupa as consultas executadas no bloco sob uma ação nomeada.
+
+    Args:
+        nome (str): Nome da ação exibido no diagnóstico
+
+    Yields:
+        ActionRecord: Registro da execução (consultas disponíveis ao final)
+    """
+    record = monitor.begin(nome)
+    try:
+        yield record
+    finally:
+        monitor.end(record)
+
+
+def instrumentado(nome):
+    """
+    Decorador que registra um método de aba como ação de interface.
+
+    Args:
+        nome (str): Nome da ação exibido no diagnóstico
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with acao(nome):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,527 @@
+"""
+Verificação do Banco - Planos de Consulta e Saúde do Arquivo
+------------------------------------------------------------
+Este módulo executa as consultas das abas sobre o banco atual e examina
+o plano de cada uma (EXPLAIN QUERY PLAN), apontando varreduras completas
+(SCAN) de tabelas grandes antes que os usuários sintam a lentidão.
+
+1. Consultas (QUERIES):
+   - Registro das leituras feitas pelas abas, chamando as próprias
+     funções de queries.py (e dos módulos auxiliares) com valores
+     amostrados do banco: páginas em todas as ordenações e nos dois
+     sentidos, filtros rápidos, pesquisa, painel, relatórios
+   - Os comandos SQL emitidos são capturados na conexão e cada comando
+     distinto recebe um EXPLAIN QUERY PLAN com os mesmos parâmetros
+   - Consultas marcadas como varredura esperada (relatórios e varreduras
+     em lote, que leem a tabela inteira por natureza) não geram alerta
+
+2. Alertas:
+   - SCAN de tabela com LARGE_TABLE_ROWS linhas ou mais (estimativa por
+     max(rowid)); varreduras de índice de cobertura também contam, pois
+     leem todas as entradas
+   - Exceto varreduras limitadas: laço externo de um comando com LIMIT já
+     na ordem pedida (páginas keyset), que para após a página
+   - Banco grande sem estatísticas do planejador (sqlite_stat1): sem
+     elas o SQLite escolhe planos piores nas ordenações por JOIN
+   - Ordenação em árvore temporária (USE TEMP B-TREE) e tempo de cada
+     consulta são informados, sem alerta
+
+3. Arquivo:
+   - Páginas, páginas livres (proporção), tamanho do arquivo e do WAL,
+     modo de journal e auto_vacuum
+   - Uso dos índices: quantos comandos do registro usam cada índice e o
+     tamanho de cada um (dbstat, quando disponível); índices sem uso são
+     candidatos a remoção
+
+4. Saída:
+   - Tabela legível (format_report) e JSON (report_json)
+   - Linha de comando: python doctor.py [--json] [-o ARQUIVO]
+   - AdmTab: botão "Verificar banco" na seção de diagnóstico
+
+Exemplo de uso:
+    report = doctor.run_doctor()
+    print(doctor.format_report(report))
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError
+
+import archive
+import database
+import documents
+import duplicates
+import photos
+import queries
+import rollups
+import static_site
+from database import read_session
+from diagnostics import acao
+from models import Animal, Shelter, User
+
+# Linhas a partir das quais uma varredura completa gera alerta
+LARGE_TABLE_ROWS = 10_000
+
+# Linhas por página nas consultas do registro (pequeno: o plano não muda)
+PAGE_LIMIT = 20
+
+# Comandos que passam pelo EXPLAIN (os demais não são leituras)
+_READ_STATEMENT = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+# Tabelas citadas no comando: FROM/JOIN [esquema.]tabela [AS apelido]
+_TABLE_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN)\s+(?:"?\w+"?\.)?"?(\w+)"?(?:\s+(?:AS\s+)?"?(?!(?:WHERE|JOIN|LEFT|INNER|ON|GROUP|ORDER|'
+    r'LIMIT|UNION|CROSS|OUTER)\b)(\w+)"?)?',
+    re.IGNORECASE,
+)
+
+# Operações do plano
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?")
+_LIMIT = re.compile(r"\bLIMIT \?(?: OFFSET \?)?\s*$", re.IGNORECASE)
+_INDEX_USE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+# ========== REGISTRO DE CONSULTAS ==========
+
+def _sample(session):
+    """
+    Valores reais usados como parâmetros das consultas do registro
+    (banco vazio: valores fictícios, os planos são os mesmos).
+    """
+    animal = session.execute(
+        select(Animal.id, Animal.name_norm, Animal.breed_norm).order_by(Animal.id).limit(1)
+    ).first()
+    user = session.execute(
+        select(User.id, User.name, User.email, User.phone, User.name_norm, User.city_norm).order_by(User.id).limit(1)
+    ).first()
+    shelter_id = session.execute(select(Shelter.id).order_by(Shelter.id).limit(1)).scalar()
+    return {
+        "animal_id": animal[0] if animal else 1,
+        "animal_name": (animal[1] or "a")[:3] if animal else "a",
+        "breed": (animal[2] or "a")[:3] if animal else "a",
+        "user_id": user[0] if user else 1,
+        "user_name": user[1] if user else "Tutor",
+        "email": user[2] if user else "tutor@example.com",
+        "phone": user[3] if user else "11999999999",
+        "user_prefix": (user[4] or "a")[:3] if user else "a",
+        "city": (user[5] or "a")[:3] if user else "a",
+        "shelter_id": shelter_id or 1,
+    }
+
+
+def _pages(page, columns, **kwargs):
+    """
+    Leituras de uma lista paginada: cada coluna de ordenação, nos dois
+    sentidos, a partir de cada trecho (valores e NULL) e a página
+    seguinte (cursor keyset).
+    """
+    def run(session, sample):
+        for column in range(columns):
+            for descending in (False, True):
+                for start in (None, (1, None, None)):
+                    rows, cursor = page(session, column=column, descending=descending, after=start,
+                                        limit=PAGE_LIMIT, **kwargs)
+                    if cursor is not None:
+                        page(session, column=column, descending=descending, after=cursor,
+                             limit=PAGE_LIMIT, **kwargs)
+    return run
+
+
+def _filtered(page, filters, field, sample_key):
+    """Primeira página do filtro rápido de um campo, ordenada por ele."""
+    def run(session, sample):
+        page(session, column=filters[field][1], descending=False, limit=PAGE_LIMIT,
+             prefix=(field, sample[sample_key]))
+    return run
+
+
+def _search(criteria):
+    """Contagem e primeira página da SearchTab com os critérios dados."""
+    def run(session, sample):
+        resolved = {key: sample[value] if value in sample else value for key, value in criteria.items()}
+        queries.search_count(session, **resolved)
+        queries.search_page(session, resolved, limit=PAGE_LIMIT)
+    return run
+
+
+def _history(session, sample):
+    """Histórico com processos arquivados (apenas se houver arquivo)."""
+    if not archive.has_archive(session):
+        return
+    page = queries.projection_page
+    for column in range(4):
+        page(session, archive.adoption_history_stmt(session), column, False, None, PAGE_LIMIT)
+    page(session, archive.adoption_history_stmt(session, ("user", sample["user_prefix"])), 2, False,
+         None, PAGE_LIMIT)
+
+
+def _since(days):
+    """Início do período do painel (últimos days dias)."""
+    return date.today() - timedelta(days=days - 1)
+
+
+# Consultas das abas: (nome, função(sessão, amostra), varredura esperada)
+QUERIES = (
+    ("Animais: páginas", _pages(queries.animal_page, len(queries.ANIMAL_SORT)), False),
+    ("Animais: filtro por nome", _filtered(queries.animal_page, queries.ANIMAL_FILTERS, "name", "animal_name"),
+     False),
+    ("Animais: filtro por raça", _filtered(queries.animal_page, queries.ANIMAL_FILTERS, "breed", "breed"), False),
+    ("Animais: processos ativos", lambda s, x: queries.active_adoption_count(s, x["animal_id"]), False),
+    ("Animais: lotação do abrigo", lambda s, x: queries.shelter_occupancy(s, x["shelter_id"]), False),
+    ("Animais: miniaturas",
+     lambda s, x: photos.load_thumbnails(s, list(range(x["animal_id"], x["animal_id"] + 20))), False),
+    ("Tutores: páginas", _pages(queries.user_page, len(queries.USER_SORT)), False),
+    ("Tutores: filtro por nome", _filtered(queries.user_page, queries.USER_FILTERS, "name", "user_prefix"), False),
+    ("Tutores: filtro por email", _filtered(queries.user_page, queries.USER_FILTERS, "email", "user_prefix"),
+     False),
+    ("Tutores: filtro por cidade", _filtered(queries.user_page, queries.USER_FILTERS, "city", "city"), False),
+    ("Tutores: duplicados ao salvar",
+     lambda s, x: duplicates.find_similar(s, x["user_name"], x["email"], x["phone"], exclude_id=x["user_id"]),
+     False),
+    ("Tutores: varredura de duplicados", lambda s, x: duplicates.scan(s), True),
+    ("Processos: páginas", _pages(queries.adoption_page, len(queries.ADOPTION_SORT)), False),
+    ("Processos: filtro por animal",
+     _filtered(queries.adoption_page, queries.ADOPTION_FILTERS, "animal", "animal_name"), False),
+    ("Processos: filtro por tutor",
+     _filtered(queries.adoption_page, queries.ADOPTION_FILTERS, "user", "user_prefix"), False),
+    ("Processos: histórico com arquivados", _history, True),
+    ("Processos: tempo por etapa", lambda s, x: queries.stage_time_report(s), False),
+    ("Documentos: contratos", lambda s, x: documents.contract_records(s, list(range(1, 101))), False),
+    ("Documentos: relatórios", lambda s, x: documents.report_records(s, documents.previous_month()), False),
+    ("Site: animais disponíveis", lambda s, x: static_site.site_records(s), False),
+    ("Abrigos: páginas", _pages(queries.shelter_page, 1), True),
+    ("Formulários: escolhas", lambda s, x: (queries.shelter_choices(s), queries.user_choices(s),
+                                            queries.available_animal_choices(s)), False),
+    ("ADM: usuários do sistema", lambda s, x: queries.auth_user_rows(s), False),
+    ("Pesquisa: espécie e porte", _search({"species": "Cachorro", "size": "Médio"}), False),
+    ("Pesquisa: abrigo e idade", _search({"shelter_id": "shelter_id", "age_min": 1, "age_max": 5}), False),
+    ("Pesquisa: texto livre", _search({"text": "cachorro pastor"}), False),
+    ("Pesquisa: contagens", lambda s, x: queries.facet_counts(s, species="Cachorro"), True),
+    ("Painel: lotação", lambda s, x: queries.dashboard_occupancy(s), False),
+    ("Painel: entradas e adoções", lambda s, x: queries.dashboard_daily(s, _since(30)), False),
+    ("Painel: espécies", lambda s, x: queries.dashboard_species(s, _since(30)), False),
+    ("Painel: última atualização", lambda s, x: rollups.last_refresh(s), False),
+)
+
+# ========== EXECUÇÃO ==========
+
+def _capture(run, session, sample):
+    """
+    Executa uma consulta do registro e devolve os comandos emitidos.
+
+    Returns:
+        list: Listas [comando, parâmetros, tempo ms], na ordem de execução
+    """
+    captured = []
+    thread = threading.get_ident()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread and not executemany and _READ_STATEMENT.match(statement):
+            captured.append([statement, parameters, time.perf_counter()])
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        if captured and captured[-1][0] is statement and threading.get_ident() == thread:
+            captured[-1][2] = (time.perf_counter() - captured[-1][2]) * 1000
+
+    event.listen(database.engine, "before_cursor_execute", before)
+    event.listen(database.engine, "after_cursor_execute", after)
+    try:
+        run(session, sample)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", before)
+        event.remove(database.engine, "after_cursor_execute", after)
+    return captured
+
+
+def _aliases(statement):
+    """Apelido → tabela para as tabelas citadas no comando."""
+    aliases = {}
+    for table, alias in _TABLE_REFERENCE.findall(statement):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def _table_rows(conn):
+    """Linhas estimadas de cada tabela do banco principal e do arquivo."""
+    rows = {}
+    schemas = [row[1] for row in conn.exec_driver_sql("PRAGMA database_list")]
+    for schema in schemas:
+        if schema == "temp":
+            continue
+        for (table,) in conn.exec_driver_sql(
+            f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ):
+            count = conn.exec_driver_sql(f'SELECT max(rowid) FROM {schema}."{table}"').scalar() or 0
+            rows[table] = max(rows.get(table, 0), count)
+    return rows
+
+
+def _explain(conn, statement, parameters):
+    """Linhas do EXPLAIN QUERY PLAN como (profundidade, detalhe)."""
+    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in plan:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append((depth[node], detail))
+    return lines
+
+
+def _analyze_plan(statement, plan, table_rows, min_rows):
+    """
+    Varreduras do plano.
+
+    Uma varredura é limitada quando é o laço externo de um comando com
+    LIMIT já na ordem pedida (sem árvore temporária): a leitura para
+    após a página (ex: ORDER BY id LIMIT 200 percorre 200 linhas).
+
+    Returns:
+        list: Dicionários (tabela, apelido, linhas, índice, grande, limitada)
+    """
+    aliases = _aliases(statement)
+    limited = bool(_LIMIT.search(statement)) and not any(
+        depth == 0 and detail.startswith("USE TEMP B-TREE") for depth, detail in plan
+    )
+    outer = next((i for i, (depth, detail) in enumerate(plan) if depth == 0 and detail.startswith(("SCAN", "SEARCH"))),
+                 None)
+    scans = []
+    for i, (depth, detail) in enumerate(plan):
+        match = _SCAN.match(detail)
+        if not match:
+            continue
+        alias, covering, index = match.groups()
+        table = aliases.get(alias, alias)
+        if table not in table_rows:
+            continue  # subconsulta, CTE ou linha constante
+        rows = table_rows[table]
+        scans.append({
+            "table": table,
+            "alias": alias,
+            "rows": rows,
+            "index": index,
+            "covering": bool(covering),
+            "large": rows >= min_rows,
+            "limited": limited and i == outer,
+        })
+    return scans
+
+
+def _storage(conn):
+    """Páginas, páginas livres, arquivo, WAL e estatísticas do banco principal."""
+    pragma = lambda name: conn.exec_driver_sql(f"PRAGMA main.{name}").scalar()
+    page_size, page_count, freelist = pragma("page_size"), pragma("page_count"), pragma("freelist_count")
+    path = next((row[2] for row in conn.exec_driver_sql("PRAGMA database_list") if row[1] == "main"), "")
+    wal = path + "-wal" if path else ""
+    has_stats = conn.exec_driver_sql(
+        "SELECT count(*) FROM main.sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    ).scalar()
+    return {
+        "path": path,
+        "page_size": page_size,
+        "page_count": page_count,
+        "freelist_count": freelist,
+        "freelist_ratio": round(freelist / page_count, 4) if page_count else 0.0,
+        "file_bytes": os.path.getsize(path) if path and os.path.exists(path) else 0,
+        "wal_bytes": os.path.getsize(wal) if wal and os.path.exists(wal) else 0,
+        "journal_mode": pragma("journal_mode"),
+        "auto_vacuum": {0: "NONE", 1: "FULL", 2: "INCREMENTAL"}.get(pragma("auto_vacuum"), "?"),
+        "statistics": bool(has_stats and conn.exec_driver_sql("SELECT count(*) FROM main.sqlite_stat1").scalar()),
+    }
+
+
+def _index_sizes(conn):
+    """Bytes por índice (tabela virtual dbstat; vazio se não compilada)."""
+    try:
+        return dict(conn.exec_driver_sql("SELECT name, sum(pgsize) FROM main.dbstat GROUP BY name").all())
+    except OperationalError:
+        return {}
+
+
+def run_doctor(min_rows=LARGE_TABLE_ROWS, only=None):
+    """
+    Executa a verificação completa do banco da aplicação.
+
+    Args:
+        min_rows (int): Linhas a partir das quais uma varredura gera alerta
+        only (list): Substrings de nomes do registro a verificar (padrão: todas)
+
+    Returns:
+        dict: Relatório serializável em JSON ("queries", "indexes",
+              "storage", "alerts")
+    """
+    with acao("Verificação do banco"), read_session() as session:
+        conn = session.connection()
+        sample = _sample(session)
+        table_rows = _table_rows(conn)
+
+        statements = {}  # comando → dados do plano (comandos repetidos examinados uma vez)
+        results = []
+        for name, run, expected in QUERIES:
+            if only and not any(o.lower() in name.lower() for o in only):
+                continue
+            entries = []
+            elapsed = 0.0
+            for statement, parameters, ms in _capture(run, session, sample):
+                elapsed += ms
+                info = statements.get(statement)
+                if info is None:
+                    plan = _explain(conn, statement, parameters)
+                    info = statements[statement] = {
+                        "statement": " ".join(statement.split()),
+                        "plan": ["  " * depth + detail for depth, detail in plan],
+                        "scans": _analyze_plan(statement, plan, table_rows, min_rows),
+                        "temp_btree": any(detail.startswith("USE TEMP B-TREE") for _, detail in plan),
+                    }
+                if info not in entries:
+                    entries.append(info)
+            large = [scan for entry in entries for scan in entry["scans"] if scan["large"] and not scan["limited"]]
+            results.append({
+                "query": name,
+                "expected_scan": expected,
+                "ms": round(elapsed, 3),
+                "statements": entries,
+                "scans": sum(len(entry["scans"]) for entry in entries),
+                "large_scans": len(large),
+                "flagged": bool(large) and not expected,
+            })
+
+        used = {}
+        for info in statements.values():
+            for line in info["plan"]:
+                for index in _INDEX_USE.findall(line):
+                    used[index] = used.get(index, 0) + 1
+        sizes = _index_sizes(conn)
+        indexes = [
+            {"index": index, "table": table, "statements": used.get(index, 0), "bytes": sizes.get(index)}
+            for index, table in conn.exec_driver_sql(
+                "SELECT name, tbl_name FROM main.sqlite_master WHERE type = 'index' ORDER BY tbl_name, name"
+            )
+        ]
+        storage = _storage(conn)
+
+    alerts = list(dict.fromkeys(
+        f"{item['query']}: SCAN {scan['table']} ({scan['rows']} linhas)"
+        for item in results if item["flagged"]
+        for entry in item["statements"] for scan in entry["scans"] if scan["large"] and not scan["limited"]
+    ))
+    if not storage["statistics"] and max(table_rows.values(), default=0) >= min_rows:
+        alerts.append("Banco sem estatísticas do planejador (ANALYZE): executar python maintenance.py")
+    return {
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "large_table_rows": min_rows,
+        "tables": table_rows,
+        "queries": results,
+        "indexes": indexes,
+        "storage": storage,
+        "alerts": alerts,
+    }
+
+# ========== SAÍDA ==========
+
+def report_json(report):
+    """Relatório em JSON (indentado, acentos preservados)."""
+    return json.dumps(report, indent=2, ensure_ascii=False)
+
+
+def _table(headers, rows):
+    """Tabela de texto com colunas alinhadas."""
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    line = lambda values: "  ".join(str(v).ljust(w) for v, w in zip(values, widths)).rstrip()
+    return "\n".join([line(headers), line("-" * w for w in widths)] + [line(row) for row in rows])
+
+
+def format_report(report):
+    """
+    Relatório legível: consultas, alertas, arquivo e índices.
+
+    Returns:
+        str: Texto com tabelas alinhadas
+    """
+    rows = []
+    for item in report["queries"]:
+        if item["flagged"]:
+            status = "ALERTA"
+        elif item["large_scans"]:
+            status = "varredura esperada"
+        else:
+            status = "ok"
+        sorts = sum(entry["temp_btree"] for entry in item["statements"])
+        rows.append((item["query"], len(item["statements"]), f"{item['ms']:.1f}", item["scans"],
+                     item["large_scans"], sorts or "", status))
+    parts = [
+        f"Verificação do banco - {report['checked_at']} "
+        f"(alerta: SCAN sem LIMIT em tabelas com {report['large_table_rows']} linhas ou mais)",
+        "",
+        _table(("Consulta", "Comandos", "ms", "SCAN", "SCAN grande", "Ordenação temp.", "Situação"), rows),
+    ]
+
+    if report["alerts"]:
+        parts += ["", "Alertas:"] + [f"- {alert}" for alert in report["alerts"]]
+        for item in report["queries"]:
+            if not item["flagged"]:
+                continue
+            for entry in item["statements"]:
+                if any(scan["large"] and not scan["limited"] for scan in entry["scans"]):
+                    parts += ["", f"{item['query']}: {entry['statement']}"]
+                    parts += [f"    {line}" for line in entry["plan"]]
+
+    storage = report["storage"]
+    parts += [
+        "",
+        "Arquivo:",
+        _table(("Item", "Valor"), [
+            ("Arquivo", storage["path"]),
+            ("Tamanho", f"{storage['file_bytes'] / 1024:.0f} KiB"),
+            ("WAL", f"{storage['wal_bytes'] / 1024:.0f} KiB ({storage['journal_mode']})"),
+            ("Páginas", f"{storage['page_count']} x {storage['page_size']} bytes"),
+            ("Páginas livres", f"{storage['freelist_count']} ({storage['freelist_ratio']:.1%})"),
+            ("auto_vacuum", storage["auto_vacuum"]),
+            ("Estatísticas", "sim" if storage["statistics"] else "não (ANALYZE pendente)"),
+        ]),
+        "",
+        "Índices:",
+        _table(("Índice", "Tabela", "Comandos", "Tamanho"), [
+            (index["index"], index["table"], index["statements"] or "sem uso",
+             "" if index["bytes"] is None else f"{index['bytes'] / 1024:.0f} KiB")
+            for index in report["indexes"]
+        ]),
+    ]
+    return "\n".join(parts)
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 sem alertas, 1 se alguma consulta varrer uma tabela grande
+    """
+    parser = argparse.ArgumentParser(description="Verificação dos planos de consulta e do arquivo do banco.")
+    parser.add_argument("--json", action="store_true", help="imprime o relatório em JSON")
+    parser.add_argument("--output", "-o", help="grava o relatório em JSON neste arquivo")
+    parser.add_argument("--min-rows", type=int, default=LARGE_TABLE_ROWS,
+                        help="linhas a partir das quais uma varredura gera alerta")
+    parser.add_argument("--only", default="", help="filtra consultas por substring (separadas por vírgula)")
+    args = parser.parse_args(argv)
+
+    only = [o.strip() for o in args.only.split(",") if o.strip()]
+    report = run_doctor(args.min_rows, only)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report_json(report))
+    print(report_json(report) if args.json else format_report(report))
+    return 1 if report["alerts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
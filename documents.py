@@ -0,0 +1,477 @@
+"""
+Documentos em Lote - Contratos de Adoção e Relatórios Mensais
+-------------------------------------------------------------
+Este módulo gera, a partir de modelos de texto, os contratos dos
+processos de adoção finalizados e os relatórios mensais de cada abrigo,
+em HTML ou texto simples, para um conjunto escolhido de processos ou
+abrigos (ou todos).
+
+1. Dados:
+   - Contratos: uma única consulta com processo, animal, tutor, abrigo e
+     data da finalização (último evento "Finalizado" do histórico), em
+     lotes de IN_BATCH IDs quando a seleção é explícita
+   - Relatórios: abrigos, movimento do mês e ocupação atual lidos dos
+     rollups (três consultas, qualquer que seja o número de abrigos),
+     atualizados antes (rollups.refresh, como o painel)
+   - Registros convertidos em dicionários simples antes da geração: os
+     processos de renderização não abrem o banco
+
+2. Modelos (TEMPLATES):
+   - string.Template ($campo) para cada tipo e formato; valores escapados
+     em HTML
+   - Um diretório com arquivos de mesmo nome (contrato.html,
+     relatorio.txt, relatorio_linha.html...) substitui os modelos padrão
+     (--modelos)
+
+3. Geração em paralelo (generate):
+   - Registros divididos em lotes renderizados e gravados por um
+     ProcessPoolExecutor (um processo por núcleo, início "spawn": seguro
+     com a interface aberta)
+   - Abaixo de PARALLEL_MIN documentos, geração no próprio processo (o
+     custo de iniciar os processos seria maior que o ganho)
+
+4. Uso:
+   - AdoptionsTab: "Gerar contratos" (processos selecionados ou todos os
+     finalizados); ShelterTab: "Relatório mensal"
+   - Linha de comando:
+       python documents.py contratos [--ids 1,2,3] [--formato txt]
+       python documents.py relatorios --mes 2026-09 [--abrigos 1,2]
+
+Variáveis de ambiente:
+    SHELTER_DOCUMENTS_DIR: diretório dos documentos (padrão: documentos)
+"""
+
+import argparse
+import html
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from string import Template
+
+from sqlalchemy import func, select
+
+import rollups
+from database import read_session, session_scope
+from diagnostics import acao
+from models import AdoptionProcess, AdoptionStatusEvent, Animal, RollupDaily, RollupOccupancy, Shelter, User
+
+# Diretório padrão dos documentos gerados
+OUTPUT_DIR = os.environ.get("SHELTER_DOCUMENTS_DIR", "documentos")
+
+# Formatos aceitos
+FORMATS = ("html", "txt")
+
+# Documentos a partir dos quais a geração usa vários processos
+PARALLEL_MIN = 500
+
+# Lotes por processo (equilíbrio entre núcleos com lotes desiguais)
+CHUNKS_PER_WORKER = 4
+
+# IDs por consulta quando a seleção é explícita (limite de parâmetros do SQLite)
+IN_BATCH = 5000
+
+# ========== MODELOS ==========
+
+_CONTRACT_TXT = """\
+CONTRATO DE ADOÇÃO Nº $id
+Data da adoção: $finalized_at
+
+ABRIGO
+  $shelter_name
+  $shelter_address
+  Telefone: $shelter_phone   Email: $shelter_email
+
+ADOTANTE
+  Nome: $user_name
+  Email: $user_email
+  Telefone: $user_phone
+  Cidade: $user_city
+
+ANIMAL
+  Nome: $animal_name
+  Espécie: $species   Raça: $breed
+  Idade: $age ano(s)   Porte: $size   Gênero: $gender
+
+O adotante declara receber o animal acima descrito e assume a
+responsabilidade por sua guarda, saúde e bem-estar, comprometendo-se a
+não abandoná-lo e a comunicar ao abrigo qualquer mudança de endereço.
+
+
+______________________________          ______________________________
+$user_name                              $shelter_name
+"""
+
+_CONTRACT_HTML = """\
+<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>Contrato de adoção nº $id</title></head>
+<body>
+<h1>Contrato de adoção nº $id</h1>
+<p>Data da adoção: $finalized_at</p>
+<h2>Abrigo</h2>
+<p>$shelter_name<br>$shelter_address<br>Telefone: $shelter_phone &middot; Email: $shelter_email</p>
+<h2>Adotante</h2>
+<p>Nome: $user_name<br>Email: $user_email<br>Telefone: $user_phone<br>Cidade: $user_city</p>
+<h2>Animal</h2>
+<p>Nome: $animal_name<br>Espécie: $species &middot; Raça: $breed<br>
+Idade: $age ano(s) &middot; Porte: $size &middot; Gênero: $gender</p>
+<p>O adotante declara receber o animal acima descrito e assume a
+responsabilidade por sua guarda, saúde e bem-estar, comprometendo-se a
+não abandoná-lo e a comunicar ao abrigo qualquer mudança de endereço.</p>
+<table style="width:100%;margin-top:4em"><tr>
+<td>______________________________<br>$user_name</td>
+<td>______________________________<br>$shelter_name</td>
+</tr></table>
+</body>
+</html>
+"""
+
+_REPORT_TXT = """\
+RELATÓRIO MENSAL - $shelter_name
+Mês: $month
+
+Capacidade: $capacity   Ocupação atual: $occupancy ($occupancy_pct)
+Entradas no mês: $intake   Adoções no mês: $adopted
+
+Espécie              Entradas  Adoções  Presentes
+$rows"""
+
+_REPORT_ROW_TXT = "$species$intake$adopted$present\n"
+
+_REPORT_HTML = """\
+<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>Relatório mensal - $shelter_name - $month</title></head>
+<body>
+<h1>Relatório mensal - $shelter_name</h1>
+<p>Mês: $month</p>
+<p>Capacidade: $capacity &middot; Ocupação atual: $occupancy ($occupancy_pct)<br>
+Entradas no mês: $intake &middot; Adoções no mês: $adopted</p>
+<table border="1" cellpadding="4" cellspacing="0">
+<tr><th>Espécie</th><th>Entradas</th><th>Adoções</th><th>Presentes</th></tr>
+$rows</table>
+</body>
+</html>
+"""
+
+_REPORT_ROW_HTML = "<tr><td>$species</td><td>$intake</td><td>$adopted</td><td>$present</td></tr>\n"
+
+# (tipo, formato) → texto do modelo; o nome do arquivo no diretório de
+# modelos personalizados é "<nome>.<formato>"
+TEMPLATES = {
+    ("contract", "txt"): _CONTRACT_TXT,
+    ("contract", "html"): _CONTRACT_HTML,
+    ("report", "txt"): _REPORT_TXT,
+    ("report", "html"): _REPORT_HTML,
+    ("report_row", "txt"): _REPORT_ROW_TXT,
+    ("report_row", "html"): _REPORT_ROW_HTML,
+}
+
+TEMPLATE_FILES = {"contract": "contrato", "report": "relatorio", "report_row": "relatorio_linha"}
+
+
+def load_templates(directory=None):
+    """
+    Modelos em uso: os padrões, substituídos pelos arquivos encontrados
+    no diretório (se informado).
+
+    Returns:
+        dict: (tipo, formato) → texto do modelo
+    """
+    templates = dict(TEMPLATES)
+    if directory:
+        for kind, fmt in TEMPLATES:
+            path = os.path.join(directory, f"{TEMPLATE_FILES[kind]}.{fmt}")
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    templates[kind, fmt] = f.read()
+    return templates
+
+# ========== DADOS ==========
+
+def _text(value):
+    return "-" if value is None or value == "" else str(value)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def contract_records(session, adoption_ids=None):
+    """
+    Dados dos contratos dos processos finalizados.
+
+    Args:
+        adoption_ids (list): Processos escolhidos (None = todos os
+            finalizados); os não finalizados são ignorados
+
+    Returns:
+        list: Dicionários com os campos dos modelos de contrato, por ID
+    """
+    finalized_at = (
+        select(func.max(AdoptionStatusEvent.changed_at))
+        .where(AdoptionStatusEvent.adoption_id == AdoptionProcess.id,
+               AdoptionStatusEvent.to_status == "Finalizado")
+        .scalar_subquery()
+    )
+    stmt = (
+        select(AdoptionProcess.id, finalized_at, Animal.name, Animal.species, Animal.breed, Animal.age,
+               Animal.size, Animal.gender, User.name, User.email, User.phone, User.city,
+               Shelter.name, Shelter.address, Shelter.phone, Shelter.email)
+        .join(Animal, Animal.id == AdoptionProcess.animal_id)
+        .join(User, User.id == AdoptionProcess.user_id)
+        .outerjoin(Shelter, Shelter.id == Animal.shelter_id)
+        .where(AdoptionProcess.status == "Finalizado")
+        .order_by(AdoptionProcess.id)
+    )
+    if adoption_ids is None:
+        rows = session.execute(stmt).all()
+    else:
+        ids = sorted(set(adoption_ids))
+        rows = [row for batch in _chunks(ids, IN_BATCH)
+                for row in session.execute(stmt.where(AdoptionProcess.id.in_(batch)))]
+
+    names = ("id", "finalized_at", "animal_name", "species", "breed", "age", "size", "gender",
+             "user_name", "user_email", "user_phone", "user_city",
+             "shelter_name", "shelter_address", "shelter_phone", "shelter_email")
+    records = []
+    for row in rows:
+        record = {name: _text(value) for name, value in zip(names, row)}
+        if row[1] is not None:
+            record["finalized_at"] = row[1].strftime("%d/%m/%Y")
+        records.append(record)
+    return records
+
+
+def report_records(session, month, shelter_ids=None):
+    """
+    Dados dos relatórios mensais por abrigo (rollups do painel).
+
+    Args:
+        month (date): Qualquer dia do mês do relatório
+        shelter_ids (list): Abrigos escolhidos (None = todos)
+
+    Returns:
+        list: Dicionários com os campos do relatório e "species" (lista
+            de (espécie, entradas, adoções, presentes)), por abrigo
+    """
+    start = month.replace(day=1)
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+    shelters = select(Shelter.id, Shelter.name, Shelter.capacity).order_by(Shelter.id)
+    daily = (
+        select(RollupDaily.shelter_id, RollupDaily.species, func.sum(RollupDaily.intake),
+               func.sum(RollupDaily.adopted))
+        .where(RollupDaily.day >= start, RollupDaily.day < end)
+        .group_by(RollupDaily.shelter_id, RollupDaily.species)
+    )
+    occupancy = select(RollupOccupancy.shelter_id, RollupOccupancy.species, RollupOccupancy.animals)
+    if shelter_ids is not None:
+        shelters = shelters.where(Shelter.id.in_(shelter_ids))
+        daily = daily.where(RollupDaily.shelter_id.in_(shelter_ids))
+        occupancy = occupancy.where(RollupOccupancy.shelter_id.in_(shelter_ids))
+
+    # (abrigo, espécie) → [entradas, adoções, presentes]
+    species = {}
+    for shelter_id, name, intake, adopted in session.execute(daily):
+        species.setdefault(shelter_id, {}).setdefault(name, [0, 0, 0])[:2] = [intake or 0, adopted or 0]
+    for shelter_id, name, animals in session.execute(occupancy):
+        species.setdefault(shelter_id, {}).setdefault(name, [0, 0, 0])[2] = animals
+
+    records = []
+    for shelter_id, name, capacity in session.execute(shelters):
+        lines = sorted(((s, *counts) for s, counts in species.get(shelter_id, {}).items()
+                        if any(counts)), key=lambda line: str(line[0]))
+        present = sum(line[3] for line in lines)
+        records.append({
+            "id": shelter_id,
+            "shelter_name": _text(name),
+            "month": start.strftime("%m/%Y"),
+            "month_key": start.strftime("%Y-%m"),
+            "capacity": capacity or 0,
+            "occupancy": present,
+            "occupancy_pct": f"{present / capacity:.0%}" if capacity else "-",
+            "intake": sum(line[1] for line in lines),
+            "adopted": sum(line[2] for line in lines),
+            "species": [(_text(s), intake, adopted, n) for s, intake, adopted, n in lines],
+        })
+    return records
+
+# ========== RENDERIZAÇÃO ==========
+
+def _escaped(record, fmt):
+    if fmt != "html":
+        return record
+    return {key: html.escape(str(value)) for key, value in record.items()}
+
+
+def render(kind, fmt, record, templates=None):
+    """
+    Renderiza um documento.
+
+    Args:
+        kind (str): "contract" ou "report"
+        fmt (str): "html" ou "txt"
+        record (dict): Registro de contract_records/report_records
+        templates (dict): Modelos (padrão: TEMPLATES)
+
+    Returns:
+        tuple: (nome do arquivo, texto)
+    """
+    templates = templates or TEMPLATES
+    if kind == "contract":
+        name = f"contrato_{record['id']}.{fmt}"
+        text = Template(templates[kind, fmt]).safe_substitute(_escaped(record, fmt))
+        return name, text
+
+    row = Template(templates["report_row", fmt])
+    rows = []
+    for species, intake, adopted, present in record["species"]:
+        if fmt == "html":
+            values = {"species": html.escape(species), "intake": intake, "adopted": adopted, "present": present}
+        else:
+            values = {"species": f"{species:<20} ", "intake": f"{intake:>8} ",
+                      "adopted": f"{adopted:>8} ", "present": f"{present:>10}"}
+        rows.append(row.safe_substitute(values))
+    fields = _escaped({k: v for k, v in record.items() if k != "species"}, fmt)
+    fields["rows"] = "".join(rows)
+    name = f"relatorio_{record['id']}_{record['month_key']}.{fmt}"
+    return name, Template(templates[kind, fmt]).safe_substitute(fields)
+
+
+def _render_chunk(args):
+    """Renderiza e grava um lote (executado nos processos do pool)."""
+    kind, fmt, records, out_dir, templates = args
+    paths = []
+    for record in records:
+        name, text = render(kind, fmt, record, templates)
+        path = os.path.join(out_dir, name)
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def generate(kind, records, out_dir=OUTPUT_DIR, fmt="html", workers=None, templates=None):
+    """
+    Renderiza e grava os documentos, em paralelo a partir de PARALLEL_MIN.
+
+    Args:
+        kind (str): "contract" ou "report"
+        records (list): Registros (contract_records/report_records)
+        out_dir (str): Diretório de saída (criado se necessário)
+        fmt (str): "html" ou "txt"
+        workers (int): Processos (padrão: núcleos da máquina; 1 = sem pool)
+        templates (dict): Modelos (padrão: TEMPLATES)
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconhecido: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    templates = templates or TEMPLATES
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(records) < PARALLEL_MIN:
+        return _render_chunk((kind, fmt, records, out_dir, templates))
+
+    size = -(-len(records) // (workers * CHUNKS_PER_WORKER))
+    jobs = [(kind, fmt, chunk, out_dir, templates) for chunk in _chunks(records, size)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return [path for paths in pool.map(_render_chunk, jobs) for path in paths]
+
+
+def generate_contracts(adoption_ids=None, out_dir=OUTPUT_DIR, fmt="html", workers=None, templates=None):
+    """
+    Gera os contratos dos processos finalizados escolhidos (None = todos).
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    with acao("Documentos: contratos"):
+        with read_session() as s:
+            records = contract_records(s, adoption_ids)
+        return generate("contract", records, out_dir, fmt, workers, templates)
+
+
+def generate_reports(month, shelter_ids=None, out_dir=OUTPUT_DIR, fmt="html", workers=None, templates=None):
+    """
+    Gera os relatórios mensais dos abrigos escolhidos (None = todos).
+
+    Returns:
+        list: Caminhos dos arquivos gravados
+    """
+    with acao("Documentos: relatórios"):
+        with session_scope() as s:
+            rollups.refresh(s)
+        with read_session() as s:
+            records = report_records(s, month, shelter_ids)
+        return generate("report", records, out_dir, fmt, workers, templates)
+
+def previous_month(today=None):
+    """Primeiro dia do mês anterior (mês padrão dos relatórios)."""
+    first = (today or date.today()).replace(day=1)
+    return date(first.year - (first.month == 1), (first.month - 2) % 12 + 1, 1)
+
+
+def parse_month(text):
+    """
+    Converte "AAAA-MM" (ou "MM/AAAA") no primeiro dia do mês.
+
+    Raises:
+        ValueError: Texto fora dos dois formatos
+    """
+    text = text.strip()
+    if "/" in text:
+        month, year = text.split("/")
+    else:
+        year, month = text.split("-")
+    return date(int(year), int(month), 1)
+
+# ========== LINHA DE COMANDO ==========
+
+def _ids(text):
+    return [int(part) for part in text.split(",") if part.strip()] if text else None
+
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso, 1 em caso de falha
+    """
+    parser = argparse.ArgumentParser(description="Contratos de adoção e relatórios mensais em lote.")
+    parser.add_argument("tipo", choices=("contratos", "relatorios"))
+    parser.add_argument("--ids", default="", help="processos (contratos), separados por vírgula")
+    parser.add_argument("--abrigos", default="", help="abrigos (relatórios), separados por vírgula")
+    parser.add_argument("--mes", default="", help="mês do relatório, AAAA-MM (padrão: mês anterior)")
+    parser.add_argument("--formato", choices=FORMATS, default="html")
+    parser.add_argument("--saida", "-o", default=OUTPUT_DIR, help="diretório dos documentos")
+    parser.add_argument("--modelos", default="", help="diretório com modelos personalizados")
+    parser.add_argument("--processos", type=int, default=None, help="processos de renderização")
+    args = parser.parse_args(argv)
+
+    templates = load_templates(args.modelos)
+    started = time.perf_counter()
+    try:
+        if args.tipo == "contratos":
+            paths = generate_contracts(_ids(args.ids), args.saida, args.formato, args.processos, templates)
+        else:
+            reference = parse_month(args.mes) if args.mes else previous_month()
+            paths = generate_reports(reference, _ids(args.abrigos), args.saida, args.formato,
+                                     args.processos, templates)
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    print(f"{len(paths)} documentos gravados em {args.saida} ({time.perf_counter() - started:.1f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
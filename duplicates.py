@@ -0,0 +1,229 @@
+"""
+Detecção de Tutores Duplicados - Bloqueio e Similaridade de Nomes
+-----------------------------------------------------------------
+Este módulo encontra tutores provavelmente cadastrados mais de uma vez
+(email com outra grafia, nome digitado de outro jeito, telefone com
+outra formatação), que a restrição UNIQUE de email não detecta.
+
+1. Bloqueio (blocking):
+   - Só são comparados tutores que compartilham uma chave de bloqueio:
+     telefone normalizado (users.phone_key) ou parte local do email
+     normalizada (users.email_key), ambas indexadas
+   - As chaves são mantidas pelo próprio modelo User (validates) e por
+     backfill_keys para cadastros anteriores
+   - Blocos maiores que MAX_BLOCK (ex: telefone genérico "11999999999")
+     não identificam ninguém e são ignorados na varredura
+
+2. Pontuação:
+   - Similaridade de Jaccard entre os trigramas dos nomes normalizados
+     (sem acento, minúsculos)
+   - Telefone e email iguais → duplicado, qualquer que seja o nome
+   - Apenas um deles igual → duplicado se a similaridade do nome for ao
+     menos MIN_NAME_SIMILARITY (evita familiares que dividem telefone)
+
+3. Uso:
+   - find_similar: verificação ao salvar (UsersTab.save), consultas por
+     índice, sem varrer a tabela
+   - scan: varredura completa em lote; pares gerados no banco por
+     auto-junção nas chaves indexadas
+
+Exemplo de uso:
+    with read_session() as s:
+        for user_id, name, email, phone, sim, reasons in duplicates.find_similar(
+                s, "Ana Silva", "ana.silva@gmail.com", "11987654321"):
+            print(user_id, name, reasons)
+"""
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+from models import User
+from utils import email_key, normalize_text, phone_key
+
+# Similaridade mínima de nome quando só uma das chaves coincide
+MIN_NAME_SIMILARITY = 0.4
+
+# Blocos com mais tutores que isto são ignorados na varredura
+MAX_BLOCK = 50
+
+# Quantidade de IDs por consulta IN e de linhas por lote no backfill
+CHUNK_SIZE = 500
+BACKFILL_BATCH = 5000
+
+# Rótulos exibidos para cada chave coincidente
+REASONS = {"phone_key": "telefone", "email_key": "email"}
+
+# ========== SIMILARIDADE ==========
+
+def trigrams(name):
+    """
+    Trigramas do nome normalizado (com espaços nas bordas, para que
+    início e fim das palavras pesem na comparação).
+
+    Returns:
+        set: Conjunto de trigramas
+    """
+    padded = f"  {normalize_text(name)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def name_similarity(a, b):
+    """
+    Similaridade de Jaccard entre os trigramas de dois nomes.
+
+    Returns:
+        float: 0.0 (nada em comum) a 1.0 (iguais após normalização)
+    """
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def _is_duplicate(similarity, reasons):
+    """Regra de decisão (ver seção 2 do módulo)."""
+    return len(reasons) > 1 or (reasons and similarity >= MIN_NAME_SIMILARITY)
+
+# ========== VERIFICAÇÃO AO SALVAR ==========
+
+def find_similar(session, name, email, phone, exclude_id=None, limit=10):
+    """
+    Procura tutores parecidos com os dados informados (antes de salvar).
+
+    Consulta apenas os blocos do telefone e do email informados, pelos
+    índices de users.phone_key e users.email_key.
+
+    Args:
+        name (str): Nome digitado
+        email (str): Email digitado
+        phone (str): Telefone digitado (qualquer formato)
+        exclude_id (int): ID do próprio tutor, em edições
+        limit (int): Quantidade máxima de resultados
+
+    Returns:
+        list: Tuplas (id, nome, email, telefone, similaridade do nome,
+              motivos), mais motivos e maior similaridade primeiro
+    """
+    keys = {"phone_key": phone_key(phone), "email_key": email_key(email)}
+    conditions = [getattr(User, column) == value for column, value in keys.items() if value]
+    if not conditions:
+        return []
+    stmt = (
+        select(User.id, User.name, User.email, User.phone, User.phone_key, User.email_key)
+        .where(or_(*conditions))
+        .limit(MAX_BLOCK * len(conditions))
+    )
+    if exclude_id is not None:
+        stmt = stmt.where(User.id != exclude_id)
+
+    matches = []
+    for user_id, other_name, other_email, other_phone, other_phone_key, other_email_key in session.execute(stmt):
+        found = {"phone_key": other_phone_key, "email_key": other_email_key}
+        reasons = [REASONS[c] for c, value in keys.items() if value and found[c] == value]
+        similarity = name_similarity(name, other_name)
+        if _is_duplicate(similarity, reasons):
+            matches.append((user_id, other_name, other_email, other_phone, similarity, reasons))
+    matches.sort(key=lambda m: (-len(m[5]), -m[4], m[0]))
+    return matches[:limit]
+
+# ========== VARREDURA EM LOTE ==========
+
+def _block_pairs(session, column, max_block):
+    """
+    Pares (id menor, id maior) que compartilham uma chave de bloqueio.
+
+    Os blocos com mais de um tutor saem de um GROUP BY sobre o índice da
+    chave; os pares, de uma auto-junção restrita a esses blocos.
+    """
+    key = getattr(User, column)
+    blocks = (
+        select(key)
+        .where(key.is_not(None))
+        .group_by(key)
+        .having(func.count() > 1, func.count() <= max_block)
+    )
+    other = aliased(User)
+    other_key = getattr(other, column)
+    stmt = (
+        select(User.id, other.id)
+        .join(other, and_(other_key == key, other.id > User.id))
+        .where(key.in_(blocks))
+    )
+    return session.execute(stmt).all()
+
+
+def scan(session, max_block=MAX_BLOCK):
+    """
+    Varre todos os tutores em busca de duplicados prováveis.
+
+    Args:
+        max_block (int): Blocos maiores que isto são ignorados
+
+    Returns:
+        list: Tuplas (id, nome, id do provável duplicado, nome dele,
+              similaridade do nome, motivos), mais motivos e maior
+              similaridade primeiro
+    """
+    reasons = {}
+    for column, label in REASONS.items():
+        for pair in _block_pairs(session, column, max_block):
+            reasons.setdefault(pair, []).append(label)
+    if not reasons:
+        return []
+
+    ids = sorted({user_id for pair in reasons for user_id in pair})
+    names = {}
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        names.update(session.execute(select(User.id, User.name).where(User.id.in_(chunk))).all())
+
+    trigram_cache = {}
+
+    def grams(user_id):
+        if user_id not in trigram_cache:
+            trigram_cache[user_id] = trigrams(names.get(user_id))
+        return trigram_cache[user_id]
+
+    results = []
+    for (a, b), labels in reasons.items():
+        ta, tb = grams(a), grams(b)
+        similarity = len(ta & tb) / len(ta | tb) if ta and tb else 0.0
+        if _is_duplicate(similarity, labels):
+            results.append((a, names.get(a), b, names.get(b), similarity, labels))
+    results.sort(key=lambda r: (-len(r[5]), -r[4], r[0], r[2]))
+    return results
+
+# ========== CHAVES DE CADASTROS ANTERIORES ==========
+
+def backfill_keys(session, batch_size=BACKFILL_BATCH):
+    """
+    Preenche phone_key/email_key de tutores gravados antes das chaves
+    existirem (ou por outros programas). Idempotente; o commit fica a
+    cargo do chamador.
+
+    Returns:
+        int: Tutores atualizados
+    """
+    table = User.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(phone_key=bindparam("b_phone_key"), email_key=bindparam("b_email_key"))
+    )
+    missing = or_(and_(User.phone_key.is_(None), User.phone.is_not(None)),
+                  and_(User.email_key.is_(None), User.email.is_not(None)))
+    updated, last_id = 0, 0
+    while True:
+        rows = session.execute(
+            select(User.id, User.phone, User.email)
+            .where(missing, User.id > last_id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        params = [{"b_id": user_id, "b_phone_key": phone_key(phone), "b_email_key": email_key(email)}
+                  for user_id, phone, email in rows]
+        session.connection().execute(stmt, params)
+        updated += len(rows)
+        last_id = rows[-1][0]
@@ -41,7 +41,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sv_ttk
 
-from database import session
+from database import read_session
 from models import AuthUser
 
 def login_screen():
@@ -107,8 +107,10 @@ def login_screen():
             messagebox.showerror("Erro", "Digite usuário e senha!")
             return
 
-        # Busca o usuário no banco de dados
-        user = session.query(AuthUser).filter_by(username=username).first()
+        # Busca o usuário no banco de dados (sessão curta de leitura; o
+        # objeto continua utilizável após o fechamento da sessão)
+        with read_session() as s:
+            user = s.query(AuthUser).filter_by(username=username).first()
         
         # Verifica se usuário existe e senha está correta
         if user and user.check_password(password):
@@ -9,7 +9,10 @@ Funcionalidades principais:
 - Tela de login segura
 - Carregamento da interface principal com abas
 - Controle de acesso baseado em nível de usuário
+- Painel gerencial para administradores e gestores
 - Gerenciamento de tema visual
+- Cópias de segurança agendadas (backup.py)
+- Manutenção do banco com a aplicação ociosa (maintenance.py)
 
 Arquitetura da aplicação:
 - Model-View-Controller implícito
@@ -33,8 +36,11 @@ from adoptions_tab import AdoptionsTab
 from users_tab import UsersTab
 from shelter_tab import ShelterTab
 from search_tab import SearchTab
+from dashboard_tab import DashboardTab
 from adm_tab import AdmTab
 from database import init_db
+import backup
+import maintenance
 from login import login_screen
 
 class MainApp(tk.Tk):
@@ -100,6 +106,13 @@ class MainApp(tk.Tk):
         self.search_tab = SearchTab(self.notebook)
         self.notebook.add(self.search_tab, text="Pesquisa")
         
+        # ========== PAINEL GERENCIAL (ADMINS E GESTORES) ==========
+
+        # Entradas, adoções e ocupação lidas das tabelas de rollup
+        if usuario_logado and usuario_logado.nivel_acesso in ("admin", "gestor"):
+            self.dashboard_tab = DashboardTab(self.notebook)
+            self.notebook.add(self.dashboard_tab, text="Painel")
+
         # ========== ABA ADMINISTRATIVA (SOMENTE ADMINS) ==========
         
         # Verifica se o usuário tem permissão de admin
@@ -107,6 +120,9 @@ class MainApp(tk.Tk):
             self.adm_tab = AdmTab(self.notebook, usuario_logado)
             self.notebook.add(self.adm_tab, text="ADM")
         
+        # Manutenção do banco quando não há uso (ANALYZE, vacuum, checkpoint)
+        self.maintenance = maintenance.start_scheduler(self)
+
         # Personaliza o título com informações do usuário
         if usuario_logado:
             self.title(f"Sistema de Abrigo Animal - Usuário: {usuario_logado.username}")
@@ -116,7 +132,7 @@ class MainApp(tk.Tk):
         Recarrega os dados em todas as abas existentes.
         Chamado após operações de 'Salvar' para manter a UI sincronizada.
         """
-        for attr in ("animals_tab", "adoptions_tab", "users_tab", "shelter_tab", "search_tab", "adm_tab"):
+        for attr in ("animals_tab", "adoptions_tab", "users_tab", "shelter_tab", "search_tab", "dashboard_tab", "adm_tab"):
             tab = getattr(self, attr, None)
             if tab and hasattr(tab, "load"):
                 try:
@@ -139,6 +155,9 @@ if __name__ == "__main__":
     # Inicialização do banco de dados
     print("Inicializando banco de dados...")
     init_db()
+
+    # Cópias de segurança agendadas (thread em segundo plano)
+    backup.start_scheduler()
     
     # Tela de login
     print("Carregando tela de login...")
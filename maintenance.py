@@ -0,0 +1,323 @@
+"""
+Manutenção em Ociosidade - Estatísticas, Compactação e Checkpoint
+-----------------------------------------------------------------
+Este módulo executa a manutenção periódica do arquivo SQLite enquanto a
+aplicação está parada, sem que o usuário perceba: estatísticas do
+planejador atualizadas, páginas livres devolvidas ao sistema e WAL
+transferido para o banco.
+
+1. Tarefas (STEPS, nesta ordem):
+   - analyze: ANALYZE tabela a tabela, limitado a ANALYSIS_LIMIT linhas
+     por índice (PRAGMA analysis_limit): estatísticas aproximadas em
+     milissegundos mesmo em tabelas com milhões de linhas
+   - optimize: PRAGMA optimize (ajustes que o próprio SQLite julga úteis)
+   - vacuum: PRAGMA incremental_vacuum em passos de VACUUM_PAGES_PER_STEP
+     páginas, apenas em bancos com auto_vacuum = INCREMENTAL (bancos
+     novos, ver init_db; bancos existentes são convertidos uma vez por
+     "python maintenance.py --converter", com o sistema fechado)
+   - checkpoint: PRAGMA wal_checkpoint(PASSIVE), apenas em modo WAL; não
+     espera por leitores nem escritores
+   - Cada tarefa é dividida em comandos curtos; entre eles o pedido de
+     interrupção é verificado
+
+2. Agendamento (MaintenanceScheduler, pela janela principal):
+   - Tk after() verifica a cada POLL_MS se houve entrada do usuário
+     (teclado, mouse) nos últimos IDLE_SECONDS; só então a manutenção é
+     iniciada, numa thread com conexão própria, no máximo uma vez a cada
+     INTERVAL_HOURS
+   - Qualquer entrada durante a execução interrompe o comando em curso
+     (sqlite3.Connection.interrupt): o bloqueio do arquivo é liberado na
+     hora e as tarefas restantes ficam para o próximo período ocioso
+
+3. Registro:
+   - Cada tarefa é uma ação do diagnóstico ("Manutenção: ..."), com os
+     comandos e tempos na seção de diagnóstico da AdmTab; execuções
+     interrompidas recebem o sufixo "(interrompida)"
+
+Variáveis de ambiente:
+    SHELTER_MAINTENANCE_HOURS: intervalo entre execuções; 0 desativa
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import OperationalError
+
+import database
+from diagnostics import acao
+
+# Tempo sem entrada do usuário para considerar a aplicação ociosa (s)
+IDLE_SECONDS = 60
+
+# Intervalo de verificação da ociosidade (ms)
+POLL_MS = 5000
+
+# Intervalo entre execuções completas (horas)
+INTERVAL_HOURS = float(os.environ.get("SHELTER_MAINTENANCE_HOURS", "24"))
+
+# Linhas examinadas por índice no ANALYZE (0 = tabela inteira)
+ANALYSIS_LIMIT = 1000
+
+# Páginas devolvidas por comando de vacuum incremental
+VACUUM_PAGES_PER_STEP = 256
+
+# Eventos que indicam que o usuário voltou a usar a aplicação
+INPUT_EVENTS = ("<KeyPress>", "<ButtonPress>", "<Motion>", "<MouseWheel>")
+
+# ========== TAREFAS ==========
+# Cada tarefa é um gerador que executa um comando curto por iteração.
+
+def _analyze(conn):
+    """Estatísticas do planejador, uma tabela por comando."""
+    conn.exec_driver_sql(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    try:
+        for table in inspect(conn).get_table_names():
+            conn.exec_driver_sql(f'ANALYZE main."{table}"')
+            yield
+    finally:
+        conn.exec_driver_sql("PRAGMA analysis_limit = 0")
+
+
+def _optimize(conn):
+    """PRAGMA optimize."""
+    conn.exec_driver_sql("PRAGMA main.optimize")
+    yield
+
+
+def _incremental_vacuum(conn):
+    """
+    Devolve as páginas livres aos poucos (auto_vacuum = INCREMENTAL).
+
+    O cursor do sqlite3 avança o PRAGMA um único passo (uma página);
+    executescript o executa até o fim.
+    """
+    if conn.exec_driver_sql("PRAGMA main.auto_vacuum").scalar() != 2:
+        return
+    driver = conn.connection.driver_connection
+    while conn.exec_driver_sql("PRAGMA main.freelist_count").scalar():
+        driver.executescript(f"PRAGMA main.incremental_vacuum({VACUUM_PAGES_PER_STEP})")
+        yield
+
+
+def _checkpoint(conn):
+    """Checkpoint passivo do WAL (somente em modo WAL)."""
+    if conn.exec_driver_sql("PRAGMA main.journal_mode").scalar() != "wal":
+        return
+    conn.exec_driver_sql("PRAGMA main.wal_checkpoint(PASSIVE)").fetchall()
+    yield
+
+
+# Chave → (rótulo no diagnóstico, tarefa)
+STEPS = {
+    "analyze": ("estatísticas (ANALYZE)", _analyze),
+    "optimize": ("PRAGMA optimize", _optimize),
+    "vacuum": ("vacuum incremental", _incremental_vacuum),
+    "checkpoint": ("checkpoint do WAL", _checkpoint),
+}
+
+# ========== EXECUÇÃO ==========
+
+def run_maintenance(bind=None, steps=None, cancel=None, on_connection=None):
+    """
+    Executa as tarefas de manutenção, parando ao primeiro pedido de
+    interrupção.
+
+    Args:
+        bind: Engine alvo (padrão: engine da aplicação)
+        steps (list): Chaves de STEPS a executar (padrão: todas)
+        cancel (threading.Event): Pedido de interrupção
+        on_connection (callable): Recebe a conexão sqlite3 em uso (para
+            interrupt()) e None ao final
+
+    Returns:
+        list: Chaves das tarefas concluídas
+
+    Raises:
+        OperationalError: Falha que não foi causada por interrupção
+    """
+    bind = bind or database.engine
+    cancel = cancel or threading.Event()
+    done = []
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if on_connection:
+            on_connection(conn.connection.driver_connection)
+        try:
+            for key in steps or STEPS:
+                if cancel.is_set():
+                    break
+                label, task = STEPS[key]
+                with acao(f"Manutenção: {label}") as record:
+                    try:
+                        for _ in task(conn):
+                            if cancel.is_set():
+                                break
+                    except OperationalError:
+                        if not cancel.is_set():
+                            record.name += " (falhou)"
+                            raise
+                    if cancel.is_set():
+                        record.name += " (interrompida)"
+                        break
+                done.append(key)
+        finally:
+            if on_connection:
+                on_connection(None)
+    return done
+
+
+def enable_incremental_vacuum(bind=None):
+    """
+    Converte um banco existente para auto_vacuum = INCREMENTAL.
+
+    Exige um VACUUM completo (reescreve o arquivo inteiro e bloqueia as
+    gravações até terminar): usar com o sistema fechado.
+
+    Returns:
+        int: Páginas livres antes da conversão
+    """
+    bind = bind or database.engine
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        free = conn.exec_driver_sql("PRAGMA main.freelist_count").scalar()
+        conn.exec_driver_sql("PRAGMA main.auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM main")
+    return free
+
+# ========== AGENDAMENTO ==========
+
+class MaintenanceScheduler:
+    """
+    Dispara run_maintenance quando a janela fica ociosa.
+
+    Atributos:
+        idle_s (float): Tempo sem entrada do usuário para iniciar (s)
+        interval_s (float): Intervalo entre execuções completas (s)
+        last_run (tuple): (data, tarefas concluídas, erro ou None)
+    """
+
+    def __init__(self, root, idle_s=IDLE_SECONDS, interval_hours=INTERVAL_HOURS, bind=None):
+        self.root = root
+        self.idle_s = idle_s
+        self.interval_s = interval_hours * 3600
+        self.bind = bind
+        self.last_run = None
+        self._last_input = time.monotonic()
+        self._next_due = time.monotonic()
+        self._pending = []
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._thread = None
+        self._after_id = None
+
+    @property
+    def running(self):
+        """Indica se há uma execução em andamento."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Passa a observar a entrada do usuário e a ociosidade."""
+        for sequence in INPUT_EVENTS:
+            self.root.bind_all(sequence, self._on_input, add="+")
+        self._after_id = self.root.after(POLL_MS, self._poll)
+
+    def stop(self):
+        """Interrompe a execução em andamento e o agendamento."""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self.cancel()
+
+    def cancel(self):
+        """Interrompe o comando em curso (as tarefas restantes ficam pendentes)."""
+        self._cancel.set()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.interrupt()
+
+    def _set_connection(self, connection):
+        with self._lock:
+            self._connection = connection
+
+    def _on_input(self, event=None):
+        self._last_input = time.monotonic()
+        if self.running and not self._cancel.is_set():
+            self.cancel()
+
+    def _poll(self):
+        self._after_id = self.root.after(POLL_MS, self._poll)
+        now = time.monotonic()
+        if self.running or now - self._last_input < self.idle_s:
+            return
+        if not self._pending:
+            if now < self._next_due:
+                return
+            self._pending = list(STEPS)
+            self._next_due = now + self.interval_s
+        self._cancel.clear()
+        self._thread = threading.Thread(target=self._run, args=(list(self._pending),),
+                                        name="manutencao", daemon=True)
+        self._thread.start()
+
+    def _run(self, steps):
+        try:
+            done = run_maintenance(self.bind, steps, self._cancel, self._set_connection)
+        except Exception as e:
+            print(f"Falha na manutenção: {e}")
+            self.last_run = (datetime.now(), [], str(e))
+            # Nova tentativa após um décimo do intervalo
+            self._pending = []
+            self._next_due = time.monotonic() + self.interval_s / 10
+            return
+        self._pending = [key for key in steps if key not in done]
+        self.last_run = (datetime.now(), done, None)
+
+
+def start_scheduler(root):
+    """
+    Inicia a manutenção em ociosidade da janela principal.
+
+    Args:
+        root (tk.Tk): Janela principal
+
+    Returns:
+        MaintenanceScheduler: Agendador iniciado (None se desativado)
+    """
+    if INTERVAL_HOURS <= 0:
+        return None
+    scheduler = MaintenanceScheduler(root)
+    scheduler.start()
+    return scheduler
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso, 1 em caso de falha
+    """
+    parser = argparse.ArgumentParser(description="Manutenção do banco do abrigo.")
+    parser.add_argument("--converter", action="store_true",
+                        help="converte o banco para vacuum incremental (VACUUM completo, sistema fechado)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.converter:
+            free = enable_incremental_vacuum()
+            print(f"Banco convertido; {free} páginas livres devolvidas.")
+        for key in run_maintenance():
+            print(f"{STEPS[key][0]}: ok")
+    except OperationalError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
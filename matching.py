@@ -0,0 +1,544 @@
+"""
+Compatibilidade Animal–Tutor - Preferências de Adoção Indexadas
+---------------------------------------------------------------
+Este módulo interpreta o texto livre de users.adoption_preferences e
+sugere, no formulário de adoção, os tutores mais compatíveis com um
+animal e os animais disponíveis mais compatíveis com um tutor.
+
+1. Interpretação (parse_preferences):
+   - Texto normalizado (sem acento, minúsculo) e dividido em palavras
+   - Espécie, porte e temperamento por vocabulário (ex: "cão", "gata",
+     "apartamento" → porte pequeno/médio, "calmo" → dócil)
+   - Faixa de idade por palavras ("filhote", "idoso") e números
+     ("até 2 anos", "mais de 5 anos", "entre 1 e 3 anos")
+   - Termos após "não"/"sem" na mesma oração são ignorados
+   - Textos repetidos são interpretados uma única vez (cache)
+
+2. Índice invertido dos tutores (TutorIndex):
+   - Apenas tutores com alguma preferência reconhecida
+   - Um bitset por valor aceito de cada critério e um bitset dos tutores
+     que declararam o critério; faixas de idade agrupadas por (mín, máx)
+   - Sincronizado como bitmap_index.py: IDs alterados entregues por
+     database.ao_confirmar, PRAGMA data_version para outros processos,
+     reconstrução numa thread
+
+3. Lado dos animais:
+   - Reaproveita o índice bitmap da SearchTab (bitmap_index.get_index),
+     restrito aos animais disponíveis, como a combobox do formulário
+
+4. Pontuação (igual nos dois sentidos):
+   - Espécie declarada e diferente → incompatível
+   - Demais critérios: cada um atendido soma; cada um divergente conta
+     contra, como desempate
+   - Ordem: mais critérios atendidos, menos divergências, menor ID
+     (animal há mais tempo no abrigo / tutor mais antigo)
+   - Sem nenhum critério atendido não há sugestão
+   - As combinações de critérios são percorridas por interseção de
+     bitsets, da melhor para a pior, até completar os k resultados
+
+Exemplo de uso:
+    with read_session() as s:
+        tutores = matching.tutors_for_animal(s, animal_id)
+    if tutores is None:
+        ...  # índices em construção; tentar novamente em instantes
+"""
+
+import bisect
+import re
+import threading
+from array import array
+from functools import lru_cache
+from itertools import product
+
+from sqlalchemy import select
+
+import bitmap_index
+import database
+from models import Animal, User
+from utils import normalize_text
+
+# Quantidade padrão de sugestões exibidas
+TOP_K = 10
+
+# Tutores atualizados incrementalmente antes de reconstruir o índice
+MAX_CHANGES = 50_000
+
+# IDs por consulta ao reler tutores alterados (limite de variáveis do SQLite)
+FETCH_CHUNK = 500
+
+# Critérios na ordem de exibição (espécie é eliminatória)
+CRITERIA = ("species", "size", "temperament", "age")
+REQUIRED = ("species",)
+LABELS = {"species": "espécie", "size": "porte", "temperament": "temperamento", "age": "idade"}
+
+# ========== INTERPRETAÇÃO DAS PREFERÊNCIAS ==========
+
+# Palavra normalizada → valores aceitos (listas de utils.py)
+VOCABULARY = {
+    "species": {
+        **dict.fromkeys(("cachorro", "cachorros", "cachorra", "cachorrinho", "cao", "caes",
+                         "cadela", "cachorrinha", "canino"), ("Cachorro",)),
+        **dict.fromkeys(("gato", "gatos", "gata", "gatas", "gatinho", "gatinha", "felino"), ("Gato",)),
+        **dict.fromkeys(("coelho", "coelhos", "coelha"), ("Coelho",)),
+        **dict.fromkeys(("passaro", "passaros", "ave", "aves", "calopsita", "periquito"), ("Pássaro",)),
+        **dict.fromkeys(("roedor", "roedores", "hamster", "porquinho", "chinchila"), ("Roedor",)),
+    },
+    "size": {
+        **dict.fromkeys(("pequeno", "pequena", "pequenos", "mini"), ("Pequeno",)),
+        **dict.fromkeys(("medio", "media", "medios"), ("Médio",)),
+        **dict.fromkeys(("grande", "grandes"), ("Grande",)),
+        "apartamento": ("Pequeno", "Médio"),
+        "quintal": ("Médio", "Grande"),
+        "sitio": ("Médio", "Grande"),
+    },
+    "temperament": {
+        **dict.fromkeys(("docil", "calmo", "calma", "tranquilo", "tranquila", "manso", "mansa"), ("Dócil",)),
+        **dict.fromkeys(("sociavel", "sociaveis", "amigavel", "carinhoso", "carinhosa"), ("Sociável",)),
+        **dict.fromkeys(("brincalhao", "brincalhona", "ativo", "ativa", "energetico", "agitado"),
+                        ("Brincalhão",)),
+        **dict.fromkeys(("medroso", "medrosa", "timido", "timida"), ("Medroso",)),
+    },
+}
+
+# Palavras de idade → (mínima, máxima) em anos (None = sem limite)
+AGE_WORDS = {
+    "filhote": (0, 1), "filhotes": (0, 1),
+    "jovem": (0, 3), "jovens": (0, 3),
+    "adulto": (2, None), "adulta": (2, None), "adultos": (2, None),
+    "idoso": (8, None), "idosa": (8, None), "senior": (8, None), "velhinho": (8, None),
+}
+
+# Palavras que anulam os termos seguintes até o fim da oração
+# ("não quer gato, ...", "sem quintal")
+NEGATIONS = {"nao", "sem", "nada", "nenhum"}
+
+# Palavras após as quais "grande"/"pequeno" descrevem o lugar, não o animal
+PLACES = {"quintal", "casa", "apartamento", "espaco", "area", "terreno", "sitio"}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_CLAUSE = re.compile(r"[,.;:!?()/]|\bmas\b")
+_BETWEEN = re.compile(r"(?:entre|de) (\d+) (?:e|a) (\d+) anos?")
+_MAX = re.compile(r"(?:ate|menos de|no maximo) (\d+) anos?")
+_MIN = re.compile(r"(?:mais de|acima de|a partir de|pelo menos|no minimo) (\d+) anos?")
+
+
+@lru_cache(maxsize=4096)
+def parse_preferences(text):
+    """
+    Interpreta o texto de preferências de um tutor.
+
+    Args:
+        text (str): Conteúdo de users.adoption_preferences
+
+    Returns:
+        dict: Critério → frozenset de valores aceitos (espécie, porte,
+              temperamento) ou (mínima, máxima) (idade), apenas para os
+              critérios reconhecidos; vazio se nada foi reconhecido
+
+    Exemplo:
+        parse_preferences("Prefere cachorro de porte pequeno")
+        → {"species": {"Cachorro"}, "size": {"Pequeno"}}
+    """
+    if not text:
+        return {}
+    normalized = normalize_text(text)
+    words, negated = [], []
+    for clause in _CLAUSE.split(normalized):
+        denied = False
+        for word in _WORD.findall(clause):
+            denied = denied or word in NEGATIONS
+            words.append(word)
+            negated.append(denied)
+    found = {}
+    age = [None, None]
+    for i, word in enumerate(words):
+        previous = words[i - 1] if i else ""
+        if negated[i]:
+            continue
+        for criterion, vocabulary in VOCABULARY.items():
+            values = vocabulary.get(word)
+            if values is None:
+                continue
+            if criterion == "size" and word not in PLACES and previous in PLACES:
+                continue
+            found.setdefault(criterion, set()).update(values)
+        if word in AGE_WORDS:
+            low, high = AGE_WORDS[word]
+            age = [low if age[0] is None else age[0], high if age[1] is None else age[1]]
+
+    # Números explícitos prevalecem sobre as palavras
+    text = " ".join(words)
+    match = _BETWEEN.search(text)
+    if match:
+        age = sorted((int(match.group(1)), int(match.group(2))))
+    else:
+        match = _MAX.search(text)
+        if match:
+            age[1] = int(match.group(1))
+        match = _MIN.search(text)
+        if match:
+            age[0] = int(match.group(1))
+    if age[0] is not None and age[1] is not None and age[0] > age[1]:
+        age = [None, None]
+
+    preferences = {criterion: frozenset(values) for criterion, values in found.items()}
+    if age != [None, None]:
+        preferences["age"] = tuple(age)
+    return preferences
+
+
+def describe(preferences):
+    """Resumo legível das preferências reconhecidas (ex: "espécie: Gato; idade: até 2")."""
+    parts = []
+    for criterion in CRITERIA:
+        value = preferences.get(criterion)
+        if value is None:
+            continue
+        if criterion == "age":
+            low, high = value
+            text = f"{low} a {high}" if low is not None and high is not None else (
+                f"até {high}" if high is not None else f"a partir de {low}")
+        else:
+            text = "/".join(sorted(value))
+        parts.append(f"{LABELS[criterion]}: {text}")
+    return "; ".join(parts)
+
+
+def _age_ok(age, age_range):
+    """Indica se a idade está na faixa (idade desconhecida nunca está)."""
+    low, high = age_range
+    return age is not None and (low is None or age >= low) and (high is None or age <= high)
+
+# ========== RANQUEAMENTO POR BITSETS ==========
+
+def _ranked(candidates, states, k):
+    """
+    Percorre as combinações de critérios, da melhor para a pior.
+
+    Args:
+        candidates (int): Bitset das posições elegíveis
+        states (dict): Critério → {"m": atendido, "x": divergente,
+                       "u": não declarado} com o bitset de cada estado
+                       (estados ausentes não são possíveis)
+        k (int): Quantidade de resultados
+
+    Returns:
+        list: Tuplas (posição, critérios atendidos, critérios divergentes)
+    """
+    names = list(states)
+    groups = {}
+    for combo in product(*(states[name] for name in names)):
+        matched = tuple(n for n, s in zip(names, combo) if s == "m")
+        if not matched:
+            continue
+        mismatched = tuple(n for n, s in zip(names, combo) if s == "x")
+        groups.setdefault((-len(matched), len(mismatched)), []).append((combo, matched, mismatched))
+
+    results = []
+    for key in sorted(groups):
+        found = []
+        for combo, matched, mismatched in groups[key]:
+            bits = candidates
+            for name, state in zip(names, combo):
+                bits &= states[name][state]
+                if not bits:
+                    break
+            else:
+                for n, pos in enumerate(bitmap_index.iter_positions(bits)):
+                    if n >= k - len(results):
+                        break
+                    found.append((pos, matched, mismatched))
+        found.sort()
+        results.extend(found[:k - len(results)])
+        if len(results) >= k:
+            break
+    return results
+
+# ========== ÍNDICE DOS TUTORES ==========
+
+class TutorIndex:
+    """
+    Índice invertido das preferências dos tutores.
+
+    Atributos:
+        ids (array): ID do tutor de cada posição, em ordem crescente
+        alive (int): Bitset das posições com preferências reconhecidas
+        stated (dict): Critério → bitset dos tutores que o declararam
+        accepted (dict): Critério → {valor ou (mín, máx): bitset}
+        version (int): PRAGMA data_version da última sincronização
+    """
+
+    def __init__(self):
+        self.ids = array("i")
+        self.prefs = []          # preferências de cada posição (para desfazer bits)
+        self.alive = 0
+        self.stated = {criterion: 0 for criterion in CRITERIA}
+        self.accepted = {criterion: {} for criterion in CRITERIA}
+        self.version = None
+        self.stale = True
+        self.changes = 0
+        self._pending = set()
+        self._building = False
+
+    # ========== CONSTRUÇÃO E SINCRONIZAÇÃO ==========
+
+    def build(self, session):
+        """Reconstrói o índice a partir de todos os tutores."""
+        version = database.versao_dados(session.get_bind())
+        ids, prefs = array("i"), []
+        rows = session.execute(
+            select(User.id, User.adoption_preferences)
+            .where(User.adoption_preferences.is_not(None))
+            .order_by(User.id)
+        )
+        for user_id, text in rows:
+            parsed = parse_preferences(text)
+            if parsed:
+                ids.append(user_id)
+                prefs.append(parsed)
+
+        size = len(prefs)
+        nbytes = (size + 7) // 8
+        stated = {criterion: bytearray(nbytes) for criterion in CRITERIA}
+        accepted = {criterion: {} for criterion in CRITERIA}
+        for pos, parsed in enumerate(prefs):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            for criterion, value in parsed.items():
+                stated[criterion][byte] |= bit
+                for key in ((value,) if criterion == "age" else value):
+                    buf = accepted[criterion].get(key)
+                    if buf is None:
+                        buf = accepted[criterion][key] = bytearray(nbytes)
+                    buf[byte] |= bit
+
+        self.ids = ids
+        self.prefs = prefs
+        self.alive = (1 << size) - 1
+        self.stated = {c: int.from_bytes(buf, "little") for c, buf in stated.items()}
+        self.accepted = {c: {key: int.from_bytes(buf, "little") for key, buf in values.items()}
+                         for c, values in accepted.items()}
+        self.version = version
+        self.changes = 0
+        self._pending = set()
+        self.stale = False
+
+    def build_in_background(self):
+        """Inicia a reconstrução numa thread própria (se já não houver uma)."""
+        if self._building:
+            return
+
+        def run():
+            try:
+                with database.read_session() as s:
+                    self.build(s)
+            finally:
+                self._building = False
+
+        self._building = True
+        threading.Thread(target=run, name="tutor-index", daemon=True).start()
+
+    def on_commit(self, alteracoes):
+        """
+        Ouvinte de database.ao_confirmar: anota os tutores alterados e a
+        versão do arquivo após o commit (como bitmap_index.BitmapIndex).
+        """
+        if not self.stale:
+            self._pending.update(alteracoes.get("users", ()))
+            if not self._building:
+                self.version = database.versao_dados()
+
+    def refresh(self, session):
+        """
+        Garante que o índice reflita o banco antes de uma consulta.
+
+        Returns:
+            bool: True se o índice está pronto (senão, reconstrução em
+                  segundo plano já iniciada)
+        """
+        if self._building:
+            return False
+        version = database.versao_dados(session.get_bind())
+        if not self.stale and self._pending:
+            self._apply(session, self._pending)
+            self._pending = set()
+            self.version = version
+        if self.stale or version != self.version or self.changes > MAX_CHANGES:
+            self.build_in_background()
+            return False
+        return True
+
+    def _apply(self, session, changed_ids):
+        """Relê as preferências dos tutores alterados e move seus bits."""
+        changed_ids = sorted(changed_ids)
+        fresh = {}
+        for start in range(0, len(changed_ids), FETCH_CHUNK):
+            chunk = changed_ids[start:start + FETCH_CHUNK]
+            fresh.update(session.execute(
+                select(User.id, User.adoption_preferences).where(User.id.in_(chunk))
+            ).all())
+        for user_id in changed_ids:
+            self._update(user_id, parse_preferences(fresh.get(user_id)))
+
+    def _update(self, user_id, parsed):
+        """Substitui, acrescenta ou remove (parsed vazio) um tutor."""
+        self.changes += 1
+        pos = bisect.bisect_left(self.ids, user_id)
+        if pos < len(self.ids) and self.ids[pos] == user_id:
+            if self.alive >> pos & 1:
+                self._set_bits(pos, self.prefs[pos], on=False)
+        elif not parsed:
+            return
+        elif self.ids and user_id < self.ids[-1]:
+            # ID fora de ordem (inserido com ID explícito): não há posição
+            self.stale = True
+            return
+        else:
+            pos = len(self.ids)
+            self.ids.append(user_id)
+            self.prefs.append(parsed)
+        self.prefs[pos] = parsed
+        if parsed:
+            self.alive |= 1 << pos
+            self._set_bits(pos, parsed, on=True)
+        else:
+            self.alive &= ~(1 << pos)
+
+    def _set_bits(self, pos, parsed, on):
+        """Liga ou desliga o bit da posição nos bitsets das preferências."""
+        mask = 1 << pos
+        for criterion, value in parsed.items():
+            self.stated[criterion] = self.stated[criterion] | mask if on else self.stated[criterion] & ~mask
+            bitmaps = self.accepted[criterion]
+            for key in ((value,) if criterion == "age" else value):
+                bits = bitmaps.get(key, 0)
+                bits = bits | mask if on else bits & ~mask
+                if bits:
+                    bitmaps[key] = bits
+                else:
+                    bitmaps.pop(key, None)
+
+    # ========== CONSULTA ==========
+
+    def rank(self, species, size, temperament, age, k=TOP_K):
+        """
+        Tutores mais compatíveis com um animal.
+
+        Returns:
+            list: Tuplas (ID do tutor, critérios atendidos, divergentes)
+        """
+        values = {"species": species, "size": size, "temperament": temperament}
+        states = {}
+        for criterion in CRITERIA:
+            if criterion == "age":
+                match = 0
+                for age_range, bits in self.accepted["age"].items():
+                    if _age_ok(age, age_range):
+                        match |= bits
+            else:
+                match = self.accepted[criterion].get(values[criterion], 0)
+            stated = self.stated[criterion]
+            states[criterion] = {"m": match, "u": self.alive & ~stated}
+            if criterion not in REQUIRED:
+                states[criterion]["x"] = stated & ~match
+        return [(self.ids[pos], matched, mismatched)
+                for pos, matched, mismatched in _ranked(self.alive, states, k)]
+
+# ========== CONSULTAS DO FORMULÁRIO ==========
+
+def _animal_states(index, preferences):
+    """Estados por critério declarado, sobre os bitsets do índice de animais."""
+    states = {}
+    for criterion, value in preferences.items():
+        if criterion == "age":
+            match = 0
+            for age, bits in index.ages.items():
+                if _age_ok(age, value):
+                    match |= bits
+        else:
+            match = 0
+            for accepted in value:
+                match |= index.bitmaps[criterion].get(accepted, 0)
+        states[criterion] = {"m": match}
+        if criterion not in REQUIRED:
+            states[criterion]["x"] = index.alive & ~match
+    return states
+
+
+def tutors_for_animal(session, animal_id, k=TOP_K, tutors=None):
+    """
+    Tutores mais compatíveis com um animal.
+
+    Args:
+        animal_id (int): Animal escolhido no formulário
+        k (int): Quantidade de sugestões
+        tutors (TutorIndex): Índice a usar (padrão: o compartilhado)
+
+    Returns:
+        list | None: Tuplas (ID, nome, atendidos, divergentes, preferências
+                     resumidas); None enquanto o índice é construído
+    """
+    tutors = tutors or get_index()
+    if not tutors.refresh(session):
+        return None
+    animal = session.execute(
+        select(Animal.species, Animal.size, Animal.temperament, Animal.age).where(Animal.id == animal_id)
+    ).first()
+    if animal is None:
+        return []
+    ranked = tutors.rank(*animal, k=k)
+    if not ranked:
+        return []
+    ids = [user_id for user_id, _, _ in ranked]
+    names = dict(session.execute(select(User.id, User.name).where(User.id.in_(ids))).all())
+    prefs = {user_id: tutors.prefs[bisect.bisect_left(tutors.ids, user_id)] for user_id in ids}
+    return [(user_id, names.get(user_id, ""), matched, mismatched, describe(prefs[user_id]))
+            for user_id, matched, mismatched in ranked]
+
+
+def animals_for_tutor(session, user_id, k=TOP_K, animals=None):
+    """
+    Animais disponíveis mais compatíveis com as preferências de um tutor.
+
+    Args:
+        user_id (int): Tutor escolhido no formulário
+        k (int): Quantidade de sugestões
+        animals (bitmap_index.BitmapIndex): Índice a usar (padrão: o da
+                                            SearchTab)
+
+    Returns:
+        list | None: Tuplas (ID, nome, espécie, porte, idade, atendidos,
+                     divergentes); None enquanto o índice é construído
+    """
+    text = session.execute(select(User.adoption_preferences).where(User.id == user_id)).scalar()
+    preferences = parse_preferences(text)
+    if not preferences:
+        return []
+    animals = animals or bitmap_index.get_index()
+    if not animals.refresh(session):
+        return None
+    # Mesmo critério da combobox do formulário (queries.available_animal_choices)
+    available = animals.filter(status="Disponível")
+    ranked = [(animals.ids[pos], matched, mismatched)
+              for pos, matched, mismatched in _ranked(available, _animal_states(animals, preferences), k)]
+    if not ranked:
+        return []
+    # Dados exibidos lidos só para as k sugestões (o índice guarda apenas filtros)
+    ids = [animal_id for animal_id, _, _ in ranked]
+    rows = {row[0]: row for row in session.execute(
+        select(Animal.id, Animal.name, Animal.species, Animal.size, Animal.age).where(Animal.id.in_(ids))
+    )}
+    return [tuple(rows[animal_id]) + (matched, mismatched)
+            for animal_id, matched, mismatched in ranked if animal_id in rows]
+
+# ========== INSTÂNCIA DA APLICAÇÃO ==========
+
+_index = None
+
+
+def get_index():
+    """Índice de tutores compartilhado (registrado em database.ao_confirmar)."""
+    global _index
+    if _index is None:
+        _index = TutorIndex()
+        database.ao_confirmar(_index.on_commit)
+    return _index
@@ -30,20 +30,89 @@ persistência.
    - Status automatizado
    - Notas e observações
 
+   AnimalPhoto:
+   - Foto e miniatura de cada animal, fora da tabela animals
+   - Lidas apenas pela tela que as exibe (photos.py)
+
+   AdoptionStatusEvent:
+   - Histórico de mudanças de etapa
+   - Somente inserção (append-only)
+   - Tempo gasto em cada etapa
+
+   Rollups (RollupDaily, RollupOccupancy, RollupAnimal, RollupState):
+   - Totais pré-agregados para o painel gerencial
+   - Mantidos incrementalmente por rollups.py
+   - Nunca editados pela interface
+
    AuthUser:
    - Autenticação segura
    - Níveis de acesso
    - Hash bcrypt com salt
    - Controle de sessão
+
+2. Colunas Categóricas (CodedText):
+   - Espécie, porte, gênero, temperamento e status gravados como a
+     posição do valor na lista de utils.py (INTEGER de 1 byte)
+   - O código Python continua lendo e comparando textos; valores fora
+     das listas são gravados como texto, sem perda
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Date, ForeignKey
-from sqlalchemy.orm import relationship, declarative_base
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, Date, ForeignKey, Index, LargeBinary
+from sqlalchemy.orm import relationship, declarative_base, deferred, validates
+from sqlalchemy.types import TypeDecorator
 import bcrypt
 
+from utils import (ADOPTION_STEPS, GENDERS, SIZES, SPECIES, STATUSES, TEMPERAMENTS, email_key,
+                   normalize_text, phone_key)
+
 # Base para todos os modelos - padrão SQLAlchemy
 Base = declarative_base()
 
+class CodedText(TypeDecorator):
+    """
+    Texto de uma lista fixa gravado como a posição do valor na lista.
+
+    Leitura e comparação continuam em texto (Animal.status == "Adotado"
+    vira status = 3 no SQL, com uso do índice). Variações de acento,
+    maiúsculas e espaços do valor gravado caem no mesmo código; textos
+    fora da lista são gravados como estão (o SQLite aceita texto numa
+    coluna INTEGER).
+
+    As listas de utils.py só podem crescer no fim: a posição é o código
+    gravado no banco.
+    """
+    impl = Integer
+    cache_ok = True
+
+    def __init__(self, values):
+        """
+        Args:
+            values (tuple): Valores da lista, na ordem dos códigos
+        """
+        super().__init__()
+        self.values = tuple(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+        self._normalized = {normalize_text(value): code for code, value in enumerate(self.values)}
+
+    def code(self, value):
+        """Código gravado para um texto (o próprio texto se não estiver na lista)."""
+        if value is None:
+            return None
+        code = self._codes.get(value)
+        if code is None:
+            code = self._normalized.get(normalize_text(value))
+        return value if code is None else code
+
+    def process_bind_param(self, value, dialect):
+        return self.code(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, int) and 0 <= value < len(self.values):
+            return self.values[value]
+        return value
+
 class Animal(Base):
     """
     Modelo que representa um animal no sistema do abrigo.
@@ -63,29 +132,83 @@ class Animal(Base):
         status (str): Status de adoção
         location (str): Localização física (Abrigo)
         shelter_id (int): ID do abrigo vinculado
+        created_at (DateTime): Entrada no sistema (None em registros antigos)
+        updated_at (DateTime): Última alteração (marca d'água dos rollups)
+        name_norm, breed_norm (str): Nome e raça normalizados (filtro
+            rápido, pesquisa e ordenação)
         
     Relacionamentos:
         adoptions: Lista de processos de adoção
         shelter: Abrigo onde o animal está alocado
     """
     __tablename__ = "animals"
+    # AUTOINCREMENT: IDs nunca reutilizados, nem após arquivar ou excluir
+    # o maior (archive.py guarda registros com o mesmo ID no arquivo)
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True)
+    # Colunas exibidas indexadas: ordenação das listas pelo cabeçalho
+    # (queries.sorted_page); o índice já vem ordenado por (coluna, id).
+    # Nome e raça ordenam pelas versões normalizadas (*_norm)
     name = Column(String(20), nullable=False)
-    species = Column(String(50), nullable=False)
+    species = Column(CodedText(SPECIES), nullable=False, index=True)
     breed = Column(String(20))
-    age = Column(Integer, nullable=False, default=0)
-    size = Column(String(20))
-    gender = Column(String(20))
-    temperament = Column(String(20))
-    status = Column(String(20), default="Disponível")
+    age = Column(Integer, nullable=False, default=0, index=True)
+    size = Column(CodedText(SIZES), index=True)
+    gender = Column(CodedText(GENDERS), index=True)
+    temperament = Column(CodedText(TEMPERAMENTS))
+    status = Column(CodedText(STATUSES), default="Disponível", index=True)
     location = Column(String(30))
-    shelter_id = Column(Integer, ForeignKey("shelter.id"), nullable=True)
+    shelter_id = Column(Integer, ForeignKey("shelter.id"), nullable=True, index=True)
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True)
+
+    # Nome e raça sem acentos e minúsculos (utils.normalize_text), mantidos
+    # a partir de name/breed: busca por prefixo (filtro rápido, pesquisa)
+    # e ordenação
+    name_norm = Column(String(20), index=True)
+    breed_norm = Column(String(20), index=True)
 
     # Relacionamentos
-    adoptions = relationship("AdoptionProcess", back_populates="animal", lazy="selectin")
+    # Carregamento sob demanda: listagens usam projeções (queries.py) e
+    # quem precisar das adoções em lote deve pedir selectinload na consulta
+    adoptions = relationship("AdoptionProcess", back_populates="animal", lazy="select")
     shelter = relationship("Shelter", backref="animals")
 
+    @validates("name", "breed")
+    def _set_text_norm(self, key, value):
+        """Atualiza name_norm/breed_norm sempre que o campo muda."""
+        setattr(self, f"{key}_norm", normalize_text(value) or None)
+        return value
+
+class AnimalPhoto(Base):
+    """
+    Foto de um animal (uma por animal), em tabela própria.
+
+    Imagens na tabela animals pesariam em toda listagem e pesquisa; aqui
+    só são lidas pela tela que as exibe. A miniatura vem antes do
+    original na linha: ler só a miniatura não percorre as páginas de
+    overflow do original, que além disso é carregado sob demanda
+    (deferred).
+
+    Atributos:
+        animal_id (int): ID do animal (chave primária)
+        sha256 (str): Hash do original (mesma imagem não gera nova miniatura)
+        width, height (int): Dimensões do original
+        thumbnail (bytes): Miniatura PNG (photos.THUMB_SIZE)
+        image (bytes): Arquivo original
+        updated_at (DateTime): Momento da gravação
+    """
+    __tablename__ = "animal_photos"
+
+    animal_id = Column(Integer, ForeignKey("animals.id"), primary_key=True)
+    sha256 = Column(String(64), nullable=False)
+    width = Column(Integer)
+    height = Column(Integer)
+    thumbnail = Column(LargeBinary, nullable=False)
+    image = deferred(Column(LargeBinary, nullable=False))
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
 class User(Base):
     """
     Modelo que representa um usuário/tutor no sistema.
@@ -100,6 +223,10 @@ class User(Base):
         phone (str): Telefone para contato
         city (str): Cidade de residência
         adoption_preferences (str): Observações
+        phone_key (str): Telefone normalizado (detecção de duplicados)
+        email_key (str): Parte local do email normalizada (idem)
+        name_norm, email_norm, city_norm (str): Nome, email e cidade
+            normalizados (filtro rápido e ordenação)
         
     Relacionamentos:
         adoptions: Lista de processos de adoção do usuário
@@ -107,6 +234,7 @@ class User(Base):
     __tablename__ = "users"
     
     id = Column(Integer, primary_key=True)
+    # Ordenação e filtro rápido pelas versões normalizadas (*_norm)
     name = Column(String(40), nullable=False)
     email = Column(String(40), unique=True, nullable=False)
     phone = Column(String(11))
@@ -114,8 +242,37 @@ class User(Base):
     adoption_preferences = Column(Text)  # Usado como campo de observações
     approved = Column(Boolean, default=False)
 
-    # Relacionamentos
-    adoptions = relationship("AdoptionProcess", back_populates="user", lazy="selectin")
+    # Chaves de bloqueio da detecção de duplicados (duplicates.py),
+    # mantidas automaticamente a partir de phone/email
+    phone_key = Column(String(11), index=True)
+    email_key = Column(String(40), index=True)
+
+    # Textos normalizados (ver Animal.name_norm)
+    name_norm = Column(String(40), index=True)
+    email_norm = Column(String(40), index=True)
+    city_norm = Column(String(25), index=True)
+
+    # Relacionamentos (carregamento sob demanda, ver Animal.adoptions)
+    adoptions = relationship("AdoptionProcess", back_populates="user", lazy="select")
+
+    @validates("phone")
+    def _set_phone_key(self, key, value):
+        """Atualiza phone_key sempre que o telefone muda."""
+        self.phone_key = phone_key(value)
+        return value
+
+    @validates("email")
+    def _set_email_key(self, key, value):
+        """Atualiza email_key e email_norm sempre que o email muda."""
+        self.email_key = email_key(value)
+        self.email_norm = normalize_text(value) or None
+        return value
+
+    @validates("name", "city")
+    def _set_text_norm(self, key, value):
+        """Atualiza name_norm/city_norm sempre que o campo muda."""
+        setattr(self, f"{key}_norm", normalize_text(value) or None)
+        return value
 
 class Shelter(Base):
     """
@@ -166,11 +323,14 @@ class AdoptionProcess(Base):
         user: Tutor adotante
     """
     __tablename__ = "adoptions"
+    # IDs nunca reutilizados (ver Animal)
+    __table_args__ = {"sqlite_autoincrement": True}
     
     id = Column(Integer, primary_key=True)
-    animal_id = Column(Integer, ForeignKey("animals.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    status = Column(String(30), default="questionnaire")
+    # Indexado: processos de um animal (processo ativo, arquivamento)
+    animal_id = Column(Integer, ForeignKey("animals.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(CodedText(ADOPTION_STEPS), default="questionnaire", index=True)
     virtual_visit_at = Column(DateTime)
     in_person_visit_at = Column(DateTime)
     notes = Column(Text)
@@ -196,6 +356,119 @@ class AdoptionProcess(Base):
             elif self.status in ["Questionário", "Visita", "Documentos", "Aprovado"]:
                 self.animal.status = "Em processo"
 
+class AdoptionStatusEvent(Base):
+    """
+    Modelo que registra cada mudança de etapa de um processo de adoção.
+
+    A tabela é somente de inserção: AdoptionProcess.status guarda apenas a
+    etapa atual, e este histórico permite medir quanto tempo os processos
+    ficam em cada etapa. Os eventos são gravados na mesma transação da
+    mudança de status (queries.save_adoption) e permanecem mesmo se o
+    processo for excluído.
+
+    Atributos:
+        id (int): Identificador único (ordem de gravação)
+        adoption_id (int): ID do processo de adoção
+        from_status (str): Etapa anterior (None na criação do processo)
+        to_status (str): Nova etapa
+        changed_at (DateTime): Momento da mudança
+        stage_seconds (int): Segundos passados em from_status (None se a
+                             entrada na etapa anterior não foi registrada)
+    """
+    __tablename__ = "adoption_status_events"
+
+    id = Column(Integer, primary_key=True)
+    adoption_id = Column(Integer, ForeignKey("adoptions.id"), nullable=False)
+    from_status = Column(CodedText(ADOPTION_STEPS))
+    to_status = Column(CodedText(ADOPTION_STEPS), nullable=False)
+    changed_at = Column(DateTime, nullable=False)
+    stage_seconds = Column(Integer)
+
+    __table_args__ = (
+        # Último evento de um processo (entrada na etapa atual)
+        Index("ix_status_events_adoption", "adoption_id", "id"),
+        # Relatório de tempo por etapa lido apenas do índice (covering)
+        Index("ix_status_events_stage", "from_status", "changed_at", "stage_seconds"),
+        # IDs nunca reutilizados (ver Animal; rollups.py usa o ID como marca)
+        {"sqlite_autoincrement": True},
+    )
+
+class RollupDaily(Base):
+    """
+    Movimento diário por abrigo e espécie (painel gerencial).
+
+    Atributos:
+        day (Date): Dia do movimento
+        shelter_id (int): ID do abrigo (0 = sem abrigo)
+        species (str): Espécie
+        intake (int): Animais cadastrados no dia
+        adopted (int): Processos finalizados no dia (descontadas reversões)
+    """
+    __tablename__ = "rollup_daily"
+
+    day = Column(Date, primary_key=True)
+    shelter_id = Column(Integer, primary_key=True)
+    species = Column(CodedText(SPECIES), primary_key=True)
+    intake = Column(Integer, nullable=False, default=0)
+    adopted = Column(Integer, nullable=False, default=0)
+
+class RollupOccupancy(Base):
+    """
+    Ocupação atual (animais não adotados) por abrigo e espécie.
+
+    Atributos:
+        shelter_id (int): ID do abrigo (0 = sem abrigo)
+        species (str): Espécie
+        animals (int): Animais presentes
+    """
+    __tablename__ = "rollup_occupancy"
+
+    shelter_id = Column(Integer, primary_key=True)
+    species = Column(CodedText(SPECIES), primary_key=True)
+    animals = Column(Integer, nullable=False, default=0)
+
+class RollupAnimal(Base):
+    """
+    Último estado de cada animal já contabilizado nos rollups.
+
+    Comparar o estado atual do animal com este registro dá a variação a
+    aplicar, o que torna o reprocessamento de uma linha inofensivo.
+
+    Atributos:
+        animal_id (int): ID do animal
+        shelter_id (int): Abrigo contabilizado (0 = sem abrigo)
+        species (str): Espécie contabilizada
+        present (bool): Contabilizado na ocupação (não adotado)
+    """
+    __tablename__ = "rollup_animals"
+
+    animal_id = Column(Integer, primary_key=True)
+    shelter_id = Column(Integer, nullable=False)
+    species = Column(CodedText(SPECIES), nullable=False)
+    present = Column(Boolean, nullable=False)
+
+class RollupState(Base):
+    """
+    Marcas d'água e metadados da atualização dos rollups.
+
+    Atributos:
+        name (str): Nome da marca (ex: "animals_updated_at", "events_id")
+        value (str): Valor serializado
+    """
+    __tablename__ = "rollup_state"
+
+    name = Column(String(40), primary_key=True)
+    value = Column(String(40))
+
+def hash_password(password):
+    """
+    Hash bcrypt (salt próprio) de uma senha em texto claro.
+
+    Função de módulo para poder ser executada em outros processos
+    (importação em lote, staff_import.py).
+    """
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
 class AuthUser(Base):
     """
     Modelo para usuários de autenticação do sistema.
@@ -228,7 +501,7 @@ class AuthUser(Base):
             - Gera salt automático
             - Protege contra rainbow tables
         """
-        self.password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
         """
@@ -0,0 +1,240 @@
+"""
+Lista Paginada - Ordenação pelo Cabeçalho e Rolagem sob Demanda
+---------------------------------------------------------------
+Este módulo liga um ttk.Treeview às consultas paginadas de queries.py:
+a lista mostra apenas as páginas já lidas e a ordenação é feita pelo
+banco, de modo que abrir uma aba ou reordenar 100 mil linhas custa uma
+página (queries.PAGE_SIZE linhas), não a tabela inteira.
+
+1. Ordenação:
+   - Clique no cabeçalho ordena pela coluna (crescente); novo clique na
+     mesma coluna inverte a ordem
+   - Seta no título indica a coluna e o sentido atuais
+   - ORDER BY coluna, id no banco (queries.sorted_page); reordenar relê
+     apenas a primeira página
+
+2. Rolagem:
+   - A barra de rolagem passa pelo PagedTree (yscrollcommand); quando a
+     parte visível chega a PREFETCH_AT do total, a página seguinte é lida
+     a partir do cursor da última (keyset) e acrescentada ao fim
+   - Seleção e posição de rolagem são mantidas durante o acréscimo
+
+3. Leitura em segundo plano (reload_async, filtro rápido):
+   - A primeira página é lida numa thread; a lista atual continua
+     visível e responsiva até a resposta chegar (verificada por after)
+   - Respostas de leituras já superadas (nova digitação, ordenação,
+     reload) são descartadas pelo número de geração
+
+4. Parte visível:
+   - on_view (opcional) é chamado sempre que a parte visível muda
+     (rolagem, páginas acrescentadas, lista relida), ex: miniaturas da
+     galeria (photos.TreeThumbnails)
+
+5. Registro:
+   - Ordenação e páginas seguintes são ações do diagnóstico
+     ("<Lista>: ordenar", "<Lista>: próxima página", "<Lista>: filtrar")
+
+Exemplo de uso:
+    self.pager = PagedTree(self.tree, scrollbar, queries.animal_page, "Animais")
+    self.pager.reload()
+"""
+
+import threading
+
+from database import read_session
+from diagnostics import acao
+import queries
+
+# Fração rolada a partir da qual a próxima página é lida
+PREFETCH_AT = 0.9
+
+# Indicadores de ordenação no título da coluna
+ARROWS = {False: " ▲", True: " ▼"}
+
+# Intervalo de verificação da leitura em segundo plano (ms)
+POLL_MS = 20
+
+
+class PagedTree:
+    """
+    Controla a ordenação e a paginação de um Treeview.
+
+    Atributos:
+        tree (ttk.Treeview): Lista controlada (IDs das linhas = iid)
+        fetch (callable): fetch(sessão, coluna, decrescente, cursor, limite)
+            → (linhas, próximo cursor ou None), como queries.animal_page
+        column (int): Coluna de ordenação atual (posição em tree["columns"])
+        descending (bool): Sentido atual
+        exhausted (bool): Todas as linhas já foram lidas
+        active (bool): A lista foi carregada (reload) e não esvaziada (clear)
+        on_view (callable): Chamado sem argumentos quando a parte visível
+            muda (None: nada)
+    """
+
+    def __init__(self, tree, scrollbar, fetch, name, column=0, descending=True, page_size=queries.PAGE_SIZE):
+        """
+        Args:
+            tree (ttk.Treeview): Lista já criada, com os títulos definidos
+            scrollbar (ttk.Scrollbar): Barra vertical da lista
+            fetch (callable): Consulta paginada (ver atributo fetch)
+            name (str): Nome da lista no diagnóstico (ex: "Animais")
+            column (int): Coluna de ordenação inicial
+            descending (bool): Sentido inicial (padrão: mais recentes primeiro)
+            page_size (int): Linhas por página
+        """
+        self.tree = tree
+        self.fetch = fetch
+        self.name = name
+        self.column = column
+        self.descending = descending
+        self.page_size = page_size
+        self.cursor = None
+        self.exhausted = True
+        self.active = False
+        self.on_view = None
+        self._scrollbar = scrollbar
+        self._pending = False
+        self._generation = 0
+        self._loading = False  # reload_async em andamento
+
+        self._columns = tuple(tree["columns"])
+        self._titles = [tree.heading(c, "text") for c in self._columns]
+        for index, c in enumerate(self._columns):
+            tree.heading(c, command=lambda index=index: self.sort_by(index))
+        tree.configure(yscrollcommand=self._on_scroll)
+        self._show_arrow()
+
+    def sort_by(self, column):
+        """
+        Ordena pela coluna (clique no cabeçalho).
+
+        Args:
+            column (int): Posição da coluna; a mesma coluna inverte o sentido
+        """
+        if column == self.column:
+            self.descending = not self.descending
+        else:
+            self.column, self.descending = column, False
+        self._show_arrow()
+        if not self.active:
+            return  # lista vazia (ex: pesquisa ainda não feita): só a seta muda
+        with acao(f"{self.name}: ordenar"):
+            self.reload()
+
+    def set_sort(self, column, descending=False):
+        """
+        Define a ordenação sem reler a lista (a próxima leitura a usa).
+
+        Args:
+            column (int): Posição da coluna
+            descending (bool): Sentido
+        """
+        self.column, self.descending = column, descending
+        self._show_arrow()
+
+    def reload(self):
+        """Descarta as linhas exibidas e lê a primeira página."""
+        self._generation += 1
+        self._loading = False
+        self.tree.delete(*self.tree.get_children())
+        self.cursor = None
+        self.exhausted = False
+        self.active = True
+        self._fetch_page()
+        self.tree.yview_moveto(0)
+
+    def reload_async(self):
+        """
+        Como reload, mas a primeira página é lida numa thread; as linhas
+        atuais são trocadas quando a resposta chega.
+        """
+        self._generation += 1
+        self._loading = True
+        generation = self._generation
+        args = (self.column, self.descending, None, self.page_size)
+        result = {}
+
+        def work():
+            try:
+                with acao(f"{self.name}: filtrar"), read_session() as s:
+                    result["page"] = self.fetch(s, *args)
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=work, name="lista", daemon=True)
+        thread.start()
+        self.tree.after(POLL_MS, self._finish_async, thread, generation, result)
+
+    def clear(self):
+        """Esvazia a lista sem consultar o banco."""
+        self._generation += 1
+        self._loading = False
+        self.tree.delete(*self.tree.get_children())
+        self.cursor = None
+        self.exhausted = True
+        self.active = False
+
+    def fetch_more(self):
+        """Acrescenta a próxima página (se ainda houver linhas)."""
+        self._pending = False
+        if self.exhausted or self._loading:
+            return  # o cursor atual pertence à lista que está sendo trocada
+        with acao(f"{self.name}: próxima página"):
+            self._fetch_page()
+
+    def reveal(self, row):
+        """
+        Garante que uma linha esteja na lista (ex: registro aberto a
+        partir de outra janela que ainda não foi alcançado pela rolagem)
+        e a seleciona.
+
+        Args:
+            row (tuple): Valores da linha (o primeiro é o ID)
+        """
+        iid = str(row[0])
+        if not self.tree.exists(iid):
+            self.tree.insert("", 0, iid=iid, values=row)
+        self.tree.selection_set(iid)
+        self.tree.see(iid)
+
+    def _fetch_page(self):
+        with read_session() as s:
+            rows, self.cursor = self.fetch(s, self.column, self.descending, self.cursor, self.page_size)
+        for row in rows:
+            iid = str(row[0])
+            if not self.tree.exists(iid):  # já exibida por reveal()
+                self.tree.insert("", "end", iid=iid, values=row)
+        self.exhausted = self.cursor is None
+
+    def _finish_async(self, thread, generation, result):
+        """Aplica a página lida por reload_async (se ainda for a atual)."""
+        if thread.is_alive():
+            self.tree.after(POLL_MS, self._finish_async, thread, generation, result)
+            return
+        if generation != self._generation:
+            return  # superada por outra leitura
+        self._loading = False
+        if "error" in result:
+            print(f"Falha ao ler a lista {self.name}: {result['error']}")
+            return
+        rows, self.cursor = result["page"]
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
+        self.exhausted = self.cursor is None
+        self.active = True
+        self.tree.yview_moveto(0)
+
+    def _on_scroll(self, first, last):
+        """yscrollcommand: repassa à barra e antecipa a próxima página."""
+        self._scrollbar.set(first, last)
+        if self.on_view is not None:
+            self.on_view()
+        if not self.exhausted and not self._pending and float(last) >= PREFETCH_AT:
+            self._pending = True
+            self.tree.after_idle(self.fetch_more)
+
+    def _show_arrow(self):
+        for index, (c, title) in enumerate(zip(self._columns, self._titles)):
+            arrow = ARROWS[self.descending] if index == self.column else ""
+            self.tree.heading(c, text=title + arrow)
@@ -0,0 +1,357 @@
+"""
+Fotos dos Animais - Armazenamento Separado e Miniaturas em Cache
+----------------------------------------------------------------
+Este módulo guarda a foto de cada animal e exibe as miniaturas no
+formulário da AnimalsTab e na galeria de resultados da SearchTab, sem
+que imagens pesem nas listagens e sem decodificar milhares de imagens
+ao rolar a lista.
+
+1. Armazenamento (tabela animal_photos, models.AnimalPhoto):
+   - Uma foto por animal, fora da tabela animals: listagens, pesquisas e
+     páginas nunca leem imagens
+   - Original e miniatura PNG na mesma linha, no próprio banco (vão
+     junto nas cópias de segurança); a miniatura é lida sem o original
+   - Até MAX_PHOTO_BYTES por foto
+   - Fotos de animais arquivados permanecem (o ID não é reutilizado)
+
+2. Miniaturas (make_thumbnail):
+   - Geradas uma única vez, ao gravar a foto; regravar a mesma imagem
+     (mesmo sha256) não gera outra
+   - Com Pillow (opcional): JPEG, PNG, GIF, BMP, WebP...; sem Pillow,
+     apenas PNG e GIF, reduzidos pelo próprio Tk (PhotoImage.subsample)
+   - Sempre PNG: decodificadas pelo Tk sem depender do Pillow
+
+3. Cache (ThumbnailCache):
+   - LRU de no máximo CACHE_SIZE PhotoImage, compartilhado pelas abas
+     (thumbnails)
+   - Decodificação sob demanda: só as miniaturas pedidas, e as que
+     faltam são lidas numa única consulta
+   - Animais sem foto também ficam no cache (None): nada de nova consulta
+   - Gravar ou remover uma foto descarta a entrada do animal
+
+4. Galeria (TreeThumbnails):
+   - Miniaturas na coluna #0 de um Treeview paginado (paged_tree.py)
+   - Apenas as linhas visíveis recebem imagem; as que saem da tela a
+     perdem, de modo que a memória fica limitada às linhas visíveis e
+     ao cache
+
+Exemplo de uso:
+    with session_scope() as s:
+        photos.save_photo(s, animal_id, data)
+    photos.thumbnails.discard(animal_id)
+    label.configure(image=photos.thumbnails.get(animal_id))
+"""
+
+import base64
+import hashlib
+import io
+import os
+import tempfile
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import ttk
+
+from sqlalchemy import delete, select
+
+from database import read_session
+from models import AnimalPhoto
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow é opcional (sem ele: PNG e GIF)
+    Image = None
+
+# Maior lado da miniatura (px)
+THUMB_SIZE = 96
+
+# Miniaturas decodificadas mantidas em memória
+CACHE_SIZE = 300
+
+# Tamanho máximo do arquivo original
+MAX_PHOTO_BYTES = 8 * 1024 * 1024
+
+# Assinaturas dos formatos que o Tk decodifica sem o Pillow
+NATIVE_FORMATS = {b"\x89PNG\r\n\x1a\n": "PNG", b"GIF87a": "GIF", b"GIF89a": "GIF"}
+
+# Tipos oferecidos no diálogo de escolha da foto
+if Image is not None:
+    FILE_TYPES = [("Imagens", "*.png *.gif *.jpg *.jpeg *.bmp *.webp"), ("Todos os arquivos", "*.*")]
+else:
+    FILE_TYPES = [("Imagens PNG e GIF", "*.png *.gif"), ("Todos os arquivos", "*.*")]
+
+
+class PhotoError(Exception):
+    """Imagem inválida, grande demais ou em formato não suportado."""
+
+# ========== MINIATURAS ==========
+
+def _native_format(data):
+    for signature, name in NATIVE_FORMATS.items():
+        if data.startswith(signature):
+            return name
+    return None
+
+
+def _thumbnail_pillow(data, size):
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except Exception as e:
+        raise PhotoError(f"Imagem inválida: {e}") from e
+    width, height = image.size
+    if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        image = image.convert("RGBA")
+    image.thumbnail((size, size))
+    out = io.BytesIO()
+    image.save(out, format="PNG", optimize=True)
+    return out.getvalue(), width, height
+
+
+def _thumbnail_tk(data, size):
+    """Redução pelo Tk (exige a janela da aplicação: thread da interface)."""
+    if _native_format(data) is None:
+        raise PhotoError("Formato não suportado sem o Pillow (use PNG ou GIF).")
+    try:
+        image = tk.PhotoImage(data=base64.b64encode(data))
+    except tk.TclError as e:
+        raise PhotoError(f"Imagem inválida: {e}") from e
+    width, height = image.width(), image.height()
+    factor = max(1, -(-max(width, height) // size))  # arredonda para cima
+    thumb = image.subsample(factor) if factor > 1 else image
+    handle, path = tempfile.mkstemp(suffix=".png")
+    os.close(handle)
+    try:
+        thumb.write(path, format="png")
+        with open(path, "rb") as f:
+            return f.read(), width, height
+    finally:
+        os.remove(path)
+
+
+def make_thumbnail(data, size=THUMB_SIZE):
+    """
+    Gera a miniatura PNG de uma imagem.
+
+    Args:
+        data (bytes): Arquivo da imagem
+        size (int): Maior lado da miniatura
+
+    Returns:
+        tuple: (miniatura PNG, largura original, altura original)
+
+    Raises:
+        PhotoError: Imagem inválida ou formato não suportado
+    """
+    if Image is not None:
+        return _thumbnail_pillow(data, size)
+    return _thumbnail_tk(data, size)
+
+# ========== ARMAZENAMENTO ==========
+
+def save_photo(session, animal_id, data):
+    """
+    Grava (ou troca) a foto de um animal, gerando a miniatura.
+
+    Args:
+        session: Sessão de gravação (database.session_scope)
+        animal_id (int): ID do animal
+        data (bytes): Arquivo da imagem
+
+    Returns:
+        bool: True se a foto mudou (False: mesma imagem já gravada)
+
+    Raises:
+        PhotoError: Imagem vazia, grande demais ou não suportada
+    """
+    if not data:
+        raise PhotoError("Arquivo vazio.")
+    if len(data) > MAX_PHOTO_BYTES:
+        raise PhotoError(f"Foto maior que {MAX_PHOTO_BYTES // (1024 * 1024)} MB.")
+    digest = hashlib.sha256(data).hexdigest()
+    photo = session.get(AnimalPhoto, animal_id)
+    if photo is not None and photo.sha256 == digest:
+        return False
+    thumbnail, width, height = make_thumbnail(data)
+    if photo is None:
+        photo = AnimalPhoto(animal_id=animal_id)
+        session.add(photo)
+    photo.sha256 = digest
+    photo.width, photo.height = width, height
+    photo.thumbnail = thumbnail
+    photo.image = data
+    return True
+
+
+def delete_photo(session, animal_id):
+    """Remove a foto de um animal (se houver)."""
+    session.execute(delete(AnimalPhoto).where(AnimalPhoto.animal_id == animal_id))
+
+
+def load_image(session, animal_id):
+    """Arquivo original da foto de um animal (None se não houver)."""
+    return session.execute(select(AnimalPhoto.image).where(AnimalPhoto.animal_id == animal_id)).scalar()
+
+
+def load_thumbnails(session, animal_ids):
+    """
+    Miniaturas de vários animais numa única consulta (somente a coluna
+    da miniatura).
+
+    Returns:
+        dict: ID do animal → miniatura PNG (animais sem foto ficam de fora)
+    """
+    if not animal_ids:
+        return {}
+    stmt = select(AnimalPhoto.animal_id, AnimalPhoto.thumbnail).where(AnimalPhoto.animal_id.in_(animal_ids))
+    return dict(session.execute(stmt).all())
+
+# ========== CACHE ==========
+
+class ThumbnailCache:
+    """
+    Cache LRU de miniaturas decodificadas (tk.PhotoImage).
+
+    Deve ser usado na thread da interface (PhotoImage pertence ao Tk).
+    Uma entrada descartada continua válida para quem ainda a exibe (a
+    imagem só é apagada quando ninguém mais a referencia).
+
+    Atributos:
+        max_size (int): Entradas mantidas
+        hits, misses (int): Acertos e leituras do banco (diagnóstico)
+    """
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()  # ID → PhotoImage ou None (sem foto)
+
+    def get(self, animal_id):
+        """Miniatura de um animal (None se não tiver foto)."""
+        return self.fetch([animal_id]).get(animal_id)
+
+    def fetch(self, animal_ids):
+        """
+        Miniaturas de vários animais, lendo do banco apenas as que faltam.
+
+        Returns:
+            dict: ID → PhotoImage ou None
+        """
+        missing = [i for i in animal_ids if i not in self._images]
+        self.hits += len(animal_ids) - len(missing)
+        if missing:
+            self.misses += len(missing)
+            with read_session() as s:
+                loaded = load_thumbnails(s, missing)
+            for animal_id in missing:
+                data = loaded.get(animal_id)
+                self._images[animal_id] = tk.PhotoImage(data=base64.b64encode(data)) if data else None
+        result = {}
+        for animal_id in animal_ids:
+            self._images.move_to_end(animal_id)
+            result[animal_id] = self._images[animal_id]
+        while len(self._images) > self.max_size:
+            self._images.popitem(last=False)
+        return result
+
+    def discard(self, animal_id):
+        """Descarta a entrada de um animal (foto gravada ou removida)."""
+        self._images.pop(animal_id, None)
+
+    def clear(self):
+        """Descarta todas as entradas."""
+        self._images.clear()
+
+    def __len__(self):
+        return len(self._images)
+
+
+# Cache compartilhado pelas abas
+thumbnails = ThumbnailCache()
+
+# ========== GALERIA ==========
+
+def visible_rows(tree):
+    """
+    Itens de um Treeview (lista sem hierarquia) visíveis na tela.
+
+    Returns:
+        list: iids das linhas visíveis, de cima para baixo
+    """
+    item = ""
+    height = tree.winfo_height()
+    for y in range(0, height, 4):  # primeira linha abaixo do cabeçalho
+        item = tree.identify_row(y)
+        if item:
+            break
+    rows = []
+    while item and tree.bbox(item):
+        rows.append(item)
+        item = tree.next(item)
+    return rows
+
+
+class TreeThumbnails:
+    """
+    Miniaturas na coluna #0 de um Treeview cujas linhas têm o ID do
+    animal como iid (listas paginadas de animais).
+
+    Atributos:
+        enabled (bool): Galeria ativa
+    """
+
+    STYLE = "Gallery.Treeview"
+
+    def __init__(self, tree, cache=None):
+        """
+        Args:
+            tree (ttk.Treeview): Lista de animais (iid = ID)
+            cache (ThumbnailCache): Cache usado (padrão: thumbnails)
+        """
+        self.tree = tree
+        self.cache = cache or thumbnails
+        self.enabled = False
+        self._style = tree.cget("style") or "Treeview"
+        self._shown = {}  # iid → PhotoImage exibida
+        self._job = None
+        ttk.Style().configure(self.STYLE, rowheight=THUMB_SIZE + 6)
+        tree.bind("<Configure>", lambda e: self.schedule(), add="+")
+
+    def enable(self, on):
+        """Ativa ou desativa a galeria."""
+        self.enabled = on
+        if on:
+            self.tree.configure(show="tree headings", style=self.STYLE)
+            self.tree.column("#0", width=THUMB_SIZE + 12, stretch=False)
+            self.schedule()
+        else:
+            self._release(list(self._shown))
+            self.tree.configure(show="headings", style=self._style)
+
+    def schedule(self):
+        """Agenda a atualização das linhas visíveis (uma por ciclo ocioso)."""
+        if self.enabled and self._job is None:
+            self._job = self.tree.after_idle(self.refresh)
+
+    def refresh(self):
+        """Exibe as miniaturas das linhas visíveis e libera as demais."""
+        self._job = None
+        if not self.enabled:
+            return
+        rows = visible_rows(self.tree)
+        self._release([iid for iid in self._shown if iid not in rows])
+        images = self.cache.fetch([int(iid) for iid in rows])
+        for iid in rows:
+            # Sempre reaplicada: a linha pode ter sido recriada (reload)
+            image = images[int(iid)]
+            self.tree.item(iid, image=image or "")
+            if image is None:
+                self._shown.pop(iid, None)
+            else:
+                self._shown[iid] = image
+
+    def _release(self, iids):
+        for iid in iids:
+            self._shown.pop(iid, None)
+            if self.tree.exists(iid):
+                self.tree.item(iid, image="")
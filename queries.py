@@ -0,0 +1,964 @@
+"""
+Camada de Consultas - Caminhos de Dados das Abas
+------------------------------------------------
+Este módulo concentra as consultas e a montagem de linhas usadas pelas
+abas da interface, separando o acesso a dados do código Tkinter.
+
+1. Motivação:
+   - As abas e o benchmark (benchmark.py) executam exatamente o mesmo código
+   - Consultas testáveis sem interface gráfica (headless)
+   - Um único lugar para otimizar cada caminho de dados
+
+2. Convenções:
+   - Toda função recebe a sessão SQLAlchemy como primeiro argumento
+     (listagens: database.read_session; gravações: database.session_scope)
+   - Funções de listagem retornam tuplas prontas para o Treeview,
+     obtidas por projeções (somente as colunas exibidas)
+   - Relacionamentos nunca são carregados implicitamente em listagens
+   - Funções de combobox retornam strings no formato "ID - Nome"
+   - Funções save_* aplicam os valores já validados e fazem apenas flush;
+     commit/rollback ficam com a unidade de trabalho (session_scope) e
+     as mensagens ao usuário com a aba
+
+3. Caminhos cobertos:
+   - AnimalsTab.load / save
+   - AdoptionsTab.load / save
+   - UsersTab.load / save
+   - ShelterTab.load / save
+   - SearchTab.search
+   - AdmTab.carregar_usuarios
+   - Páginas ordenadas no banco para as listas das abas (*_page)
+   - Filtro rápido por prefixo nas colunas normalizadas (*_norm)
+   - SearchTab: busca livre sem acentos/maiúsculas (text_conditions)
+   - AdoptionsTab: relatório de tempo por etapa (stage_time_report)
+   - DashboardTab: leituras apenas das tabelas de rollup (rollups.py)
+"""
+
+from datetime import datetime
+
+from sqlalchemy import (DateTime, Integer, and_, bindparam, func, literal, or_, select, tuple_, type_coerce,
+                        union_all, update)
+
+from database import registrar_alteracoes
+from utils import normalize_text
+from models import (Animal, AdoptionProcess, AdoptionStatusEvent, AuthUser, CodedText, RollupDaily,
+                    RollupOccupancy, Shelter, User)
+
+# Etapas em que o animal é considerado "Em processo"
+IN_PROGRESS_STEPS = ("Questionário", "Visita", "Documentos", "Aprovado")
+
+# Facetas de contagem exibidas na SearchTab
+FACETS = ("species", "size", "shelter_id", "status")
+
+# ========== COMBOBOXES ==========
+
+def shelter_choices(session):
+    """
+    Lista os abrigos no formato "ID - Nome" para comboboxes.
+
+    Returns:
+        list: Strings "ID - Nome" ordenadas por ID
+    """
+    rows = session.execute(select(Shelter.id, Shelter.name).order_by(Shelter.id))
+    return [f"{shelter_id} - {name}" for shelter_id, name in rows]
+
+
+def available_animal_choices(session):
+    """
+    Lista os animais disponíveis para adoção no formato "ID - Nome".
+
+    Igualdade pelo código do status (índice ix_animals_status): variações
+    como 'Disponivel' ou ' Disponível ' já são gravadas com o mesmo
+    código (models.CodedText).
+
+    Returns:
+        list: Strings "ID - Nome" dos animais disponíveis
+    """
+    rows = session.execute(
+        select(Animal.id, Animal.name).where(Animal.status == "Disponível")
+    )
+    return [f"{animal_id} - {name}" for animal_id, name in rows]
+
+
+def user_choices(session):
+    """
+    Lista todos os tutores no formato "ID - Nome".
+
+    Returns:
+        list: Strings "ID - Nome" de todos os tutores
+    """
+    rows = session.execute(select(User.id, User.name))
+    return [f"{user_id} - {name}" for user_id, name in rows]
+
+# ========== LISTAGENS ==========
+#
+# As listagens usam projeções: uma única consulta com JOIN que devolve
+# apenas as colunas exibidas, sem montar objetos ORM nem disparar lazy
+# loads de relacionamentos por linha.
+
+def _blank(column):
+    """Coluna com NULL trocado por string vazia (equivale a `valor or ""`)."""
+    return func.coalesce(column, "")
+
+
+def sync_animal_status(session, in_progress=False):
+    """
+    Corrige em lote o status dos animais a partir dos processos de adoção.
+
+    - Processo finalizado → "Adotado"
+    - Processo em andamento → "Em processo" (apenas com in_progress=True)
+
+    Substitui a verificação linha a linha sobre Animal.adoptions por
+    comandos UPDATE únicos. Como grava, deve rodar numa sessão de escrita
+    antes da listagem (que usa sessão somente leitura); o commit fica a
+    cargo do chamador. Os IDs corrigidos (RETURNING) são registrados para
+    os ouvintes de database.ao_confirmar.
+
+    Args:
+        in_progress (bool): Também marca animais com processos em andamento
+    """
+    finalized = select(AdoptionProcess.animal_id).where(AdoptionProcess.status == "Finalizado")
+    changed = session.execute(
+        update(Animal)
+        .where(Animal.id.in_(finalized), or_(Animal.status.is_(None), Animal.status != "Adotado"))
+        .values(status="Adotado", updated_at=datetime.now())
+        .returning(Animal.id)
+        .execution_options(synchronize_session="fetch")
+    ).scalars().all()
+    if in_progress:
+        ongoing = select(AdoptionProcess.animal_id).where(
+            AdoptionProcess.status.in_(IN_PROGRESS_STEPS + ("Triagem",))
+        )
+        changed += session.execute(
+            update(Animal)
+            .where(Animal.id.in_(ongoing), Animal.id.not_in(finalized),
+                   or_(Animal.status.is_(None), Animal.status != "Em processo"))
+            .values(status="Em processo", updated_at=datetime.now())
+            .returning(Animal.id)
+            .execution_options(synchronize_session="fetch")
+        ).scalars().all()
+    registrar_alteracoes(session, Animal.__tablename__, changed)
+
+
+def animal_rows_stmt():
+    """Projeção da tabela de animais (compartilhada com row_cache.py)."""
+    return (
+        select(Animal.id, Animal.name, Animal.species, _blank(Animal.breed), Animal.age,
+               _blank(Animal.size), _blank(Animal.gender), Animal.status, _blank(Shelter.name))
+        .outerjoin(Shelter, Animal.shelter_id == Shelter.id)
+        .order_by(Animal.id.desc())
+    )
+
+
+def animal_rows(session):
+    """
+    Monta as linhas da tabela de animais (AnimalsTab.load).
+
+    O chamador deve executar sync_animal_status antes, para que animais
+    com adoção finalizada apareçam como "Adotado".
+
+    Returns:
+        list: Tuplas (id, nome, espécie, raça, idade, porte, gênero, status, abrigo)
+    """
+    return [tuple(row) for row in session.execute(animal_rows_stmt())]
+
+
+def adoption_rows_stmt():
+    """Projeção da tabela de processos (compartilhada com row_cache.py)."""
+    return (
+        select(AdoptionProcess.id,
+               func.coalesce(Animal.name, "-"),
+               func.coalesce(User.name, "-"),
+               func.coalesce(func.nullif(AdoptionProcess.status, "", type_=AdoptionProcess.status.type), "-"))
+        .outerjoin(Animal, AdoptionProcess.animal_id == Animal.id)
+        .outerjoin(User, AdoptionProcess.user_id == User.id)
+        .order_by(AdoptionProcess.id.desc())
+    )
+
+
+def adoption_rows(session):
+    """
+    Monta as linhas da tabela de processos (AdoptionsTab.load).
+
+    Returns:
+        list: Tuplas (id, animal, tutor, status)
+    """
+    return [tuple(row) for row in session.execute(adoption_rows_stmt())]
+
+
+def user_rows_stmt():
+    """Projeção da tabela de tutores (compartilhada com row_cache.py)."""
+    return select(User.id, User.name, User.email, _blank(User.city)).order_by(User.id.desc())
+
+
+def user_rows(session):
+    """
+    Monta as linhas da tabela de tutores (UsersTab.load).
+
+    Returns:
+        list: Tuplas (id, nome, email, cidade)
+    """
+    return [tuple(row) for row in session.execute(user_rows_stmt())]
+
+
+def _has_archive(session):
+    """archive.has_archive (importado sob demanda: archive usa este módulo)."""
+    import archive
+    return archive.has_archive(session)
+
+
+def shelter_rows_stmt(archived=False):
+    """
+    Projeção da tabela de abrigos com estatísticas (ShelterTab.load).
+
+    Para cada abrigo calcula:
+    - Resgatados: total de animais vinculados
+    - Adotados: animais com adoção finalizada
+    - Atuais: resgatados - adotados
+
+    As estatísticas vêm de duas agregações agrupadas por abrigo, unidas
+    aos abrigos numa única consulta (antes: duas consultas por abrigo).
+
+    Args:
+        archived (bool): Soma também animais e processos do arquivo
+            histórico (anexado: archive.has_archive); sem isso, arquivar
+            faria os adotados sumirem das estatísticas
+    """
+    animals = select(Animal.id.label("id"), Animal.shelter_id.label("shelter_id"))
+    finalized = select(AdoptionProcess.animal_id.label("animal_id")).where(AdoptionProcess.status == "Finalizado")
+    if archived:
+        import archive
+        cold_animals, cold_adoptions = archive.ARCHIVED["animals"], archive.ARCHIVED["adoptions"]
+        animals = union_all(animals, select(cold_animals.c.id, cold_animals.c.shelter_id))
+        finalized = union_all(finalized, select(cold_adoptions.c.animal_id)
+                              .where(cold_adoptions.c.status == "Finalizado"))
+    animals = animals.subquery("all_animals")
+    finalized = finalized.subquery("finalized")
+
+    rescued = (
+        select(animals.c.shelter_id.label("shelter_id"), func.count().label("n"))
+        .group_by(animals.c.shelter_id)
+        .subquery()
+    )
+    adopted = (
+        select(animals.c.shelter_id.label("shelter_id"), func.count().label("n"))
+        .join(finalized, finalized.c.animal_id == animals.c.id)
+        .group_by(animals.c.shelter_id)
+        .subquery()
+    )
+    rescued_n = func.coalesce(rescued.c.n, 0)
+    adopted_n = func.coalesce(adopted.c.n, 0)
+    return (
+        select(Shelter.id, _blank(Shelter.name), _blank(Shelter.email), _blank(Shelter.phone),
+               _blank(Shelter.address), func.coalesce(Shelter.capacity, 0),
+               rescued_n, adopted_n, rescued_n - adopted_n)
+        .outerjoin(rescued, rescued.c.shelter_id == Shelter.id)
+        .outerjoin(adopted, adopted.c.shelter_id == Shelter.id)
+        .order_by(Shelter.id.desc())
+    )
+
+
+def shelter_rows(session):
+    """
+    Monta as linhas da tabela de abrigos (ver shelter_rows_stmt).
+
+    Returns:
+        list: Tuplas (id, nome, email, telefone, endereço, capacidade,
+              resgatados, adotados, atuais)
+    """
+    return [tuple(row) for row in session.execute(shelter_rows_stmt(_has_archive(session)))]
+
+
+def _search_columns():
+    """Colunas exibidas pela SearchTab."""
+    return (Animal.id, Animal.name, Animal.species, Animal.age, _blank(Animal.size),
+            _blank(Animal.gender), Animal.status, _blank(Shelter.name))
+
+
+def search_index_stmt(ids=None):
+    """
+    Colunas de filtro da pesquisa, em ordem de ID (usada por bitmap_index.py).
+
+    Args:
+        ids (iterable): Restringe a projeção a estes IDs (None = todos)
+    """
+    stmt = (
+        select(Animal.id, Animal.species, Animal.age, _blank(Animal.size), _blank(Animal.gender),
+               Animal.status, Animal.shelter_id, Animal.temperament)
+        .order_by(Animal.id)
+    )
+    if ids is not None:
+        stmt = stmt.where(Animal.id.in_(ids))
+    return stmt
+
+
+def search_animal_rows(session, species="", size="", shelter_id=None, age_min=None, age_max=None, text="",
+                       status=""):
+    """
+    Executa a pesquisa de animais com filtros combinados por AND (SearchTab.search).
+
+    O chamador deve executar sync_animal_status(in_progress=True) antes,
+    para que o status reflita os processos (finalizado → "Adotado", em
+    andamento → "Em processo").
+
+    Args:
+        species (str): Espécie (vazio = sem filtro)
+        size (str): Porte (vazio = sem filtro)
+        shelter_id (int): ID do abrigo (None = sem filtro)
+        age_min (int): Idade mínima (None = sem filtro)
+        age_max (int): Idade máxima (None = sem filtro)
+        text (str): Busca livre (ver text_conditions; vazio = sem filtro)
+        status (str): Status do animal (vazio = sem filtro; a SearchTab
+            não filtra por status, a API sim)
+
+    Returns:
+        list: Tuplas (id, nome, espécie, idade, porte, gênero, status, abrigo)
+    """
+    stmt = search_rows_stmt(species, size, shelter_id, age_min, age_max, text, status)
+    return [tuple(row) for row in session.execute(stmt)]
+
+
+def search_rows_stmt(species="", size="", shelter_id=None, age_min=None, age_max=None, text="", status=""):
+    """Projeção da SearchTab com os filtros aplicados (ver search_animal_rows)."""
+    conditions = _search_conditions(species, size, shelter_id, age_min, age_max, text, status)
+    return (
+        select(*_search_columns())
+        .outerjoin(Shelter, Animal.shelter_id == Shelter.id)
+        .where(*(condition for _, condition in conditions))
+    )
+
+
+def search_count(session, species="", size="", shelter_id=None, age_min=None, age_max=None, text="",
+                 status=""):
+    """Quantidade de animais encontrados pela pesquisa (sem montar linhas)."""
+    conditions = _search_conditions(species, size, shelter_id, age_min, age_max, text, status)
+    stmt = select(func.count()).select_from(Animal).where(*(condition for _, condition in conditions))
+    return session.execute(stmt).scalar_one()
+
+
+def _search_conditions(species="", size="", shelter_id=None, age_min=None, age_max=None, text="", status=""):
+    """
+    Condições WHERE da pesquisa, cada uma associada à faceta que filtra.
+
+    Returns:
+        list: Pares (faceta, condição); idade usa a faceta "age" e a busca
+              livre a faceta "text" (vale para todas as facetas)
+    """
+    conditions = [("text", condition) for condition in text_conditions(text)]
+    if species:
+        conditions.append(("species", Animal.species == species))
+    if size:
+        conditions.append(("size", Animal.size == size))
+    if shelter_id is not None:
+        conditions.append(("shelter_id", Animal.shelter_id == shelter_id))
+    if age_min is not None:
+        conditions.append(("age", Animal.age >= age_min))
+    if age_max is not None:
+        conditions.append(("age", Animal.age <= age_max))
+    if status:
+        conditions.append(("status", Animal.status == status))
+    return conditions
+
+
+def facet_counts(session, species="", size="", shelter_id=None, age_min=None, age_max=None, text="",
+                 status=""):
+    """
+    Conta os animais por valor de cada faceta sob os filtros atuais.
+
+    Cada faceta aplica todos os filtros exceto o seu próprio (ex: com
+    espécie "Gato" selecionada, a faceta de espécie continua mostrando
+    quantos cachorros existem com os demais filtros). Todas as facetas
+    saem de uma única consulta: um GROUP BY por faceta unidos com
+    UNION ALL.
+
+    Returns:
+        dict: Faceta → lista de (valor, quantidade), maior quantidade primeiro
+    """
+    conditions = _search_conditions(species, size, shelter_id, age_min, age_max, text, status)
+    # Mesmos valores exibidos na tabela (porte vazio = NULL)
+    columns = {"species": Animal.species, "size": _blank(Animal.size),
+               "shelter_id": Animal.shelter_id, "status": Animal.status}
+    groups = []
+    for facet in FACETS:
+        column = columns[facet]
+        groups.append(
+            select(literal(facet).label("facet"), type_coerce(column, Integer).label("value"),
+                   func.count().label("n"))
+            .where(*(condition for owner, condition in conditions if owner != facet))
+            .group_by(column)
+        )
+    # Uma coluna "value" para todas as facetas: os valores chegam crus
+    # (códigos) e cada faceta os traduz com o tipo da própria coluna
+    counts = {facet: [] for facet in FACETS}
+    for facet, value, n in session.execute(union_all(*groups)):
+        column_type = columns[facet].type
+        if isinstance(column_type, CodedText):
+            value = column_type.process_result_value(value, None)
+        counts[facet].append((value, n))
+    for values in counts.values():
+        values.sort(key=lambda item: (-item[1], str(item[0])))
+    return counts
+
+
+def auth_user_rows(session):
+    """
+    Monta as linhas da tabela de contas do sistema (AdmTab.carregar_usuarios).
+
+    Returns:
+        list: Tuplas (id, username, nível de acesso) ordenadas por username
+    """
+    stmt = select(AuthUser.id, AuthUser.username, AuthUser.nivel_acesso).order_by(AuthUser.username)
+    return [tuple(row) for row in session.execute(stmt)]
+
+# ========== ORDENAÇÃO E PAGINAÇÃO ==========
+#
+# As listas das abas mostram uma página por vez, ordenada no banco pela
+# coluna escolhida no cabeçalho com desempate pelo ID (ordem total e
+# estável). A página seguinte continua depois da última linha exibida
+# (keyset pagination: WHERE (chave, id) > (?, ?)), sem OFFSET: com um
+# índice na coluna, cada página lê apenas as próprias linhas. No SQLite
+# um índice de uma coluna já está ordenado por (coluna, rowid), de modo
+# que o desempate pelo ID não exige índices compostos.
+
+# Linhas por página
+PAGE_SIZE = 200
+
+# Colunas de ordenação na ordem das colunas de cada projeção (mesma
+# ordem das colunas dos Treeviews). Colunas dos próprios registros são
+# indexadas; nomes, emails e cidades ordenam pela versão normalizada
+# (sem acento e minúscula, a mesma do filtro rápido). Nomes vindos de JOIN (abrigo, animal, tutor) ordenam por
+# (nome, ID do registro ligado): a ordem do índice do nome seguida da
+# chave estrangeira indexada, de modo que o SQLite percorre a tabela
+# ligada pelo índice do nome em vez de ordenar a tabela inteira.
+ANIMAL_SORT = (Animal.id, Animal.name_norm, Animal.species, Animal.breed_norm, Animal.age, Animal.size,
+               Animal.gender, Animal.status, (Shelter.name, Shelter.id))
+USER_SORT = (User.id, User.name_norm, User.email_norm, User.city_norm)
+ADOPTION_SORT = (AdoptionProcess.id, (Animal.name_norm, Animal.id), (User.name_norm, User.id),
+                 AdoptionProcess.status)
+SEARCH_SORT = (Animal.id, Animal.name_norm, Animal.species, Animal.age, Animal.size, Animal.gender,
+               Animal.status, (Shelter.name, Shelter.id))
+
+
+def _valid_cursor(segment, last_key, last_id, segments, keys):
+    """Cursor (trecho, chave, ID) compatível com uma ordenação de sorted_page."""
+    def integer(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    return (integer(segment) and 0 <= segment < segments
+            and integer(last_id)
+            and isinstance(last_key, tuple) and len(last_key) == keys
+            and all(value is None or isinstance(value, (str, int, float)) for value in last_key))
+
+
+def sorted_page(session, stmt, key, id_column, descending=False, after=None, limit=PAGE_SIZE):
+    """
+    Uma página da projeção ordenada por key, com desempate pelo ID.
+
+    Linhas com key NULL formam um trecho à parte, percorrido pelo ID:
+    primeiro na ordem crescente e por último na decrescente (onde o
+    SQLite coloca NULL), para que cada trecho seja uma faixa contínua do
+    índice. Com key em tupla (nome de JOIN) o trecho NULL fica sempre
+    por último.
+
+    Args:
+        stmt: Projeção cuja primeira coluna é o ID
+        key: Coluna de ordenação, ou tupla de colunas (a primeira decide
+             o trecho NULL)
+        id_column: Coluna de desempate (ID)
+        descending (bool): Ordem decrescente
+        after (tuple): Cursor devolvido pela página anterior (None = início)
+        limit (int): Linhas por página
+
+    Returns:
+        tuple: (linhas, cursor da próxima página ou None no fim da lista)
+
+    Raises:
+        ValueError: Cursor que não pode ter saído desta ordenação
+    """
+    def ordered(column):
+        return column.desc() if descending else column.asc()
+
+    def beyond(column, value):
+        return column < value if descending else column > value
+
+    keys = key if isinstance(key, tuple) else (key,)
+    if keys == (id_column,):
+        segments = ("values",)
+    elif descending or len(keys) > 1:
+        # Tupla: NULL = registro ligado ausente, só encontrado percorrendo
+        # a tabela inteira; fica no fim nos dois sentidos
+        segments = ("values", "nulls")
+    else:
+        segments = ("nulls", "values")
+    segment, last_key, last_id = after or (0, None, None)
+    if after is not None and not _valid_cursor(segment, last_key, last_id, len(segments), len(keys)):
+        raise ValueError("cursor inválido")
+    stmt = stmt.order_by(None).add_columns(*(k.label(f"sort_key_{i}") for i, k in enumerate(keys)))
+
+    rows = []
+    while segment < len(segments):
+        wanted = limit - len(rows)
+        if segments[segment] == "nulls":
+            page = stmt.where(keys[0].is_(None)).order_by(ordered(id_column))
+            if last_id is not None:
+                page = page.where(beyond(id_column, last_id))
+        elif keys == (id_column,):
+            page = stmt.order_by(ordered(id_column))
+            if last_id is not None:
+                page = page.where(beyond(id_column, last_id))
+        else:
+            page = stmt.where(keys[0].is_not(None)).order_by(*map(ordered, keys), ordered(id_column))
+            if last_id is not None:
+                # Cursor com o tipo das colunas (categorias voltam a código)
+                types = [k.type for k in keys] + [id_column.type]
+                page = page.where(beyond(tuple_(*keys, id_column), tuple_(*last_key, last_id, types=types)))
+        fetched = session.execute(page.limit(wanted)).all()
+        rows.extend(tuple(row[:-len(keys)]) for row in fetched)
+        if len(fetched) == wanted:
+            last_key, last_id = tuple(fetched[-1][-len(keys):]), fetched[-1][0]
+            return rows, (segment, last_key, last_id)
+        segment, last_key, last_id = segment + 1, None, None
+    return rows, None
+
+
+def projection_page(session, stmt, column=0, descending=False, after=None, limit=PAGE_SIZE):
+    """
+    Página de uma projeção ordenada pelas próprias colunas exibidas.
+
+    Para projeções sem colunas indexáveis (estatísticas dos abrigos,
+    histórico com processos arquivados): a ordenação usa os valores
+    exibidos.
+    """
+    columns = stmt.selected_columns
+    return sorted_page(session, stmt, columns[column], columns[0], descending, after, limit)
+
+
+def animal_page(session, column=0, descending=True, after=None, limit=PAGE_SIZE, prefix=None):
+    """Página da AnimalsTab (colunas de animal_rows_stmt); ver sorted_page e prefix_filter."""
+    stmt = animal_rows_stmt().where(*prefix_filter(ANIMAL_FILTERS, prefix))
+    return sorted_page(session, stmt, ANIMAL_SORT[column], Animal.id, descending, after, limit)
+
+
+def user_page(session, column=0, descending=True, after=None, limit=PAGE_SIZE, prefix=None):
+    """Página da UsersTab (colunas de user_rows_stmt); ver sorted_page e prefix_filter."""
+    stmt = user_rows_stmt().where(*prefix_filter(USER_FILTERS, prefix))
+    return sorted_page(session, stmt, USER_SORT[column], User.id, descending, after, limit)
+
+
+def adoption_page(session, column=0, descending=True, after=None, limit=PAGE_SIZE, prefix=None):
+    """Página da AdoptionsTab (colunas de adoption_rows_stmt); ver sorted_page e prefix_filter."""
+    stmt = adoption_rows_stmt().where(*prefix_filter(ADOPTION_FILTERS, prefix))
+    return sorted_page(session, stmt, ADOPTION_SORT[column], AdoptionProcess.id,
+                       descending, after, limit)
+
+
+def shelter_page(session, column=0, descending=True, after=None, limit=PAGE_SIZE):
+    """Página da ShelterTab (colunas de shelter_rows_stmt, com o arquivo); ver projection_page."""
+    return projection_page(session, shelter_rows_stmt(_has_archive(session)), column, descending, after, limit)
+
+
+def search_page(session, criteria, column=0, descending=False, after=None, limit=PAGE_SIZE):
+    """
+    Página da SearchTab (colunas de search_rows_stmt); ver sorted_page.
+
+    Args:
+        criteria (dict): Filtros aceitos por search_animal_rows
+    """
+    return sorted_page(session, search_rows_stmt(**criteria), SEARCH_SORT[column], Animal.id,
+                       descending, after, limit)
+
+# ========== FILTRO RÁPIDO ==========
+#
+# A caixa de filtro acima de cada lista busca o texto digitado como
+# prefixo de uma coluna normalizada (utils.normalize_text: sem acentos,
+# minúscula), mantida pelos modelos a partir da coluna original e
+# indexada. O prefixo vira uma faixa do índice (coluna >= p AND
+# coluna < p + U+10FFFF), já que o LIKE do SQLite só usa índices com
+# COLLATE NOCASE. Ordenada pela mesma coluna (posição em *_SORT), a
+# primeira página lê apenas as próprias linhas do índice.
+
+# Campo do filtro → (coluna normalizada, posição da coluna na lista)
+ANIMAL_FILTERS = {"name": (Animal.name_norm, 1), "breed": (Animal.breed_norm, 3)}
+USER_FILTERS = {"name": (User.name_norm, 1), "email": (User.email_norm, 2), "city": (User.city_norm, 3)}
+ADOPTION_FILTERS = {"animal": (Animal.name_norm, 1), "user": (User.name_norm, 2)}
+
+# Colunas normalizadas mantidas pelos modelos: (origem, normalizada)
+NORMALIZED_COLUMNS = (
+    (Animal.name, Animal.name_norm),
+    (Animal.breed, Animal.breed_norm),
+    (User.name, User.name_norm),
+    (User.email, User.email_norm),
+    (User.city, User.city_norm),
+)
+
+# Categorias reconhecidas por palavra na busca livre (text_conditions)
+TEXT_CATEGORIES = (Animal.species, Animal.size, Animal.gender)
+
+# Linhas por lote no preenchimento de bancos antigos
+BACKFILL_BATCH = 5000
+
+# Maior caractere Unicode: limite superior da faixa de um prefixo
+_PREFIX_END = "\U0010ffff"
+
+
+def prefix_range(column, text):
+    """
+    Condição "coluna começa com text" (já normalizado) como faixa do índice.
+    """
+    return and_(column >= text, column < text + _PREFIX_END)
+
+
+def prefix_filter(filters, prefix):
+    """
+    Condições do filtro rápido.
+
+    Args:
+        filters (dict): Campos aceitos (ANIMAL_FILTERS, USER_FILTERS...)
+        prefix (tuple): (campo, texto digitado) ou None
+
+    Returns:
+        tuple: Condições para where() (vazia sem filtro ou texto vazio)
+    """
+    if not prefix:
+        return ()
+    field, text = prefix
+    text = normalize_text(text)
+    if not text:
+        return ()
+    return (prefix_range(filters[field][0], text),)
+
+
+def text_conditions(text):
+    """
+    Condições da busca livre da SearchTab ("cachorro medio", "Joao").
+
+    Cada palavra igual (sem acentos e maiúsculas) a uma espécie, porte ou
+    gênero vira igualdade com o código da categoria; as demais palavras,
+    juntas, são procuradas como prefixo do nome ou da raça. Todas as
+    condições usam índices (códigos e colunas *_norm).
+
+    Args:
+        text (str): Texto digitado
+
+    Returns:
+        list: Condições para where() (vazia com texto vazio)
+    """
+    conditions, words = [], []
+    for word in normalize_text(text).split():
+        for column in TEXT_CATEGORIES:
+            if isinstance(column.type.code(word), int):
+                conditions.append(column == word)
+                break
+        else:
+            words.append(word)
+    if words:
+        phrase = " ".join(words)
+        conditions.append(or_(prefix_range(Animal.name_norm, phrase), prefix_range(Animal.breed_norm, phrase)))
+    return conditions
+
+
+def backfill_normalized(session, columns=NORMALIZED_COLUMNS, batch_size=BACKFILL_BATCH):
+    """
+    Preenche as colunas normalizadas de registros gravados antes de elas
+    existirem (ou por outros programas). Idempotente; o commit fica a
+    cargo do chamador.
+
+    Args:
+        columns (tuple): Pares (origem, normalizada), como NORMALIZED_COLUMNS
+
+    Returns:
+        int: Valores preenchidos
+    """
+    updated = 0
+    for source, target in columns:
+        table = source.table
+        key = table.primary_key.columns[0]
+        stmt = update(table).where(key == bindparam("b_id")).values({target.key: bindparam("b_value")})
+        last_id = 0
+        while True:
+            rows = session.execute(
+                select(key, source)
+                .where(target.is_(None), source.is_not(None), key > last_id)
+                .order_by(key)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            params = [{"b_id": row_id, "b_value": normalize_text(value) or None} for row_id, value in rows]
+            session.connection().execute(stmt, params)
+            updated += len(rows)
+            last_id = rows[-1][0]
+    return updated
+
+# ========== RELATÓRIOS ==========
+
+def stage_time_report(session, since=None, until=None, now=None, include_archive=False):
+    """
+    Tempo que os processos passam em cada etapa (AdoptionsTab).
+
+    Calculado só com agregações no banco: a duração de cada etapa já é
+    gravada no evento que encerra a etapa (stage_seconds), de modo que o
+    histórico concluído é um GROUP BY lido apenas do índice
+    ix_status_events_stage. Processos ainda parados numa etapa são medidos
+    a partir do último evento de cada um (índice ix_status_events_adoption).
+
+    Args:
+        since (datetime): Considera etapas encerradas a partir desta data
+        until (datetime): Considera etapas encerradas antes desta data
+        now (datetime): Referência para etapas em andamento (padrão: agora)
+        include_archive (bool): Inclui as etapas concluídas de processos
+                                arquivados (archive.py)
+
+    Returns:
+        list: Tuplas (etapa, concluídas, média em dias, máximo em dias,
+              em andamento, média em andamento em dias), nas etapas de
+              IN_PROGRESS_STEPS primeiro; médias None sem dados
+    """
+    now = now or datetime.now()
+    E = AdoptionStatusEvent
+
+    # Etapas concluídas: banco principal ou, no histórico completo, a
+    # união com o arquivo (processos em andamento nunca são arquivados)
+    if include_archive:
+        import archive
+        E = archive.events_union(session).c
+    closed = select(E.from_status, func.count(E.stage_seconds), func.avg(E.stage_seconds),
+                    func.max(E.stage_seconds)).where(E.from_status.is_not(None))
+    if since is not None:
+        closed = closed.where(E.changed_at >= since)
+    if until is not None:
+        closed = closed.where(E.changed_at < until)
+    closed = closed.group_by(E.from_status)
+    E = AdoptionStatusEvent
+
+    # Entrada na etapa atual = último evento do processo
+    last_event = (select(func.max(E.id)).where(E.adoption_id == AdoptionProcess.id)
+                  .correlate(AdoptionProcess).scalar_subquery())
+    open_days = func.julianday(literal(now, DateTime)) - func.julianday(E.changed_at)
+    current = (
+        select(AdoptionProcess.status, func.count(), func.avg(open_days))
+        .join(E, E.id == last_event)
+        .where(AdoptionProcess.status.in_(IN_PROGRESS_STEPS), E.to_status == AdoptionProcess.status)
+        .group_by(AdoptionProcess.status)
+    )
+
+    days = 86400.0
+    stats = {}
+    for status, n, avg, longest in session.execute(closed):
+        stats[status] = [n, avg / days if avg is not None else None,
+                         longest / days if longest is not None else None, 0, None]
+    for status, n, avg in session.execute(current):
+        entry = stats.setdefault(status, [0, None, None, 0, None])
+        entry[3:] = [n, avg]
+
+    order = list(IN_PROGRESS_STEPS) + sorted(s for s in stats if s not in IN_PROGRESS_STEPS)
+    return [(status, *stats[status]) for status in order if status in stats]
+
+# ========== PAINEL GERENCIAL (ROLLUPS) ==========
+
+def _rollup_shelter_filter(model, shelter_id):
+    """Condição de abrigo nas tabelas de rollup (None = todos)."""
+    return () if shelter_id is None else (model.shelter_id == shelter_id,)
+
+
+def dashboard_occupancy(session, shelter_id=None):
+    """
+    Ocupação atual por abrigo e espécie (DashboardTab).
+
+    Lê apenas rollup_occupancy (uma linha por abrigo e espécie).
+
+    Returns:
+        list: Tuplas (abrigo, espécie, animais), por abrigo e maior ocupação
+    """
+    stmt = (
+        select(func.coalesce(Shelter.name, "(sem abrigo)"), RollupOccupancy.species, RollupOccupancy.animals)
+        .outerjoin(Shelter, Shelter.id == RollupOccupancy.shelter_id)
+        .where(RollupOccupancy.animals != 0, *_rollup_shelter_filter(RollupOccupancy, shelter_id))
+        .order_by(RollupOccupancy.shelter_id, RollupOccupancy.animals.desc())
+    )
+    return [tuple(row) for row in session.execute(stmt)]
+
+
+def dashboard_daily(session, since, shelter_id=None):
+    """
+    Entradas e adoções por dia a partir de uma data (DashboardTab).
+
+    Lê apenas o intervalo pedido de rollup_daily (chave iniciada pelo dia).
+
+    Returns:
+        list: Tuplas (dia, entradas, adoções), dia mais recente primeiro
+    """
+    stmt = (
+        select(RollupDaily.day, func.sum(RollupDaily.intake), func.sum(RollupDaily.adopted))
+        .where(RollupDaily.day >= since, *_rollup_shelter_filter(RollupDaily, shelter_id))
+        .group_by(RollupDaily.day)
+        .order_by(RollupDaily.day.desc())
+    )
+    return [tuple(row) for row in session.execute(stmt)]
+
+
+def dashboard_species(session, since, shelter_id=None):
+    """
+    Entradas e adoções por espécie a partir de uma data (DashboardTab).
+
+    Returns:
+        list: Tuplas (espécie, entradas, adoções), maior entrada primeiro
+    """
+    intake = func.sum(RollupDaily.intake)
+    stmt = (
+        select(RollupDaily.species, intake, func.sum(RollupDaily.adopted))
+        .where(RollupDaily.day >= since, *_rollup_shelter_filter(RollupDaily, shelter_id))
+        .group_by(RollupDaily.species)
+        .order_by(intake.desc(), RollupDaily.species)
+    )
+    return [tuple(row) for row in session.execute(stmt)]
+
+# ========== VERIFICAÇÕES DE NEGÓCIO ==========
+
+def shelter_occupancy(session, shelter_id):
+    """
+    Conta os animais ainda não adotados de um abrigo (validação de lotação).
+
+    Returns:
+        int: Ocupação atual do abrigo
+    """
+    return session.query(Animal).filter(Animal.shelter_id == shelter_id, Animal.status != "Adotado").count()
+
+
+def active_adoption_count(session, animal_id):
+    """
+    Conta os processos ativos (não finalizados/recusados) de um animal.
+
+    Returns:
+        int: Quantidade de processos ativos
+    """
+    return session.query(AdoptionProcess).filter(
+        AdoptionProcess.animal_id == animal_id,
+        AdoptionProcess.status.notin_(("Finalizado", "Recusado"))
+    ).count()
+
+# ========== GRAVAÇÃO ==========
+
+def _get_or_new(session, model, record_id):
+    """
+    Busca o registro para edição ou cria um novo (adicionado à sessão).
+
+    Returns:
+        objeto do modelo, ou None se o ID informado não existir
+    """
+    if record_id:
+        return session.get(model, record_id)
+    obj = model()
+    session.add(obj)
+    return obj
+
+
+def save_animal(session, animal_id, **values):
+    """
+    Cria ou atualiza um animal com valores já validados (AnimalsTab.save).
+
+    Args:
+        animal_id (int): ID para edição, ou None para criação
+        **values: Atributos do modelo Animal
+
+    Returns:
+        Animal: Registro salvo, ou None se animal_id não existir
+    """
+    animal = _get_or_new(session, Animal, animal_id)
+    if animal is None:
+        return None
+    for attr, value in values.items():
+        setattr(animal, attr, value)
+    session.flush()
+    return animal
+
+
+def save_user(session, user_id, **values):
+    """
+    Cria ou atualiza um tutor com valores já validados (UsersTab.save).
+
+    Returns:
+        User: Registro salvo, ou None se user_id não existir
+    """
+    usuario = _get_or_new(session, User, user_id)
+    if usuario is None:
+        return None
+    for attr, value in values.items():
+        setattr(usuario, attr, value)
+    session.flush()
+    return usuario
+
+
+def save_shelter(session, shelter_id, **values):
+    """
+    Cria ou atualiza um abrigo com valores já validados (ShelterTab.save).
+
+    Returns:
+        Shelter: Registro salvo, ou None se shelter_id não existir
+    """
+    abrigo = _get_or_new(session, Shelter, shelter_id)
+    if abrigo is None:
+        return None
+    for attr, value in values.items():
+        setattr(abrigo, attr, value)
+    session.flush()
+    return abrigo
+
+
+def save_adoption(session, adoption_id, **values):
+    """
+    Cria ou atualiza um processo de adoção (AdoptionsTab.save).
+
+    Após gravar o processo, sincroniza o status do animal vinculado
+    (finalizado → "Adotado", em andamento → "Em processo").
+
+    Returns:
+        AdoptionProcess: Registro salvo, ou None se adoption_id não existir
+    """
+    adocao = _get_or_new(session, AdoptionProcess, adoption_id)
+    if adocao is None:
+        return None
+    previous = adocao.status if adoption_id else None
+    for attr, value in values.items():
+        setattr(adocao, attr, value)
+    session.flush()
+
+    # Mudança de etapa entra no histórico na mesma transação
+    if adocao.status != previous or not adoption_id:
+        _record_status_change(session, adocao, previous)
+
+    # Atualiza automaticamente o status do animal (relacionamento recarregado,
+    # pois animal_id pode ter mudado nesta mesma unidade de trabalho)
+    session.expire(adocao, ["animal"])
+    adocao.update_animal_status()
+    if adocao.animal and adocao.status in IN_PROGRESS_STEPS:
+        adocao.animal.status = "Em processo"
+    session.flush()
+    return adocao
+
+
+def _record_status_change(session, adocao, previous):
+    """
+    Registra uma mudança de etapa em AdoptionStatusEvent (somente inserção).
+
+    A duração da etapa encerrada é calculada agora, a partir do último
+    evento do processo, para que o relatório não precise reconstruir a
+    sequência de eventos.
+
+    Args:
+        adocao (AdoptionProcess): Processo já gravado (flush) com a nova etapa
+        previous (str): Etapa anterior, ou None na criação do processo
+    """
+    now = datetime.now()
+    stage_seconds = None
+    if previous is not None:
+        entered = session.scalar(
+            select(AdoptionStatusEvent.changed_at)
+            .where(AdoptionStatusEvent.adoption_id == adocao.id)
+            .order_by(AdoptionStatusEvent.id.desc())
+            .limit(1)
+        )
+        if entered is not None:
+            stage_seconds = max(0, int((now - entered).total_seconds()))
+    session.add(AdoptionStatusEvent(adoption_id=adocao.id, from_status=previous, to_status=adocao.status,
+                                    changed_at=now, stage_seconds=stage_seconds))
@@ -0,0 +1,93 @@
+"""
+Filtro Rápido - Busca por Prefixo acima das Listas
+--------------------------------------------------
+Este módulo implementa a caixa de filtro exibida acima das listas das
+abas (animais, tutores, processos): o texto digitado é procurado como
+início do nome, raça, email ou cidade, sem diferenciar acentos e maiúsculas.
+
+1. Busca:
+   - Prefixo comparado com a coluna normalizada do campo escolhido
+     (queries.prefix_filter), como faixa do índice: sem varrer a tabela
+   - Ao filtrar, a lista passa a ser ordenada pelo campo filtrado
+     (crescente), a ordem do próprio índice; o cabeçalho continua
+     podendo reordenar a lista filtrada
+
+2. Digitação:
+   - A consulta só é feita DEBOUNCE_MS após a última tecla
+   - Leitura da primeira página em segundo plano
+     (PagedTree.reload_async): a digitação nunca espera pelo banco
+   - Esc limpa o filtro
+
+Exemplo de uso:
+    self.quick = QuickFilter(left_panel, self.pager, queries.USER_FILTERS,
+                             {"Nome": "name", "Email": "email"})
+    ...
+    queries.user_page(session, column, descending, after, limit, self.quick.prefix)
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from utils import normalize_text
+
+# Espera após a última tecla antes de consultar (ms)
+DEBOUNCE_MS = 250
+
+
+class QuickFilter(ttk.Frame):
+    """
+    Caixa de filtro por prefixo ligada a um PagedTree.
+
+    Atributos:
+        prefix (tuple): Filtro atual (campo, texto) ou None; lido pela
+            função de página da aba (fetch do PagedTree)
+    """
+
+    def __init__(self, parent, pager, filters, labels):
+        """
+        Args:
+            parent: Widget pai
+            pager (PagedTree): Lista filtrada
+            filters (dict): Campos da consulta (ex: queries.USER_FILTERS)
+            labels (dict): Rótulo exibido → campo de filters, na ordem
+                do seletor (seletor oculto com um único campo)
+        """
+        super().__init__(parent)
+        self.pager = pager
+        self.filters = filters
+        self.labels = labels
+        self.prefix = None
+        self._after_id = None
+
+        ttk.Label(self, text="Filtrar:").pack(side=tk.LEFT)
+        self.field = tk.StringVar(value=next(iter(labels)))
+        if len(labels) > 1:
+            selector = ttk.Combobox(self, textvariable=self.field, values=list(labels),
+                                    state="readonly", width=8)
+            selector.pack(side=tk.LEFT, padx=(5, 0))
+            selector.bind("<<ComboboxSelected>>", lambda e: self._schedule())
+        self.text = tk.StringVar()
+        entry = ttk.Entry(self, textvariable=self.text)
+        entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 0))
+        entry.bind("<Escape>", lambda e: self.text.set(""))
+        self.text.trace_add("write", lambda *args: self._schedule())
+
+    def _schedule(self):
+        """Reinicia a espera a cada tecla (debounce)."""
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self._after_id = self.after(DEBOUNCE_MS, self.apply)
+
+    def apply(self):
+        """Aplica o texto atual à lista."""
+        self._after_id = None
+        field = self.labels[self.field.get()]
+        text = normalize_text(self.text.get())
+        prefix = (field, text) if text else None
+        if prefix == self.prefix:
+            return
+        self.prefix = prefix
+        column = self.filters[field][1]
+        if prefix and self.pager.column != column:
+            self.pager.set_sort(column, descending=False)
+        self.pager.reload_async()
@@ -0,0 +1,410 @@
+"""
+Rollups do Painel Gerencial - Totais Mantidos Incrementalmente
+--------------------------------------------------------------
+Este módulo mantém as tabelas pré-agregadas lidas pela aba de painel
+(dashboard_tab.py): entradas e adoções por dia, abrigo e espécie, e a
+ocupação atual por abrigo e espécie. O painel nunca consulta animals ou
+adoptions diretamente, de modo que o tempo de abertura não depende do
+tamanho do histórico.
+
+1. Tabelas (models.py):
+   - rollup_daily: entradas (animals.created_at) e adoções (eventos de
+     adoption_status_events para/de "Finalizado") por dia
+   - rollup_occupancy: animais não adotados por abrigo e espécie
+   - rollup_animals: último estado contabilizado de cada animal
+   - rollup_state: marcas d'água e momento da última atualização
+
+2. Atualização incremental (refresh):
+   - Animais: apenas linhas com updated_at a partir da marca d'água
+     (com uma margem de OVERLAP para transações confirmadas fora de
+     ordem); a variação vem da comparação com rollup_animals, então
+     reprocessar uma linha não altera os totais
+   - Adoções: apenas eventos com ID acima da marca d'água (a tabela de
+     eventos é somente de inserção)
+   - Exclusões pelo ORM: aplicadas no próprio flush da exclusão
+     (_on_flush), na mesma transação
+   - Primeira execução: reconstrução com agregações no banco (rebuild);
+     também corrige alterações feitas fora da aplicação (SQL manual)
+
+3. Consistência:
+   - Tudo roda numa única transação de escrita (session_scope); a
+     primeira instrução grava em rollup_state para obter o bloqueio de
+     escrita antes das leituras, evitando duas estações somando a mesma
+     variação
+   - Antes disso, uma verificação somente leitura (pending): sem nada a
+     contabilizar, refresh não grava (não disputa o bloqueio de escrita
+     nem muda PRAGMA data_version, que os índices em memória observam)
+
+Exemplo de uso:
+    with session_scope() as s:
+        rollups.refresh(s)
+    with read_session() as s:
+        rows = queries.dashboard_occupancy(s)
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, delete, event, func, insert as sa_insert, literal, or_, select, union_all
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from models import (Animal, AdoptionProcess, AdoptionStatusEvent, RollupAnimal, RollupDaily,
+                    RollupOccupancy, RollupState)
+
+# Margem reprocessada antes da marca d'água de animais (transações que
+# gravaram updated_at antes da marca mas confirmaram depois dela)
+OVERLAP = timedelta(minutes=5)
+
+# Abrigo usado para animais sem abrigo (chave primária não aceita NULL)
+NO_SHELTER = 0
+
+# IDs consultados por instrução IN ao comparar com rollup_animals
+CHUNK_SIZE = 500
+
+# Nomes das marcas em rollup_state
+ANIMALS_MARK = "animals_updated_at"
+EVENTS_MARK = "events_id"
+REFRESHED_AT = "refreshed_at"
+
+# ========== ESTADO ==========
+
+def _read_state(session):
+    """Marcas d'água gravadas (nome → valor)."""
+    return dict(session.execute(select(RollupState.name, RollupState.value)).all())
+
+
+def _write_state(session, values):
+    """Grava marcas d'água (upsert)."""
+    stmt = insert(RollupState.__table__)
+    stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"value": stmt.excluded.value})
+    session.connection().execute(stmt, [{"name": k, "value": v} for k, v in values.items()])
+
+
+def last_refresh(session):
+    """
+    Momento da última atualização dos rollups.
+
+    Returns:
+        datetime: Última atualização, ou None se nunca atualizados
+    """
+    value = session.scalar(select(RollupState.value).where(RollupState.name == REFRESHED_AT))
+    return datetime.fromisoformat(value) if value else None
+
+# ========== APLICAÇÃO DE VARIAÇÕES ==========
+
+def _add_daily(session, deltas, column):
+    """
+    Soma variações em rollup_daily.
+
+    Args:
+        deltas (dict): (dia, abrigo, espécie) → variação
+        column (str): "intake" ou "adopted"
+    """
+    rows = [{"day": day, "shelter_id": shelter_id, "species": species,
+             "intake": n if column == "intake" else 0, "adopted": n if column == "adopted" else 0}
+            for (day, shelter_id, species), n in deltas.items() if n]
+    if not rows:
+        return
+    table = RollupDaily.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "shelter_id", "species"],
+        set_={column: table.c[column] + stmt.excluded[column]},
+    )
+    session.connection().execute(stmt, rows)
+
+
+def _add_occupancy(session, deltas):
+    """
+    Soma variações em rollup_occupancy.
+
+    Args:
+        deltas (dict): (abrigo, espécie) → variação
+    """
+    rows = [{"shelter_id": shelter_id, "species": species, "animals": n}
+            for (shelter_id, species), n in deltas.items() if n]
+    if not rows:
+        return
+    table = RollupOccupancy.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["shelter_id", "species"],
+        set_={"animals": table.c.animals + stmt.excluded.animals},
+    )
+    session.connection().execute(stmt, rows)
+
+
+def _is_present(status):
+    """Animal conta na ocupação enquanto não for adotado (mesma regra de shelter_occupancy)."""
+    return status != "Adotado"
+
+# ========== ANIMAIS ==========
+
+def _animal_columns():
+    """Colunas de animals lidas pela atualização."""
+    return (Animal.id, func.coalesce(Animal.shelter_id, NO_SHELTER), Animal.species, Animal.status,
+            Animal.created_at, Animal.updated_at)
+
+
+def _apply_animals(session, rows):
+    """
+    Contabiliza animais novos ou alterados.
+
+    Args:
+        rows (list): Linhas de _animal_columns()
+
+    Returns:
+        datetime: Maior updated_at entre as linhas (None se nenhuma tiver)
+    """
+    intake, occupancy, mirror = {}, {}, []
+    newest = None
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        known = {
+            animal_id: (shelter_id, species, present)
+            for animal_id, shelter_id, species, present in session.execute(
+                select(RollupAnimal.animal_id, RollupAnimal.shelter_id, RollupAnimal.species,
+                       RollupAnimal.present)
+                .where(RollupAnimal.animal_id.in_([row[0] for row in chunk]))
+            )
+        }
+        for animal_id, shelter_id, species, status, created_at, updated_at in chunk:
+            if updated_at is not None and (newest is None or updated_at > newest):
+                newest = updated_at
+            state = (shelter_id, species, _is_present(status))
+            before = known.get(animal_id)
+            if before == state:
+                continue
+            if before is None:
+                if created_at is not None:
+                    key = (created_at.date(), shelter_id, species)
+                    intake[key] = intake.get(key, 0) + 1
+            elif before[2]:
+                occupancy[before[:2]] = occupancy.get(before[:2], 0) - 1
+            if state[2]:
+                occupancy[state[:2]] = occupancy.get(state[:2], 0) + 1
+            mirror.append({"animal_id": animal_id, "shelter_id": shelter_id, "species": species,
+                           "present": state[2]})
+
+    _add_daily(session, intake, "intake")
+    _add_occupancy(session, occupancy)
+    if mirror:
+        stmt = insert(RollupAnimal.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["animal_id"],
+            set_={c: stmt.excluded[c] for c in ("shelter_id", "species", "present")},
+        )
+        session.connection().execute(stmt, mirror)
+    return newest
+
+
+def _forget_animals(session, animal_ids):
+    """
+    Retira animais excluídos de rollup_animals e da ocupação.
+
+    As entradas já contabilizadas permanecem no histórico diário.
+    """
+    conn = session.connection()
+    gone = conn.execute(
+        select(RollupAnimal.shelter_id, RollupAnimal.species, RollupAnimal.present)
+        .where(RollupAnimal.animal_id.in_(animal_ids))
+    ).all()
+    occupancy = {}
+    for shelter_id, species, present in gone:
+        if present:
+            occupancy[(shelter_id, species)] = occupancy.get((shelter_id, species), 0) - 1
+    _add_occupancy(session, occupancy)
+    conn.execute(delete(RollupAnimal.__table__).where(RollupAnimal.animal_id.in_(animal_ids)))
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session, flush_context):
+    """
+    Exclusões de animais pelo ORM são aplicadas aos rollups no mesmo flush.
+
+    Exclusões não deixam linha para a marca d'água de updated_at; tratá-las
+    aqui (mesma transação) evita comparar animals e rollup_animals inteiras
+    a cada atualização.
+    """
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Animal)]
+    for start in range(0, len(deleted), CHUNK_SIZE):
+        _forget_animals(session, deleted[start:start + CHUNK_SIZE])
+
+# ========== ADOÇÕES ==========
+
+def _touches_finalized(E):
+    """Eventos que entram em ou saem de "Finalizado"."""
+    return (E.to_status == "Finalizado") | (E.from_status == "Finalizado")
+
+
+def _adoption_delta(E):
+    """+1 ao entrar em "Finalizado", -1 ao sair (correção do processo)."""
+    return case((E.to_status == "Finalizado", 1), else_=-1)
+
+
+def _apply_events(session, after_id):
+    """
+    Contabiliza adoções dos eventos com ID acima de after_id.
+
+    Entrar em "Finalizado" soma uma adoção no dia do evento; sair de
+    "Finalizado" (correção do processo) desconta. Agregado no banco por
+    dia, abrigo e espécie.
+
+    Returns:
+        int: Maior ID de evento existente (nova marca d'água)
+    """
+    E = AdoptionStatusEvent
+    last_id = session.scalar(select(func.max(E.id))) or 0
+    if last_id <= after_id:
+        return after_id
+    day = func.date(E.changed_at)
+    stmt = (
+        select(day, func.coalesce(Animal.shelter_id, NO_SHELTER), Animal.species, func.sum(_adoption_delta(E)))
+        .join(AdoptionProcess, AdoptionProcess.id == E.adoption_id)
+        .join(Animal, Animal.id == AdoptionProcess.animal_id)
+        .where(E.id > after_id, E.id <= last_id, _touches_finalized(E))
+        .group_by(day, Animal.shelter_id, Animal.species)
+    )
+    adopted = {(date.fromisoformat(d), shelter_id, species): n
+               for d, shelter_id, species, n in session.execute(stmt)}
+    _add_daily(session, adopted, "adopted")
+    return last_id
+
+# ========== ATUALIZAÇÃO ==========
+
+def rebuild(session, now=None):
+    """
+    Recalcula todos os rollups a partir das tabelas de origem.
+
+    Usado na primeira atualização (e disponível para correções manuais).
+    As agregações rodam no banco; apenas os totais agrupados passam pelo
+    Python.
+
+    Returns:
+        dict: Resumo da atualização
+    """
+    now = now or datetime.now()
+    _write_state(session, {REFRESHED_AT: now.isoformat(sep=" ")})
+    for model in (RollupDaily, RollupOccupancy, RollupAnimal):
+        session.execute(delete(model))
+
+    present = func.coalesce(Animal.status, "") != "Adotado"
+    session.execute(
+        sa_insert(RollupAnimal).from_select(
+            ["animal_id", "shelter_id", "species", "present"],
+            select(Animal.id, func.coalesce(Animal.shelter_id, NO_SHELTER), Animal.species, present),
+        )
+    )
+    session.execute(
+        sa_insert(RollupOccupancy).from_select(
+            ["shelter_id", "species", "animals"],
+            select(RollupAnimal.shelter_id, RollupAnimal.species, func.count())
+            .where(RollupAnimal.present)
+            .group_by(RollupAnimal.shelter_id, RollupAnimal.species),
+        )
+    )
+
+    # Entradas e adoções numa única agregação (INSERT ... SELECT)
+    E = AdoptionStatusEvent
+    last_event = session.scalar(select(func.max(E.id))) or 0
+    flows = union_all(
+        select(func.date(Animal.created_at).label("day"),
+               func.coalesce(Animal.shelter_id, NO_SHELTER).label("shelter_id"),
+               Animal.species.label("species"), literal(1).label("intake"), literal(0).label("adopted"))
+        .where(Animal.created_at.is_not(None)),
+        select(func.date(E.changed_at), func.coalesce(Animal.shelter_id, NO_SHELTER), Animal.species,
+               literal(0), _adoption_delta(E))
+        .join(AdoptionProcess, AdoptionProcess.id == E.adoption_id)
+        .join(Animal, Animal.id == AdoptionProcess.animal_id)
+        .where(E.id <= last_event, _touches_finalized(E)),
+    ).subquery()
+    session.execute(
+        sa_insert(RollupDaily).from_select(
+            ["day", "shelter_id", "species", "intake", "adopted"],
+            select(flows.c.day, flows.c.shelter_id, flows.c.species,
+                   func.sum(flows.c.intake), func.sum(flows.c.adopted))
+            .group_by(flows.c.day, flows.c.shelter_id, flows.c.species),
+        )
+    )
+
+    newest = session.scalar(select(func.max(Animal.updated_at)))
+    _write_state(session, {ANIMALS_MARK: (newest or now).isoformat(sep=" "), EVENTS_MARK: str(last_event)})
+    animals = session.scalar(select(func.count()).select_from(RollupAnimal))
+    return {"full": True, "animals": animals, "events": last_event}
+
+
+def pending(session):
+    """
+    Indica se há algo a contabilizar (somente leitura: serve numa
+    read_session).
+
+    - Rollups nunca montados ou eventos de adoção acima da marca d'água
+    - Animal da janela de updated_at cujo abrigo, espécie ou presença
+      difere de rollup_animals (edições de nome, raça etc. não contam)
+    - Marca d'água de animais atrasada mais de OVERLAP em relação à
+      última alteração: avançá-la mantém pequena a janela reprocessada
+
+    Returns:
+        bool: True se refresh() alteraria os rollups ou as marcas
+    """
+    state = _read_state(session)
+    if ANIMALS_MARK not in state or EVENTS_MARK not in state:
+        return True
+    E = AdoptionStatusEvent
+    if (session.scalar(select(func.max(E.id))) or 0) > int(state[EVENTS_MARK]):
+        return True
+
+    mark = datetime.fromisoformat(state[ANIMALS_MARK])
+    newest = session.scalar(select(func.max(Animal.updated_at)))
+    if newest is not None and newest > mark + OVERLAP:
+        return True
+    present = func.coalesce(Animal.status, "") != "Adotado"
+    differs = (
+        select(Animal.id)
+        .outerjoin(RollupAnimal, RollupAnimal.animal_id == Animal.id)
+        .where(Animal.updated_at >= mark - OVERLAP,
+               or_(RollupAnimal.animal_id.is_(None),
+                   RollupAnimal.shelter_id != func.coalesce(Animal.shelter_id, NO_SHELTER),
+                   RollupAnimal.species != Animal.species,
+                   RollupAnimal.present != present))
+        .limit(1)
+    )
+    return session.scalar(differs) is not None
+
+
+def refresh(session, now=None):
+    """
+    Atualiza os rollups processando apenas o que mudou desde a última vez.
+
+    Deve rodar numa sessão de escrita (session_scope); o commit fica a
+    cargo do chamador. Sem nada a contabilizar (pending), retorna sem
+    gravar: nem o bloqueio de escrita é obtido, nem a versão do arquivo
+    muda.
+
+    Args:
+        now (datetime): Momento da atualização (padrão: agora)
+
+    Returns:
+        dict: Resumo (full, animais e eventos processados)
+    """
+    if not pending(session):
+        return {"full": False, "animals": 0, "events": 0}
+    now = now or datetime.now()
+    # Primeira instrução grava: obtém o bloqueio de escrita antes de ler
+    _write_state(session, {REFRESHED_AT: now.isoformat(sep=" ")})
+    state = _read_state(session)
+    if ANIMALS_MARK not in state or EVENTS_MARK not in state:
+        return rebuild(session, now)
+
+    mark = datetime.fromisoformat(state[ANIMALS_MARK])
+    changed = session.execute(select(*_animal_columns()).where(Animal.updated_at >= mark - OVERLAP)).all()
+    newest = _apply_animals(session, changed)
+
+    events_mark = int(state[EVENTS_MARK])
+    last_event = _apply_events(session, events_mark)
+
+    _write_state(session, {
+        ANIMALS_MARK: max(mark, newest or mark).isoformat(sep=" "),
+        EVENTS_MARK: str(last_event),
+    })
+    return {"full": False, "animals": len(changed), "events": last_event - events_mark}
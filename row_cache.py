@@ -0,0 +1,273 @@
+"""
+Cache de Linhas Compacto - Armazenamento Colunar das Abas de Listagem
+---------------------------------------------------------------------
+Este módulo mantém em memória listas completas de linhas (projeções de
+queries.py) num formato colunar compacto. É a base do índice bitmap da
+SearchTab (bitmap_index.py), que guarda nele as colunas de filtro; as
+listas das abas leem apenas as páginas exibidas, ordenadas no banco
+(queries.sorted_page, paged_tree.py).
+
+1. Representação:
+   - Uma coluna por campo da projeção (mesmas colunas de queries.py)
+   - Inteiros (ID, idade): array("i"), 4 bytes por linha
+   - Categorias (espécie, porte, status, abrigo...): valores distintos
+     internados + códigos em array("B"/"H"/"I"), 1 a 4 bytes por linha
+   - Textos livres (nome, email): bytes UTF-8 concatenados num único
+     bytearray + array de deslocamentos, sem um objeto str por linha
+
+2. Operações:
+   - Reconstrução de linhas (tuplas) sob demanda
+   - Acesso direto aos códigos das categorias (bitsets de bitmap_index.py)
+   - Estimativa determinística do tamanho em bytes (nbytes)
+
+3. Medições (animais, base sintética de dataset_generator.py,
+   python benchmark.py --row-cache --sizes 1000000):
+   - Objetos ORM Animal com a coleção adoptions: ~2.900 bytes/linha
+   - Tuplas da projeção (queries.animal_rows): ~610 bytes/linha
+   - RowCache: ~23,5 bytes/linha, ~22 MiB para 1 milhão de animais
+     (meta: < 100 bytes/linha)
+
+Exemplo de uso:
+    with read_session() as s:
+        cache = row_cache.animal_cache(s)
+    print(len(cache), cache.nbytes(), cache.row(0))
+"""
+
+import sys
+from array import array
+
+import queries
+
+# Linhas lidas do cursor por lote durante a carga
+BATCH_SIZE = 10_000
+
+# Códigos de categoria, do menor ao maior tipo, e o maior código de cada um
+_CODE_TYPES = ("B", "H", "I")
+_CODE_LIMITS = {"B": 0xFF, "H": 0xFFFF, "I": 0xFFFFFFFF}
+
+# Valor reservado para NULL em colunas inteiras
+_INT_NULL = -2**31
+
+# ========== COLUNAS ==========
+
+class IntColumn:
+    """Coluna de inteiros (NULL representado por um valor reservado)."""
+
+    __slots__ = ("data",)
+
+    # Valor gravado em data no lugar de NULL
+    NULL = _INT_NULL
+
+    def __init__(self):
+        self.data = array("i")
+
+    def append(self, value):
+        self.data.append(_INT_NULL if value is None else value)
+
+    def extend(self, values):
+        self.data.extend([_INT_NULL if v is None else v for v in values])
+
+    def __getitem__(self, pos):
+        value = self.data[pos]
+        return None if value == _INT_NULL else value
+
+    def __len__(self):
+        return len(self.data)
+
+    def nbytes(self):
+        return sys.getsizeof(self.data)
+
+
+class CategoryColumn:
+    """
+    Coluna categórica: cada valor distinto é guardado uma única vez.
+
+    Os códigos começam em array("B") e são alargados automaticamente
+    para "H"/"I" quando a quantidade de valores distintos passa do limite.
+    """
+
+    __slots__ = ("values", "codes", "_lookup")
+
+    def __init__(self):
+        self.values = []      # código → valor
+        self._lookup = {}     # valor → código
+        self.codes = array("B")
+
+    def code_of(self, value):
+        """Código de um valor (None se o valor não ocorre na coluna)."""
+        return self._lookup.get(value)
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code > _CODE_LIMITS[self.codes.typecode]:
+                self._widen()
+            if isinstance(value, str):
+                value = sys.intern(value)
+            self.values.append(value)
+            self._lookup[value] = code
+        self.codes.append(code)
+
+    def extend(self, values):
+        lookup = self._lookup
+        codes = [lookup.get(v) for v in values]
+        if None in codes:
+            # Valores novos no lote: caminho lento (e alargamento) só para eles
+            for i, code in enumerate(codes):
+                if code is None:
+                    self.append(values[i])
+                    codes[i] = self.codes.pop()
+        self.codes.extend(codes)
+
+    def _widen(self):
+        """Troca o array de códigos pelo próximo tipo maior."""
+        next_type = _CODE_TYPES[_CODE_TYPES.index(self.codes.typecode) + 1]
+        self.codes = array(next_type, self.codes)
+
+    def __getitem__(self, pos):
+        return self.values[self.codes[pos]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def nbytes(self):
+        total = sys.getsizeof(self.codes) + sys.getsizeof(self.values) + sys.getsizeof(self._lookup)
+        return total + sum(sys.getsizeof(v) for v in self.values)
+
+
+class TextColumn:
+    """
+    Coluna de texto livre: bytes UTF-8 concatenados + deslocamentos.
+
+    offsets[i] marca o fim do texto da linha i (o início é offsets[i-1]).
+    NULLs são raros (campos obrigatórios) e ficam num conjunto à parte.
+    """
+
+    __slots__ = ("blob", "offsets", "nulls")
+
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array("I")
+        self.nulls = set()
+
+    def append(self, value):
+        if value is None:
+            self.nulls.add(len(self.offsets))
+        else:
+            self.blob += value.encode("utf-8")
+        self.offsets.append(len(self.blob))
+
+    def extend(self, values):
+        if None in values:
+            for value in values:
+                self.append(value)
+            return
+        encoded = [v.encode("utf-8") for v in values]
+        end = len(self.blob)
+        offsets = []
+        for chunk in encoded:
+            end += len(chunk)
+            offsets.append(end)
+        self.blob += b"".join(encoded)
+        self.offsets.extend(offsets)
+
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += len(self.offsets)
+        if pos in self.nulls:
+            return None
+        start = self.offsets[pos - 1] if pos else 0
+        return self.blob[start:self.offsets[pos]].decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def nbytes(self):
+        return sys.getsizeof(self.blob) + sys.getsizeof(self.offsets) + sys.getsizeof(self.nulls)
+
+
+_COLUMN_TYPES = {"int": IntColumn, "category": CategoryColumn, "text": TextColumn}
+
+# ========== CACHE ==========
+
+class RowCache:
+    """
+    Conjunto de linhas de uma listagem em formato colunar.
+
+    Args:
+        schema (tuple): Pares (nome da coluna, tipo) na ordem da projeção;
+                        tipos: "int", "category" ou "text"
+    """
+
+    __slots__ = ("names", "columns")
+
+    def __init__(self, schema):
+        self.names = tuple(name for name, _ in schema)
+        self.columns = tuple(_COLUMN_TYPES[kind]() for _, kind in schema)
+
+    def append(self, row):
+        """Acrescenta uma linha (tupla na ordem do schema)."""
+        for column, value in zip(self.columns, row):
+            column.append(value)
+
+    def extend(self, rows):
+        """Acrescenta várias linhas (transpostas e gravadas coluna a coluna)."""
+        rows = list(rows)
+        if not rows:
+            return
+        for column, values in zip(self.columns, zip(*rows)):
+            column.extend(values)
+
+    def __len__(self):
+        return len(self.columns[0])
+
+    def row(self, pos):
+        """Reconstrói a linha de uma posição como tupla."""
+        return tuple(column[pos] for column in self.columns)
+
+    def __iter__(self):
+        for pos in range(len(self)):
+            yield self.row(pos)
+
+    def column(self, name):
+        """Coluna pelo nome (KeyError se não existir)."""
+        try:
+            return self.columns[self.names.index(name)]
+        except ValueError:
+            raise KeyError(name) from None
+
+    def nbytes(self):
+        """Tamanho estimado do cache em bytes (arrays + valores distintos)."""
+        return sys.getsizeof(self) + sum(column.nbytes() for column in self.columns)
+
+# ========== CARGA A PARTIR DAS PROJEÇÕES ==========
+
+# Colunas na mesma ordem das projeções de queries.py
+ANIMAL_SCHEMA = (
+    ("id", "int"), ("name", "text"), ("species", "category"), ("breed", "category"),
+    ("age", "int"), ("size", "category"), ("gender", "category"), ("status", "category"),
+    ("shelter", "category"),
+)
+
+
+def load(session, stmt, schema, batch_size=BATCH_SIZE):
+    """
+    Executa uma projeção e carrega o resultado num RowCache em lotes.
+
+    As linhas são consumidas do cursor aos poucos, de modo que a lista
+    completa de tuplas nunca existe em memória. A projeção é executada
+    direto na conexão (Core), sem a camada de resultados do ORM.
+
+    Returns:
+        RowCache: Linhas na ordem da consulta
+    """
+    cache = RowCache(schema)
+    for partition in session.connection().execute(stmt).partitions(batch_size):
+        cache.extend(partition)
+    return cache
+
+
+def animal_cache(session):
+    """Linhas da AnimalsTab (mesma projeção de queries.animal_rows)."""
+    return load(session, queries.animal_rows_stmt(), ANIMAL_SCHEMA)
@@ -6,9 +6,12 @@ no sistema do abrigo. Permite encontrar animais específicos baseado em múltipl
 critérios de busca combinados.
 
 Funcionalidades de busca:
-- Filtro por espécie (busca parcial por texto)
+- Busca livre sem diferenciar acentos e maiúsculas ("cachorro medio",
+  "joao"): espécie, porte e gênero reconhecidos por palavra, demais
+  palavras como início do nome ou da raça
+- Filtro por espécie (seleção em combobox)
 - Filtro por porte (seleção em combobox)
-- Filtro por localização (busca parcial por texto)
+- Filtro por abrigo (seleção em combobox)
 - Filtro por faixa etária (idade mínima e máxima)
 - Combinação de múltiplos filtros simultaneamente
 
@@ -20,19 +23,50 @@ Características da interface:
 - Layout responsivo e user-friendly
 
 Técnicas de busca implementadas:
-- Busca por texto parcial (LIKE %texto%)
-- Filtros exatos para campos categóricos
+- Filtros exatos para campos categóricos (códigos indexados,
+  models.CodedText)
+- Busca livre pelas colunas normalizadas indexadas (queries.text_conditions),
+  tão rápida quanto os filtros exatos
 - Faixas numéricas para idade
 - Combinação de critérios com AND
+- Índice bitmap em memória para bases grandes (bitmap_index.py), com
+  a consulta SQL como alternativa enquanto o índice é construído ou
+  quando há busca livre
+- Resultados ordenados pelo cabeçalho no banco e lidos em páginas
+  conforme a rolagem (paged_tree.py); o índice bitmap fornece a contagem
+
+Galeria:
+- Opção "Galeria" mostra a miniatura da foto de cada resultado
+  (photos.py): só as linhas visíveis são decodificadas, com cache LRU
+
+Contagens por faceta:
+- Quantidade de animais por espécie, porte, abrigo e status sob os
+  filtros atuais (cada faceta ignora apenas o próprio filtro)
+- Atualizadas enquanto os filtros mudam, com atraso (debounce) para
+  não recalcular a cada tecla
+- Clique num valor de espécie, porte ou abrigo aplica o filtro
 """
 
 import tkinter as tk
 from tkinter import ttk
 from base_tab import BaseTab
-from database import session
-from models import Animal, Shelter
+from database import read_session, session_scope
+import bitmap_index
+import queries
+from paged_tree import PagedTree
+import photos
+from diagnostics import instrumentado
 from utils import SIZES, parse_int, SPECIES
 
+# Atraso entre a última alteração de filtro e o recálculo das facetas (ms)
+FACET_DELAY_MS = 250
+
+# Nova tentativa enquanto o índice bitmap está em construção (ms)
+FACET_RETRY_MS = 1000
+
+# Títulos das facetas no painel de contagens
+FACET_LABELS = {"species": "Espécie", "size": "Porte", "shelter_id": "Abrigo", "status": "Status"}
+
 class SearchTab(BaseTab):
     """
     Classe para pesquisa avançada e filtragem de animais.
@@ -46,7 +80,7 @@ class SearchTab(BaseTab):
     - Seção inferior: Tabela de resultados
     
     Atributos:
-        e_species, e_location, e_amin, e_amax (ttk.Entry): Campos de texto
+        e_text, e_amin, e_amax (ttk.Entry): Campos de texto
         cb_size (ttk.Combobox): Seletor de porte
         tree (ttk.Treeview): Tabela de resultados
     """
@@ -74,6 +108,14 @@ class SearchTab(BaseTab):
         filt = ttk.LabelFrame(self, text="Filtros de Busca")
         filt.pack(fill=tk.X, padx=5, pady=5)
 
+        # Busca livre (nome, raça, espécie, porte, gênero; Enter busca)
+        filt_row0 = ttk.Frame(filt)
+        filt_row0.pack(fill=tk.X, padx=10, pady=(10, 0))
+        ttk.Label(filt_row0, text="Texto").pack(side=tk.LEFT, padx=(0, 5))
+        self.e_text = ttk.Entry(filt_row0)
+        self.e_text.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.e_text.bind("<Return>", lambda e: self.search())
+
         # Primeira linha de filtros (espécie, porte, localização)
         filt_row1 = ttk.Frame(filt)
         filt_row1.pack(fill=tk.X, padx=10, pady=10)
@@ -111,6 +153,17 @@ class SearchTab(BaseTab):
         ttk.Button(filt_row2, text="Buscar", command=self.search, style="Success.TButton").grid(row=0, column=4, padx=(0, 5))
         ttk.Button(filt_row2, text="Limpar", command=self.clear_filters).grid(row=0, column=5)
 
+        # Galeria: miniaturas das fotos nos resultados
+        self.gallery_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(filt_row2, text="Galeria", variable=self.gallery_var,
+                        command=self.toggle_gallery).grid(row=0, column=6, padx=(15, 0))
+
+        # Qualquer alteração de filtro agenda o recálculo das facetas
+        for combo in (self.cb_species, self.cb_size, self.cb_shelter):
+            combo.bind("<<ComboboxSelected>>", self.schedule_facets)
+        for entry in (self.e_text, self.e_amin, self.e_amax):
+            entry.bind("<KeyRelease>", self.schedule_facets)
+
         # ========== SEÇÃO DE RESULTADOS ==========
         results_frame = ttk.Frame(self)
         results_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -118,6 +171,22 @@ class SearchTab(BaseTab):
         # Título da seção de resultados
         ttk.Label(results_frame, text="Resultados da Busca", style="Header.TLabel").pack(anchor=tk.W, pady=(0, 5))
 
+        # ========== PAINEL DE FACETAS ==========
+        # Empacotado antes da tabela para reservar a lateral direita
+        facets_frame = ttk.LabelFrame(results_frame, text="Contagens")
+        facets_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=(5, 0))
+
+        self.facet_tree = ttk.Treeview(facets_frame, columns=("Qtd",), show="tree headings", height=14)
+        self.facet_tree.heading("#0", text="VALOR")
+        self.facet_tree.heading("Qtd", text="QTD")
+        self.facet_tree.column("#0", width=170, anchor=tk.W)
+        self.facet_tree.column("Qtd", width=70, anchor=tk.E)
+        self.facet_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.facet_tree.bind("<<TreeviewSelect>>", self.on_select_facet)
+
+        self._facet_items = {}  # item do painel → (faceta, valor)
+        self._facet_job = None  # recálculo agendado (after)
+
         # Container da tabela com scrollbar
         table_frame = ttk.Frame(results_frame)
         table_frame.pack(fill=tk.BOTH, expand=True)
@@ -149,6 +218,18 @@ class SearchTab(BaseTab):
         # Posicionamento da tabela
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
+        # Ordenação pelo cabeçalho e páginas lidas conforme a rolagem
+        # (resultados em ordem de ID até um clique no cabeçalho)
+        self.criteria = {}
+        self.pager = PagedTree(self.tree, scrollbar, self.fetch_page, "Pesquisa", descending=False)
+
+        # Miniaturas apenas das linhas visíveis (galeria desativada de início)
+        self.gallery = photos.TreeThumbnails(self.tree)
+        self.pager.on_view = self.gallery.schedule
+
+        # Contagens iniciais (sem filtros)
+        self.schedule_facets()
+
     def clear_filters(self):
         """
         Limpa todos os campos de filtro e a tabela de resultados.
@@ -161,36 +242,24 @@ class SearchTab(BaseTab):
         self.cb_species.set("")
         self.cb_size.set("")
         self.cb_shelter.set("")
+        self.e_text.delete(0, tk.END)
         self.e_amin.delete(0, tk.END)
         self.e_amax.delete(0, tk.END)
         
         # Limpa a tabela de resultados
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        self.pager.clear()
 
-    def search(self):
-        """
-        Executa a busca com base nos filtros aplicados.
-        
-        Este método constrói uma consulta dinâmica ao banco de dados
-        aplicando os filtros especificados pelo usuário. Os filtros
-        são combinados com operador AND.
-        
-        A função realiza:
-        1. Coleta dos valores dos filtros
-        2. Construção incremental da query SQLAlchemy
-        3. Aplicação dos filtros de texto (busca parcial)
-        4. Aplicação dos filtros numéricos (faixa etária)
-        5. Execução da consulta e exibição dos resultados
-        6. Exibição do contador de resultados
-        
-        Técnicas de filtragem:
-        - Combobox: filtro exato quando selecionado
-        - Números: filtro por faixa (>= e <=)
+        self.schedule_facets()
+
+    def get_criteria(self):
         """
-        # Inicia a query base
-        query = session.query(Animal)
+        Coleta os filtros do formulário.
 
+        Returns:
+            dict: Critérios aceitos por queries.search_animal_rows e
+                  queries.facet_counts (e pelo índice bitmap quando sem
+                  busca livre, ver use_index)
+        """
         # Coleta e limpa os valores dos filtros
         species = self.cb_species.get().strip()
         size = self.cb_size.get().strip()
@@ -198,70 +267,166 @@ class SearchTab(BaseTab):
         amin = self.e_amin.get().strip()
         amax = self.e_amax.get().strip()
 
-        # Aplica filtro de espécie (busca parcial)
-        if species:
-            # Espécie vem do combobox (valores exatos)
-            query = query.filter(Animal.species.ilike(f"%{species}%"))
-            
-        # Aplica filtro de porte (filtro exato)
-        if size:
-            query = query.filter(Animal.size.ilike(f"%{size}%"))
-            
         # Aplica filtro de abrigo (filtro exato por ID extraído do combobox)
+        shelter_id = None
         if shelter_val:
             try:
                 shelter_id = int(shelter_val.split(" - ")[0])
-                query = query.filter(Animal.shelter_id == shelter_id)
             except Exception:
                 # se parsing falhar, ignora o filtro
                 pass
-            
-        # Aplica filtro de idade mínima
-        if amin:
-            query = query.filter(Animal.age >= parse_int(amin, 0))
-            
-        # Aplica filtro de idade máxima
-        if amax:
-            query = query.filter(Animal.age <= parse_int(amax, 9999))
 
-        # Limpa resultados anteriores
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        return dict(
+            species=species,
+            size=size,
+            shelter_id=shelter_id,
+            age_min=parse_int(amin, 0) if amin else None,
+            age_max=parse_int(amax, 9999) if amax else None,
+            text=self.e_text.get().strip(),
+        )
+
+    @staticmethod
+    def use_index(criteria):
+        """
+        Indica se os critérios podem ser respondidos pelo índice bitmap.
+
+        O índice cobre apenas as categorias e a idade; a busca livre vai
+        ao banco pelas colunas normalizadas indexadas.
+        """
+        return bitmap_index.enabled() and not criteria["text"]
 
-        # Executa a consulta e processa os resultados
-        results = query.all()
+    @instrumentado("Pesquisa: buscar")
+    def search(self):
+        """
+        Executa a busca com base nos filtros aplicados.
         
-        # Insere cada animal encontrado na tabela
-        # Atualiza status localmente e mostra o nome do abrigo
-        for animal in results:
-            # Se houver adoção finalizada, marca como Adotado
-            finalized_adoption = any(ap.status == "Finalizado" for ap in animal.adoptions)
-            in_process = any(ap.status in ("Questionário", "Triagem", "Visita", "Documentos", "Aprovado") for ap in animal.adoptions)
-            if finalized_adoption:
-                animal.status = "Adotado"
-            elif in_process:
-                animal.status = "Em processo"
-
-            shelter_name = animal.shelter.name if animal.shelter else ""
-
-            # Insere apenas os 8 valores correspondentes às colunas
-            # (ID, Nome, Espécie, Idade, Porte, Gênero, Status, Abrigo)
-            self.tree.insert("", "end", values=(
-                animal.id,
-                animal.name,
-                animal.species,
-                animal.age,
-                animal.size or "",
-                animal.gender or "",
-                animal.status,
-                shelter_name
-            ))
-
-        # Persistir eventuais alterações de status
-        session.commit()
+        Este método constrói uma consulta dinâmica ao banco de dados
+        aplicando os filtros especificados pelo usuário. Os filtros
+        são combinados com operador AND.
+        
+        A função realiza:
+        1. Coleta dos valores dos filtros
+        2. Atualização do status dos animais a partir dos processos
+        3. Contagem dos resultados (índice bitmap quando pronto, senão SQL)
+        4. Leitura da primeira página na ordenação atual (ORDER BY no
+           banco); as demais páginas são lidas conforme a rolagem
+        5. Exibição do contador de resultados
+        
+        Técnicas de filtragem:
+        - Texto livre: colunas normalizadas (sem acentos e maiúsculas)
+        - Combobox: filtro exato quando selecionado
+        - Números: filtro por faixa (>= e <=)
+        """
+        self.criteria = self.get_criteria()
+
+        # Atualiza e confirma o status dos animais a partir dos processos
+        with session_scope() as s:
+            queries.sync_animal_status(s, in_progress=True)
+
+        # Contagem: pelo índice bitmap quando ativo e pronto, senão pelo
+        # banco (o índice é construído em segundo plano)
+        with read_session() as s:
+            if self.use_index(self.criteria) and bitmap_index.get_index().refresh(s):
+                total = bitmap_index.get_index().count(**self.criteria)
+            else:
+                total = queries.search_count(s, **self.criteria)
+
+        # Primeira página dos resultados
+        # (ID, Nome, Espécie, Idade, Porte, Gênero, Status, Abrigo)
+        self.pager.reload()
+
+        # Status pode ter sido corrigido: atualiza as facetas
+        self.schedule_facets()
 
         # Exibe o resumo da busca
-        self.info(f"Encontrados {len(results)} animais.")
+        self.info(f"Encontrados {total} animais.")
+
+    def toggle_gallery(self):
+        """Liga ou desliga as miniaturas nos resultados."""
+        self.gallery.enable(self.gallery_var.get())
+
+    def fetch_page(self, session, column, descending, after, limit):
+        """Consulta paginada dos resultados com os filtros da última busca."""
+        return queries.search_page(session, self.criteria, column, descending, after, limit)
+
+    # ========== FACETAS ==========
+
+    def schedule_facets(self, event=None):
+        """Agenda o recálculo das facetas, cancelando o agendamento anterior."""
+        if self._facet_job is not None:
+            self.after_cancel(self._facet_job)
+        self._facet_job = self.after(FACET_DELAY_MS, self.refresh_facets)
+
+    @instrumentado("Pesquisa: contagens")
+    def refresh_facets(self):
+        """
+        Recalcula as contagens por faceta sob os filtros atuais.
+
+        Usa o índice bitmap quando ativo (popcount em memória); sem ele,
+        uma única consulta agrupada. Enquanto o índice é construído o
+        painel aguarda e tenta de novo, para não bloquear a interface
+        com a consulta sobre a base grande.
+
+        O status reflete a última sincronização (feita a cada busca).
+        """
+        self._facet_job = None
+        criteria = self.get_criteria()
+        with read_session() as s:
+            if self.use_index(criteria):
+                index = bitmap_index.get_index()
+                if not index.refresh(s):
+                    self.show_facets(None)
+                    self._facet_job = self.after(FACET_RETRY_MS, self.refresh_facets)
+                    return
+                counts = index.facet_counts(**criteria)
+            else:
+                counts = queries.facet_counts(s, **criteria)
+        self.show_facets(counts)
+
+    def show_facets(self, counts):
+        """
+        Exibe as contagens no painel (None = índice em construção).
+
+        Args:
+            counts (dict): Faceta → lista de (valor, quantidade)
+        """
+        self.facet_tree.delete(*self.facet_tree.get_children())
+        self._facet_items = {}
+        if counts is None:
+            self.facet_tree.insert("", "end", text="Calculando...", values=("",))
+            return
+
+        # Nomes dos abrigos a partir do combobox ("ID - Nome")
+        shelters = {}
+        for item in self.cb_shelter["values"]:
+            shelters[str(item).split(" - ")[0]] = item
+
+        for facet, label in FACET_LABELS.items():
+            values = counts.get(facet, [])
+            parent = self.facet_tree.insert("", "end", text=label, values=(len(values),), open=True)
+            for value, n in values:
+                if facet == "shelter_id":
+                    text = shelters.get(str(value), "(sem abrigo)" if value is None else str(value))
+                else:
+                    text = value if value else "(vazio)"
+                item = self.facet_tree.insert(parent, "end", text=text, values=(n,))
+                self._facet_items[item] = (facet, value)
+
+    def on_select_facet(self, event):
+        """Aplica como filtro o valor de espécie, porte ou abrigo clicado."""
+        sel = self.facet_tree.selection()
+        if not sel or sel[0] not in self._facet_items:
+            return
+        facet, value = self._facet_items[sel[0]]
+        if facet == "species":
+            self.cb_species.set(value or "")
+        elif facet == "size":
+            self.cb_size.set(value or "")
+        elif facet == "shelter_id" and value is not None:
+            self.cb_shelter.set(self.facet_tree.item(sel[0], "text"))
+        else:
+            return
+        self.schedule_facets()
 
     def get_shelters(self):
         """
@@ -269,4 +434,5 @@ class SearchTab(BaseTab):
 
         Formato: "{id} - {name}" como exibido em outras abas do sistema.
         """
-        return [f"{s.id} - {s.name}" for s in session.query(Shelter).order_by(Shelter.id).all()]
+        with read_session() as s:
+            return queries.shelter_choices(s)
@@ -13,6 +13,8 @@ Funcionalidades principais:
 - Sincronização em tempo real entre abas
 - Integridade referencial com animais
 - Dashboard de ocupação e adoções
+- Ordenação pelo cabeçalho feita no banco (paged_tree.py)
+- Relatórios mensais por abrigo gerados em lote (documents.py)
 
 Informações gerenciadas:
 - Dados básicos: nome*, email*, telefone*
@@ -39,10 +41,15 @@ Sincronização:
 - Manutenção de consistência com outros módulos
 """
 
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from database import session
-from models import Shelter, Animal, AdoptionProcess
+from tkinter import ttk, messagebox, filedialog, simpledialog
+from database import read_session, session_scope
+from models import Shelter, Animal
+import documents
+import queries
+from paged_tree import PagedTree
+from diagnostics import instrumentado
 
 class ShelterTab(ttk.Frame):
     """
@@ -120,6 +127,9 @@ class ShelterTab(ttk.Frame):
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
+        # Ordenação pelo cabeçalho (inclusive pelas estatísticas)
+        self.pager = PagedTree(self.tree, scrollbar, queries.shelter_page, "Abrigos")
+
         # ========== PAINEL DIREITO - FORMULÁRIO ==========
         right_panel = ttk.Frame(main_container, width=350)
         right_panel.pack(side=tk.RIGHT, fill=tk.Y)
@@ -172,12 +182,17 @@ class ShelterTab(ttk.Frame):
         ttk.Button(btn_frame, text="Novo", command=self.new).pack(side=tk.LEFT, padx=4)
         ttk.Button(btn_frame, text="Salvar", command=self.save).pack(side=tk.LEFT, padx=4)
         ttk.Button(btn_frame, text="Excluir", command=self.delete).pack(side=tk.LEFT, padx=4)
+
+        # Relatório mensal dos abrigos selecionados (ou de todos)
+        self.btn_report = ttk.Button(self.scrollable_frame, text="Relatório mensal", command=self.generate_reports)
+        self.btn_report.grid(row=r + 1, column=0, columnspan=2, pady=(0, 10))
     # Botão 'Atualizar Página' removido; Salvar já recarrega a lista.
 
         # ========== INICIALIZAÇÃO ==========
         self.selected_id = None
         self.load()
 
+    @instrumentado("Abrigos: carregar")
     def load(self):
         """
         Carrega todos os abrigos com estatísticas calculadas.
@@ -189,40 +204,11 @@ class ShelterTab(ttk.Frame):
         
         Estas estatísticas são calculadas em tempo real a cada carregamento.
         """
-        # Limpa a tabela atual
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        # Busca todos os abrigos ordenados por ID decrescente
-        abrigos = session.query(Shelter).order_by(Shelter.id.desc()).all()
-        
-        for abrigo in abrigos:
-            # Calcula estatísticas para o abrigo
-            
-            # Animais resgatados: total de animais vinculados ao abrigo
-            rescued_count = session.query(Animal).filter(Animal.shelter_id == abrigo.id).count()
-            
-            # Animais adotados: animais com adoção finalizada
-            adopted_count = (
-                session.query(Animal)
-                .join(Animal.adoptions)
-                .filter(Animal.shelter_id == abrigo.id, AdoptionProcess.status == "Finalizado")
-                .count()
-            )
-            
-            # Animais atuais: resgatados - adotados
-            animais_atuais = rescued_count - adopted_count
-            
-            # Insere o abrigo na tabela com todas as informações
-            self.tree.insert(
-                "",
-                "end",
-                iid=str(abrigo.id),
-                values=(abrigo.id, abrigo.name or "", abrigo.email or "", abrigo.phone or "", 
-                        abrigo.address or "", abrigo.capacity or 0, rescued_count, 
-                        adopted_count, animais_atuais)
-            )
+        # Primeira página na ordenação atual (ID decrescente até um clique
+        # no cabeçalho), com as estatísticas já calculadas
+        self.pager.reload()
 
+    @instrumentado("Abrigos: selecionar")
     def on_select(self, event):
         """
         Manipula a seleção de um abrigo na lista.
@@ -235,7 +221,8 @@ class ShelterTab(ttk.Frame):
             return
             
         # Busca o abrigo selecionado
-        abrigo = session.get(Shelter, int(sel[0]))
+        with read_session() as s:
+            abrigo = s.get(Shelter, int(sel[0]))
         self.selected_id = abrigo.id
 
         # Preenche todos os campos do formulário
@@ -263,6 +250,7 @@ class ShelterTab(ttk.Frame):
             else:
                 widget.delete(0, tk.END)
 
+    @instrumentado("Abrigos: salvar")
     def save(self):
         """
         Salva ou atualiza um abrigo no banco de dados.
@@ -279,7 +267,6 @@ class ShelterTab(ttk.Frame):
         # Valida nome
         if not name_val:
             messagebox.showerror("Erro", "Nome do abrigo é obrigatório.")
-            session.rollback()
             return
 
         # Valida email obrigatório
@@ -287,20 +274,17 @@ class ShelterTab(ttk.Frame):
         email_pattern = r"[^@\\s]+@[^@\\s]+\\.[^@\\s]+"
         if not email_val or not re.match(email_pattern, email_val):
             messagebox.showerror("Erro", "Email inválido ou ausente.")
-            session.rollback()
             return
 
         # Validação de telefone obrigatório: deve ter 11 dígitos
         phone_digits = "".join(ch for ch in phone_raw if ch.isdigit())
         if not phone_raw or len(phone_digits) != 11:
             messagebox.showerror("Erro", "Telefone inválido. Deve conter 11 dígitos.")
-            session.rollback()
             return
 
         # Valida endereço obrigatório
         if not address_val:
             messagebox.showerror("Erro", "Endereço é obrigatório.")
-            session.rollback()
             return
 
         # Processa capacidade (converte para inteiro e exige > 0)
@@ -310,28 +294,22 @@ class ShelterTab(ttk.Frame):
                 raise ValueError()
         except Exception:
             messagebox.showerror("Erro", "Capacidade deve ser um número inteiro maior que zero.")
-            session.rollback()
             return
 
-        # Determina se é criação ou edição
-        if self.selected_id:
-            abrigo = session.get(Shelter, self.selected_id)
+        try:
+            # Cria ou atualiza o abrigo
+            with session_scope() as s:
+                abrigo = queries.save_shelter(
+                    s, self.selected_id,
+                    name=name_val,
+                    email=email_val,
+                    phone=phone_digits,
+                    address=address_val,
+                    capacity=capacity_val,
+                )
             if abrigo is None:
                 messagebox.showerror("Erro", "Abrigo selecionado não encontrado.")
                 return
-        else:
-            abrigo = Shelter()
-            session.add(abrigo)
-
-        # Atualiza dados básicos
-        abrigo.name = name_val
-        abrigo.email = email_val
-        abrigo.phone = phone_digits
-        abrigo.address = address_val
-        abrigo.capacity = capacity_val
-
-        try:
-            session.commit()
             # Recarrega todas as abas
             try:
                 root = self.winfo_toplevel()
@@ -342,9 +320,9 @@ class ShelterTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Abrigo salvo com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao salvar abrigo: {e}")
 
+    @instrumentado("Abrigos: excluir")
     def delete(self):
         """
         Exclui o abrigo selecionado após confirmação.
@@ -357,7 +335,8 @@ class ShelterTab(ttk.Frame):
             return
             
         # Verifica se há animais vinculados ao abrigo
-        animais_vinculados = session.query(Animal).filter(Animal.shelter_id == self.selected_id).count()
+        with read_session() as s:
+            animais_vinculados = s.query(Animal).filter(Animal.shelter_id == self.selected_id).count()
         if animais_vinculados > 0:
             messagebox.showerror("Erro", f"Não é possível excluir o abrigo. Existem {animais_vinculados} animais vinculados a ele.")
             return
@@ -366,9 +345,8 @@ class ShelterTab(ttk.Frame):
             return
             
         try:
-            abrigo = session.get(Shelter, self.selected_id)
-            session.delete(abrigo)
-            session.commit()
+            with session_scope() as s:
+                s.delete(s.get(Shelter, self.selected_id))
             
             # Recarrega todas as abas para manter UI consistente
             try:
@@ -382,5 +360,48 @@ class ShelterTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Abrigo excluído com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao excluir abrigo: {e}")
+
+    def generate_reports(self):
+        """
+        Gera o relatório mensal dos abrigos selecionados na lista (ou de
+        todos, sem seleção) em segundo plano (documents.py).
+        """
+        ids = [int(iid) for iid in self.tree.selection()] or None
+        texto = simpledialog.askstring("Relatório mensal", "Mês (AAAA-MM):",
+                                       initialvalue=documents.previous_month().strftime("%Y-%m"), parent=self)
+        if not texto:
+            return
+        try:
+            mes = documents.parse_month(texto)
+        except ValueError:
+            messagebox.showerror("Erro", "Mês inválido. Use o formato AAAA-MM.")
+            return
+        out_dir = filedialog.askdirectory(title="Pasta dos relatórios", mustexist=False)
+        if not out_dir:
+            return
+
+        self.btn_report.config(state=tk.DISABLED)
+        resultado = {}
+
+        def executar():
+            try:
+                resultado["paths"] = documents.generate_reports(mes, ids, out_dir)
+            except Exception as e:
+                resultado["erro"] = e
+
+        tarefa = threading.Thread(target=executar, name="relatorios", daemon=True)
+        tarefa.start()
+
+        def aguardar():
+            if tarefa.is_alive():
+                self.after(200, aguardar)
+                return
+            self.btn_report.config(state=tk.NORMAL)
+            if "erro" in resultado:
+                messagebox.showerror("Erro", f"Erro ao gerar relatórios: {resultado['erro']}")
+            else:
+                messagebox.showinfo("Relatório mensal",
+                                    f"{len(resultado['paths'])} relatórios gravados em {out_dir}.")
+
+        aguardar()
@@ -0,0 +1,221 @@
+"""
+Importação de Contas em Lote - Usuários do Sistema a partir de CSV
+------------------------------------------------------------------
+Este módulo cria de uma vez as contas de voluntários e funcionários
+(AuthUser) listadas numa planilha CSV, em vez de cadastrá-las uma a uma
+na AdmTab, onde cada conta espera pelo bcrypt e por um commit próprio.
+
+1. Arquivo:
+   - Cabeçalho com as colunas usuario, senha e nivel (também aceitos
+     username, password e nivel_acesso); nivel é opcional
+   - Separador detectado (vírgula ou ponto e vírgula, como o Excel
+     grava em português); UTF-8, com ou sem BOM
+   - O arquivo contém senhas em texto claro: apagá-lo após a importação
+
+2. Validação (por linha, antes de qualquer hash):
+   - Usuário e senha obrigatórios; nível em utils.ACCESS_LEVELS
+   - Usuário repetido no arquivo ou já cadastrado: linha ignorada
+
+3. Hash das senhas:
+   - bcrypt é CPU-bound e só libera o GIL em parte: as senhas são
+     processadas por um ProcessPoolExecutor (um processo por núcleo,
+     início "spawn", seguro com a interface aberta)
+   - Abaixo de PARALLEL_MIN senhas, no próprio processo
+
+4. Gravação:
+   - Todas as contas válidas numa única transação (session_scope): ou
+     entram todas, ou nenhuma
+   - Resultado por linha: (linha, usuário, situação, detalhe), com
+     situação em "criado", "existente" ou "erro"
+
+5. Uso:
+   - AdmTab: "Importar CSV..." (resultado numa janela)
+   - Linha de comando: python staff_import.py contas.csv [--nivel usuario]
+
+Exemplo de arquivo:
+    usuario;senha;nivel
+    maria.souza;Troque@123;gestor
+    joao.lima;Troque@123;usuario
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select
+
+from database import session_scope
+from diagnostics import acao
+from models import AuthUser, hash_password
+from utils import ACCESS_LEVELS
+
+# Senhas a partir das quais o hash usa vários processos
+PARALLEL_MIN = 8
+
+# Nomes aceitos para cada coluna do cabeçalho
+COLUMNS = {
+    "username": ("usuario", "usuário", "username", "login"),
+    "password": ("senha", "password"),
+    "level": ("nivel", "nível", "nivel_acesso", "nível de acesso", "level"),
+}
+
+# Situações do resultado por linha
+CREATED, EXISTING, ERROR = "criado", "existente", "erro"
+
+
+class StaffImportError(Exception):
+    """Arquivo ilegível ou sem as colunas obrigatórias."""
+
+# ========== LEITURA ==========
+
+def read_rows(path, default_level="usuario"):
+    """
+    Lê e valida as linhas do arquivo.
+
+    Args:
+        path (str): Arquivo CSV
+        default_level (str): Nível das linhas sem a coluna nivel
+
+    Returns:
+        tuple: (contas válidas [(linha, usuário, senha, nível)],
+                resultados das linhas recusadas)
+
+    Raises:
+        StaffImportError: Arquivo ilegível ou sem usuário/senha no cabeçalho
+    """
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        raise StaffImportError(f"Não foi possível ler o arquivo: {e}") from e
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.reader(text.splitlines(), dialect)
+    header = [name.strip().lower() for name in next(reader, [])]
+    index = {}
+    for key, names in COLUMNS.items():
+        for position, name in enumerate(header):
+            if name in names:
+                index[key] = position
+                break
+    if "username" not in index or "password" not in index:
+        raise StaffImportError("O cabeçalho precisa das colunas usuario e senha.")
+
+    def cell(row, key):
+        position = index.get(key)
+        return row[position].strip() if position is not None and position < len(row) else ""
+
+    accounts, rejected, seen = [], [], set()
+    for line, row in enumerate(reader, start=2):
+        if not any(value.strip() for value in row):
+            continue
+        username, password = cell(row, "username"), cell(row, "password")
+        level = cell(row, "level").lower() or default_level
+        if not username:
+            rejected.append((line, "", ERROR, "Usuário em branco"))
+        elif not password:
+            rejected.append((line, username, ERROR, "Senha em branco"))
+        elif level not in ACCESS_LEVELS:
+            rejected.append((line, username, ERROR, f"Nível inválido: {level}"))
+        elif username.lower() in seen:
+            rejected.append((line, username, ERROR, "Usuário repetido no arquivo"))
+        else:
+            seen.add(username.lower())
+            accounts.append((line, username, password, level))
+    return accounts, rejected
+
+# ========== HASH E GRAVAÇÃO ==========
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash bcrypt de várias senhas, em paralelo a partir de PARALLEL_MIN.
+
+    Args:
+        passwords (list): Senhas em texto claro
+        workers (int): Processos (padrão: núcleos da máquina; 1 = sem pool)
+
+    Returns:
+        list: Hashes, na ordem das senhas
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < PARALLEL_MIN:
+        return [hash_password(p) for p in passwords]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(passwords)), mp_context=context) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def import_accounts(path, default_level="usuario", workers=None):
+    """
+    Importa as contas do arquivo (uma única transação).
+
+    Args:
+        path (str): Arquivo CSV
+        default_level (str): Nível das linhas sem a coluna nivel
+        workers (int): Processos do hash (ver hash_passwords)
+
+    Returns:
+        list: Resultados (linha, usuário, situação, detalhe), por linha
+
+    Raises:
+        StaffImportError: Arquivo ilegível ou sem as colunas obrigatórias
+    """
+    with acao("ADM: importar usuários"):
+        accounts, results = read_rows(path, default_level)
+
+        # Usuários já cadastrados (mesma regra de salvar_usuario: nome exato)
+        with session_scope() as s:
+            names = [username for _, username, _, _ in accounts]
+            existing = set(s.execute(select(AuthUser.username).where(AuthUser.username.in_(names))).scalars())
+        for line, username, _, _ in accounts:
+            if username in existing:
+                results.append((line, username, EXISTING, "Usuário já cadastrado"))
+        accounts = [account for account in accounts if account[1] not in existing]
+
+        hashes = hash_passwords([password for _, _, password, _ in accounts], workers)
+
+        with session_scope() as s:
+            s.add_all(AuthUser(username=username, password_hash=password_hash, nivel_acesso=level)
+                      for (_, username, _, level), password_hash in zip(accounts, hashes))
+        results.extend((line, username, CREATED, level) for line, username, _, level in accounts)
+    return sorted(results)
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso, 1 se o arquivo for recusado ou alguma
+             linha tiver erro
+    """
+    parser = argparse.ArgumentParser(description="Importação de usuários do sistema a partir de CSV.")
+    parser.add_argument("arquivo", help="arquivo CSV (usuario, senha, nivel)")
+    parser.add_argument("--nivel", choices=ACCESS_LEVELS, default="usuario",
+                        help="nível das linhas sem a coluna nivel")
+    parser.add_argument("--processos", type=int, default=None, help="processos do hash das senhas")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        results = import_accounts(args.arquivo, args.nivel, args.processos)
+    except StaffImportError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    for line, username, status, detail in results:
+        print(f"linha {line}: {username or '-'}: {status} ({detail})")
+    counts = {status: sum(1 for r in results if r[2] == status) for status in (CREATED, EXISTING, ERROR)}
+    print(f"{counts[CREATED]} criados, {counts[EXISTING]} existentes, {counts[ERROR]} com erro "
+          f"({time.perf_counter() - started:.1f} s).")
+    return 1 if counts[ERROR] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Site Público - Páginas Estáticas dos Animais Disponíveis
+--------------------------------------------------------
+Este módulo gera o site estático de adoção (HTML puro, links relativos:
+pode ser publicado em qualquer servidor ou pasta) com os animais de
+status "Disponível", reescrevendo a cada execução apenas as páginas
+cujo conteúdo mudou.
+
+1. Páginas:
+   - index.html: total de animais, abrigos e listas
+   - animais/<id>.html: um animal (com a miniatura, se houver foto)
+   - animais/lista-<n>.html: animais com ID entre n*LIST_BUCKET e
+     (n+1)*LIST_BUCKET; faixas fixas de ID em vez de páginas numeradas,
+     de modo que uma adoção altera uma lista, e não todas as seguintes
+   - abrigos/<id>.html: dados do abrigo e seus animais por nome
+   - fotos/<id>.png: miniatura da foto (photos.py)
+   - Nenhuma data de geração nas páginas: o mesmo dado gera sempre o
+     mesmo arquivo
+
+2. Geração incremental (publish):
+   - Status corrigido antes pelos processos (sync_animal_status, como a
+     pesquisa), depois uma leitura dos abrigos e uma dos animais
+   - Cada página é renderizada em memória e comparada, pelo sha256, com
+     o manifesto da execução anterior (MANIFEST no diretório do site);
+     só as diferentes (ou ausentes do disco) são gravadas
+   - Fotos comparadas pelo sha256 já guardado em animal_photos: a
+     miniatura só é lida do banco quando muda
+   - Páginas que deixaram de existir (animal adotado) são apagadas
+   - Gravação num arquivo temporário trocado pelo definitivo: o servidor
+     nunca entrega uma página pela metade; o manifesto é gravado por
+     último (uma execução interrompida apenas regrava mais na próxima)
+   - Alterações feitas à mão nos arquivos não são detectadas: use
+     --completo para reescrever tudo
+
+3. Uso:
+   - Administração: "Publicar site"
+   - Linha de comando:
+       python static_site.py [--saida site] [--completo] [--listar]
+
+Variáveis de ambiente:
+    SHELTER_SITE_DIR: diretório do site (padrão: site)
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import sys
+import time
+from string import Template
+
+from sqlalchemy import select
+
+import queries
+from database import read_session, session_scope
+from diagnostics import acao
+from models import Animal, AnimalPhoto, Shelter
+
+# Diretório padrão do site
+OUTPUT_DIR = os.environ.get("SHELTER_SITE_DIR", "site")
+
+# Manifesto dos hashes das páginas (dentro do diretório do site)
+MANIFEST = ".manifesto.json"
+
+# Faixa de IDs de cada lista de animais
+LIST_BUCKET = 500
+
+# Fotos lidas por consulta (limite de parâmetros do SQLite)
+PHOTO_BATCH = 500
+
+# Título do site
+SITE_TITLE = "Animais para adoção"
+
+# ========== MODELOS ==========
+
+_LAYOUT = Template("""\
+<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>$title</title><link rel="stylesheet" href="${root}estilo.css"></head>
+<body>
+<header><a href="${root}index.html">$site</a></header>
+<main>
+$body</main>
+</body>
+</html>
+""")
+
+_CARD = Template("""\
+<li><a href="${root}animais/$id.html">$image<strong>$name</strong></a> $species, $age ano(s)$shelter</li>
+""")
+
+_ANIMAL = Template("""\
+<h1>$name</h1>
+$image<dl>
+<dt>Espécie</dt><dd>$species</dd>
+<dt>Raça</dt><dd>$breed</dd>
+<dt>Idade</dt><dd>$age ano(s)</dd>
+<dt>Porte</dt><dd>$size</dd>
+<dt>Gênero</dt><dd>$gender</dd>
+<dt>Temperamento</dt><dd>$temperament</dd>
+<dt>Abrigo</dt><dd>$shelter</dd>
+</dl>
+""")
+
+_SHELTER = Template("""\
+<h1>$name</h1>
+<p>$address<br>Telefone: $phone &middot; Email: $email</p>
+<h2>$count animal(is) disponível(is)</h2>
+<ul class="animais">
+$cards</ul>
+""")
+
+_STYLE = """\
+body { font-family: sans-serif; margin: 0 auto; max-width: 60em; padding: 0 1em; }
+header { padding: 1em 0; border-bottom: 1px solid #ccc; }
+ul.animais { list-style: none; padding: 0; }
+ul.animais li { padding: .4em 0; border-bottom: 1px solid #eee; }
+ul.animais img { vertical-align: middle; margin-right: .6em; }
+nav a { margin-right: 1em; }
+dt { font-weight: bold; }
+"""
+
+# ========== DADOS ==========
+
+def _text(value):
+    return "-" if value is None or value == "" else str(value)
+
+
+def site_records(session):
+    """
+    Abrigos e animais disponíveis (duas consultas).
+
+    Returns:
+        tuple: (abrigos, animais), listas de dicionários por ID; cada
+            animal traz "photo" (sha256 da foto ou None)
+    """
+    shelters = [
+        {"id": shelter_id, "name": _text(name), "address": _text(address),
+         "phone": _text(phone), "email": _text(email)}
+        for shelter_id, name, address, phone, email in session.execute(
+            select(Shelter.id, Shelter.name, Shelter.address, Shelter.phone, Shelter.email)
+            .order_by(Shelter.id)
+        )
+    ]
+    names = {shelter["id"]: shelter["name"] for shelter in shelters}
+
+    stmt = (
+        select(Animal.id, Animal.name, Animal.species, Animal.breed, Animal.age, Animal.size,
+               Animal.gender, Animal.temperament, Animal.shelter_id, AnimalPhoto.sha256)
+        .outerjoin(AnimalPhoto, AnimalPhoto.animal_id == Animal.id)
+        .where(Animal.status == "Disponível")
+        .order_by(Animal.id)
+    )
+    fields = ("id", "name", "species", "breed", "age", "size", "gender", "temperament")
+    animals = []
+    for row in session.execute(stmt):
+        animal = {name: _text(value) for name, value in zip(fields, row)}
+        animal["id"] = row[0]
+        animal["shelter_id"] = row[8]
+        animal["shelter"] = names.get(row[8], "-")
+        animal["photo"] = row[9]
+        animals.append(animal)
+    return shelters, animals
+
+# ========== PÁGINAS ==========
+
+def _page(title, root, body):
+    return _LAYOUT.substitute(title=html.escape(title), root=root, site=html.escape(SITE_TITLE), body=body)
+
+
+def _image(animal, root):
+    if not animal["photo"]:
+        return ""
+    # Versão na URL: foto trocada não fica presa no cache do navegador
+    return (f'<img src="{root}fotos/{animal["id"]}.png?v={animal["photo"][:8]}" '
+            f'alt="{html.escape(animal["name"])}" loading="lazy"> ')
+
+
+def _card(animal, root, with_shelter=True):
+    shelter = f" &middot; {html.escape(animal['shelter'])}" if with_shelter else ""
+    return _CARD.substitute(root=root, id=animal["id"], image=_image(animal, root),
+                            name=html.escape(animal["name"]), species=html.escape(animal["species"]),
+                            age=html.escape(animal["age"]), shelter=shelter)
+
+
+def _list_name(bucket):
+    return f"lista-{bucket}.html"
+
+
+def _nav(buckets, index):
+    links = []
+    if index > 0:
+        links.append(f'<a href="{_list_name(buckets[index - 1])}">&larr; Anterior</a>')
+    if index + 1 < len(buckets):
+        links.append(f'<a href="{_list_name(buckets[index + 1])}">Próxima &rarr;</a>')
+    return f"<nav>{''.join(links)}</nav>\n" if links else ""
+
+
+def render_pages(shelters, animals):
+    """
+    Renderiza todas as páginas do site (exceto as fotos).
+
+    Args:
+        shelters, animals (list): Registros de site_records
+
+    Yields:
+        tuple: (caminho relativo, texto)
+    """
+    yield "estilo.css", _STYLE
+
+    for animal in animals:
+        fields = {key: html.escape(value) for key, value in animal.items()
+                  if key in ("name", "species", "breed", "age", "size", "gender", "temperament")}
+        fields["image"] = _image(animal, "../").replace(' loading="lazy"', "")
+        shelter = html.escape(animal["shelter"])
+        if animal["shelter_id"] is not None:
+            shelter = f'<a href="../abrigos/{animal["shelter_id"]}.html">{shelter}</a>'
+        fields["shelter"] = shelter
+        yield f"animais/{animal['id']}.html", _page(animal["name"], "../", _ANIMAL.substitute(fields))
+
+    by_shelter = {}
+    for animal in animals:
+        by_shelter.setdefault(animal["shelter_id"], []).append(animal)
+    for shelter in shelters:
+        members = sorted(by_shelter.get(shelter["id"], []), key=lambda a: (a["name"].casefold(), a["id"]))
+        body = _SHELTER.substitute({key: html.escape(value) for key, value in shelter.items() if key != "id"},
+                                   count=len(members),
+                                   cards="".join(_card(a, "../", with_shelter=False) for a in members))
+        yield f"abrigos/{shelter['id']}.html", _page(shelter["name"], "../", body)
+
+    lists = {}
+    for animal in animals:
+        lists.setdefault(animal["id"] // LIST_BUCKET, []).append(animal)
+    buckets = sorted(lists)
+    for index, bucket in enumerate(buckets):
+        members = lists[bucket]
+        title = f"Animais para adoção - lista {index + 1}"
+        body = (f"<h1>Animais para adoção</h1>\n{_nav(buckets, index)}<ul class=\"animais\">\n"
+                + "".join(_card(a, "../") for a in members) + "</ul>\n" + _nav(buckets, index))
+        yield f"animais/{_list_name(bucket)}", _page(title, "../", body)
+
+    counts = {shelter_id: len(members) for shelter_id, members in by_shelter.items()}
+    shelter_links = "".join(
+        f'<li><a href="abrigos/{s["id"]}.html">{html.escape(s["name"])}</a> ({counts.get(s["id"], 0)})</li>\n'
+        for s in shelters
+    )
+    list_links = "".join(
+        f'<li><a href="animais/{_list_name(bucket)}">Lista {index + 1}</a> ({len(lists[bucket])})</li>\n'
+        for index, bucket in enumerate(buckets)
+    )
+    body = (f"<h1>{html.escape(SITE_TITLE)}</h1>\n<p>{len(animals)} animal(is) esperando um lar.</p>\n"
+            f"<h2>Abrigos</h2>\n<ul>\n{shelter_links}</ul>\n<h2>Todos os animais</h2>\n<ul>\n{list_links}</ul>\n")
+    yield "index.html", _page(SITE_TITLE, "", body)
+
+# ========== GRAVAÇÃO ==========
+
+def load_manifest(out_dir):
+    """Manifesto da última execução: caminho relativo → sha256 ({} se não houver)."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(out_dir, path, data):
+    """Grava por troca atômica (temporário + os.replace)."""
+    target = os.path.join(out_dir, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    temporary = target + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+    os.replace(temporary, target)
+
+
+def publish(out_dir=OUTPUT_DIR, full=False):
+    """
+    Gera o site, gravando apenas o que mudou desde a última execução.
+
+    Args:
+        out_dir (str): Diretório do site (criado se necessário)
+        full (bool): Reescreve todas as páginas, ignorando o manifesto
+
+    Returns:
+        dict: {"written": caminhos gravados, "removed": caminhos
+            apagados, "unchanged": páginas mantidas}
+    """
+    with acao("Site: publicar"):
+        with session_scope() as s:
+            queries.sync_animal_status(s, in_progress=True)
+        with read_session() as s:
+            shelters, animals = site_records(s)
+
+        os.makedirs(out_dir, exist_ok=True)
+        previous = load_manifest(out_dir)
+        manifest = {}
+        summary = {"written": [], "removed": [], "unchanged": 0}
+
+        def changed(path, digest):
+            manifest[path] = digest
+            if not full and previous.get(path) == digest and os.path.exists(os.path.join(out_dir, path)):
+                summary["unchanged"] += 1
+                return False
+            summary["written"].append(path)
+            return True
+
+        for path, text in render_pages(shelters, animals):
+            data = text.encode("utf-8")
+            if changed(path, hashlib.sha256(data).hexdigest()):
+                _write(out_dir, path, data)
+
+        written = set()
+        pending = [a["id"] for a in animals if a["photo"] and changed(f"fotos/{a['id']}.png", a["photo"])]
+        for start in range(0, len(pending), PHOTO_BATCH):
+            with read_session() as s:
+                rows = s.execute(select(AnimalPhoto.animal_id, AnimalPhoto.thumbnail)
+                                 .where(AnimalPhoto.animal_id.in_(pending[start:start + PHOTO_BATCH])))
+                for animal_id, thumbnail in rows:
+                    _write(out_dir, f"fotos/{animal_id}.png", thumbnail)
+                    written.add(animal_id)
+        for animal_id in set(pending) - written:  # foto removida entre as leituras
+            del manifest[f"fotos/{animal_id}.png"]
+            summary["written"].remove(f"fotos/{animal_id}.png")
+
+        for path in sorted(set(previous) - set(manifest)):
+            try:
+                os.remove(os.path.join(out_dir, path))
+            except FileNotFoundError:
+                pass
+            summary["removed"].append(path)
+
+        _write(out_dir, MANIFEST, json.dumps(manifest, sort_keys=True).encode("utf-8"))
+        return summary
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 em caso de sucesso, 1 em caso de falha
+    """
+    parser = argparse.ArgumentParser(description="Gera o site estático dos animais disponíveis.")
+    parser.add_argument("--saida", "-o", default=OUTPUT_DIR, help="diretório do site")
+    parser.add_argument("--completo", action="store_true", help="reescreve todas as páginas")
+    parser.add_argument("--listar", action="store_true", help="lista os arquivos gravados e apagados")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    try:
+        summary = publish(args.saida, args.completo)
+    except OSError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    if args.listar:
+        for path in summary["written"]:
+            print(f"+ {path}")
+        for path in summary["removed"]:
+            print(f"- {path}")
+    print(f"{len(summary['written'])} gravados, {len(summary['removed'])} apagados, "
+          f"{summary['unchanged']} sem alteração em {args.saida} ({time.perf_counter() - started:.1f} s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,11 @@ Funcionalidades principais:
 - Integração com sistema de adoção
 - Interface dividida em lista e formulário
 - Atualizações em tempo real com sincronização entre abas
+- Detecção de tutores duplicados (ao salvar e em varredura completa)
+- Ordenação pelo cabeçalho feita no banco, com páginas lidas conforme a
+  rolagem (paged_tree.py)
+- Filtro rápido pelo início do nome, email ou cidade, sem diferenciar
+  acentos (quick_filter.py)
 
 Informações gerenciadas:
 - Dados pessoais: nome completo
@@ -22,6 +27,8 @@ Validações implementadas:
 - Validação completa de email com regex
 - Telefone: exatamente 11 dígitos numéricos
 - Prevenção de exclusão com processos ativos
+- Aviso de possível duplicado: mesmo telefone/email normalizados com
+  nome parecido (duplicates.py)
 - Integridade referencial com adoções
 
 Sincronização:
@@ -32,8 +39,13 @@ Sincronização:
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from database import session
+from database import read_session, session_scope
 from models import User
+import duplicates
+import queries
+from paged_tree import PagedTree
+from quick_filter import QuickFilter
+from diagnostics import instrumentado
 
 class UsersTab(ttk.Frame):
     """
@@ -103,6 +115,14 @@ class UsersTab(ttk.Frame):
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
+        # Ordenação pelo cabeçalho e páginas lidas conforme a rolagem
+        self.pager = PagedTree(self.tree, scrollbar, self.fetch_page, "Tutores")
+
+        # Filtro rápido acima da lista
+        self.quick = QuickFilter(left_panel, self.pager, queries.USER_FILTERS,
+                                 {"Nome": "name", "Email": "email", "Cidade": "city"})
+        self.quick.pack(fill=tk.X, pady=(0, 5), before=table_frame)
+
         # ========== PAINEL DIREITO - FORMULÁRIO ==========
         right_panel = ttk.Frame(main_container, width=350)
         right_panel.pack(side=tk.RIGHT, fill=tk.Y)
@@ -161,29 +181,29 @@ class UsersTab(ttk.Frame):
         ttk.Button(btn_frame, text="Novo", command=self.new).pack(side=tk.LEFT, padx=4)
         ttk.Button(btn_frame, text="Salvar", command=self.save).pack(side=tk.LEFT, padx=4)
         ttk.Button(btn_frame, text="Excluir", command=self.delete).pack(side=tk.LEFT, padx=4)
+        ttk.Button(btn_frame, text="Duplicados", command=self.show_duplicates).pack(side=tk.LEFT, padx=4)
         # Botão 'Atualizar Página' removido. Salvar já recarrega a lista.
 
         # ========== INICIALIZAÇÃO ==========
         self.selected_id = None
         self.load()
 
+    @instrumentado("Tutores: carregar")
     def load(self):
         """
-        Carrega todos os usuários na tabela.
+        Carrega os usuários na tabela.
         
-        Ordena os usuários por ID decrescente (mais recentes primeiro)
-        e formata o campo de aprovação para exibição "Sim"/"Não".
+        Relê a primeira página na ordenação atual (ID decrescente, mais
+        recentes primeiro, até um clique no cabeçalho); as demais páginas
+        são lidas conforme a rolagem.
         """
-        # Limpa a tabela atual
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        # Busca todos os usuários ordenados por ID decrescente
-        for usuario in session.query(User).order_by(User.id.desc()).all():
-            self.tree.insert("", "end", iid=str(usuario.id),
-                           values=(usuario.id, usuario.name, usuario.email, 
-                                   usuario.city or ""))
+        self.pager.reload()
 
+    def fetch_page(self, session, column, descending, after, limit):
+        """Consulta paginada da lista com o filtro rápido (ver paged_tree.PagedTree)."""
+        return queries.user_page(session, column, descending, after, limit, self.quick.prefix)
+
+    @instrumentado("Tutores: selecionar")
     def on_select(self, event):
         """
         Manipula a seleção de um usuário na lista.
@@ -196,7 +216,8 @@ class UsersTab(ttk.Frame):
             return
             
         # Busca o usuário selecionado
-        usuario = session.get(User, int(sel[0]))
+        with read_session() as s:
+            usuario = s.get(User, int(sel[0]))
         self.selected_id = usuario.id
 
         # Preenche campos básicos
@@ -229,6 +250,7 @@ class UsersTab(ttk.Frame):
             else:
                 widget.delete(0, tk.END)
 
+    @instrumentado("Tutores: salvar")
     def save(self):
         """
         Salva ou atualiza um usuário no banco de dados.
@@ -248,7 +270,6 @@ class UsersTab(ttk.Frame):
         email_pattern = r"[^@\s]+@[^@\s]+\.[^@\s]+"
         if not re.match(email_pattern, email):
             messagebox.showerror("Erro", "Email inválido.")
-            session.rollback()
             return
 
         # Validação de telefone (obrigatório): deve ter 11 dígitos
@@ -256,35 +277,40 @@ class UsersTab(ttk.Frame):
         phone_digits = "".join(ch for ch in phone_raw if ch.isdigit())
         if not phone_raw or len(phone_digits) != 11:
             messagebox.showerror("Erro", "Telefone inválido. Deve conter 11 dígitos.")
-            session.rollback()
             return
 
         # Cidade obrigatória
         city_val = self.inputs["Cidade"].get().strip()
         if not city_val:
             messagebox.showerror("Erro", "Cidade é obrigatória.")
-            session.rollback()
             return
 
-        # Determina se é criação ou edição
-        if self.selected_id:
-            usuario = session.get(User, self.selected_id)
-            if usuario is None:
-                messagebox.showerror("Erro", "Tutor selecionado não encontrado.")
+        # Aviso de possível recadastro (telefone/email normalizados + nome)
+        with read_session() as s:
+            similares = duplicates.find_similar(s, name, email, phone_digits, exclude_id=self.selected_id)
+        if similares:
+            linhas = "\n".join(
+                f"ID {user_id} - {nome} ({', '.join(motivos)}; nome {sim:.0%} parecido)"
+                for user_id, nome, _, _, sim, motivos in similares[:5]
+            )
+            if not messagebox.askyesno("Possível duplicado",
+                                       f"Tutores parecidos já cadastrados:\n\n{linhas}\n\nSalvar mesmo assim?"):
                 return
-        else:
-            usuario = User()
-            session.add(usuario)
-
-        # Atualiza dados básicos
-        usuario.name = name
-        usuario.email = email
-        usuario.phone = phone_digits
-        usuario.city = city_val
-        usuario.adoption_preferences = self.inputs["Observações"].get("1.0", tk.END).strip() or None
 
         try:
-            session.commit()
+            # Cria ou atualiza o tutor
+            with session_scope() as s:
+                usuario = queries.save_user(
+                    s, self.selected_id,
+                    name=name,
+                    email=email,
+                    phone=phone_digits,
+                    city=city_val,
+                    adoption_preferences=self.inputs["Observações"].get("1.0", tk.END).strip() or None,
+                )
+            if usuario is None:
+                messagebox.showerror("Erro", "Tutor selecionado não encontrado.")
+                return
             # Recarrega todas as abas para manter UI consistente
             try:
                 root = self.winfo_toplevel()
@@ -295,9 +321,9 @@ class UsersTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Tutor salvo com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao salvar tutor: {e}")
 
+    @instrumentado("Tutores: excluir")
     def delete(self):
         """
         Exclui o usuário selecionado após confirmação.
@@ -311,7 +337,8 @@ class UsersTab(ttk.Frame):
             
         # Verifica se o usuário possui processos de adoção
         from models import AdoptionProcess
-        processos_vinculados = session.query(AdoptionProcess).filter(AdoptionProcess.user_id == self.selected_id).count()
+        with read_session() as s:
+            processos_vinculados = s.query(AdoptionProcess).filter(AdoptionProcess.user_id == self.selected_id).count()
         if processos_vinculados > 0:
             messagebox.showerror("Erro", f"Não é possível excluir o tutor. Existem {processos_vinculados} processos de adoção vinculados a ele.")
             return
@@ -320,9 +347,8 @@ class UsersTab(ttk.Frame):
             return
             
         try:
-            usuario = session.get(User, self.selected_id)
-            session.delete(usuario)
-            session.commit()
+            with session_scope() as s:
+                s.delete(s.get(User, self.selected_id))
             
             # Recarrega todas as abas para manter UI consistente
             try:
@@ -336,5 +362,54 @@ class UsersTab(ttk.Frame):
             self.load()
             messagebox.showinfo("Sucesso", "Tutor excluído com sucesso.")
         except Exception as e:
-            session.rollback()
             messagebox.showerror("Erro", f"Erro ao excluir tutor: {e}")
+
+    # ========== DUPLICADOS ==========
+
+    @instrumentado("Tutores: duplicados")
+    def show_duplicates(self):
+        """
+        Exibe os pares de tutores provavelmente duplicados (varredura completa).
+
+        Duplo clique num par seleciona o primeiro tutor na lista para edição.
+        """
+        with read_session() as s:
+            pares = duplicates.scan(s)
+
+        window = tk.Toplevel(self)
+        window.title(f"Tutores duplicados ({len(pares)})")
+        window.transient(self.winfo_toplevel())
+
+        table_frame = ttk.Frame(window)
+        table_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        scrollbar = ttk.Scrollbar(table_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        columns = (("ID", 60), ("Nome", 180), ("ID Duplicado", 90), ("Nome Duplicado", 180),
+                   ("Motivo", 120), ("Nome %", 70))
+        tree = ttk.Treeview(table_frame, columns=[c for c, _ in columns], show="headings",
+                            yscrollcommand=scrollbar.set, height=15)
+        scrollbar.config(command=tree.yview)
+        for c, w in columns:
+            tree.heading(c, text=c.upper())
+            tree.column(c, width=w, anchor=tk.W)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        for a, nome_a, b, nome_b, sim, motivos in pares:
+            tree.insert("", "end", values=(a, nome_a, b, nome_b, ", ".join(motivos), f"{sim:.0%}"))
+
+        def abrir(event):
+            sel = tree.selection()
+            if not sel:
+                return
+            user_id = int(tree.item(sel[0], "values")[0])
+            # O tutor pode estar numa página ainda não lida da lista
+            with read_session() as s:
+                row = s.execute(queries.user_rows_stmt().where(User.id == user_id)).first()
+            if row:
+                self.pager.reveal(tuple(row))
+
+        tree.bind("<Double-1>", abrir)
+        if not pares:
+            ttk.Label(window, text="Nenhum duplicado provável encontrado.").pack(pady=(0, 10))
+        ttk.Button(window, text="Fechar", command=window.destroy).pack(pady=(0, 10))
@@ -31,7 +31,7 @@ e reusabilidade.
 
 5. Validações Utilitárias:
    - Verificação de tipos
-   - Normalização de strings
+   - Normalização de strings (acentos, telefone, email)
    - Validação de formatos
    - Tratamento de exceções
 
@@ -42,6 +42,7 @@ e reusabilidade.
    - Conversores customizados
 """
 
+import unicodedata
 from datetime import datetime, date
 from typing import Optional
 
@@ -65,6 +66,9 @@ SPECIES = ["", "Cachorro", "Gato", "Coelho", "Pássaro", "Roedor"]
 # Temperamentos disponíveis para animais
 TEMPERAMENTS = ["", "Dócil", "Sociável", "Brincalhão", "Medroso", "Agressivo"]
 
+# Níveis de acesso dos usuários do sistema (AuthUser.nivel_acesso)
+ACCESS_LEVELS = ["admin", "gestor", "usuario"]
+
 # ========== FUNÇÕES DE PARSING ==========
 
 def parse_bool(value: str) -> bool:
@@ -196,3 +200,66 @@ def combobox_set(cb, value: str):
         cb.set(value)
     else:
         cb.set("")
+
+# ========== NORMALIZAÇÃO PARA COMPARAÇÃO ==========
+
+def normalize_text(s: Optional[str]) -> str:
+    """
+    Normaliza um texto para comparação: sem acentos, minúsculo e com
+    espaços simples.
+
+    Args:
+        s (Optional[str]): Texto original
+
+    Returns:
+        str: Texto normalizado ("" para None)
+
+    Exemplos:
+        normalize_text("  José  da Silva ") → "jose da silva"
+        normalize_text("CONCEIÇÃO") → "conceicao"
+    """
+    if not s:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", s)
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(without_accents.casefold().split())
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """
+    Chave de comparação de telefone: apenas os 11 dígitos nacionais
+    (DDD + número), descartando o código do país e a formatação.
+
+    Args:
+        phone (Optional[str]): Telefone em qualquer formato
+
+    Returns:
+        Optional[str]: Dígitos normalizados, ou None se houver menos de 10
+
+    Exemplos:
+        phone_key("(11) 98765-4321") → "11987654321"
+        phone_key("+55 11 98765-4321") → "11987654321"
+    """
+    digits = "".join(ch for ch in (phone or "") if ch.isdigit())
+    if len(digits) > 11:
+        # Código do país (55) ou prefixo de discagem (0xx) à esquerda
+        digits = digits[-11:]
+    return digits if len(digits) >= 10 else None
+
+def email_key(email: Optional[str]) -> Optional[str]:
+    """
+    Chave de comparação de email: parte local normalizada, sem pontos e
+    sem sufixo "+etiqueta" (o domínio é ignorado).
+
+    Args:
+        email (Optional[str]): Email completo
+
+    Returns:
+        Optional[str]: Parte local normalizada, ou None se vazia
+
+    Exemplos:
+        email_key("Ana.Silva+abrigo@gmail.com") → "anasilva"
+        email_key("anasilva@hotmail.com") → "anasilva"
+    """
+    local = normalize_text(email).split("@", 1)[0]
+    local = local.split("+", 1)[0].replace(".", "").replace(" ", "")
+    return local or None
@@ -0,0 +1,423 @@
+"""
+API HTTP Somente Leitura - Animais, Abrigos e Pesquisa em JSON
+--------------------------------------------------------------
+Este módulo publica, num servidor HTTP da biblioteca padrão, os dados
+que os totens das feiras de adoção e o site precisam (animais
+disponíveis, lotação dos abrigos, pesquisa), sem abrir a aplicação e
+sem atrapalhar as estações que gravam no banco.
+
+1. Rotas (GET, respostas em JSON UTF-8):
+   - /animals: lista da AnimalsTab (queries.animal_page); filtros name=
+     ou breed= por prefixo, como o filtro rápido
+   - /animals/<id>: um animal
+   - /shelters: abrigos com capacidade, resgatados, adotados e atuais
+     (queries.shelter_page)
+   - /search: pesquisa da SearchTab (queries.search_page) com species,
+     size, shelter_id, age_min, age_max, text e status (ex:
+     status=Disponível); a primeira página traz também o total
+   - /search/facets: contagens por faceta (queries.facet_counts)
+   - Listas: sort=<campo>, order=asc|desc, limit (até MAX_LIMIT) e
+     after=<next da página anterior> (cursor keyset de
+     queries.sorted_page, opaco para o cliente); cursor adulterado ou de
+     outra ordenação = 400
+
+2. Conexões:
+   - Pool de POOL_SIZE conexões somente leitura (URI mode=ro e PRAGMA
+     query_only) numa engine própria, usada pela mesma camada de
+     consultas das abas; com o pool esgotado por POOL_TIMEOUT_S a
+     resposta é 503
+   - Em modo WAL, leitores nunca bloqueiam as gravações das estações;
+     fora dele, cada leitura segura o commit dos outros até terminar. O
+     servidor avisa ao iniciar; --wal converte o banco (persistente;
+     WAL exige o arquivo num disco local, não numa pasta de rede)
+   - O status dos animais é o gravado: a correção pelos processos
+     (queries.sync_animal_status) é feita pelas abas da aplicação
+
+3. Cache HTTP (ETag/304):
+   - ETag = instância do servidor + versão dos dados
+     (database.versao_dados, PRAGMA data_version), lida ANTES da consulta:
+     uma gravação no meio só pode gerar uma resposta nova a mais, nunca
+     um 304 indevido
+   - If-None-Match com a versão atual responde 304 sem consultar o banco
+   - Cache-Control: no-cache (o cliente sempre revalida)
+
+Uso:
+    python web_api.py [--host 0.0.0.0] [--porta 8080] [--wal]
+
+Variáveis de ambiente:
+    SHELTER_API_PORT: porta padrão (8080)
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import re
+import sys
+import threading
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError, StatementError, TimeoutError as PoolTimeout
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import database
+import queries
+from models import Animal
+from utils import normalize_text
+
+# Porta padrão
+PORT = int(os.environ.get("SHELTER_API_PORT", "8080"))
+
+# Conexões de leitura simultâneas
+POOL_SIZE = 4
+
+# Espera por uma conexão livre antes de responder 503 (s)
+POOL_TIMEOUT_S = 5
+
+# Espera pelo bloqueio do arquivo (ms)
+BUSY_TIMEOUT_MS = 5000
+
+# Linhas por página: padrão e máximo
+DEFAULT_LIMIT = 50
+MAX_LIMIT = queries.PAGE_SIZE
+
+# Campos de cada projeção (mesma ordem das colunas e de *_SORT)
+ANIMAL_FIELDS = ("id", "name", "species", "breed", "age", "size", "gender", "status", "shelter")
+SEARCH_FIELDS = ("id", "name", "species", "age", "size", "gender", "status", "shelter")
+SHELTER_FIELDS = ("id", "name", "email", "phone", "address", "capacity", "rescued", "adopted", "current")
+
+_ANIMAL_ID = re.compile(r"^/animals/(\d+)$")
+
+
+class BadRequest(ValueError):
+    """Parâmetro inválido (resposta 400)."""
+
+# ========== CONEXÕES ==========
+
+def create_read_engine(path=None, pool_size=POOL_SIZE):
+    """
+    Engine somente leitura sobre o arquivo do banco.
+
+    Args:
+        path (str): Arquivo (padrão: o da engine da aplicação)
+        pool_size (int): Conexões mantidas no pool
+
+    Returns:
+        Engine: Conexões abertas com mode=ro e PRAGMA query_only
+    """
+    path = path or database.engine.url.database
+    uri = Path(path).resolve().as_uri()
+    engine = create_engine(f"sqlite:///{uri}?mode=ro&uri=true", poolclass=QueuePool,
+                           pool_size=pool_size, max_overflow=0, pool_timeout=POOL_TIMEOUT_S)
+
+    @event.listens_for(engine, "connect")
+    def _configure(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        dbapi_connection.execute("PRAGMA query_only = ON")
+
+    return engine
+
+
+def journal_mode(engine):
+    """Modo de journal do arquivo (ex: "wal", "delete")."""
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+
+def enable_wal():
+    """
+    Converte o banco da aplicação para WAL (persistente, vale para todas
+    as estações).
+
+    Returns:
+        str: Modo resultante
+    """
+    with database.engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA journal_mode = WAL").scalar()
+
+# ========== PARÂMETROS ==========
+
+def _param(params, name, default=None, cast=str):
+    values = params.get(name)
+    if not values or values[0] == "":
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise BadRequest(f"Parâmetro inválido: {name}") from None
+
+
+def _paging(params, fields, default_sort="id"):
+    """(coluna, decrescente, cursor, limite) a partir de sort, order, after e limit."""
+    sort = _param(params, "sort", default_sort)
+    if sort not in fields:
+        raise BadRequest(f"sort deve ser um de: {', '.join(fields)}")
+    order = _param(params, "order", "asc")
+    if order not in ("asc", "desc"):
+        raise BadRequest("order deve ser asc ou desc")
+    limit = _param(params, "limit", DEFAULT_LIMIT, int)
+    if not 1 <= limit <= MAX_LIMIT:
+        raise BadRequest(f"limit deve estar entre 1 e {MAX_LIMIT}")
+    return fields.index(sort), order == "desc", decode_cursor(_param(params, "after")), limit
+
+
+def encode_cursor(cursor):
+    """Cursor de queries.sorted_page → texto opaco para a URL (None = fim)."""
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    """Texto de encode_cursor → cursor (None = primeira página)."""
+    if token is None:
+        return None
+    try:
+        cursor = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise BadRequest("Cursor inválido") from None
+    # Forma de queries.sorted_page: [trecho, [chave...], id]; o trecho e o
+    # tamanho da chave são conferidos pela própria ordenação
+    if not (isinstance(cursor, list) and len(cursor) == 3
+            and all(isinstance(v, int) and not isinstance(v, bool) for v in (cursor[0], cursor[2]))
+            and isinstance(cursor[1], list)):
+        raise BadRequest("Cursor inválido")
+    segment, last_key, last_id = cursor
+    return segment, tuple(last_key), last_id
+
+
+def _keyset(page, session, *args, after=None, **kwargs):
+    """
+    Executa uma função de página de queries.py com o cursor do cliente.
+
+    Raises:
+        BadRequest: Cursor incompatível com a ordenação pedida
+    """
+    try:
+        return page(session, *args, after=after, **kwargs)
+    except (TypeError, ValueError, StatementError):
+        if after is None:
+            raise
+        # Cursor adulterado: comparação impossível ou valores que não
+        # cabem nas colunas
+        raise BadRequest("Cursor inválido") from None
+
+
+def _criteria(params):
+    """Filtros da pesquisa (mesmos nomes de queries.search_animal_rows)."""
+    return dict(
+        species=_param(params, "species", ""),
+        size=_param(params, "size", ""),
+        shelter_id=_param(params, "shelter_id", None, int),
+        age_min=_param(params, "age_min", None, int),
+        age_max=_param(params, "age_max", None, int),
+        text=_param(params, "text", ""),
+        status=_param(params, "status", ""),
+    )
+
+
+def _page(rows, cursor, fields):
+    return {"items": [dict(zip(fields, row)) for row in rows], "next": encode_cursor(cursor)}
+
+# ========== ROTAS ==========
+
+def get_animals(session, params):
+    """Lista de animais (AnimalsTab); com filtro, ordenada pelo campo filtrado."""
+    prefix = None
+    for field in queries.ANIMAL_FILTERS:
+        text = normalize_text(_param(params, field, ""))
+        if text:
+            prefix = (field, text)
+    column, descending, after, limit = _paging(params, ANIMAL_FIELDS, prefix[0] if prefix else "id")
+    rows, cursor = _keyset(queries.animal_page, session, column, descending, after=after, limit=limit, prefix=prefix)
+    return _page(rows, cursor, ANIMAL_FIELDS)
+
+
+def get_animal(session, animal_id):
+    """Um animal (None se não existir)."""
+    row = session.execute(queries.animal_rows_stmt().where(Animal.id == animal_id)).first()
+    return dict(zip(ANIMAL_FIELDS, row)) if row else None
+
+
+def get_shelters(session, params):
+    """Abrigos com as estatísticas da ShelterTab."""
+    column, descending, after, limit = _paging(params, SHELTER_FIELDS)
+    rows, cursor = _keyset(queries.shelter_page, session, column, descending, after=after, limit=limit)
+    return _page(rows, cursor, SHELTER_FIELDS)
+
+
+def get_search(session, params):
+    """Pesquisa (SearchTab); a primeira página traz o total."""
+    criteria = _criteria(params)
+    column, descending, after, limit = _paging(params, SEARCH_FIELDS)
+    rows, cursor = _keyset(queries.search_page, session, criteria, column, descending, after=after, limit=limit)
+    body = _page(rows, cursor, SEARCH_FIELDS)
+    if after is None:
+        body["total"] = queries.search_count(session, **criteria)
+    return body
+
+
+def get_facets(session, params):
+    """Contagens por faceta sob os filtros da pesquisa."""
+    counts = queries.facet_counts(session, **_criteria(params))
+    return {facet: [{"value": value, "count": n} for value, n in values] for facet, values in counts.items()}
+
+
+ROUTES = {
+    "/animals": get_animals,
+    "/shelters": get_shelters,
+    "/search": get_search,
+    "/search/facets": get_facets,
+}
+
+# ========== SERVIDOR ==========
+
+class ApiServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP com o pool de leitura e a versão dos dados.
+
+    Atributos:
+        sessions (sessionmaker): Sessões sobre a engine somente leitura
+        instance (str): Identificador desta execução (parte do ETag: a
+            versão dos dados recomeça a cada abertura do arquivo)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, pool_size=POOL_SIZE):
+        super().__init__(address, ApiHandler)
+        self.engine = create_read_engine(pool_size=pool_size)
+        self.sessions = sessionmaker(bind=self.engine)
+        self.instance = uuid.uuid4().hex[:8]
+        self._version_lock = threading.Lock()
+
+    def etag(self):
+        """ETag da versão atual dos dados (mesmo valor para todas as rotas)."""
+        with self._version_lock:  # conexão de versao_dados compartilhada
+            return f'"{self.instance}-{database.versao_dados()}"'
+
+    def server_close(self):
+        super().server_close()
+        self.engine.dispose()
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Atende as rotas de ROUTES (somente GET)."""
+
+    server_version = "ShelterAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        match = _ANIMAL_ID.match(path)
+        if path not in ROUTES and not match:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Rota não encontrada", "routes": sorted(ROUTES)})
+            return
+
+        # Versão lida antes da consulta (ver docstring do módulo)
+        etag = self.server.etag()
+        if etag in (tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")):
+            self._send(HTTPStatus.NOT_MODIFIED, b"", etag)
+            return
+
+        try:
+            with self.server.sessions() as session:
+                if match:
+                    body = get_animal(session, int(match.group(1)))
+                    if body is None:
+                        self._send_json(HTTPStatus.NOT_FOUND, {"error": "Animal não encontrado"})
+                        return
+                else:
+                    body = ROUTES[path](session, parse_qs(url.query))
+        except BadRequest as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+        except PoolTimeout:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Servidor ocupado, tente novamente"})
+            return
+        except OperationalError as e:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": f"Banco indisponível: {e.orig}"})
+            return
+        except Exception as e:
+            # Nunca derrubar a conexão sem resposta
+            self.log_error("Erro ao atender %s: %r", self.path, e)
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Erro interno"})
+            return
+        self._send_json(HTTPStatus.OK, body, etag)
+
+    def _send_json(self, status, body, etag=None):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self._send(status, data, etag)
+
+    def _send(self, status, data, etag=None):
+        self.send_response(status)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+
+def serve(host="127.0.0.1", port=PORT, pool_size=POOL_SIZE):
+    """
+    Atende requisições até Ctrl+C.
+
+    Args:
+        host (str): Endereço (0.0.0.0 = todas as interfaces)
+        port (int): Porta
+        pool_size (int): Conexões de leitura
+    """
+    server = ApiServer((host, port), pool_size)
+    mode = journal_mode(server.engine)
+    if mode != "wal":
+        print(f"Aviso: banco em modo {mode}; as leituras da API atrasam as gravações das estações. "
+              "Use --wal (disco local) para evitar.")
+    print(f"API em http://{host}:{port}/ ({database.DATABASE_PATH}, {pool_size} conexões de leitura)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# ========== LINHA DE COMANDO ==========
+
+def main(argv=None):
+    """
+    Ponto de entrada de linha de comando.
+
+    Returns:
+        int: 0 ao encerrar, 1 se o servidor não puder iniciar
+    """
+    parser = argparse.ArgumentParser(description="API HTTP somente leitura do abrigo (JSON).")
+    parser.add_argument("--host", default="127.0.0.1", help="endereço (0.0.0.0 = todas as interfaces)")
+    parser.add_argument("--porta", type=int, default=PORT)
+    parser.add_argument("--conexoes", type=int, default=POOL_SIZE, help="conexões de leitura")
+    parser.add_argument("--wal", action="store_true",
+                        help="converte o banco para WAL antes de iniciar (persistente; apenas disco local)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.wal:
+            print(f"Modo do banco: {enable_wal()}")
+        serve(args.host, args.porta, args.conexoes)
+    except (OSError, OperationalError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())